@@ -8,6 +8,9 @@ from django.db.models import Q
 
 User = get_user_model()
 
+# Атрибут с предзагруженными активными тегами поста (Prefetch to_attr)
+ACTIVE_TAGS_ATTR = 'prefetched_active_tags'
+
 class BlogCategory(TimeStampedModel):
     """
     Категория блога
@@ -151,9 +154,14 @@ class BlogPost(TimeStampedModel):
     def get_tags_with_icons(self):
         """
         Возвращает теги с иконками для шаблона
+
+        Использует теги, предзагруженные в ACTIVE_TAGS_ATTR, если они есть.
         """
+        tags = getattr(self, ACTIVE_TAGS_ATTR, None)
+        if tags is None:
+            tags = self.tags.filter(is_active=True)
         tags_data = []
-        for tag in self.tags.filter(is_active=True):
+        for tag in tags:
             tags_data.append({
                 'name': tag.name,
                 'url': f'?tag={tag.slug}',
@@ -6,3 +6,7 @@ class ContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'content'
     verbose_name = _('Контент')
+
+    def ready(self):
+        """Подключение сигналов сброса кэша контекст-процессоров."""
+        import content.signals
@@ -1,24 +1,37 @@
 from django.utils import timezone
+from core.caching import VersionedCache
 from .models import Banner, SiteSettings
 
+# Кэш баннеров и настроек сайта; сбрасывается сигналами Banner и SiteSettings
+site_content_cache = VersionedCache('site_content')
+
+
 def site_content(request):
-    """Контекстный процессор для управления контентом сайта"""
+    """
+    Контекстный процессор для управления контентом сайта.
+
+    Данные берутся из кэша только при обращении к ним в шаблоне.
+    """
     today = timezone.now().date()
-    
-    # Получаем активные баннеры
-    banners = Banner.objects.filter(
+    return {
+        # Дата в ключе: набор активных баннеров меняется по расписанию показа
+        'banners': site_content_cache.lazy(f'banners:{today.isoformat()}', lambda: _build_banners(today)),
+        'site_settings': site_content_cache.lazy('site_settings', _build_site_settings)
+    }
+
+
+def _build_banners(today):
+    """Активные баннеры на дату"""
+    return list(Banner.objects.filter(
         is_active=True,
         start_date__lte=today,
         end_date__gte=today
-    ).order_by('order')
-    
-    # Получаем настройки сайта
+    ).order_by('order'))
+
+
+def _build_site_settings():
+    """Настройки сайта (None, если не созданы)"""
     try:
-        site_settings = SiteSettings.objects.get()
+        return SiteSettings.objects.get()
     except SiteSettings.DoesNotExist:
-        site_settings = None
-    
-    return {
-        'banners': banners,
-        'site_settings': site_settings
-    } 
\ No newline at end of file
+        return None
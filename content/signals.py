@@ -0,0 +1,21 @@
+"""
+Сигналы приложения content.
+
+Баннеры и настройки сайта (context_processors.site_content_cache)
+кэшируются на всех страницах; их изменения сбрасывают кэш во всех процессах.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .context_processors import site_content_cache
+from .models import Banner, SiteSettings
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def invalidate_site_content(sender, **kwargs):
+    """Сбрасывает кэш баннеров и настроек сайта."""
+    site_content_cache.invalidate_on_change()
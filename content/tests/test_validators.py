@@ -1,8 +1,11 @@
+from django import forms
 from django.test import TestCase
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
 from django.core.exceptions import ValidationError
+from unittest import mock
 from PIL import Image
 import io
+import tracemalloc
 
 from content.validators import (
     validate_image_format, 
@@ -12,7 +15,9 @@ from content.validators import (
     validate_desktop_image,
     validate_tablet_image,
     validate_mobile_image,
-    get_ratio_display
+    get_ratio_display,
+    probe_image,
+    ImageProbe,
 )
 
 
@@ -192,4 +197,72 @@ class ContentValidatorsTest(TestCase):
         
         # Должно не пройти с маленьким допуском
         with self.assertRaises(ValidationError):
-            validate_image_aspect_ratio(self.close_ratio_jpg, 16/9, tolerance=0.001) 
\ No newline at end of file
+            validate_image_aspect_ratio(self.close_ratio_jpg, 16/9, tolerance=0.001) 
+
+class ImageProbeTest(TestCase):
+    """Тесты разбора заголовка изображения"""
+
+    def _upload(self, size, padding=0):
+        """Создает загрузку во временном файле, как Django для больших файлов"""
+        img_io = io.BytesIO()
+        Image.new('RGB', size, color='red').save(img_io, format='JPEG')
+        upload = TemporaryUploadedFile('banner.jpg', 'image/jpeg', 0, None)
+        upload.write(img_io.getvalue())
+        # Данные после маркера конца JPEG не влияют на заголовок
+        chunk = b'\0' * (1024 * 1024)
+        for _ in range(padding // len(chunk)):
+            upload.write(chunk)
+        upload.size = upload.tell()
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload
+
+    def test_single_probe_per_upload(self):
+        """Все валидаторы цепочки используют один разбор заголовка"""
+        upload = self._upload((1920, 1080))
+        upload.seek(10)
+        with mock.patch('content.validators.Image.open', wraps=Image.open) as image_open:
+            validate_desktop_image(upload)
+            validate_image_dimensions(upload, 100, 100, 4000, 4000)
+            validate_image_aspect_ratio(upload, 16/9)
+        self.assertEqual(image_open.call_count, 1)
+        self.assertEqual(probe_image(upload), ImageProbe('JPEG', 1920, 1080))
+        self.assertEqual(upload.tell(), 10)
+
+    def test_form_image_reused(self):
+        """Изображение, уже открытое forms.ImageField, не читается повторно"""
+        upload = forms.ImageField().clean(self._upload((1920, 1080)))
+        with mock.patch('content.validators.Image.open') as image_open:
+            validate_desktop_image(upload)
+        image_open.assert_not_called()
+
+    def test_memory_flat_for_large_uploads(self):
+        """Бенчмарк: память при проверке 20 МБ не растет вместе с размером файла"""
+        small = self._upload((1920, 1080))
+        large = self._upload((1920, 1080), padding=20 * 1024 * 1024)
+        self.assertGreater(large.size, 20 * 1024 * 1024)
+
+        peaks, read = {}, {}
+        for name, upload in (('small', small), ('large', large)):
+            read[name] = 0
+            file_read = upload.file.read
+
+            def counting_read(*args, name=name, file_read=file_read):
+                data = file_read(*args)
+                read[name] += len(data)
+                return data
+
+            tracemalloc.start()
+            with mock.patch.object(upload.file, 'read', counting_read):
+                validate_desktop_image(upload)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        # Читается только заголовок, а не 20 МБ файла
+        self.assertGreater(read['small'], 0)
+        self.assertLess(read['large'], 1024 * 1024)
+        self.assertEqual(read['large'], read['small'])
+
+        # Прежняя реализация копировала весь файл в BytesIO (20+ МБ на проверку)
+        self.assertLess(peaks['large'], 1024 * 1024)
+        self.assertLess(peaks['large'], peaks['small'] * 2 + 64 * 1024)
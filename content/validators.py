@@ -1,9 +1,70 @@
+from dataclasses import dataclass
+
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from PIL import Image
-import os
 from .constants import DEFAULT_SIZES
-import io
+
+SUPPORTED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+# Атрибут загруженного файла, в котором хранится результат разбора заголовка
+PROBE_ATTR = '_image_probe'
+
+
+@dataclass(frozen=True)
+class ImageProbe:
+    """Формат и размеры изображения, прочитанные из заголовка файла."""
+    format: str
+    width: int
+    height: int
+
+    @property
+    def ratio(self):
+        return self.width / self.height
+
+
+def probe_image(image):
+    """
+    Читает формат и размеры изображения без чтения всего файла.
+
+    Pillow открывает файл лениво: разбирается только заголовок, пиксели не
+    декодируются, поэтому память не зависит от размера загрузки. Результат
+    сохраняется на объекте файла, и все валидаторы цепочки используют одну
+    проверку. Если файл уже открыт формой (forms.ImageField кладет
+    изображение в атрибут image), повторно он не читается.
+
+    Args:
+        image: Загруженный файл или FieldFile
+
+    Returns:
+        ImageProbe: Формат и размеры
+
+    Raises:
+        OSError: Если файл не является изображением
+    """
+    probe = getattr(image, PROBE_ATTR, None)
+    if probe is not None:
+        return probe
+
+    opened = getattr(image, 'image', None)
+    if isinstance(opened, Image.Image):
+        probe = ImageProbe(opened.format, opened.width, opened.height)
+    else:
+        position = image.tell()
+        image.seek(0)
+        try:
+            opened = Image.open(image)
+            probe = ImageProbe(opened.format, opened.width, opened.height)
+        finally:
+            # Возвращаем курсор туда, где он был до проверки
+            image.seek(position)
+
+    try:
+        setattr(image, PROBE_ATTR, probe)
+    except AttributeError:
+        pass
+    return probe
+
 
 def validate_image_format(image, size):
     """
@@ -14,73 +75,64 @@ def validate_image_format(image, size):
         size: Словарь с требуемыми размерами {'min_width': int, 'min_height': int}
     """
     try:
-        # Открываем изображение
-        img = Image.open(io.BytesIO(image.read()))
-        
-        # Проверяем размеры
-        if img.width < size['min_width'] or img.height < size['min_height']:
-            raise ValidationError(
-                _('Изображение должно быть не меньше %(width)sx%(height)s пикселей.'),
-                params={'width': size['min_width'], 'height': size['min_height']},
-            )
-            
-        # Проверяем формат
-        if img.format not in ['JPEG', 'PNG', 'WEBP']:
-            raise ValidationError(
-                _('Поддерживаются только форматы JPEG, PNG и WEBP.')
-            )
-            
-        # Возвращаем курсор в начало файла
-        image.seek(0)
-        
+        probe = probe_image(image)
     except Exception as e:
         raise ValidationError(
             _('Ошибка при обработке изображения: %(error)s'),
             params={'error': str(e)},
         )
 
+    # Проверяем размеры
+    if probe.width < size['min_width'] or probe.height < size['min_height']:
+        raise ValidationError(
+            _('Изображение должно быть не меньше %(width)sx%(height)s пикселей.'),
+            params={'width': size['min_width'], 'height': size['min_height']},
+        )
+
+    # Проверяем формат
+    if probe.format not in SUPPORTED_FORMATS:
+        raise ValidationError(
+            _('Поддерживаются только форматы JPEG, PNG и WEBP.')
+        )
+
 def validate_image_dimensions(value, min_width, min_height, max_width, max_height):
     """Проверка размеров изображения"""
     try:
-        img = Image.open(value)
-        width, height = img.size
-        
-        if width < min_width or height < min_height:
-            raise ValidationError(
-                _('Изображение слишком маленькое. Минимальный размер: %(min_width)sx%(min_height)s пикселей.') % {
-                    'min_width': min_width,
-                    'min_height': min_height
-                }
-            )
-            
-        if width > max_width or height > max_height:
-            raise ValidationError(
-                _('Изображение слишком большое. Максимальный размер: %(max_width)sx%(max_height)s пикселей.') % {
-                    'max_width': max_width,
-                    'max_height': max_height
-                }
-            )
-            
+        probe = probe_image(value)
     except Exception as e:
         raise ValidationError(_('Ошибка при проверке изображения: %(error)s') % {'error': str(e)})
 
+    if probe.width < min_width or probe.height < min_height:
+        raise ValidationError(
+            _('Изображение слишком маленькое. Минимальный размер: %(min_width)sx%(min_height)s пикселей.') % {
+                'min_width': min_width,
+                'min_height': min_height
+            }
+        )
+
+    if probe.width > max_width or probe.height > max_height:
+        raise ValidationError(
+            _('Изображение слишком большое. Максимальный размер: %(max_width)sx%(max_height)s пикселей.') % {
+                'max_width': max_width,
+                'max_height': max_height
+            }
+        )
+
 def validate_image_aspect_ratio(value, target_ratio, tolerance=0.1):
     """Проверка пропорций изображения"""
     try:
-        img = Image.open(value)
-        width, height = img.size
-        current_ratio = width / height
-        
-        if abs(current_ratio - target_ratio) > tolerance:
-            raise ValidationError(
-                _('Неверные пропорции изображения. Требуемое соотношение: %(ratio)s:1') % {
-                    'ratio': target_ratio
-                }
-            )
-            
+        probe = probe_image(value)
+        current_ratio = probe.ratio
     except Exception as e:
         raise ValidationError(_('Ошибка при проверке пропорций изображения: %(error)s') % {'error': str(e)})
 
+    if abs(current_ratio - target_ratio) > tolerance:
+        raise ValidationError(
+            _('Неверные пропорции изображения. Требуемое соотношение: %(ratio)s:1') % {
+                'ratio': target_ratio
+            }
+        )
+
 def validate_banner_image(value, device_type):
     """Проверка изображения баннера на соответствие размерам для определенного типа устройства"""
     # Получаем все форматы для данного типа устройства
@@ -89,14 +141,13 @@ def validate_banner_image(value, device_type):
     if not device_sizes:
         raise ValidationError(_('Не найдены форматы для данного типа устройства'))
     
-    # Проверяем формат файла
+    # Проверяем формат файла (заголовок читается один раз и кэшируется на файле)
     validate_image_format(value, device_sizes[0])
     
     try:
-        # Открываем изображение для проверки размеров
-        img = Image.open(value)
-        width, height = img.size
-        current_ratio = width / height
+        probe = probe_image(value)
+        width, height = probe.width, probe.height
+        current_ratio = probe.ratio
         
         # Проверяем, соответствует ли изображение хотя бы одному формату
         valid_for_any_size = False
@@ -1,8 +1,35 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
+from django.contrib.admin.views.main import ChangeList
 from django.utils.html import format_html
+from .generic import prefetch_generic
 from .models import City, Region, CityCoordinates
 
+
+class GenericPrefetchChangeList(ChangeList):
+    """Changelist resolving generic foreign keys of a page in batch."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        # Queryset остается queryset (нужен list_editable); после вычисления
+        # он отдает те же экземпляры, в которые записываются связанные объекты
+        for field_name in self.model_admin.generic_prefetch_fields:
+            prefetch_generic(self.result_list, field_name, select_related=(), prefetch_related=())
+
+
+class GenericPrefetchAdminMixin:
+    """
+    Admin mixin for list columns showing generic foreign keys.
+
+    Objects referenced by ``generic_prefetch_fields`` are loaded with one
+    query per model for the whole page instead of one query per row.
+    """
+    generic_prefetch_fields = ('facility',)
+
+    def get_changelist(self, request, **kwargs):
+        return GenericPrefetchChangeList
+
+
 @admin.register(Region)
 class RegionAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'is_active']
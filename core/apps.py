@@ -8,5 +8,11 @@ class CoreConfig(AppConfig):
     verbose_name = _('Ядро')
     
     def ready(self):
-        """Подключение сигналов при запуске приложения."""
+        """Подключение сигналов, проверок и журнала медленных запросов при запуске приложения."""
+        import core.checks
         import core.signals
+        from django.db.backends.signals import connection_created
+        from .query_inspector import install_slow_query_logger
+
+        connection_created.connect(install_slow_query_logger, dispatch_uid='core.slow_query_logger')
+        install_slow_query_logger()
@@ -0,0 +1,183 @@
+"""
+Two-tier versioned cache for data shown on every page.
+
+A VersionedCache keeps values in a small in-process LRU in front of the
+shared Django cache. Both tiers are keyed by a version number stored in the
+shared cache; invalidate() bumps it, so stale entries of every process are
+simply never read again. Model signals call invalidate_on_change(), which
+bumps the version now and again after the transaction commits (see
+run_now_and_on_commit()). The version itself
+is re-read from the shared cache at most every VERSION_TTL seconds, which
+bounds how long another process can serve an old value.
+
+Version numbers (here and in the other modules that version their caches:
+page tags, facets, city grid, gazetteer, trigram indexes) live in the
+'versions' cache alias, apart from the cached values: an evicted version
+would start again from 0 and bring back entries stored under it. See
+get_version() and bump_version().
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+
+def get_context_cache_settings():
+    """
+    Get context cache settings merged with defaults.
+
+    Returns:
+        dict: TIMEOUT (seconds in the shared cache), LOCAL_SIZE (entries per
+        namespace in the process) and VERSION_TTL (seconds)
+    """
+    options = {
+        'TIMEOUT': 60 * 60,
+        'LOCAL_SIZE': 64,
+        'VERSION_TTL': 5,
+    }
+    options.update(getattr(settings, 'CONTEXT_CACHE', {}))
+    return options
+
+
+VERSION_CACHE_ALIAS = 'versions'
+
+
+def get_version_cache():
+    """
+    Get the cache storing version numbers.
+
+    Returns:
+        BaseCache: The 'versions' cache, or the default cache if the alias
+        is not configured
+    """
+    if VERSION_CACHE_ALIAS in settings.CACHES:
+        return caches[VERSION_CACHE_ALIAS]
+    return cache
+
+
+def get_version(key):
+    """Get a version number (0 if it was never bumped)."""
+    return get_version_cache().get(key, 0)
+
+
+def get_versions(keys):
+    """Get version numbers of several keys in one request, in the order of keys."""
+    versions = get_version_cache().get_many(keys)
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def bump_version(key):
+    """
+    Increment a version number in every process.
+
+    Args:
+        key: Version key
+
+    Returns:
+        int: New version
+    """
+    version_cache = get_version_cache()
+    # add() не перезаписывает: параллельные процессы не сбросят чужой incr
+    version_cache.add(key, 0, None)
+    return version_cache.incr(key)
+
+
+def run_now_and_on_commit(invalidate):
+    """
+    Run a cache invalidation now and again after the transaction commits.
+
+    The immediate run makes the change visible to the current request. A
+    concurrent request may still read the old rows before the commit and
+    store them under the new version; the run after the commit drops such
+    entries. Outside a transaction both runs happen at once.
+
+    Args:
+        invalidate: Callable without arguments
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class VersionedCache:
+    """
+    Process-local LRU in front of the shared cache with versioned keys.
+
+    Args:
+        namespace: Prefix of the cache keys (e.g. 'service_menu')
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+
+    @property
+    def version_key(self):
+        return f'context_cache:{self.namespace}:version'
+
+    def get_version(self):
+        """Get the current version (re-read at most every VERSION_TTL seconds)."""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= get_context_cache_settings()['VERSION_TTL']:
+            version = get_version(self.version_key)
+            with self._lock:
+                if version != self._version:
+                    self._local.clear()
+                self._version, self._version_checked = version, now
+        return self._version
+
+    def get(self, key, build):
+        """
+        Get a value, building and storing it on a miss in both tiers.
+
+        Args:
+            key: Key inside the namespace
+            build: Callable returning the value (must be picklable)
+
+        Returns:
+            Cached or freshly built value
+        """
+        options = get_context_cache_settings()
+        version = self.get_version()
+        local_key = (version, key)
+        with self._lock:
+            if local_key in self._local:
+                self._local.move_to_end(local_key)
+                return self._local[local_key]
+
+        shared_key = f'context_cache:{self.namespace}:{version}:{key}'
+        value = cache.get(shared_key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            cache.set(shared_key, value, options['TIMEOUT'])
+
+        with self._lock:
+            self._local[local_key] = value
+            while len(self._local) > options['LOCAL_SIZE']:
+                self._local.popitem(last=False)
+        return value
+
+    def lazy(self, key, build):
+        """Get a proxy that reads the value only when a template uses it."""
+        return SimpleLazyObject(lambda: self.get(key, build))
+
+    def invalidate(self):
+        """Drop cached values of the namespace in every process."""
+        bump_version(self.version_key)
+        with self._lock:
+            self._local.clear()
+            self._version = None
+
+    def invalidate_on_change(self):
+        """Invalidate after a model change: now and after commit (see run_now_and_on_commit())."""
+        run_now_and_on_commit(self.invalidate)
+
+
+_MISSING = object()
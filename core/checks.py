@@ -0,0 +1,44 @@
+"""
+System checks of the deployment configuration.
+
+Run with ``python manage.py check --deploy``.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .caching import VERSION_CACHE_ALIAS
+
+
+# Бэкенды, данные которых не видны другим процессам
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warn when caches are not shared between processes.
+
+    Page, context and card caches, cache versions, rate limit counters and
+    metrics are read by every worker; with a process-local backend each
+    worker sees only its own copy and invalidation does not reach the others.
+    """
+    warnings = []
+    for alias in ('default', VERSION_CACHE_ALIAS):
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if alias == VERSION_CACHE_ALIAS and backend is None:
+            warnings.append(Warning(
+                f"CACHES['{VERSION_CACHE_ALIAS}'] is not configured.",
+                hint='Cache versions are stored in the default cache and can be evicted with the values.',
+                id='core.W002',
+            ))
+        elif backend in PROCESS_LOCAL_CACHES:
+            warnings.append(Warning(
+                f"CACHES['{alias}'] uses {backend.rsplit('.', 1)[-1]}, which is not shared between processes.",
+                hint='Set REDIS_URL or configure Memcached for production.',
+                id='core.W001',
+            ))
+    return warnings
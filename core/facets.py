@@ -0,0 +1,115 @@
+"""
+Faceted filter counts.
+
+Counts of a facet are computed with one grouped query over the objects
+matching the current search and all other filters (the facet's own filter
+is left out, so the user sees how many objects every alternative value
+gives). Results are cached per facet by a normalized signature of the
+other parameters; a version number in the cache is bumped when the
+underlying objects change.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count
+
+from .caching import bump_version, get_version
+from .text import normalize_text
+
+
+def get_facet_settings():
+    """
+    Get facet settings merged with defaults.
+
+    Returns:
+        dict: Settings TIMEOUT (seconds) and MAX_VALUES
+    """
+    options = {
+        'TIMEOUT': 600,
+        'MAX_VALUES': 100,
+    }
+    options.update(getattr(settings, 'FACETS', {}))
+    return options
+
+
+def _version_key(namespace):
+    return f'facets:{namespace}:version'
+
+
+def get_facets_version(namespace):
+    """Get the current cache version of facets in the namespace."""
+    return get_version(_version_key(namespace))
+
+
+def invalidate_facets(namespace):
+    """
+    Drop cached facet counts of the namespace in every process.
+
+    Args:
+        namespace: Facet namespace (usually a model label)
+    """
+    bump_version(_version_key(namespace))
+
+
+def facet_signature(params, text_params=()):
+    """
+    Build a stable signature of filter parameters.
+
+    Empty values are dropped. Free-text values are normalized so that
+    equivalent queries ('Нарколог ' and 'нарколог') share a cache entry;
+    other values are exact-match filters (slugs, ids) and are kept as is.
+
+    Args:
+        params: Iterable of (name, value) pairs
+        text_params: Names of free-text parameters (the search query)
+
+    Returns:
+        str: Hex digest
+    """
+    normalized = sorted(
+        (name, ' '.join(normalize_text(value).split()) if name in text_params else value)
+        for name, value in params
+        if value and str(value).strip()
+    )
+    return hashlib.md5(repr(normalized).encode('utf-8')).hexdigest()
+
+
+def facet_cache_key(namespace, param, signature):
+    """Get the cache key of one facet's counts."""
+    return f'facets:{namespace}:{get_facets_version(namespace)}:{param}:{signature}'
+
+
+def count_facet(queryset, value_field, label_field=None, limit=None):
+    """
+    Count objects per value of a field with one grouped query.
+
+    Args:
+        queryset: Objects matching the current search and other filters
+        value_field: Lookup of the filter value (e.g. 'city__slug')
+        label_field: Lookup of the display name (value is used if None)
+        limit: Maximum number of values
+
+    Returns:
+        list: Dicts with 'value', 'label' and 'count', most frequent first
+    """
+    model = queryset.model
+    # Подзапрос по pk убирает дубли от JOIN, сортировку и аннотации исходного запроса
+    fields = [value_field] + ([label_field] if label_field else [])
+    rows = (
+        model._base_manager.filter(pk__in=queryset.values('pk'))
+        .filter(**{f'{value_field}__isnull': False})
+        .values(*fields)
+        .annotate(count=Count('pk', distinct=True))
+        .order_by('-count', label_field or value_field)
+    )
+    if limit:
+        rows = rows[:limit]
+    return [
+        {
+            'value': str(row[value_field]),
+            'label': row[label_field] if label_field else row[value_field],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,203 @@
+"""
+In-memory gazetteer of cities.
+
+All City, Region and CityCoordinates rows are loaded once per process into
+parallel arrays (one slot per city) with dictionaries from id, slug and
+name to the slot, so lookups are O(1) and never touch the database. The
+copy is reloaded when a version number in the Django cache changes;
+signals bump it on every change of the three models.
+
+Cities without active coordinates fall back to SEED_COORDINATES, which is
+also what the add_city_coordinates command writes to the database.
+"""
+
+import math
+import threading
+from array import array
+from collections import namedtuple
+
+from .caching import bump_version, get_version
+
+
+GAZETTEER_VERSION_KEY = 'gazetteer:version'
+
+# Координаты крупных городов России: начальные данные CityCoordinates
+# и запасной вариант для городов без координат в БД
+SEED_COORDINATES = {
+    'Москва': (55.7558, 37.6176),
+    'Санкт-Петербург': (59.9311, 30.3609),
+    'Новосибирск': (55.0084, 82.9357),
+    'Екатеринбург': (56.8519, 60.6122),
+    'Казань': (55.8304, 49.0661),
+    'Нижний Новгород': (56.2965, 43.9361),
+    'Челябинск': (55.1644, 61.4368),
+    'Самара': (53.2001, 50.1500),
+    'Уфа': (54.7388, 55.9721),
+    'Ростов-на-Дону': (47.2357, 39.7015),
+    'Краснодар': (45.0355, 38.9753),
+    'Анапа': (44.8947, 37.3166),
+    'Сочи': (43.6028, 39.7342),
+    'Волгоград': (48.7080, 44.5133),
+    'Пермь': (58.0105, 56.2502),
+    'Воронеж': (51.6720, 39.1843),
+    'Саратов': (51.5924, 46.0347),
+    'Тольятти': (53.5078, 49.4204),
+    'Ижевск': (56.8519, 53.2324),
+    'Ульяновск': (54.3176, 48.3706),
+    'Барнаул': (53.3548, 83.7698),
+    'Иркутск': (52.2896, 104.2806),
+    'Хабаровск': (48.4802, 135.0719),
+    'Ярославль': (57.6261, 39.8875),
+    'Владивосток': (43.1198, 131.8869),
+    'Махачкала': (42.9849, 47.5047),
+    'Томск': (56.4977, 84.9744),
+    'Оренбург': (51.7727, 55.0988),
+    'Кемерово': (55.3904, 86.0468),
+    'Новокузнецк': (53.7945, 87.1848),
+    'Рязань': (54.6269, 39.6916),
+    'Астрахань': (46.3589, 48.0506),
+    'Набережные Челны': (55.7436, 52.3958),
+    'Пенза': (53.2007, 45.0046),
+    'Липецк': (52.6031, 39.5708),
+    'Киров': (58.6035, 49.6668),
+    'Чебоксары': (56.1322, 47.2519),
+    'Тула': (54.1961, 37.6182),
+    'Калининград': (54.7074, 20.5072),
+    'Курск': (51.7373, 36.1873),
+    'Улан-Удэ': (51.8335, 107.5841),
+    'Ставрополь': (45.0428, 41.9734),
+    'Магнитогорск': (53.4186, 59.0472),
+    'Иваново': (57.0004, 40.9739),
+    'Брянск': (53.2521, 34.3717),
+    'Тверь': (56.8587, 35.9006),
+    'Белгород': (50.5977, 36.5858),
+    'Архангельск': (64.5473, 40.5602),
+    'Владимир': (56.1296, 40.4066),
+    'Севастополь': (44.6166, 33.5254),
+    'Чита': (52.0515, 113.4719),
+    'Грозный': (43.3178, 45.6949),
+    'Симферополь': (44.9572, 34.1108),
+}
+
+Place = namedtuple('Place', 'id name slug region latitude longitude')
+Place.__doc__ = """City of the gazetteer; latitude and longitude are None if unknown."""
+
+
+class _Index:
+    """Parallel arrays of one loaded copy; replaced as a whole on reload."""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.lat = array('d')
+        self.lon = array('d')
+        self.region = array('l')
+        self.names = []
+        self.slugs = []
+        self.region_names = []
+        self.by_id = {}
+        self.by_slug = {}
+        self.by_name = {}
+
+    def place(self, index):
+        if index is None:
+            return None
+        lat, lon = self.lat[index], self.lon[index]
+        known = not math.isnan(lat)
+        region = self.region[index]
+        return Place(
+            self.ids[index],
+            self.names[index],
+            self.slugs[index],
+            self.region_names[region] if region >= 0 else None,
+            lat if known else None,
+            lon if known else None,
+        )
+
+
+class Gazetteer:
+    """
+    Array-backed index of cities with their regions and coordinates.
+    """
+
+    def __init__(self):
+        self._index = _Index()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index.ids)
+
+    def ensure_loaded(self):
+        """Load cities if the gazetteer is missing or outdated."""
+        version = get_version(GAZETTEER_VERSION_KEY)
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version == version:
+                return
+            # Читатели продолжают работать со старой копией до замены
+            self._index = self._load()
+            self._version = version
+
+    def _load(self):
+        from .models import City, Region
+
+        index = _Index()
+        regions = {}
+        for region_id, name in Region.objects.values_list('id', 'name'):
+            regions[region_id] = len(index.region_names)
+            index.region_names.append(name)
+
+        rows = City.objects.order_by('id').values_list(
+            'id', 'name', 'slug', 'region_id',
+            'coordinates__latitude', 'coordinates__longitude', 'coordinates__is_active',
+        )
+        for city_id, name, slug, region_id, lat, lon, active in rows:
+            if lat is None or not active:
+                lat, lon = SEED_COORDINATES.get(name, (math.nan, math.nan))
+            position = len(index.ids)
+            index.ids.append(city_id)
+            index.lat.append(float(lat))
+            index.lon.append(float(lon))
+            index.region.append(regions.get(region_id, -1))
+            index.names.append(name)
+            index.slugs.append(slug)
+            index.by_id[city_id] = position
+            # Slug и название уникальны только в пределах региона: первый город выигрывает
+            index.by_slug.setdefault(slug, position)
+            index.by_name.setdefault(name.casefold(), position)
+        return index
+
+    def get(self, city_id):
+        """
+        Get a city by primary key.
+
+        Args:
+            city_id: City primary key
+
+        Returns:
+            Place: City or None if unknown
+        """
+        self.ensure_loaded()
+        index = self._index
+        return index.place(index.by_id.get(city_id))
+
+    def get_by_slug(self, slug):
+        """Get a city by slug (None if unknown)."""
+        self.ensure_loaded()
+        index = self._index
+        return index.place(index.by_slug.get(slug))
+
+    def get_by_name(self, name):
+        """Get a city by case-insensitive name (None if unknown)."""
+        self.ensure_loaded()
+        index = self._index
+        return index.place(index.by_name.get(name.strip().casefold()))
+
+
+gazetteer = Gazetteer()
+
+
+def invalidate_gazetteer():
+    """Make every process reload the gazetteer."""
+    bump_version(GAZETTEER_VERSION_KEY)
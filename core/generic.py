@@ -0,0 +1,119 @@
+"""
+Batch resolution of generic foreign keys.
+
+Accessing a GenericForeignKey on every object of a list runs one query per
+object. Django batches it with prefetch_related() and GenericPrefetch;
+get_generic_queryset() builds the querysets for it (joining city and
+organization type and prefetching images when the model has them), and
+prefetch_generic() applies them to already loaded instances, so
+``obj.facility`` no longer hits the database.
+"""
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
+
+
+DEFAULT_SELECT_RELATED = ('city', 'city__region', 'organization_type')
+DEFAULT_PREFETCH_RELATED = ('images',)
+
+
+def get_generic_field(model, name=None):
+    """
+    Get a GenericForeignKey of a model.
+
+    Args:
+        model: Model class
+        name: Field name (the only generic foreign key if None)
+
+    Returns:
+        GenericForeignKey: Field
+
+    Raises:
+        ValueError: If the field is not found or ambiguous
+    """
+    fields = [f for f in model._meta.private_fields if isinstance(f, GenericForeignKey)]
+    if name is not None:
+        fields = [f for f in fields if f.name == name]
+    if len(fields) != 1:
+        raise ValueError(f'{model.__name__} has no single generic foreign key {name or ""}'.strip())
+    return fields[0]
+
+
+def _has_lookup(model, lookup):
+    """Check that a select_related/prefetch_related lookup exists on the model."""
+    for part in lookup.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+        if model is None:
+            return False
+    return True
+
+
+def get_generic_queryset(model, queryset=None, select_related=DEFAULT_SELECT_RELATED,
+                         prefetch_related=DEFAULT_PREFETCH_RELATED):
+    """
+    Build the queryset used to load objects of one model.
+
+    A queryset given by the caller is used as is, so it can carry its own
+    prefetches (e.g. ``Clinic.objects.with_related_data()``).
+
+    Args:
+        model: Target model class
+        queryset: Queryset of the model (the base manager with default
+            relations if None)
+        select_related: Lookups joined when the model has them
+        prefetch_related: Lookups prefetched when the model has them
+
+    Returns:
+        QuerySet: Queryset with related data
+    """
+    if queryset is not None:
+        return queryset
+    queryset = model._base_manager.all()
+    select = [lookup for lookup in select_related if _has_lookup(model, lookup)]
+    prefetch = [lookup for lookup in prefetch_related if _has_lookup(model, lookup)]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def prefetch_generic(instances, field_name=None, querysets=None, **options):
+    """
+    Resolve a generic foreign key of many objects at once.
+
+    A GenericPrefetch with a queryset per referenced model is passed to
+    prefetch_related_objects(), so Django runs one query per model.
+
+    Args:
+        instances: Iterable of model instances of one model
+        field_name: GenericForeignKey name (the only one by default)
+        querysets: Optional {model: queryset} overriding default querysets
+        **options: select_related / prefetch_related for get_generic_queryset()
+
+    Returns:
+        list: The instances; the field returns the loaded object (or None)
+        without queries
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+
+    field = get_generic_field(type(instances[0]), field_name)
+    ct_attname = instances[0]._meta.get_field(field.ct_field).attname
+    content_type_ids = {getattr(instance, ct_attname) for instance in instances} - {None}
+    models = {ContentType.objects.get_for_id(pk).model_class() for pk in content_type_ids}
+
+    querysets = querysets or {}
+    prefetch_related_objects(instances, GenericPrefetch(field.name, [
+        get_generic_queryset(model, querysets.get(model), **options)
+        for model in models if model is not None
+    ]))
+    return instances
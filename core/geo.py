@@ -0,0 +1,289 @@
+"""
+Geographical search over city coordinates.
+
+Facilities are located by their city, so "near" queries work on
+CityCoordinates:
+
+1. An in-memory grid over active city coordinates selects cities inside
+   the radius (haversine is computed only for cities in grid cells that
+   intersect the bounding box).
+2. The facility queryset is restricted to these cities and to the bounding
+   box in SQL, and annotated with ``distance_km`` for ordering.
+
+The grid is loaded lazily once per process. Coordinate changes bump a
+version number in the Django cache, so every process reloads its copy.
+"""
+
+import math
+import re
+import threading
+
+from django.conf import settings
+from django.db.models import Case, FloatField, Value, When
+
+from .caching import bump_version, get_version
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_CELL_SIZE = 1.0  # градусы
+
+GRID_VERSION_KEY = 'city_grid:version'
+
+COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def get_geo_settings():
+    """
+    Get "near" search settings merged with defaults.
+
+    Returns:
+        dict: Settings DEFAULT_RADIUS_KM, MAX_RADIUS_KM and CELL_SIZE
+    """
+    options = {
+        'DEFAULT_RADIUS_KM': 50,
+        'MAX_RADIUS_KM': 1000,
+        'CELL_SIZE': DEFAULT_CELL_SIZE,
+    }
+    options.update(getattr(settings, 'GEO_SEARCH', {}))
+    return options
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Get great-circle distance between two points.
+
+    Args:
+        lat1, lon1: First point in degrees
+        lat2, lon2: Second point in degrees
+
+    Returns:
+        float: Distance in kilometers
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Get a latitude/longitude box containing the circle.
+
+    Args:
+        lat, lon: Center in degrees
+        radius_km: Radius in kilometers
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lon, max_lon); longitude spans the
+        whole range near the poles
+    """
+    d_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-6 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    d_lon = radius_km / (KM_PER_DEGREE * cos_lat)
+    return min_lat, max_lat, lon - d_lon, lon + d_lon
+
+
+class CityGrid:
+    """
+    Uniform grid of city coordinates.
+
+    Cells, coordinates and slugs are kept in one tuple. A reload builds new
+    dicts and replaces the tuple with one assignment, so lookups running at
+    the same time, without the lock, see either the old grid or the new one.
+
+    Args:
+        cell_size: Cell size in degrees
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        # (ячейка -> id городов, id города -> координаты, slug -> id города)
+        self._data = ({}, {}, {})
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data[1])
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size))
+
+    def add(self, city_id, lat, lon, slug=None):
+        """
+        Add a city to the grid.
+
+        Args:
+            city_id: City primary key
+            lat, lon: Coordinates in degrees
+            slug: City slug for origin lookups
+        """
+        self._add_to(self._data, city_id, lat, lon, slug)
+
+    def _add_to(self, data, city_id, lat, lon, slug):
+        cells, cities, slugs = data
+        cities[city_id] = (lat, lon)
+        cells.setdefault(self._cell(lat, lon), []).append(city_id)
+        if slug:
+            slugs[slug] = city_id
+
+    def clear(self):
+        """Remove all cities."""
+        self._data = ({}, {}, {})
+
+    def get_city_coordinates(self, slug):
+        """
+        Get coordinates of a city by slug.
+
+        Args:
+            slug: City slug
+
+        Returns:
+            tuple: (lat, lon) or None if the city has no active coordinates
+        """
+        _, cities, slugs = self._data
+        city_id = slugs.get(slug)
+        return cities.get(city_id) if city_id is not None else None
+
+    def _lon_ranges(self, min_lon, max_lon):
+        """Split a longitude range crossing the antimeridian."""
+        if min_lon < -180:
+            return [(min_lon + 360, 180.0), (-180.0, max_lon)]
+        if max_lon > 180:
+            return [(min_lon, 180.0), (-180.0, max_lon - 360)]
+        return [(min_lon, max_lon)]
+
+    def within(self, lat, lon, radius_km):
+        """
+        Get cities within the radius.
+
+        Args:
+            lat, lon: Center in degrees
+            radius_km: Radius in kilometers
+
+        Returns:
+            list: (city_id, distance_km) pairs, nearest first
+        """
+        cells, cities, _ = self._data
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        row_from, row_to = self._cell(min_lat, 0)[0], self._cell(max_lat, 0)[0]
+
+        result = []
+        for lon_from, lon_to in self._lon_ranges(min_lon, max_lon):
+            col_from, col_to = self._cell(0, lon_from)[1], self._cell(0, lon_to)[1]
+            for row in range(row_from, row_to + 1):
+                for col in range(col_from, col_to + 1):
+                    for city_id in cells.get((row, col), ()):
+                        city_lat, city_lon = cities[city_id]
+                        distance = haversine_km(lat, lon, city_lat, city_lon)
+                        if distance <= radius_km:
+                            result.append((city_id, distance))
+        result.sort(key=lambda item: (item[1], item[0]))
+        return result
+
+    def ensure_loaded(self):
+        """Load active city coordinates if the grid is missing or outdated."""
+        version = get_version(GRID_VERSION_KEY)
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version == version:
+                return
+            from .models import CityCoordinates
+
+            data = ({}, {}, {})
+            rows = CityCoordinates.objects.filter(is_active=True).values_list(
+                'city_id', 'city__slug', 'latitude', 'longitude'
+            )
+            for city_id, slug, lat, lon in rows:
+                self._add_to(data, city_id, float(lat), float(lon), slug)
+            self._data = data
+            self._version = version
+
+
+city_grid = CityGrid(get_geo_settings()['CELL_SIZE'])
+
+
+def invalidate_city_grid():
+    """Make every process reload the city grid."""
+    bump_version(GRID_VERSION_KEY)
+
+
+def parse_near(value):
+    """
+    Resolve a "near" value into coordinates.
+
+    Args:
+        value: 'lat,lon' pair or a city slug
+
+    Returns:
+        tuple: (lat, lon) in degrees
+
+    Raises:
+        ValueError: If coordinates are out of range or the city is unknown
+    """
+    if isinstance(value, (tuple, list)):
+        lat, lon = float(value[0]), float(value[1])
+    else:
+        match = COORDINATES_RE.match(value or '')
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+        else:
+            city_grid.ensure_loaded()
+            coordinates = city_grid.get_city_coordinates((value or '').strip())
+            if coordinates is None:
+                raise ValueError(f'Неизвестный город: {value}')
+            lat, lon = coordinates
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Координаты вне допустимого диапазона')
+    return lat, lon
+
+
+def filter_near(queryset, near, radius_km=None, city_field='city'):
+    """
+    Filter objects located in cities within the radius.
+
+    Args:
+        queryset: QuerySet of a model with a foreign key to City
+        near: 'lat,lon' pair, (lat, lon) tuple or city slug
+        radius_km: Radius in kilometers (DEFAULT_RADIUS_KM if None)
+        city_field: Name of the City foreign key
+
+    Returns:
+        QuerySet: Objects annotated with ``distance_km``, nearest first
+
+    Raises:
+        ValueError: If near or radius is invalid
+    """
+    options = get_geo_settings()
+    radius_km = float(options['DEFAULT_RADIUS_KM'] if radius_km is None else radius_km)
+    if not 0 < radius_km <= options['MAX_RADIUS_KM']:
+        raise ValueError('Радиус вне допустимого диапазона')
+
+    lat, lon = parse_near(near)
+    city_grid.ensure_loaded()
+    cities = city_grid.within(lat, lon, radius_km)
+    if not cities:
+        return queryset.none()
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    coordinates = f'{city_field}__coordinates'
+    queryset = queryset.filter(**{
+        f'{city_field}_id__in': [city_id for city_id, _ in cities],
+        f'{coordinates}__is_active': True,
+        f'{coordinates}__latitude__range': (min_lat, max_lat),
+    })
+    if min_lon >= -180 and max_lon <= 180:
+        queryset = queryset.filter(**{f'{coordinates}__longitude__range': (min_lon, max_lon)})
+
+    return queryset.annotate(
+        distance_km=Case(
+            *[When(**{f'{city_field}_id': city_id}, then=Value(round(distance, 3)))
+              for city_id, distance in cities],
+            output_field=FloatField()
+        )
+    ).order_by('distance_km', *(queryset.query.order_by or queryset.model._meta.ordering))
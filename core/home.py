@@ -0,0 +1,129 @@
+"""
+Precomputed snapshot of the homepage blocks.
+
+The homepage shows rehab centers, clinics and private doctors (featured
+first), specialists, recovery stories and blog posts. The snapshot builder
+loads every block with its related data in a fixed number of queries and
+stores the lists in a VersionedCache, so steady-state requests render the
+page without touching the database.
+
+The snapshot is dropped when a model shown on the homepage changes (see
+core.signals) and rebuilt by the next request; the refresh_home_snapshot
+command rebuilds it on a schedule.
+"""
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .caching import VersionedCache
+
+# Кэш блоков главной страницы; сбрасывается сигналами моделей из SNAPSHOT_MODELS
+home_snapshot_cache = VersionedCache('home_snapshot')
+
+SNAPSHOT_KEY = 'blocks'
+
+# Модели, изменения которых влияют на главную страницу
+SNAPSHOT_MODELS = (
+    'facilities.RehabCenter',
+    'facilities.Clinic',
+    'facilities.PrivateDoctor',
+    'facilities.FacilityImage',
+    'facilities.OrganizationType',
+    'core.City',
+    'core.Region',
+    'staff.MedicalSpecialist',
+    'staff.FacilitySpecialist',
+    'staff.Specialization',
+    'recovery_stories.RecoveryStory',
+    'blog.BlogPost',
+    'blog.Tag',
+    'blog.BlogPostTag',
+)
+
+# Поля-счетчики просмотров: их сохранение не меняет главную страницу
+COUNTER_FIELDS = frozenset({'views', 'views_count'})
+
+
+def get_home_settings():
+    """
+    Get homepage snapshot settings merged with defaults.
+
+    Returns:
+        dict: Block sizes FACILITIES, SPECIALISTS, STORIES and POSTS
+    """
+    options = {
+        'FACILITIES': 12,
+        'SPECIALISTS': 12,
+        'STORIES': 6,
+        'POSTS': 3,
+    }
+    options.update(getattr(settings, 'HOME_SNAPSHOT', {}))
+    return options
+
+
+def build_home_snapshot():
+    """
+    Load all homepage blocks.
+
+    Featured facilities come first, then the newest regular ones. Cards
+    need the city with region and the main image of facilities,
+    specializations and organization type of doctors and active tags of
+    posts; all of them are loaded here.
+
+    Returns:
+        dict: Lists of model instances by context name
+    """
+    from blog.models import ACTIVE_TAGS_ATTR, BlogPost, Tag
+    from facilities.models import Clinic, PrivateDoctor, RehabCenter
+    from recovery_stories.models import RecoveryStory
+    from staff.models import MedicalSpecialist
+
+    options = get_home_settings()
+    facilities_limit = options['FACILITIES']
+    newest_featured = ('-is_featured', '-created_at')
+    return {
+        'rehab_centers': list(
+            RehabCenter.objects.with_related_data()
+            .filter(is_active=True).order_by(*newest_featured)[:facilities_limit]
+        ),
+        'clinics': list(
+            Clinic.objects.with_related_data()
+            .filter(is_active=True).order_by(*newest_featured)[:facilities_limit]
+        ),
+        'private_doctors': list(
+            PrivateDoctor.objects.with_related_data().select_related('organization_type')
+            .order_by(*newest_featured)[:facilities_limit]
+        ),
+        'specialists': list(
+            MedicalSpecialist.objects.filter(is_active=True).order_by('-created_at')[:options['SPECIALISTS']]
+        ),
+        'recovery_stories': list(
+            RecoveryStory.objects.filter(is_published=True).order_by('-created_at')[:options['STORIES']]
+        ),
+        'useful_info_cards': list(
+            BlogPost.objects.filter(is_published=True).prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.filter(is_active=True), to_attr=ACTIVE_TAGS_ATTR)
+            ).order_by('-created_at')[:options['POSTS']]
+        ),
+    }
+
+
+def get_home_snapshot():
+    """
+    Get the homepage blocks, building them on a miss.
+
+    Returns:
+        dict: Lists of model instances by context name
+    """
+    return home_snapshot_cache.get(SNAPSHOT_KEY, build_home_snapshot)
+
+
+def refresh_home_snapshot():
+    """
+    Rebuild the snapshot and make every process use the new one.
+
+    Returns:
+        dict: Fresh homepage blocks
+    """
+    home_snapshot_cache.invalidate()
+    return get_home_snapshot()
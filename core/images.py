@@ -0,0 +1,358 @@
+"""
+Resized and WebP/AVIF derivatives of uploaded images.
+
+Every registered image field gets fixed-width copies of the upload in the
+original format and in WebP (and AVIF when Pillow supports it). They are
+stored next to the original (``photo.jpg`` -> ``photo.w320.webp``) together
+with a JSON manifest (``photo.derivatives.json``) listing them, which
+templates read through the cache to build ``srcset`` attributes.
+
+Derivatives are generated in a process pool after the upload is committed,
+so Pillow work does not block the request; ``generate_image_derivatives``
+backfills existing media. Derivatives are deleted together with the
+original (django-cleanup ``cleanup_post_delete`` signal).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = '.derivatives.json'
+
+# Форматы Pillow и расширения файлов
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'png': ('PNG', 'png', 'image/png'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'avif': ('AVIF', 'avif', 'image/avif'),
+}
+
+# Ошибки чтения и кодирования, после которых файл пропускается
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_image_settings():
+    """
+    Get image derivative settings merged with defaults.
+
+    Returns:
+        dict: WIDTHS, MAX_WIDTH, FORMATS, QUALITY, WORKERS, ASYNC,
+        MANIFEST_TIMEOUT (seconds) and FIELDS ({'app.Model': [field names]})
+    """
+    options = {
+        'WIDTHS': (320, 640, 1024),
+        'MAX_WIDTH': 1920,
+        'FORMATS': ('webp', 'avif'),
+        'QUALITY': 80,
+        'WORKERS': 2,
+        'ASYNC': True,
+        'MANIFEST_TIMEOUT': 24 * 60 * 60,
+        'FIELDS': {
+            'facilities.FacilityImage': ['image'],
+            'facilities.Clinic': ['meta_image'],
+            'facilities.RehabCenter': ['meta_image'],
+            'facilities.PrivateDoctor': ['meta_image'],
+            'staff.MedicalSpecialist': ['photo'],
+            'staff.FacilitySpecialist': ['photo', 'meta_image'],
+            'blog.BlogPost': ['image', 'meta_image'],
+            'blog.Article': ['image', 'meta_image'],
+            'recovery_stories.RecoveryStory': ['image', 'meta_image'],
+            'content.Banner': ['image'],
+        },
+    }
+    options.update(getattr(settings, 'IMAGE_DERIVATIVES', {}))
+    return options
+
+
+def get_image_fields(model):
+    """
+    Get names of image fields with derivatives of a model.
+
+    Returns:
+        list: Field names (empty if the model is not registered)
+    """
+    return get_image_settings()['FIELDS'].get(model._meta.label, [])
+
+
+def get_output_formats(options=None):
+    """Get derivative formats supported by the installed Pillow."""
+    options = options or get_image_settings()
+    return [fmt for fmt in options['FORMATS'] if fmt in FORMATS and features.check(fmt)]
+
+
+def derivative_name(name, width, fmt):
+    """
+    Get the storage name of a derivative.
+
+    Args:
+        name: Storage name of the original ('facilities/images/a.jpg')
+        width: Width in pixels
+        fmt: Format key from FORMATS
+
+    Returns:
+        str: Name next to the original ('facilities/images/a.w320.webp')
+    """
+    stem, _ = os.path.splitext(name)
+    return f'{stem}.w{width}.{FORMATS[fmt][1]}'
+
+
+def manifest_name(name):
+    """Get the storage name of the derivatives manifest of an original."""
+    return os.path.splitext(name)[0] + MANIFEST_SUFFIX
+
+
+def _manifest_cache_key(name):
+    return 'images:manifest:' + hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+def forget_manifest(name):
+    """Drop the cached manifest of an original."""
+    cache.delete(_manifest_cache_key(name))
+
+
+def _save(storage, name, data):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def _encode(image, fmt, quality):
+    pil_format = FORMATS[fmt][0]
+    if pil_format in ('JPEG', 'AVIF') and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    buffer = io.BytesIO()
+    save_options = {'optimize': True} if pil_format in ('JPEG', 'PNG') else {}
+    if pil_format != 'PNG':
+        save_options['quality'] = quality
+    image.save(buffer, pil_format, **save_options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, options=None, storage=None):
+    """
+    Generate derivatives of one image and write its manifest.
+
+    Widths not smaller than the original are skipped (no upscaling); the
+    modern formats also get a copy at the original width (at most
+    MAX_WIDTH), the original itself is the full-size fallback.
+
+    Args:
+        name: Storage name of the original
+        options: Settings from get_image_settings()
+        storage: Storage of the file (default storage if None)
+
+    Returns:
+        dict: Manifest with 'width', 'height' and 'sources'
+        ({format: [[width, name], ...]}, narrowest first)
+    """
+    options = options or get_image_settings()
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        original_format = (image.format or 'JPEG').lower()
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    width, height = image.size
+
+    fallback = original_format if original_format in ('jpeg', 'png', 'webp') else 'jpeg'
+    max_width = min(width, options['MAX_WIDTH'])
+    sizes = sorted({w for w in options['WIDTHS'] if w < max_width} | {max_width})
+
+    sources = {}
+    resized = {}
+    for fmt in [fallback] + [f for f in get_output_formats(options) if f != fallback]:
+        variants = []
+        for target in sizes:
+            if fmt == original_format and target == width:
+                # Оригинал уже есть в этом формате и размере
+                variants.append([width, name])
+                continue
+            if target not in resized:
+                resized[target] = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS, reducing_gap=3.0
+                )
+            data = _encode(resized[target], fmt, options['QUALITY'])
+            variants.append([target, _save(storage, derivative_name(name, target, fmt), data)])
+        sources[fmt] = variants
+
+    manifest = {'width': width, 'height': height, 'fallback': fallback, 'sources': sources}
+    _save(storage, manifest_name(name), json.dumps(manifest).encode('utf-8'))
+    return manifest
+
+
+def delete_derivatives(name, storage=None):
+    """
+    Delete derivatives and the manifest of an original.
+
+    Args:
+        name: Storage name of the original
+        storage: Storage of the file (default storage if None)
+    """
+    storage = storage or default_storage
+    manifest = read_manifest(name, storage)
+    for variants in manifest.get('sources', {}).values():
+        for _, variant in variants:
+            if variant != name and storage.exists(variant):
+                storage.delete(variant)
+    if storage.exists(manifest_name(name)):
+        storage.delete(manifest_name(name))
+    forget_manifest(name)
+
+
+def read_manifest(name, storage=None):
+    """Read the manifest of an original from the storage ({} if missing)."""
+    storage = storage or default_storage
+    try:
+        with storage.open(manifest_name(name), 'rb') as file:
+            return json.loads(file.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def get_manifest(name, storage=None):
+    """
+    Get the manifest of an original through the cache.
+
+    Args:
+        name: Storage name of the original
+        storage: Storage of the file (default storage if None)
+
+    Returns:
+        dict: Manifest ({} while derivatives are not generated)
+    """
+    if not name:
+        return {}
+    key = _manifest_cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = read_manifest(name, storage)
+        options = get_image_settings()
+        # Отсутствующий манифест кэшируется ненадолго: он появится после обработки
+        cache.set(key, manifest, options['MANIFEST_TIMEOUT'] if manifest else 60)
+    return manifest
+
+
+def get_srcset(file, fmt=None):
+    """
+    Build a srcset attribute value for an image file.
+
+    Args:
+        file: FieldFile (or storage name) of the original
+        fmt: Format key; the fallback format of the manifest if None
+
+    Returns:
+        str: 'url 320w, url 640w, ...' or '' if there are no derivatives
+    """
+    name = getattr(file, 'name', file)
+    storage = getattr(file, 'storage', None) or default_storage
+    manifest = get_manifest(name, storage)
+    variants = manifest.get('sources', {}).get(fmt or manifest.get('fallback'), [])
+    return ', '.join(f'{storage.url(variant)} {width}w' for width, variant in variants)
+
+
+def init_worker():
+    """Set up Django in a pool process (needed with the spawn start method)."""
+    import django
+
+    django.setup()
+
+
+def get_executor():
+    """Get the process pool running Pillow work (created on first use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=get_image_settings()['WORKERS'], initializer=init_worker
+            )
+        return _executor
+
+
+def _done(name, future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Failed to generate derivatives of %s: %s', name, error)
+    forget_manifest(name)
+
+
+def schedule_derivatives(name):
+    """
+    Generate derivatives of an uploaded image in the process pool.
+
+    With ASYNC disabled (tests, single-process deployments) the work runs
+    inline.
+
+    Args:
+        name: Storage name of the original
+
+    Returns:
+        Future: Pending result, or None if the work ran inline
+    """
+    if not get_image_settings()['ASYNC']:
+        try:
+            generate_derivatives(name)
+        except IMAGE_ERRORS as error:
+            logger.error('Failed to generate derivatives of %s: %s', name, error)
+        forget_manifest(name)
+        return None
+    try:
+        future = get_executor().submit(generate_derivatives, name)
+    except BrokenProcessPool:
+        # Процесс пула упал (например, OOM): пул пересоздается при следующей загрузке
+        shutdown_executor(wait=False)
+        logger.error('Image process pool is broken, %s is left without derivatives', name)
+        return None
+    future.add_done_callback(lambda future: _done(name, future))
+    return future
+
+
+def shutdown_executor(wait=True):
+    """Stop the process pool (it is recreated on the next upload)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def iter_image_names(fields=None):
+    """
+    Iterate over stored names of all registered image fields.
+
+    Args:
+        fields: {'app.Model': [field names]} (registered fields if None)
+
+    Yields:
+        str: Storage names, each once
+    """
+    seen = set()
+    for label, field_names in (fields or get_image_settings()['FIELDS']).items():
+        model = apps.get_model(label)
+        for field_name in field_names:
+            names = model._base_manager.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).order_by().values_list(field_name, flat=True).distinct()
+            for name in names.iterator():
+                if name not in seen:
+                    seen.add(name)
+                    yield name
@@ -8,13 +8,327 @@
 - Ошибки
 """
 
+import atexit
+import copy
 import logging
+import logging.config
+import logging.handlers
 import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 from django.conf import settings
 from django.utils import timezone
 
 
+def get_log_queue_settings():
+    """
+    Get queued logging settings merged with defaults.
+    
+    Returns:
+        dict: ENABLED, MAXSIZE (records in the queue), BATCH_SIZE,
+        FLUSH_INTERVAL (seconds a batch may collect records) and
+        SHUTDOWN_TIMEOUT (seconds)
+    """
+    options = {
+        'ENABLED': True,
+        'MAXSIZE': 10000,
+        'BATCH_SIZE': 500,
+        'FLUSH_INTERVAL': 0.2,
+        'SHUTDOWN_TIMEOUT': 5.0,
+    }
+    options.update(getattr(settings, 'LOG_QUEUE', {}))
+    return options
+
+
+class BatchedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotating file handler whose flushes the log writer defers to the end of a batch."""
+    
+    defer_flush = False
+    
+    def flush(self):
+        if not self.defer_flush:
+            super().flush()
+
+
+class DroppingQueue(queue.Queue):
+    """
+    Bounded queue of (handlers, record) items with an overflow policy.
+    
+    When the queue is full, a WARNING or higher record replaces the oldest
+    DEBUG/INFO one; otherwise the new record is dropped. Dropped records are
+    counted by level name.
+    """
+    
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.dropped = Counter()
+    
+    def offer(self, item, levelno):
+        """
+        Put an item without blocking.
+        
+        Args:
+            item: (handlers, record) pair
+            levelno: Level of the record
+            
+        Returns:
+            bool: False if the record was dropped
+        """
+        with self.mutex:
+            if 0 < self.maxsize <= self._qsize():
+                if levelno <= logging.INFO or not self._evict_low_level():
+                    self.dropped[logging.getLevelName(levelno)] += 1
+                    return False
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return True
+    
+    def _evict_low_level(self):
+        for index, queued in enumerate(self.queue):
+            if queued is not None and queued[1].levelno <= logging.INFO:
+                del self.queue[index]
+                self.dropped[queued[1].levelname] += 1
+                return True
+        return False
+
+
+class QueuedLogHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the background log writer instead of writing them.
+    
+    Args:
+        writer: LogWriter instance
+        targets: Handlers the records are written to
+    """
+    
+    def __init__(self, writer, targets):
+        super().__init__(writer.queue)
+        self.writer = writer
+        self.targets = tuple(targets)
+    
+    def prepare(self, record):
+        # Сообщение и traceback вычисляются в потоке запроса: аргументы
+        # могут измениться или обращаться к БД, пока запись ждет в очереди.
+        # Меняется копия: ту же запись получают обработчики родительских логгеров
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        self.writer.submit(self.targets, record)
+
+
+class LogWriter:
+    """
+    Background thread writing queued records to their handlers.
+    
+    Records are collected into batches of up to BATCH_SIZE for at most
+    FLUSH_INTERVAL seconds; file handlers are flushed once per batch.
+    
+    Args:
+        maxsize: Queue size
+        batch_size: Records per batch
+        flush_interval: Seconds a batch may wait for more records
+    """
+    
+    def __init__(self, maxsize=10000, batch_size=500, flush_interval=0.2):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = DroppingQueue(maxsize)
+        self.overflow_targets = ()
+        self._reported = 0
+        self._thread = None
+    
+    def submit(self, targets, record):
+        """Queue a record for the handlers (dropped on overflow)."""
+        return self.queue.offer((targets, record), record.levelno)
+    
+    def start(self):
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                stop = self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    def write(self, batch):
+        """
+        Write a batch of queued items.
+        
+        Args:
+            batch: (handlers, record) pairs; None stops the writer
+            
+        Returns:
+            bool: True if the batch contained the stop marker
+        """
+        touched = set()
+        stop = False
+        for item in batch:
+            if item is None:
+                stop = True
+                continue
+            targets, record = item
+            for handler in targets:
+                if record.levelno >= handler.level:
+                    self._handle(handler, record, touched)
+        self._report_overflow(touched)
+        for handler in touched:
+            handler.defer_flush = False
+            handler.flush()
+        return stop
+    
+    def _handle(self, handler, record, touched):
+        if isinstance(handler, BatchedTimedRotatingFileHandler):
+            handler.defer_flush = True
+            touched.add(handler)
+        handler.handle(record)
+    
+    def _report_overflow(self, touched):
+        dropped = sum(self.queue.dropped.values())
+        if dropped == self._reported or not self.overflow_targets:
+            return
+        record = logging.LogRecord(
+            'core.logging', logging.WARNING, __file__, 0,
+            f"LOG_QUEUE_OVERFLOW: {json.dumps(dict(self.queue.dropped), ensure_ascii=False)}", None, None,
+        )
+        self._reported = dropped
+        for handler in self.overflow_targets:
+            self._handle(handler, record, touched)
+    
+    def flush(self, timeout=5.0):
+        """
+        Wait until every queued record is written.
+        
+        Args:
+            timeout: Seconds to wait
+            
+        Returns:
+            bool: False if records were still queued after the timeout
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return not self.queue.unfinished_tasks
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def stop(self, timeout=5.0):
+        """Write the remaining records and stop the thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+    
+    def after_fork(self):
+        """Start a new queue and thread in a forked child process."""
+        if self._thread is None:
+            return
+        self.queue = DroppingQueue(self.maxsize)
+        self._reported = 0
+        self.start()
+
+
+# Фоновый писатель логов процесса (None, если очередь выключена)
+log_writer = None
+
+
+def configure_logging(config):
+    """
+    Apply LOGGING and move the configured handlers behind a queue.
+    
+    Used as LOGGING_CONFIG. Every logger from the config (and the root
+    logger) gets one QueuedLogHandler in place of its handlers; a single
+    background LogWriter writes the records, so disk latency does not
+    affect requests. Remaining records are written at interpreter exit.
+    
+    Args:
+        config: LOGGING dictionary
+    """
+    global log_writer
+    logging.config.dictConfig(config)
+    if log_writer is not None:
+        log_writer.stop()
+        log_writer = None
+    
+    options = get_log_queue_settings()
+    if not options['ENABLED']:
+        return
+    writer = LogWriter(options['MAXSIZE'], options['BATCH_SIZE'], options['FLUSH_INTERVAL'])
+    root = logging.getLogger()
+    # О переполнении сообщается в обработчики корневого логгера
+    writer.overflow_targets = tuple(root.handlers)
+    loggers = [logging.getLogger(name) for name in config.get('loggers', {})]
+    loggers.append(root)
+    for logger in dict.fromkeys(loggers):
+        targets = list(logger.handlers)
+        if not targets:
+            continue
+        for handler in targets:
+            logger.removeHandler(handler)
+        logger.addHandler(QueuedLogHandler(writer, targets))
+    writer.start()
+    log_writer = writer
+
+
+def flush_logs(timeout=5.0):
+    """
+    Wait until queued log records are written.
+    
+    Args:
+        timeout: Seconds to wait
+        
+    Returns:
+        bool: False if records were still queued after the timeout
+    """
+    return log_writer.flush(timeout) if log_writer is not None else True
+
+
+def _shutdown_log_writer():
+    if log_writer is not None:
+        log_writer.stop(get_log_queue_settings()['SHUTDOWN_TIMEOUT'])
+
+
+def _restart_log_writer():
+    if log_writer is not None:
+        log_writer.after_fork()
+
+
+atexit.register(_shutdown_log_writer)
+os.register_at_fork(after_in_child=_restart_log_writer)
+
+
 class BusinessLogger:
     """Логгер для бизнес-событий."""
     
@@ -107,7 +421,8 @@ class PerformanceLogger:
     def __init__(self):
         self.logger = logging.getLogger('performance')
     
-    def log_slow_query(self, query, execution_time, threshold=1.0):
+    def log_slow_query(self, query, execution_time, threshold=1.0, params_count=None,
+                       view=None, origin=None, explain=None):
         """Логирование медленных запросов."""
         if execution_time > threshold:
             log_data = {
@@ -116,6 +431,11 @@ class PerformanceLogger:
                 'execution_time': execution_time,
                 'threshold': threshold,
             }
+            # Контекст передается обработчиком execute (core.query_inspector)
+            for key, value in (('params_count', params_count), ('view', view),
+                               ('origin', origin), ('explain', explain)):
+                if value is not None:
+                    log_data[key] = value
             self.logger.warning(f"SLOW_QUERY: {json.dumps(log_data, ensure_ascii=False)}")
     
     def log_request_performance(self, path, method, response_time, status_code):
@@ -128,7 +448,22 @@ class PerformanceLogger:
             'status_code': status_code,
         }
         self.logger.info(f"REQUEST_PERFORMANCE: {json.dumps(log_data, ensure_ascii=False)}")
-    
+
+    def log_request_queries(self, path, method, query_count, query_time, repeated=None):
+        """Логирование SQL-запросов одного HTTP-запроса и признаков N+1."""
+        log_data = {
+            'timestamp': timezone.now().isoformat(),
+            'path': path,
+            'method': method,
+            'query_count': query_count,
+            'query_time': query_time,
+        }
+        if repeated:
+            log_data['repeated'] = [{'sql': sql, 'count': count} for sql, count in repeated]
+            self.logger.warning(f"N_PLUS_ONE: {json.dumps(log_data, ensure_ascii=False)}")
+        else:
+            self.logger.info(f"REQUEST_QUERIES: {json.dumps(log_data, ensure_ascii=False)}")
+
     def log_memory_usage(self, memory_usage, threshold=100):
         """Логирование использования памяти."""
         if memory_usage > threshold:
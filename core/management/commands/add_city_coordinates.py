@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from core.gazetteer import SEED_COORDINATES
 from core.models import City, CityCoordinates
 
 
@@ -17,69 +18,11 @@ class Command(BaseCommand):
             *args: Additional arguments
             **options: Command options
         """
-        # Координаты основных городов России
-        cities_data = {
-            'Москва': (55.7558, 37.6176),
-            'Санкт-Петербург': (59.9311, 30.3609),
-            'Новосибирск': (55.0084, 82.9357),
-            'Екатеринбург': (56.8519, 60.6122),
-            'Казань': (55.8304, 49.0661),
-            'Нижний Новгород': (56.2965, 43.9361),
-            'Челябинск': (55.1644, 61.4368),
-            'Самара': (53.2001, 50.1500),
-            'Уфа': (54.7388, 55.9721),
-            'Ростов-на-Дону': (47.2357, 39.7015),
-            'Краснодар': (45.0355, 38.9753),
-            'Анапа': (44.8947, 37.3166),
-            'Сочи': (43.6028, 39.7342),
-            'Волгоград': (48.7080, 44.5133),
-            'Пермь': (58.0105, 56.2502),
-            'Воронеж': (51.6720, 39.1843),
-            'Саратов': (51.5924, 46.0347),
-            'Тольятти': (53.5078, 49.4204),
-            'Ижевск': (56.8519, 53.2324),
-            'Ульяновск': (54.3176, 48.3706),
-            'Барнаул': (53.3548, 83.7698),
-            'Иркутск': (52.2896, 104.2806),
-            'Хабаровск': (48.4802, 135.0719),
-            'Ярославль': (57.6261, 39.8875),
-            'Владивосток': (43.1198, 131.8869),
-            'Махачкала': (42.9849, 47.5047),
-            'Томск': (56.4977, 84.9744),
-            'Оренбург': (51.7727, 55.0988),
-            'Кемерово': (55.3904, 86.0468),
-            'Новокузнецк': (53.7945, 87.1848),
-            'Рязань': (54.6269, 39.6916),
-            'Астрахань': (46.3589, 48.0506),
-            'Набережные Челны': (55.7436, 52.3958),
-            'Пенза': (53.2007, 45.0046),
-            'Липецк': (52.6031, 39.5708),
-            'Киров': (58.6035, 49.6668),
-            'Чебоксары': (56.1322, 47.2519),
-            'Тула': (54.1961, 37.6182),
-            'Калининград': (54.7074, 20.5072),
-            'Курск': (51.7373, 36.1873),
-            'Улан-Удэ': (51.8335, 107.5841),
-            'Ставрополь': (45.0428, 41.9734),
-            'Магнитогорск': (53.4186, 59.0472),
-            'Иваново': (57.0004, 40.9739),
-            'Брянск': (53.2521, 34.3717),
-            'Тверь': (56.8587, 35.9006),
-            'Белгород': (50.5977, 36.5858),
-            'Архангельск': (64.5473, 40.5602),
-            'Владимир': (56.1296, 40.4066),
-            'Севастополь': (44.6166, 33.5254),
-            'Чита': (52.0515, 113.4719),
-            'Грозный': (43.3178, 45.6949),
-            'Калининград': (54.7074, 20.5072),
-            'Симферополь': (44.9572, 34.1108),
-        }
-
         created_count = 0
         updated_count = 0
 
         with transaction.atomic():
-            for city_name, (lat, lng) in cities_data.items():
+            for city_name, (lat, lng) in SEED_COORDINATES.items():
                 # Ищем город по названию
                 city = City.objects.filter(name=city_name).first()
                 
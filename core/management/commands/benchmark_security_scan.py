@@ -0,0 +1,76 @@
+"""
+Django management command для замера стоимости проверки запросов.
+
+Использование:
+    python manage.py benchmark_security_scan
+    python manage.py benchmark_security_scan --iterations 100000
+    python manage.py benchmark_security_scan --url "/clinics/?city=moskva&page=2"
+
+Для каждого URL измеряется проверка пути и GET-параметров
+(core.security_scan.scan_request) с текущими настройками SECURITY_SCAN.
+Бюджет - 10 мкс на запрос для типичных URL.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from core.security_scan import get_matcher, scan_request
+
+
+TYPICAL_URLS = (
+    '/',
+    '/clinics/',
+    '/clinics/?city=moskva&page=2',
+    '/services/narkologiya/vyvod-iz-zapoya/',
+    '/search/?q=реабилитация+алкоголизма&city=sankt-peterburg&utm_source=yandex&utm_medium=cpc',
+    '/blog/kak-vybrat-reabilitacionnyj-centr/?utm_source=telegram',
+)
+
+# Бюджет на запрос в микросекундах
+BUDGET_US = 10.0
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время проверки запроса на подозрительные паттерны'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Число проверок на каждый URL',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            help='URL для замера (можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        matcher = get_matcher()
+        if matcher is None:
+            self.stdout.write(self.style.WARNING('Проверка запросов отключена (SECURITY_SCAN)'))
+            return
+
+        factory = RequestFactory()
+        iterations = max(options['iterations'], 1)
+        urls = options['url'] or TYPICAL_URLS
+        width = max(len(url) for url in urls)
+        worst = 0.0
+        for url in urls:
+            request = factory.get(url)
+            # Разбор QueryDict происходит один раз за запрос и в замер не входит
+            request.GET
+            start = time.perf_counter()
+            for _ in range(iterations):
+                scan_request(request, matcher)
+            per_request = (time.perf_counter() - start) / iterations * 1e6
+            worst = max(worst, per_request)
+            self.stdout.write(f'{url:<{width}}  {per_request:>7.2f} мкс')
+
+        message = f'Максимум: {worst:.2f} мкс на запрос (бюджет {BUDGET_US:.0f} мкс)'
+        if worst <= BUDGET_US:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(message))
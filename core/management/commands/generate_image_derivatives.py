@@ -0,0 +1,92 @@
+"""
+Django management command для генерации миниатюр и WebP/AVIF-вариантов
+уже загруженных изображений.
+
+Использование:
+    python manage.py generate_image_derivatives
+    python manage.py generate_image_derivatives --model blog.BlogPost --force
+    python manage.py generate_image_derivatives --workers 4
+
+Новые загрузки обрабатываются автоматически (сигналы); команда нужна после
+развертывания, изменения настроек IMAGE_DERIVATIVES и для старых файлов.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from core.images import (
+    IMAGE_ERRORS, forget_manifest, generate_derivatives, get_image_settings, init_worker,
+    iter_image_names, manifest_name,
+)
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры и WebP/AVIF-варианты загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            help='Обработать только указанную модель (app.Model), можно несколько раз',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты, даже если они уже есть',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Число процессов (по умолчанию IMAGE_DERIVATIVES["WORKERS"], 0 - без пула)',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        settings = get_image_settings()
+        fields = settings['FIELDS']
+        if options['model']:
+            unknown = set(options['model']) - set(fields)
+            if unknown:
+                raise CommandError(f'Модели без изображений: {", ".join(sorted(unknown))}')
+            fields = {label: fields[label] for label in options['model']}
+
+        names = []
+        missing = 0
+        for name in iter_image_names(fields):
+            if not default_storage.exists(name):
+                missing += 1
+            elif options['force'] or not default_storage.exists(manifest_name(name)):
+                names.append(name)
+
+        workers = settings['WORKERS'] if options['workers'] is None else options['workers']
+        processed, errors = 0, 0
+        if workers and len(names) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+                futures = {executor.submit(generate_derivatives, name): name for name in names}
+                for future in as_completed(futures):
+                    ok = self._report(futures[future], future.exception())
+                    processed, errors = processed + ok, errors + (not ok)
+        else:
+            for name in names:
+                try:
+                    generate_derivatives(name)
+                    error = None
+                except IMAGE_ERRORS as exc:
+                    error = exc
+                ok = self._report(name, error)
+                processed, errors = processed + ok, errors + (not ok)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Обработано: {processed}, ошибок: {errors}, файлов нет в хранилище: {missing}'
+        ))
+
+    def _report(self, name, error):
+        forget_manifest(name)
+        if error is None:
+            if self.verbosity >= 2:
+                self.stdout.write(f'✓ {name}')
+            return True
+        self.stderr.write(self.style.ERROR(f'✗ {name}: {error}'))
+        return False
+
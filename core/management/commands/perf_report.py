@@ -0,0 +1,82 @@
+"""
+Django management command для просмотра задержек запросов по маршрутам.
+
+Использование:
+    python manage.py perf_report
+    python manage.py perf_report --sort p99 --limit 10
+    python manage.py perf_report --route facilities
+
+Данные берутся из гистограмм, которые процессы сервера публикуют в общий
+кэш (core.metrics); логи не разбираются. При локальном для процесса
+бэкенде кэша (LocMemCache) данных сервера команда не видит.
+"""
+
+import math
+
+from django.core.management.base import BaseCommand
+from core.metrics import collect, quantile
+
+
+SORT_KEYS = ('count', 'p50', 'p95', 'p99', 'errors')
+
+
+class Command(BaseCommand):
+    help = 'Показывает p50/p95/p99 задержек запросов по маршрутам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default='p95',
+            help='Поле сортировки (по убыванию)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Число маршрутов в отчете (0 - все)',
+        )
+        parser.add_argument(
+            '--route',
+            help='Показать только маршруты, содержащие строку',
+        )
+
+    def handle(self, *args, **options):
+        snapshot = collect()
+        buckets = snapshot['buckets']
+        rows = []
+        for (route, method), series in snapshot['series'].items():
+            if options['route'] and options['route'] not in route:
+                continue
+            counts = series['counts']
+            total = sum(counts)
+            rows.append({
+                'route': route,
+                'method': method,
+                'count': total,
+                'p50': quantile(buckets, counts, 0.5),
+                'p95': quantile(buckets, counts, 0.95),
+                'p99': quantile(buckets, counts, 0.99),
+                'mean': series['sum'] / total if total else math.nan,
+                'errors': sum(n for status, n in series['statuses'].items() if int(status) >= 500),
+            })
+
+        if not rows:
+            self.stdout.write(self.style.WARNING('Нет данных о запросах'))
+            return
+
+        rows.sort(key=lambda row: (row[options['sort']], row['count']), reverse=True)
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        width = max(len(f"{row['method']} {row['route']}") for row in rows)
+        self.stdout.write(
+            f"{'Маршрут':<{width}}  {'Запросов':>8}  {'p50, мс':>8}  {'p95, мс':>8}  "
+            f"{'p99, мс':>8}  {'Среднее':>8}  {'5xx':>5}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['method'] + ' ' + row['route']:<{width}}  {row['count']:>8}  "
+                f"{row['p50'] * 1000:>8.1f}  {row['p95'] * 1000:>8.1f}  {row['p99'] * 1000:>8.1f}  "
+                f"{row['mean'] * 1000:>8.1f}  {row['errors']:>5}"
+            )
@@ -0,0 +1,24 @@
+"""
+Django management command для перестроения снимка главной страницы.
+
+Использование:
+    python manage.py refresh_home_snapshot
+
+Снимок сбрасывается сигналами при изменении данных; команду запускают по
+расписанию (cron), чтобы главная обновлялась и без изменений моделей,
+и после развертывания, чтобы первый посетитель не ждал перестроения.
+"""
+
+from django.core.management.base import BaseCommand
+from core.home import refresh_home_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает снимок блоков главной страницы'
+
+    def handle(self, *args, **options):
+        snapshot = refresh_home_snapshot()
+        if options['verbosity'] >= 2:
+            for name, items in snapshot.items():
+                self.stdout.write(f'{name}: {len(items)}')
+        self.stdout.write(self.style.SUCCESS('✓ Снимок главной страницы обновлен'))
@@ -0,0 +1,311 @@
+"""
+In-process request latency histograms.
+
+RequestLoggingMiddleware records every response in a fixed-bucket
+histogram keyed by resolved URL name and method, with counters per status
+code. Each thread writes to its own shard, so recording takes no lock; a
+snapshot sums the shards. When a thread exits, its shard is folded into
+the totals of finished threads, so thread churn does not grow the list.
+
+Every process publishes its snapshot to the shared cache at most every
+PUBLISH_INTERVAL seconds. The staff metrics endpoint (Prometheus text
+format) and the perf_report command merge the snapshots of all live
+processes. The list of processes is changed under a cache.add() lock, so
+concurrent registrations are not lost. With a process-local cache backend
+only the current process is visible.
+"""
+
+import math
+import os
+import socket
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def get_metrics_settings():
+    """
+    Get metrics settings merged with defaults.
+
+    Returns:
+        dict: ENABLED, BUCKETS (upper bounds in seconds), PUBLISH_INTERVAL
+        and PROCESS_TTL (seconds) and TOKEN (bearer token for scrapers,
+        None to allow staff only)
+    """
+    options = {
+        'ENABLED': True,
+        'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        'PUBLISH_INTERVAL': 10,
+        'PROCESS_TTL': 300,
+        'TOKEN': None,
+    }
+    options.update(getattr(settings, 'METRICS', {}))
+    return options
+
+
+PROCESSES_KEY = 'latency:processes'
+PROCESSES_LOCK_TIMEOUT = 5
+
+# Маршрут запросов, не сопоставленных ни одному URL (404 и т.п.)
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class _Series:
+    """Histogram of one route and method in one shard."""
+
+    __slots__ = ('counts', 'sum', 'statuses')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.statuses = {}
+
+
+class _ShardOwner:
+    """Thread-local handle of a shard; its finalizer fires when the thread exits."""
+
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class LatencyRegistry:
+    """
+    Latency histograms by (route, method).
+
+    Args:
+        buckets: Upper bounds of the buckets in seconds; an implicit +Inf
+            bucket is added
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards = []
+        # Сумма шардов завершившихся потоков
+        self._retired = {}
+        # Финализатор может сработать в потоке, который уже держит блокировку
+        self._lock = threading.RLock()
+        self._published = 0.0
+        self._registered = None
+
+    def _shard(self):
+        owner = getattr(self._local, 'owner', None)
+        if owner is None:
+            owner = _ShardOwner({})
+            with self._lock:
+                self._shards.append(owner.shard)
+            weakref.finalize(owner, self._retire, owner.shard)
+            self._local.owner = owner
+        return owner.shard
+
+    def _retire(self, shard):
+        """Fold the shard of a finished thread into the retired totals."""
+        with self._lock:
+            self._shards = [item for item in self._shards if item is not shard]
+            for key, series in shard.items():
+                _merge_series(self._retired, key, list(series.counts), series.sum, dict(series.statuses))
+
+    def observe(self, route, method, status, seconds):
+        """
+        Record a response.
+
+        Args:
+            route: Resolved URL name
+            method: HTTP method
+            status: Status code
+            seconds: Response time
+        """
+        shard = self._shard()
+        series = shard.get((route, method))
+        if series is None:
+            series = shard[(route, method)] = _Series(len(self.buckets) + 1)
+        series.counts[bisect_left(self.buckets, seconds)] += 1
+        series.sum += seconds
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """
+        Sum the shards.
+
+        Returns:
+            dict: 'buckets' and 'series' mapping (route, method) to dicts
+            with per-bucket 'counts', 'sum' and 'statuses'
+        """
+        with self._lock:
+            shards = list(self._shards)
+            merged = {
+                key: {'counts': list(series['counts']), 'sum': series['sum'], 'statuses': dict(series['statuses'])}
+                for key, series in self._retired.items()
+            }
+        for shard in shards:
+            # Копия элементов: поток-владелец может добавлять маршруты
+            for key, series in list(shard.items()):
+                _merge_series(merged, key, list(series.counts), series.sum, dict(series.statuses))
+        return {'buckets': self.buckets, 'series': merged}
+
+    def reset(self):
+        """Drop recorded data of every thread."""
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+    def maybe_publish(self):
+        """Publish the snapshot if PUBLISH_INTERVAL has passed."""
+        now = time.monotonic()
+        if now - self._published < get_metrics_settings()['PUBLISH_INTERVAL']:
+            return
+        self._published = now
+        self.publish()
+
+    def publish(self):
+        """Store the snapshot of this process in the shared cache."""
+        ttl = get_metrics_settings()['PROCESS_TTL']
+        cache.set(process_key(), self.snapshot(), ttl)
+        # Процесс отмечается в списке дважды за время жизни снимка
+        due = self._registered is None or time.monotonic() - self._registered >= ttl / 2
+        if due and register_process(ttl):
+            self._registered = time.monotonic()
+
+
+def _merge_series(merged, key, counts, total, statuses):
+    target = merged.get(key)
+    if target is None:
+        merged[key] = {'counts': counts, 'sum': total, 'statuses': statuses}
+        return
+    target['counts'] = [a + b for a, b in zip(target['counts'], counts)]
+    target['sum'] += total
+    for status, count in statuses.items():
+        target['statuses'][status] = target['statuses'].get(status, 0) + count
+
+
+def process_key():
+    """Get the cache key of this process' snapshot."""
+    return f'latency:process:{socket.gethostname()}:{os.getpid()}'
+
+
+def register_process(ttl):
+    """
+    Mark this process as live in the shared list of processes.
+
+    The list is read and written under a lock taken with cache.add(), so
+    processes registering at the same time do not overwrite each other.
+
+    Args:
+        ttl: Seconds after which a process that stopped publishing is dropped
+
+    Returns:
+        bool: False if another process holds the lock; retried on the next
+        publish
+    """
+    lock_key = f'{PROCESSES_KEY}:lock'
+    if not cache.add(lock_key, 1, PROCESSES_LOCK_TIMEOUT):
+        return False
+    try:
+        now = time.time()
+        processes = cache.get(PROCESSES_KEY) or {}
+        processes = {key: seen for key, seen in processes.items() if now - seen < ttl}
+        processes[process_key()] = now
+        cache.set(PROCESSES_KEY, processes, ttl)
+    finally:
+        cache.delete(lock_key)
+    return True
+
+
+latency_registry = LatencyRegistry(get_metrics_settings()['BUCKETS'])
+
+
+def collect():
+    """
+    Merge the snapshots of all live processes.
+
+    The current process contributes its live data instead of the last
+    published copy.
+
+    Returns:
+        dict: Snapshot in the format of LatencyRegistry.snapshot()
+    """
+    local = latency_registry.snapshot()
+    keys = [key for key in (cache.get(PROCESSES_KEY) or {}) if key != process_key()]
+    merged = {}
+    for snapshot in [local, *cache.get_many(keys).values()]:
+        if tuple(snapshot['buckets']) != latency_registry.buckets:
+            # Процесс с другими границами корзин не суммируется
+            continue
+        for key, series in snapshot['series'].items():
+            _merge_series(merged, key, list(series['counts']), series['sum'], dict(series['statuses']))
+    return {'buckets': latency_registry.buckets, 'series': merged}
+
+
+def quantile(buckets, counts, q):
+    """
+    Estimate a quantile from bucket counts.
+
+    Values are assumed uniform inside a bucket, as in Prometheus'
+    histogram_quantile(); the +Inf bucket reports its lower bound.
+
+    Args:
+        buckets: Upper bounds
+        counts: Counts per bucket (the last one is +Inf)
+        q: Quantile in [0, 1]
+
+    Returns:
+        float: Estimated value in seconds, or NaN without observations
+    """
+    total = sum(counts)
+    if not total:
+        return math.nan
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def render_prometheus(snapshot):
+    """
+    Render a snapshot in the Prometheus text exposition format.
+
+    Args:
+        snapshot: Snapshot from collect()
+
+    Returns:
+        str: Metrics text
+    """
+    buckets = snapshot['buckets']
+    lines = [
+        '# HELP http_request_duration_seconds Response time by route and method.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    statuses = []
+    for (route, method), series in sorted(snapshot['series'].items()):
+        labels = f'route="{_label(route)}",method="{_label(method)}"'
+        cumulative = 0
+        for bound, count in zip([*buckets, '+Inf'], series['counts']):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {series["sum"]}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {cumulative}')
+        for status, count in sorted(series['statuses'].items()):
+            statuses.append(f'http_responses_total{{{labels},status="{status}"}} {count}')
+    lines += [
+        '# HELP http_responses_total Responses by route, method and status code.',
+        '# TYPE http_responses_total counter',
+        *statuses,
+    ]
+    return '\n'.join(lines) + '\n'
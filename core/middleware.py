@@ -6,14 +6,20 @@ Middleware для автоматического логирования.
 - Измерения производительности
 - Логирования ошибок
 - Обнаружения подозрительной активности
+- Подсчета SQL-запросов и обнаружения N+1
 """
 
 import time
 import logging
+from contextlib import ExitStack
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from django.http import Http404
 from django.core.exceptions import PermissionDenied
 from .logging import performance_logger, error_logger, security_logger
+from .metrics import UNMATCHED_ROUTE, get_metrics_settings, latency_registry
+from .query_inspector import QueryCounter, current_request, get_query_inspector_settings
+from .security_scan import get_matcher, scan_request
 
 
 class RequestLoggingMiddleware(MiddlewareMixin):
@@ -67,6 +73,13 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         if hasattr(request, 'start_time'):
             response_time = time.time() - request.start_time
             
+            # Гистограмма задержек по маршруту и методу
+            if get_metrics_settings()['ENABLED']:
+                match = getattr(request, 'resolver_match', None)
+                route = match.view_name if match else UNMATCHED_ROUTE
+                latency_registry.observe(route, request.method, response.status_code, response_time)
+                latency_registry.maybe_publish()
+            
             # Логируем производительность
             performance_logger.log_request_performance(
                 path=request.path,
@@ -196,39 +209,23 @@ class SecurityMiddleware(MiddlewareMixin):
         Args:
             request: HTTP request object
         """
-        ip_address = self._get_client_ip(request)
-        
-        # Проверяем на SQL инъекции в URL
-        suspicious_patterns = [
-            'union select',
-            'drop table',
-            'delete from',
-            'insert into',
-            'update set',
-            'script>',
-            'javascript:',
-        ]
+        matcher = get_matcher()
+        if matcher is None:
+            return None
         
-        path_lower = request.path.lower()
-        for pattern in suspicious_patterns:
-            if pattern in path_lower:
-                security_logger.log_suspicious_activity(
-                    activity_type='sql_injection_attempt',
-                    details={'pattern': pattern, 'path': request.path},
-                    ip_address=ip_address,
-                    user=request.user
-                )
-                break
-        
-        # Проверяем на XSS в параметрах
-        for key, value in request.GET.items():
-            if isinstance(value, str) and any(pattern in value.lower() for pattern in ['<script', 'javascript:']):
-                security_logger.log_suspicious_activity(
-                    activity_type='xss_attempt',
-                    details={'parameter': key, 'value': value},
-                    ip_address=ip_address,
-                    user=request.user
-                )
+        # Путь и значения параметров проверяются одним проходом
+        for parameter, value, activity_type, pattern in scan_request(request, matcher):
+            if parameter is None:
+                details = {'pattern': pattern, 'path': request.path}
+            else:
+                details = {'pattern': pattern, 'parameter': parameter, 'value': value}
+            security_logger.log_suspicious_activity(
+                activity_type=activity_type,
+                details=details,
+                ip_address=self._get_client_ip(request),
+                user=request.user
+            )
+        return None
     
     def _get_client_ip(self, request):
         """
@@ -279,4 +276,64 @@ class DatabaseLoggingMiddleware(MiddlewareMixin):
                 'user_id': request.user.id,
                 'username': request.user.username,
             }
-        return None 
\ No newline at end of file
+        return None
+
+
+class QueryInspectorMiddleware:
+    """
+    Middleware counting SQL queries of each request and flagging N+1.
+
+    The counter wraps every database connection while the rest of the
+    chain runs; the request is also published to the slow query logger.
+    Totals go to the performance log; statement shapes repeated
+    N_PLUS_ONE_THRESHOLD times or more are logged as N_PLUS_ONE. Staff
+    responses get X-DB-Queries and Server-Timing headers.
+    """
+
+    def __init__(self, get_response):
+        """
+        Initialize query inspector middleware.
+
+        Args:
+            get_response: Django response handler
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Запрос нужен журналу медленных запросов для имени представления
+        token = current_request.set(request)
+        try:
+            return self._inspect(request)
+        finally:
+            current_request.reset(token)
+
+    def _inspect(self, request):
+        options = get_query_inspector_settings()
+        if not options['ENABLED']:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        if counter.count:
+            repeated = counter.repeated(options['N_PLUS_ONE_THRESHOLD'])
+            performance_logger.log_request_queries(
+                path=request.path,
+                method=request.method,
+                query_count=counter.count,
+                query_time=round(counter.duration, 6),
+                repeated=repeated[:options['MAX_REPORTED']],
+            )
+
+        # Проверка прав после выхода из обертки: загрузка пользователя не считается
+        user = getattr(request, 'user', None)
+        if options['STAFF_HEADERS'] and user is not None and user.is_staff:
+            response['X-DB-Queries'] = str(counter.count)
+            timing = f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.11 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citycoordinates',
+            index=models.Index(fields=['latitude', 'longitude'], name='core_citycoord_lat_lon_idx'),
+        ),
+    ]
@@ -5,11 +5,26 @@ This module provides reusable mixins for common view functionality
 like search, filtering, and pagination.
 """
 
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ObjectDoesNotExist
-from core.models import City, Region, CityCoordinates
+from django.http import JsonResponse
+from django.shortcuts import render
+from core.models import City, Region
+from core.facets import count_facet, facet_cache_key, facet_signature, get_facet_settings
+from core.gazetteer import gazetteer
+from core.geo import filter_near, parse_near
+from core.logging import security_logger
+from core.rate_limit import check_rate_limit, get_client_ip
+from core.page_cache import (
+    acquire_lock, entry_response, get_page_cache_settings, get_tag_versions, is_fresh,
+    make_entry, normalize_query, release_lock, wait_for_entry,
+)
 
 
 class SearchMixin:
@@ -45,15 +60,32 @@ class SearchMixin:
         queryset = super().get_queryset()
         search_query = self.get_search_query()
         
-        if search_query and self.search_fields:
-            q_objects = Q()
-            for field in self.search_fields:
-                lookup = f"{field}__{self.search_lookup}"
-                q_objects |= Q(**{lookup: search_query})
-            queryset = queryset.filter(q_objects)
+        if search_query:
+            queryset = self.filter_search(queryset, search_query)
             
         return queryset
     
+    def filter_search(self, queryset, search_query):
+        """
+        Filter queryset by search query.
+        
+        Override to use another search implementation.
+        
+        Args:
+            queryset: QuerySet to filter
+            search_query: Non-empty search query
+            
+        Returns:
+            QuerySet: Filtered queryset
+        """
+        if not self.search_fields:
+            return queryset
+        q_objects = Q()
+        for field in self.search_fields:
+            lookup = f"{field}__{self.search_lookup}"
+            q_objects |= Q(**{lookup: search_query})
+        return queryset.filter(q_objects)
+    
     def get_context_data(self, **kwargs):
         """
         Add search query to context.
@@ -125,6 +157,146 @@ class FilterMixin:
         return context
 
 
+class FacetMixin:
+    """
+    Mixin for counts of filter values (facets).
+    
+    Must precede FilterMixin. Counts of a facet are computed over the view
+    queryset without the facet's own filter, with one grouped query per
+    facet, and cached by the other search and filter parameters
+    (see core.facets).
+    
+    Attributes:
+        facet_fields: Dictionary mapping filter GET parameters to label
+            lookups (None to show values as is)
+        facet_labels: Dictionary mapping GET parameters to {value: label}
+        facet_namespace: Cache namespace (model label by default)
+    """
+    
+    facet_fields = {}
+    facet_labels = {}
+    facet_namespace = None
+    facet_reset_params = ('page', 'cursor', 'offset')
+    _facet_excluded = None
+    
+    def get_facet_namespace(self):
+        """
+        Get the cache namespace of facet counts.
+        
+        Returns:
+            str: Namespace invalidated by core.facets.invalidate_facets()
+        """
+        return self.facet_namespace or self.model._meta.label_lower
+    
+    def get_filter_params(self):
+        """
+        Get filter parameters, leaving out the facet being counted.
+        
+        Returns:
+            dict: Dictionary of field-value pairs for filtering
+        """
+        filters = super().get_filter_params()
+        if self._facet_excluded is not None:
+            filters.pop(self.filter_fields[self._facet_excluded], None)
+        return filters
+    
+    def get_facet_params(self):
+        """
+        Get names of GET parameters that change the set of objects.
+        
+        Returns:
+            set: Filter parameters and search, "near" and rating parameters
+        """
+        names = set(self.filter_fields)
+        for attr in ('search_param', 'near_param', 'radius_param', 'min_rating_param'):
+            name = getattr(self, attr, None)
+            if name:
+                names.add(name)
+        return names
+    
+    def get_facets(self):
+        """
+        Get counts of every facet value under the current filters.
+        
+        Returns:
+            dict: GET parameter -> list of options with 'value', 'label',
+            'count', 'selected' and 'query' (query string toggling the value)
+        """
+        options = get_facet_settings()
+        namespace = self.get_facet_namespace()
+        names = self.get_facet_params()
+        text_params = {self.search_param} if getattr(self, 'search_param', None) else set()
+        keys = {}
+        for param in self.facet_fields:
+            signature = facet_signature(
+                ((name, value) for name, value in self.request.GET.items()
+                 if name in names and name != param),
+                text_params
+            )
+            keys[param] = facet_cache_key(namespace, param, signature)
+        
+        cached = cache.get_many(keys.values())
+        facets = {}
+        for param, label_field in self.facet_fields.items():
+            values = cached.get(keys[param])
+            if values is None:
+                self._facet_excluded = param
+                try:
+                    queryset = self.get_queryset()
+                finally:
+                    self._facet_excluded = None
+                values = count_facet(
+                    queryset, self.filter_fields[param], label_field, options['MAX_VALUES']
+                )
+                cache.set(keys[param], values, options['TIMEOUT'])
+            facets[param] = self.get_facet_options(param, values)
+        return facets
+    
+    def get_facet_options(self, param, values):
+        """
+        Add selection state, labels and links to facet values.
+        
+        Args:
+            param: GET parameter of the facet
+            values: Counted values from core.facets.count_facet()
+            
+        Returns:
+            list: Options of the facet
+        """
+        selected = self.request.GET.get(param, '')
+        labels = self.facet_labels.get(param, {})
+        options = [dict(value) for value in values]
+        if selected and selected not in {option['value'] for option in options}:
+            options.append({'value': selected, 'label': selected, 'count': 0})
+        
+        for option in options:
+            option['label'] = labels.get(option['value'], option['label'])
+            option['selected'] = option['value'] == selected
+            query = self.request.GET.copy()
+            for name in self.facet_reset_params:
+                query.pop(name, None)
+            if option['selected']:
+                query.pop(param, None)
+            else:
+                query[param] = option['value']
+            option['query'] = query.urlencode()
+        return options
+    
+    def get_context_data(self, **kwargs):
+        """
+        Add facet counts to context.
+        
+        Args:
+            **kwargs: Additional context data
+            
+        Returns:
+            dict: Context with facets added
+        """
+        context = super().get_context_data(**kwargs)
+        context['facets'] = self.get_facets()
+        return context
+
+
 class OrderingMixin:
     """
     Mixin for adding ordering functionality to views.
@@ -184,6 +356,81 @@ class OrderingMixin:
         return context
 
 
+class RatingMixin:
+    """
+    Mixin for sorting and filtering by denormalized rating fields.
+    
+    Works with models derived from reviews.models.RatingAggregateModel.
+    
+    Attributes:
+        rating_sort_param: GET parameter name for sorting
+        rating_sort_value: Sort parameter value that enables rating ordering
+        min_rating_param: GET parameter name for minimal rating filter
+    """
+    
+    rating_sort_param = 'sort'
+    rating_sort_value = 'rating'
+    min_rating_param = 'min_rating'
+    
+    def get_min_rating(self):
+        """
+        Get minimal rating from request.
+        
+        Returns:
+            float or None: Minimal rating in range 1-5 or None if not set
+        """
+        try:
+            min_rating = float(self.request.GET.get(self.min_rating_param, ''))
+        except ValueError:
+            return None
+        if 1 <= min_rating <= 5:
+            return min_rating
+        return None
+    
+    def is_rating_sort(self):
+        """
+        Check whether ordering by rating is requested.
+        
+        Returns:
+            bool: True if rating ordering is requested
+        """
+        return self.request.GET.get(self.rating_sort_param) == self.rating_sort_value
+    
+    def get_queryset(self):
+        """
+        Add rating filtering and ordering to queryset.
+        
+        Returns:
+            QuerySet: Filtered and ordered queryset
+        """
+        queryset = super().get_queryset()
+        min_rating = self.get_min_rating()
+        
+        if min_rating is not None:
+            queryset = queryset.filter(rating_count__gt=0, rating_avg__gte=min_rating)
+        
+        if self.is_rating_sort():
+            ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+            queryset = queryset.order_by('-rating_avg', '-rating_count', *ordering)
+            
+        return queryset
+    
+    def get_context_data(self, **kwargs):
+        """
+        Add rating filter state to context.
+        
+        Args:
+            **kwargs: Additional context data
+            
+        Returns:
+            dict: Context with rating filter parameters added
+        """
+        context = super().get_context_data(**kwargs)
+        context['min_rating'] = self.get_min_rating()
+        context['rating_sort'] = self.is_rating_sort()
+        return context
+
+
 class PaginationMixin:
     """
     Mixin for adding pagination functionality to views.
@@ -289,41 +536,97 @@ class PaginationMixin:
 
 class CacheMixin:
     """
-    Mixin for adding caching functionality to views.
+    Mixin for caching whole pages of anonymous visitors.
+    
+    Pages are keyed by view, path and normalized query string and marked
+    stale when a model listed in cache_tags (or a global tag, see
+    core.page_cache) changes. Stale pages are served while one request
+    rebuilds them. Only views without side effects may use the mixin.
     
     Attributes:
-        cache_timeout: Cache timeout in seconds
+        cache_timeout: Seconds a page is fresh (PAGE_CACHE['TIMEOUT'] if None)
         cache_key_prefix: Prefix for cache keys
+        cache_tags: Model labels the page depends on
     """
     
-    cache_timeout = 300  # 5 minutes
+    cache_timeout = None
     cache_key_prefix = 'view_cache'
+    cache_tags = ()
+    
+    def get_cache_tags(self):
+        """
+        Get dependency tags of the page.
+        
+        Returns:
+            tuple: View tags followed by global tags
+        """
+        return tuple(self.cache_tags) + tuple(get_page_cache_settings()['GLOBAL_TAGS'])
     
     def get_cache_key(self):
         """
         Generate cache key for this view.
         
         Returns:
-            str: Unique cache key for this view instance
+            str: Key of the page for the current path and query string
         """
-        # Include user ID if authenticated
-        user_id = self.request.user.id if self.request.user.is_authenticated else 'anonymous'
+        options = get_page_cache_settings()
+        query = normalize_query(self.request.GET, options['IGNORED_PARAMS'])
+        variant = 'ajax' if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest' else 'page'
+        raw = f"{self.request.get_host()}{self.request.path}?{query}"
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        view = f"{self.__class__.__module__}.{self.__class__.__name__}"
+        return f"{self.cache_key_prefix}:{view}:{variant}:{digest}"
+    
+    def is_cacheable_request(self, request):
+        """
+        Check that the page of a request may be served from the cache.
         
-        # Include query parameters
-        query_params = self.request.GET.urlencode()
+        Only GET and HEAD requests of anonymous visitors without a session
+        or pending messages are cached.
         
-        return f"{self.cache_key_prefix}:{self.__class__.__name__}:{user_id}:{query_params}"
+        Args:
+            request: HttpRequest object
+            
+        Returns:
+            bool: True if the request may use the page cache
+        """
+        if not get_page_cache_settings()['ENABLED'] or request.method not in ('GET', 'HEAD'):
+            return False
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return False
+        return (
+            settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and 'messages' not in request.COOKIES
+        )
+    
+    def is_cacheable_response(self, response):
+        """
+        Check that a response may be stored.
+        
+        Args:
+            response: HttpResponse object
+            
+        Returns:
+            bool: True for complete 200 responses that set no cookies
+        """
+        cache_control = response.get('Cache-Control', '')
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in cache_control
+            and 'no-store' not in cache_control
+        )
     
     def get_cached_data(self):
         """
         Get data from cache.
         
         Returns:
-            Any: Cached data or None if not found
+            Any: Cached page entry or None if not found
         """
-        from django.core.cache import cache
-        cache_key = self.get_cache_key()
-        return cache.get(cache_key)
+        return cache.get(self.get_cache_key())
     
     def set_cached_data(self, data):
         """
@@ -332,9 +635,55 @@ class CacheMixin:
         Args:
             data: Data to cache
         """
-        from django.core.cache import cache
-        cache_key = self.get_cache_key()
-        cache.set(cache_key, data, self.cache_timeout)
+        options = get_page_cache_settings()
+        timeout = self.cache_timeout or options['TIMEOUT']
+        cache.set(self.get_cache_key(), data, timeout + options['STALE_TIMEOUT'])
+    
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Serve the page from the cache or render and store it.
+        
+        Args:
+            request: HttpRequest object
+            *args: Positional arguments of the view
+            **kwargs: Keyword arguments of the view
+            
+        Returns:
+            HttpResponse: Cached or freshly rendered page
+        """
+        if not self.is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+        
+        options = get_page_cache_settings()
+        key = self.get_cache_key()
+        versions = get_tag_versions(self.get_cache_tags())
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry, versions):
+            return entry_response(entry, request, 'hit')
+        
+        if not acquire_lock(key, options['LOCK_TIMEOUT']):
+            # Страницу уже строит другой запрос
+            if entry is not None:
+                return entry_response(entry, request, 'stale')
+            entry = wait_for_entry(key, versions, options['LOCK_WAIT'])
+            if entry is not None:
+                return entry_response(entry, request, 'hit')
+            return self._render_page(request, versions, args, kwargs)
+        
+        try:
+            return self._render_page(request, versions, args, kwargs)
+        finally:
+            release_lock(key)
+    
+    def _render_page(self, request, versions, args, kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        if self.is_cacheable_response(response):
+            timeout = self.cache_timeout or get_page_cache_settings()['TIMEOUT']
+            self.set_cached_data(make_entry(response, versions, timeout))
+        response['X-Page-Cache'] = 'miss'
+        return response
     
     def get_context_data(self, **kwargs):
         """
@@ -403,6 +752,154 @@ class PermissionMixin:
         return super().dispatch(request, *args, **kwargs) 
 
 
+class RateLimitMixin:
+    """
+    Mixin for limiting form submissions per client IP and phone number.
+    
+    Limits of the scope come from RATE_LIMITS (see core.rate_limit).
+    Rejected AJAX submissions get a JSON error, others the request error
+    page; both with status 429 and a Retry-After header.
+    
+    Attributes:
+        rate_limit_scope: Endpoint name in RATE_LIMITS['ENDPOINTS']
+        rate_limit_methods: HTTP methods that are counted
+        rate_limit_message: Error shown to a limited client
+    """
+    
+    rate_limit_scope = None
+    rate_limit_methods = ('POST',)
+    rate_limit_message = _('Слишком много заявок. Пожалуйста, попробуйте позже или позвоните нам.')
+    
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Reject the request if a limit of the scope is exceeded.
+        
+        Args:
+            request: HTTP request object
+            *args: Additional arguments
+            **kwargs: Additional keyword arguments
+            
+        Returns:
+            HttpResponse: Response of the view or 429 response
+        """
+        if request.method in self.rate_limit_methods:
+            exceeded = check_rate_limit(request, self.rate_limit_scope)
+            if exceeded:
+                return self.rate_limited(request, *exceeded)
+        return super().dispatch(request, *args, **kwargs)
+    
+    def rate_limited(self, request, key_name, retry_after):
+        """
+        Build the response for a rejected submission.
+        
+        Args:
+            request: HTTP request object
+            key_name: Exceeded limit ('ip' or 'phone')
+            retry_after: Seconds until the client may retry
+            
+        Returns:
+            HttpResponse: Response with status 429
+        """
+        security_logger.log_suspicious_activity(
+            activity_type='rate_limit_exceeded',
+            details={'scope': self.rate_limit_scope, 'key': key_name, 'path': request.path},
+            ip_address=get_client_ip(request),
+            user=request.user if request.user.is_authenticated else None,
+        )
+        message = str(self.rate_limit_message)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = JsonResponse(
+                {'success': False, 'error': message, 'retry_after': retry_after},
+                status=429,
+            )
+        else:
+            response = render(request, 'requests/error.html', {'error_message': message}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class NearMixin:
+    """
+    Mixin for "near" filtering by city coordinates.
+    
+    Accepts a 'lat,lon' pair or a city slug and an optional radius in
+    kilometers. Results are ordered by distance unless ``sort`` is set.
+    
+    Attributes:
+        near_param: GET parameter name for the origin
+        radius_param: GET parameter name for the radius
+    """
+    
+    near_param = 'near'
+    radius_param = 'radius'
+    
+    def get_near(self):
+        """
+        Get origin and radius from request.
+        
+        Returns:
+            tuple: (near, radius_km) or (None, None) if not set or invalid
+        """
+        near = self.request.GET.get(self.near_param, '').strip()
+        if not near:
+            return None, None
+        try:
+            radius = self.request.GET.get(self.radius_param, '').strip()
+            radius_km = float(radius) if radius else None
+            parse_near(near)
+        except ValueError:
+            return None, None
+        return near, radius_km
+    
+    def get_queryset(self):
+        """
+        Add "near" filtering and distance ordering to queryset.
+        
+        Returns:
+            QuerySet: Filtered queryset annotated with distance_km
+        """
+        queryset = super().get_queryset()
+        near, radius_km = self.get_near()
+        if near is None:
+            return queryset
+        
+        try:
+            filtered = filter_near(queryset, near, radius_km)
+        except ValueError:
+            return queryset
+        if self.request.GET.get('sort'):
+            return filtered.order_by(*(queryset.query.order_by or queryset.model._meta.ordering))
+        return filtered
+    
+    def get_context_data(self, **kwargs):
+        """
+        Add "near" filter state to context.
+        
+        Args:
+            **kwargs: Additional context data
+            
+        Returns:
+            dict: Context with near and radius added
+        """
+        context = super().get_context_data(**kwargs)
+        near, radius_km = self.get_near()
+        context['near'] = near
+        context['radius'] = radius_km
+        return context
+
+
+# Данные по умолчанию для объектов без города или координат
+DEFAULT_GEO_DATA = {
+    'geo_region': 'RU',
+    'geo_placename': 'Россия',
+    'geo_position': '65.0000;105.0000',
+    'icbm': '65.0000, 105.0000',
+    'city_name': 'Анапа',
+    'region_name': 'Краснодарский край',
+    'full_location': 'Анапа, Краснодарский край'
+}
+
+
 class GeoDataMixin:
     """
     Mixin for adding geographical data to view context.
@@ -413,6 +910,9 @@ class GeoDataMixin:
         """
         Get geographical data for facility or specialist.
         
+        Coordinates and region come from the in-memory gazetteer, so no
+        queries are made.
+        
         Args:
             facility: Facility or specialist object
             
@@ -423,126 +923,22 @@ class GeoDataMixin:
         if facility and hasattr(facility, 'facility') and facility.facility:
             facility = facility.facility
         
-        # Получаем город учреждения
-        city = None
-        if facility and hasattr(facility, 'city') and facility.city:
-            city = facility.city
-        
-        # Если есть город, пытаемся получить координаты из БД
-        if city:
-            try:
-                coords = CityCoordinates.objects.get(city=city, is_active=True)
-                return {
-                    'geo_region': 'RU',
-                    'geo_placename': city.name,
-                    'geo_position': coords.get_coordinates_string(),
-                    'icbm': coords.get_icbm_string(),
-                    'city_name': city.name,
-                    'region_name': city.region.name if city.region else 'Россия',
-                    'full_location': f"{city.name}, {city.region.name}" if city.region else city.name
-                }
-            except CityCoordinates.DoesNotExist:
-                # Если координат нет в БД, используем хардкод для основных городов
-                return self._get_coordinates_for_city(city.name)
-        
-        # Если нет города или координат, возвращаем данные по умолчанию
-        return {
-            'geo_region': 'RU',
-            'geo_placename': 'Россия',
-            'geo_position': '65.0000;105.0000',
-            'icbm': '65.0000, 105.0000',
-            'city_name': 'Анапа',
-            'region_name': 'Краснодарский край',
-            'full_location': 'Анапа, Краснодарский край'
-        }
-    
-    def _get_coordinates_for_city(self, city_name):
-        """
-        Return coordinates for major cities (hardcoded as fallback).
-        
-        Args:
-            city_name: Name of the city
-            
-        Returns:
-            dict: Dictionary with geographical data for the city
-        """
-        coordinates = {
-            'Москва': (55.7558, 37.6176),
-            'Санкт-Петербург': (59.9311, 30.3609),
-            'Новосибирск': (55.0084, 82.9357),
-            'Екатеринбург': (56.8519, 60.6122),
-            'Казань': (55.8304, 49.0661),
-            'Нижний Новгород': (56.2965, 43.9361),
-            'Челябинск': (55.1644, 61.4368),
-            'Самара': (53.2001, 50.1500),
-            'Уфа': (54.7388, 55.9721),
-            'Ростов-на-Дону': (47.2357, 39.7015),
-            'Краснодар': (45.0355, 38.9753),
-            'Анапа': (44.8947, 37.3166),
-            'Сочи': (43.6028, 39.7342),
-            'Волгоград': (48.7080, 44.5133),
-            'Пермь': (58.0105, 56.2502),
-            'Воронеж': (51.6720, 39.1843),
-            'Саратов': (51.5924, 46.0347),
-            'Тольятти': (53.5078, 49.4204),
-            'Ижевск': (56.8519, 53.2324),
-            'Ульяновск': (54.3176, 48.3706),
-            'Барнаул': (53.3548, 83.7698),
-            'Иркутск': (52.2896, 104.2806),
-            'Хабаровск': (48.4802, 135.0719),
-            'Ярославль': (57.6261, 39.8875),
-            'Владивосток': (43.1198, 131.8869),
-            'Махачкала': (42.9849, 47.5047),
-            'Томск': (56.4977, 84.9744),
-            'Оренбург': (51.7727, 55.0988),
-            'Кемерово': (55.3904, 86.0468),
-            'Новокузнецк': (53.7945, 87.1848),
-            'Рязань': (54.6269, 39.6916),
-            'Астрахань': (46.3589, 48.0506),
-            'Набережные Челны': (55.7436, 52.3958),
-            'Пенза': (53.2007, 45.0046),
-            'Липецк': (52.6031, 39.5708),
-            'Киров': (58.6035, 49.6668),
-            'Чебоксары': (56.1322, 47.2519),
-            'Тула': (54.1961, 37.6182),
-            'Калининград': (54.7074, 20.5072),
-            'Курск': (51.7373, 36.1873),
-            'Улан-Удэ': (51.8335, 107.5841),
-            'Ставрополь': (45.0428, 41.9734),
-            'Магнитогорск': (53.4186, 59.0472),
-            'Иваново': (57.0004, 40.9739),
-            'Брянск': (53.2521, 34.3717),
-            'Тверь': (56.8587, 35.9006),
-            'Белгород': (50.5977, 36.5858),
-            'Архангельск': (64.5473, 40.5602),
-            'Владимир': (56.1296, 40.4066),
-            'Севастополь': (44.6166, 33.5254),
-            'Чита': (52.0515, 113.4719),
-            'Грозный': (43.3178, 45.6949),
-            'Симферополь': (44.9572, 34.1108),
-        }
+        # Город учреждения ищем по id, не загружая сам объект
+        city_id = getattr(facility, 'city_id', None) if facility else None
+        place = gazetteer.get(city_id) if city_id is not None else None
+        if place is None or place.latitude is None:
+            return dict(DEFAULT_GEO_DATA)
         
-        if city_name in coordinates:
-            lat, lng = coordinates[city_name]
-            return {
-                'geo_region': 'RU',
-                'geo_placename': city_name,
-                'geo_position': f"{lat};{lng}",
-                'icbm': f"{lat}, {lng}",
-                'city_name': city_name,
-                'region_name': 'Россия',
-                'full_location': city_name
-            }
-        
-        # Если город не найден, возвращаем данные по умолчанию
+        lat, lng = place.latitude, place.longitude
+        region_name = place.region or 'Россия'
         return {
             'geo_region': 'RU',
-            'geo_placename': 'Россия',
-            'geo_position': '65.0000;105.0000',
-            'icbm': '65.0000, 105.0000',
-            'city_name': 'Анапа',
-            'region_name': 'Краснодарский край',
-            'full_location': 'Анапа, Краснодарский край'
+            'geo_placename': place.name,
+            'geo_position': f"{lat:.6f};{lng:.6f}",
+            'icbm': f"{lat:.6f}, {lng:.6f}",
+            'city_name': place.name,
+            'region_name': region_name,
+            'full_location': f"{place.name}, {place.region}" if place.region else place.name
         }
     
     def get_context_data(self, **kwargs):
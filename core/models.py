@@ -104,6 +104,9 @@ class CityCoordinates(TimeStampedModel):
         verbose_name_plural = _('Координаты городов')
         ordering = ['city__name']
         unique_together = ['city']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='core_citycoord_lat_lon_idx'),
+        ]
 
     def __str__(self):
         return f"{self.city.name}: {self.latitude}, {self.longitude}"
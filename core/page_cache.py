@@ -0,0 +1,220 @@
+"""
+Full-page cache for anonymous visitors.
+
+Pages are cached per view, host, path and normalized query string. Every
+view declares dependency tags (model labels such as 'facilities.Clinic');
+the version of each tag lives in the shared 'versions' cache (see
+core.caching) and is bumped from model signals, so an entry built with
+older versions is treated as stale.
+
+Stale entries are served while one request rebuilds the page
+(stale-while-revalidate). The rebuilding request holds a short lock taken
+with cache.add(), so an expiring hot page is rebuilt once instead of by
+every concurrent request (single flight). When nothing is cached yet, the
+other requests wait briefly for the lock holder and then render the page
+themselves.
+
+The CSRF token is not stored: it is replaced with a placeholder when the
+page is cached and with the visitor's token when it is served.
+"""
+
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.http import urlencode
+
+from .caching import bump_version, get_versions
+
+
+def get_page_cache_settings():
+    """
+    Get page cache settings merged with defaults.
+
+    Returns:
+        dict: ENABLED, TIMEOUT (seconds a page is fresh), STALE_TIMEOUT
+        (seconds a stale page may still be served), LOCK_TIMEOUT and
+        LOCK_WAIT (seconds), IGNORED_PARAMS, GLOBAL_TAGS (tags of data shown
+        on every page) and IGNORED_MODELS (labels never used as tags)
+    """
+    options = {
+        'ENABLED': True,
+        'TIMEOUT': 300,
+        'STALE_TIMEOUT': 600,
+        'LOCK_TIMEOUT': 30,
+        'LOCK_WAIT': 2.0,
+        'IGNORED_PARAMS': (
+            'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+            'gclid', 'yclid', 'fbclid', '_openstat',
+        ),
+        'GLOBAL_TAGS': (
+            'medical_services.ServiceCategory',
+            'medical_services.Service',
+            'content.Banner',
+            'content.SiteSettings',
+        ),
+        'IGNORED_MODELS': (
+            'sessions.Session',
+            'admin.LogEntry',
+            'admin_logs.AdminActionLog',
+            'contenttypes.ContentType',
+            'auth.Permission',
+        ),
+    }
+    options.update(getattr(settings, 'PAGE_CACHE', {}))
+    return options
+
+
+PAGE_CACHE_PREFIX = 'page_cache'
+
+# Интервал опроса кэша, пока другой запрос строит страницу
+LOCK_POLL_INTERVAL = 0.05
+
+CSRF_PLACEHOLDER = 'page-cache-csrf-token'
+
+_csrf_input_re = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _tag_key(tag):
+    return f'{PAGE_CACHE_PREFIX}:tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """
+    Get the current versions of dependency tags.
+
+    Args:
+        tags: Sequence of tags
+
+    Returns:
+        tuple: Versions in the order of tags (0 for never invalidated)
+    """
+    return get_versions([_tag_key(tag) for tag in tags])
+
+
+def invalidate_tags(*tags):
+    """
+    Mark cached pages depending on any of the tags as stale.
+
+    Args:
+        *tags: Tags (model labels)
+    """
+    for tag in tags:
+        bump_version(_tag_key(tag))
+
+
+def normalize_query(query, ignored=()):
+    """
+    Build a stable query string for the cache key.
+
+    Empty values and tracking parameters are dropped and parameters are
+    sorted, so '?b=2&a=1&utm_source=x&c=' and '?a=1&b=2' share an entry.
+
+    Args:
+        query: QueryDict of the request
+        ignored: Parameter names to drop
+
+    Returns:
+        str: Encoded query string
+    """
+    pairs = sorted(
+        (name, value.strip())
+        for name, values in query.lists()
+        if name not in ignored
+        for value in values
+        if value.strip()
+    )
+    return urlencode(pairs)
+
+
+def strip_csrf_token(content):
+    """Replace CSRF tokens in page content with a placeholder."""
+    return _csrf_input_re.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content)
+
+
+def restore_csrf_token(content, request):
+    """Put the visitor's CSRF token in place of the placeholder."""
+    if CSRF_PLACEHOLDER not in content:
+        return content
+    return content.replace(CSRF_PLACEHOLDER, get_token(request))
+
+
+def acquire_lock(key, timeout):
+    """Take the rebuild lock of a page; False if another request holds it."""
+    return cache.add(f'{key}:lock', 1, timeout)
+
+
+def release_lock(key):
+    cache.delete(f'{key}:lock')
+
+
+def wait_for_entry(key, versions, timeout):
+    """
+    Wait until another request stores a current entry of a page.
+
+    Args:
+        key: Cache key of the page
+        versions: Current tag versions
+        timeout: Seconds to wait
+
+    Returns:
+        dict: Entry, or None if it did not appear in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['versions'] == versions:
+            return entry
+    return None
+
+
+def is_fresh(entry, versions):
+    """Check that an entry is within its timeout and built with current tags."""
+    return entry['versions'] == versions and entry['fresh_until'] > time.time()
+
+
+def make_entry(response, versions, timeout):
+    """
+    Build a cache entry from a rendered response.
+
+    Args:
+        response: Rendered HttpResponse
+        versions: Tag versions the page was built with
+        timeout: Seconds the entry is fresh
+
+    Returns:
+        dict: Picklable entry
+    """
+    content = response.content.decode(response.charset)
+    return {
+        'content': strip_csrf_token(content),
+        'status': response.status_code,
+        'content_type': response['Content-Type'],
+        'fresh_until': time.time() + timeout,
+        'versions': versions,
+    }
+
+
+def entry_response(entry, request, state):
+    """
+    Build a response from a cache entry.
+
+    Args:
+        entry: Cache entry
+        request: Current request
+        state: Value of the X-Page-Cache header ('hit' or 'stale')
+
+    Returns:
+        HttpResponse: Page with the visitor's CSRF token
+    """
+    response = HttpResponse(
+        restore_csrf_token(entry['content'], request),
+        status=entry['status'],
+        content_type=entry['content_type'],
+    )
+    response['X-Page-Cache'] = state
+    return response
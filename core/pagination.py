@@ -0,0 +1,197 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, the next page is selected with a WHERE condition on the
+sort key of the last seen row plus its id, so every page costs the same
+regardless of depth. Cursor tokens are opaque url-safe base64 strings;
+datetimes keep their microseconds, so rows created in the same millisecond
+are neither skipped nor repeated.
+
+Only orderings by plain, non-nullable fields can be paginated this way:
+"a > NULL" matches nothing in SQL. get_keyset_ordering() returns None for
+expressions and nullable sort keys, and callers fall back to OFFSET.
+Annotations used as sort keys must not be NULL (wrap them in Coalesce).
+"""
+
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Ошибка разбора курсора пагинации."""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder keeping the full precision of datetimes and times."""
+
+    def default(self, o):
+        # DjangoJSONEncoder округляет время до миллисекунд
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """
+    Encode sort key values into an opaque cursor token.
+
+    Args:
+        values: List of sort key values (dates and decimals are allowed)
+
+    Returns:
+        str: Url-safe cursor token
+    """
+    payload = json.dumps(values, cls=CursorEncoder, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token into sort key values.
+
+    Args:
+        token: Cursor token produced by encode_cursor()
+
+    Returns:
+        list: Sort key values
+
+    Raises:
+        InvalidCursor: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(f'Некорректный курсор: {e}')
+    if not isinstance(values, list):
+        raise InvalidCursor('Некорректный курсор')
+    return values
+
+
+def get_keyset_ordering(queryset):
+    """
+    Get ordering of the queryset with primary key as a tie-breaker.
+
+    Args:
+        queryset: QuerySet to paginate
+
+    Returns:
+        list: Ordering field names (with '-' prefix for descending), or None
+        if the ordering has expressions or nullable sort keys and cannot be
+        used for keyset pagination
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if not all(isinstance(field, str) for field in ordering):
+        return None
+    if any(_is_nullable(queryset.model, field.lstrip('-')) for field in ordering):
+        return None
+    if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+        ordering.append('id')
+    return ordering
+
+
+def _is_nullable(model, name):
+    """Check whether a sort key can be NULL (annotations are assumed not to be)."""
+    for part in name.split('__'):
+        if part == 'pk':
+            return False
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        if field.null:
+            return True
+        model = field.related_model
+        if model is None:
+            return False
+    return False
+
+
+def _to_python(model, name, value):
+    """Convert a decoded cursor value to the field type."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value
+    try:
+        return field.to_python(value)
+    except ValidationError as e:
+        raise InvalidCursor(f'Некорректный курсор: {e}')
+
+
+def _get_value(obj, name):
+    """Get sort key value from an object, following '__' lookups."""
+    value = obj
+    for part in name.split('__'):
+        value = getattr(value, part, None) if value is not None else None
+    if hasattr(value, 'pk'):
+        value = value.pk
+    return value
+
+
+def keyset_paginate(queryset, cursor=None, limit=12, ordering=None):
+    """
+    Get one page of the queryset after the given cursor.
+
+    Args:
+        queryset: QuerySet to paginate
+        cursor: Cursor token of the previous page (first page if None)
+        limit: Page size
+        ordering: Ordering to use (queryset ordering if None)
+
+    Returns:
+        tuple: (items, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+        ValueError: If the ordering cannot be used for keyset pagination
+    """
+    ordering = ordering or get_keyset_ordering(queryset)
+    if ordering is None:
+        raise ValueError('Ordering with expressions or nullable keys is not supported')
+    names = [field.lstrip('-') for field in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor('Курсор не соответствует сортировке')
+        values = [_to_python(queryset.model, name, value) for name, value in zip(names, values)]
+
+        # (a > va) OR (a = va AND b > vb) OR ...
+        condition = Q()
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            branch = Q(**{f'{names[index]}__{lookup}': values[index]})
+            for prev in range(index):
+                branch &= Q(**{names[prev]: values[prev]})
+            condition |= branch
+        queryset = queryset.filter(condition)
+
+    items = list(queryset[:limit + 1])
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_more and items:
+        next_cursor = cursor_for(items[-1], ordering)
+    return items, next_cursor
+
+
+def cursor_for(obj, ordering):
+    """
+    Build the cursor pointing right after the given object.
+
+    Args:
+        obj: Last object of a page
+        ordering: Ordering used for the page
+
+    Returns:
+        str: Cursor token
+    """
+    return encode_cursor([_get_value(obj, field.lstrip('-')) for field in ordering])
@@ -0,0 +1,254 @@
+"""
+Per-request SQL inspection.
+
+QueryInspectorMiddleware installs a QueryCounter as an execute wrapper on
+every database connection for the duration of a request. The counter
+records the number of statements, the time spent in the database and how
+often each statement shape repeats. A shape is the SQL with literals and
+placeholders replaced by "?" and IN lists collapsed, so the same query
+issued for every row of a list (N+1) shows up as one fingerprint with a
+high count.
+
+SlowQueryLogger is installed once per connection (CoreConfig.ready via
+connection_created) and times every statement, including those outside
+requests. The threshold is read once and re-read when the setting changes
+(setting_changed). Statements over SLOW_QUERY_THRESHOLD are reported through
+PerformanceLogger.log_slow_query with their shape, number of parameters,
+the view of the current request, the first project frame that issued the
+query and, if EXPLAIN_SLOW_QUERIES is on, the query plan.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+import django
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+def get_query_inspector_settings():
+    """
+    Get query inspector settings merged with defaults.
+
+    Returns:
+        dict: ENABLED, N_PLUS_ONE_THRESHOLD (repetitions of one statement
+        shape reported as N+1), MAX_REPORTED (shapes listed in the log) and
+        STAFF_HEADERS (add X-DB-Queries and Server-Timing for staff),
+        SLOW_QUERY_THRESHOLD (seconds, None to disable) and
+        EXPLAIN_SLOW_QUERIES (log the plan of slow SELECT statements)
+    """
+    options = {
+        'ENABLED': True,
+        'N_PLUS_ONE_THRESHOLD': 5,
+        'MAX_REPORTED': 5,
+        'STAFF_HEADERS': True,
+        'SLOW_QUERY_THRESHOLD': 0.5,
+        'EXPLAIN_SLOW_QUERIES': False,
+    }
+    options.update(getattr(settings, 'QUERY_INSPECTOR', {}))
+    return options
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'\bVALUES\s*\([?,\s]*\)(?:\s*,\s*\([?,\s]*\))*', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normalize SQL to the shape shared by all executions of one query.
+
+    Args:
+        sql: SQL text as passed to the database cursor
+
+    Returns:
+        str: SQL with literals replaced by "?", IN lists and multi-row
+        VALUES collapsed and whitespace squeezed
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub('VALUES (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """
+    Execute wrapper that counts statements, their time and shapes.
+
+    Attributes:
+        count: Number of executed statements
+        duration: Total time in the database in seconds
+        shapes: Mapping of fingerprint to the number of executions
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            shape = fingerprint(sql)
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold):
+        """
+        Get statement shapes executed at least `threshold` times.
+
+        Args:
+            threshold: Minimal number of executions
+
+        Returns:
+            list: (fingerprint, count) pairs, most frequent first
+        """
+        found = [(shape, count) for shape, count in self.shapes.items() if count >= threshold]
+        found.sort(key=lambda item: item[1], reverse=True)
+        return found
+
+
+# Текущий запрос для отчета о медленных запросах; задает QueryInspectorMiddleware
+current_request = ContextVar('current_request', default=None)
+
+# Каталоги, кадры из которых не считаются источником запроса
+_SKIPPED_DIRS = (
+    os.path.dirname(django.__file__) + os.sep,
+    os.path.dirname(os.__file__) + os.sep,
+    os.path.abspath(__file__),
+)
+
+
+def query_origin():
+    """
+    Find the project frame that issued the current query.
+
+    Returns:
+        str: "path:line in function" relative to BASE_DIR, or None
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_SKIPPED_DIRS) and 'site-packages' not in filename:
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def current_view():
+    """Get the view name of the request being processed, if any."""
+    request = current_request.get()
+    if request is None:
+        return None
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else request.path
+
+
+_UNSET = object()
+
+
+class SlowQueryLogger:
+    """
+    Execute wrapper reporting statements slower than SLOW_QUERY_THRESHOLD.
+    """
+
+    def __init__(self):
+        # Защита от повторного входа при выполнении EXPLAIN
+        self._local = threading.local()
+        self._threshold = _UNSET
+
+    @property
+    def threshold(self):
+        """SLOW_QUERY_THRESHOLD in seconds (None if disabled), read once."""
+        threshold = self._threshold
+        if threshold is _UNSET:
+            threshold = self._threshold = get_query_inspector_settings()['SLOW_QUERY_THRESHOLD']
+        return threshold
+
+    def reset(self):
+        """Forget the threshold so the next statement reads the settings again."""
+        self._threshold = _UNSET
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, 'active', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            threshold = self.threshold
+            if threshold is not None and duration > threshold:
+                self.report(sql, params, many, context, duration, threshold)
+
+    def report(self, sql, params, many, context, duration, threshold):
+        from .logging import performance_logger
+
+        explain = None
+        if not many and get_query_inspector_settings()['EXPLAIN_SLOW_QUERIES']:
+            explain = self.explain(context['connection'], sql, params)
+        performance_logger.log_slow_query(
+            fingerprint(sql),
+            round(duration, 6),
+            threshold=threshold,
+            # executemany получает итератор наборов: не перебираем его
+            params_count=None if many else len(params or ()),
+            view=current_view(),
+            origin=query_origin(),
+            explain=explain,
+        )
+
+    def explain(self, connection, sql, params):
+        """
+        Get the plan of a SELECT statement.
+
+        Args:
+            connection: Database connection that executed the statement
+            sql: SQL text
+            params: Statement parameters
+
+        Returns:
+            str: Plan rows joined by newlines, or None for other statements
+        """
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        self._local.active = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+        except DatabaseError as exc:
+            return f'EXPLAIN failed: {exc}'
+        finally:
+            self._local.active = False
+
+
+slow_query_logger = SlowQueryLogger()
+
+
+def install_slow_query_logger(sender=None, connection=None, **kwargs):
+    """
+    Add the slow query logger to a connection (connection_created receiver).
+
+    Without a connection the logger is added to every connection already
+    opened in this thread.
+    """
+    targets = [connection] if connection is not None else connections.all(initialized_only=True)
+    for target in targets:
+        if slow_query_logger not in target.execute_wrappers:
+            target.execute_wrappers.insert(0, slow_query_logger)
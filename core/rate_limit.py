@@ -0,0 +1,164 @@
+"""
+Cache-backed rate limiting of form submissions.
+
+Each endpoint (scope) limits submissions per client IP and per phone
+number. Counting uses a sliding window approximated with two fixed-window
+counters: the current window's count plus the previous window's count
+weighted by the part of it still inside the sliding window. Counters are
+changed with cache.add() and cache.incr(), which are atomic on Redis and
+Memcached, so concurrent workers share one count without locks.
+
+Phone numbers are reduced to their last ten digits and hashed before
+they become part of a cache key.
+"""
+
+import hashlib
+import math
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def get_rate_limit_settings():
+    """
+    Get rate limit settings merged with defaults.
+
+    Returns:
+        dict: ENABLED, DEFAULT and ENDPOINTS (scope -> limits; a limit is
+        (requests, window in seconds) per key 'ip' or 'phone', None to turn
+        the key off) and TRUSTED_PROXY_COUNT (number of reverse proxies in
+        front of the site that append to X-Forwarded-For; 0 to use
+        REMOTE_ADDR only)
+    """
+    options = {
+        'ENABLED': True,
+        'DEFAULT': {
+            'ip': (10, 600),
+            'phone': (3, 3600),
+        },
+        'ENDPOINTS': {},
+        'TRUSTED_PROXY_COUNT': 0,
+    }
+    options.update(getattr(settings, 'RATE_LIMITS', {}))
+    return options
+
+
+def get_endpoint_limits(scope):
+    """
+    Get limits of an endpoint.
+
+    Args:
+        scope: Endpoint name from RATE_LIMITS['ENDPOINTS']
+
+    Returns:
+        dict: Key name ('ip', 'phone') to (requests, window) for enabled keys
+    """
+    options = get_rate_limit_settings()
+    limits = dict(options['DEFAULT'])
+    limits.update(options['ENDPOINTS'].get(scope, {}))
+    return {name: limit for name, limit in limits.items() if limit}
+
+
+def hit(key, limit, window, now=None):
+    """
+    Count a request against a sliding window.
+
+    Args:
+        key: Counter key without the window suffix
+        limit: Allowed requests per window
+        window: Window length in seconds
+        now: Current timestamp (time.time() if None)
+
+    Returns:
+        int: 0 if the request is allowed, otherwise seconds until it would be
+    """
+    now = time.time() if now is None else now
+    index = int(now // window)
+    current_key = f'{key}:{index}'
+    # Счетчик живет два окна: следующее окно читает его как предыдущее
+    cache.add(current_key, 0, window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.set(current_key, 1, window * 2)
+        current = 1
+    previous = cache.get(f'{key}:{index - 1}', 0)
+
+    elapsed = now - index * window
+    if previous * (window - elapsed) / window + current <= limit:
+        return 0
+    if current > limit or not previous:
+        wait = window - elapsed
+    else:
+        # Вес предыдущего окна снижается до допустимого
+        wait = window - elapsed - (limit - current) * window / previous
+    return max(1, math.ceil(wait))
+
+
+def get_client_ip(request):
+    """
+    Get the client address used as rate limit key.
+
+    X-Forwarded-For is used only with TRUSTED_PROXY_COUNT proxies in front
+    of the site. The client controls the start of the header, so the
+    address is taken from the right: the one added by the outermost
+    trusted proxy.
+
+    Args:
+        request: HTTP request object
+
+    Returns:
+        str: Client IP address
+    """
+    proxies = get_rate_limit_settings()['TRUSTED_PROXY_COUNT']
+    if proxies:
+        forwarded = [
+            address.strip()
+            for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def normalize_phone(phone):
+    """Reduce a phone number to its last ten digits ('' if too short)."""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def check_rate_limit(request, scope):
+    """
+    Count a submission and check the limits of its endpoint.
+
+    Every enabled key is counted even if another one is already exceeded,
+    so a client cannot spend one limit while blocked by the other.
+
+    Args:
+        request: HTTP request object
+        scope: Endpoint name
+
+    Returns:
+        tuple: (key name, seconds to wait) of the exceeded limit with the
+        longest wait, or None if the request is allowed
+    """
+    if not get_rate_limit_settings()['ENABLED']:
+        return None
+    identities = {
+        'ip': get_client_ip(request),
+        'phone': normalize_phone(request.POST.get('phone')),
+    }
+    exceeded = None
+    for name, (limit, window) in get_endpoint_limits(scope).items():
+        identity = identities.get(name)
+        if not identity:
+            continue
+        digest = hashlib.md5(identity.encode('utf-8')).hexdigest()
+        wait = hit(f'ratelimit:{scope}:{name}:{digest}', limit, window)
+        if wait and (exceeded is None or wait > exceeded[1]):
+            exceeded = (name, wait)
+    return exceeded
@@ -0,0 +1,141 @@
+"""
+Request scanner for suspicious patterns.
+
+All configured patterns are compiled once into a single alternation
+regex. The lowercased path and query values of a request are joined with
+NUL separators and scanned in one pass; a match is mapped back to its
+segment by offset. Most requests match nothing, so the cost is one join
+and one regex search.
+
+Patterns come from SECURITY_SCAN['RULES'] (activity type -> literal
+substrings). The compiled matcher is cached per process and rebuilt when
+the setting changes (setting_changed).
+"""
+
+import re
+from bisect import bisect_right
+
+from django.conf import settings
+
+
+DEFAULT_RULES = {
+    'sql_injection_attempt': ('union select', 'drop table', 'delete from', 'insert into', 'update set'),
+    'xss_attempt': ('<script', 'script>', 'javascript:'),
+}
+
+
+def get_security_scan_settings():
+    """
+    Get request scanner settings merged with defaults.
+
+    Returns:
+        dict: ENABLED and RULES (activity type -> patterns matched as
+        case-insensitive substrings)
+    """
+    options = {
+        'ENABLED': True,
+        'RULES': DEFAULT_RULES,
+    }
+    options.update(getattr(settings, 'SECURITY_SCAN', {}))
+    return options
+
+
+class PatternMatcher:
+    """
+    Single compiled regex over all patterns of all activity types.
+
+    Args:
+        rules: Mapping of activity type to literal patterns
+    """
+
+    def __init__(self, rules):
+        self.activities = {}
+        for activity_type, patterns in rules.items():
+            for pattern in patterns:
+                # Паттерн, указанный в нескольких типах, относится к первому
+                self.activities.setdefault(pattern.lower(), activity_type)
+        # Длинные паттерны первыми: при общем начале побеждает более точный
+        ordered = sorted(self.activities, key=len, reverse=True)
+        self.regex = re.compile('|'.join(map(re.escape, ordered))) if ordered else None
+
+    def scan(self, segments):
+        """
+        Find the first pattern in each segment.
+
+        Args:
+            segments: Strings to check
+
+        Returns:
+            list: (segment index, activity type, pattern) triples
+        """
+        if self.regex is None:
+            return []
+        lowered = [segment.lower() for segment in segments]
+        text = '\0'.join(lowered)
+        match = self.regex.search(text)
+        if match is None:
+            return []
+
+        starts = []
+        offset = 0
+        for segment in lowered:
+            starts.append(offset)
+            offset += len(segment) + 1
+
+        found = []
+        while match is not None:
+            index = bisect_right(starts, match.start()) - 1
+            pattern = match.group()
+            found.append((index, self.activities[pattern], pattern))
+            # Остаток сегмента пропускаем: достаточно первого совпадения
+            if index + 1 == len(starts):
+                break
+            match = self.regex.search(text, starts[index + 1])
+        return found
+
+
+_matcher = None
+
+
+def get_matcher():
+    """
+    Get the compiled matcher for the current settings.
+
+    Returns:
+        PatternMatcher: Matcher, or None if scanning is disabled
+    """
+    global _matcher
+    if _matcher is None:
+        options = get_security_scan_settings()
+        _matcher = PatternMatcher(options['RULES'] if options['ENABLED'] else {})
+    return _matcher if _matcher.regex is not None else None
+
+
+def reset_matcher():
+    """Drop the compiled matcher so the next request rebuilds it."""
+    global _matcher
+    _matcher = None
+
+
+def scan_request(request, matcher):
+    """
+    Scan the path and query values of a request.
+
+    Args:
+        request: HTTP request object
+        matcher: PatternMatcher to use
+
+    Returns:
+        list: (parameter name or None for the path, value, activity type,
+        pattern) tuples
+    """
+    names = [None]
+    segments = [request.path]
+    for key, values in request.GET.lists():
+        for value in values:
+            names.append(key)
+            segments.append(value)
+    return [
+        (names[index], segments[index], activity_type, pattern)
+        for index, activity_type, pattern in matcher.scan(segments)
+    ]
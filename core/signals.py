@@ -7,11 +7,23 @@
 - Логирования удаления объектов
 """
 
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
 from django.contrib.auth.models import User
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.core.signals import setting_changed
+from .caching import run_now_and_on_commit
 from .logging import database_logger, security_logger, business_logger
+from .gazetteer import invalidate_gazetteer
+from .geo import invalidate_city_grid
+from .images import get_image_fields, schedule_derivatives, delete_derivatives
+from .page_cache import get_page_cache_settings, invalidate_tags
+from .home import COUNTER_FIELDS, SNAPSHOT_MODELS, home_snapshot_cache
+from .models import City, CityCoordinates, Region
+from .query_inspector import slow_query_logger
+from .security_scan import reset_matcher
 
 
 @receiver(post_save)
@@ -178,4 +190,102 @@ def _get_client_ip(request):
         ip = x_forwarded_for.split(',')[0]
     else:
         ip = request.META.get('REMOTE_ADDR')
-    return ip 
\ No newline at end of file
+    return ip
+
+
+@receiver(post_save, sender=CityCoordinates)
+@receiver(post_delete, sender=CityCoordinates)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_grid_on_change(sender, **kwargs):
+    """Сбрасывает сетку координат городов для поиска «рядом»."""
+    invalidate_city_grid()
+
+
+@receiver(post_save, sender=CityCoordinates)
+@receiver(post_delete, sender=CityCoordinates)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_gazetteer_on_change(sender, **kwargs):
+    """Сбрасывает справочник городов во всех процессах."""
+    run_now_and_on_commit(invalidate_gazetteer)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def invalidate_page_cache(sender, instance, action=None, model=None, **kwargs):
+    """Помечает устаревшими кэшированные страницы, зависящие от модели."""
+    if action is not None and not action.startswith('post_'):
+        return
+    labels = {instance._meta.label}
+    if model is not None:
+        # Изменение m2m затрагивает обе стороны связи
+        labels.add(model._meta.label)
+    labels -= set(get_page_cache_settings()['IGNORED_MODELS'])
+    if not labels:
+        return
+    run_now_and_on_commit(lambda: invalidate_tags(*labels))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def invalidate_home_snapshot(sender, instance, action=None, model=None, update_fields=None, **kwargs):
+    """Сбрасывает снимок главной страницы при изменении показанных на ней моделей."""
+    if action is not None and not action.startswith('post_'):
+        return
+    if update_fields and COUNTER_FIELDS.issuperset(update_fields):
+        # Счетчик просмотров на главной не выводится
+        return
+    labels = {instance._meta.label}
+    if model is not None:
+        labels.add(model._meta.label)
+    if labels.isdisjoint(SNAPSHOT_MODELS):
+        return
+    home_snapshot_cache.invalidate_on_change()
+
+
+@receiver(pre_save)
+def mark_new_images(sender, instance, raw=False, **kwargs):
+    """Запоминает поля с новыми загрузками до сохранения файлов."""
+    field_names = get_image_fields(sender)
+    if not field_names or raw:
+        return
+    # Незафиксированный файл - новая загрузка, сохраняется вместе с моделью
+    instance._new_image_fields = [
+        name for name in field_names
+        if getattr(instance, name) and not getattr(instance, name)._committed
+    ]
+
+
+@receiver(post_save)
+def generate_image_derivatives(sender, instance, **kwargs):
+    """Ставит в очередь генерацию миниатюр новых изображений после коммита."""
+    for field_name in getattr(instance, '_new_image_fields', None) or ():
+        name = getattr(instance, field_name).name
+        transaction.on_commit(lambda name=name: schedule_derivatives(name))
+    instance._new_image_fields = []
+
+
+@receiver(cleanup_post_delete)
+def delete_image_derivatives(sender, field_name, file_name, file, success, **kwargs):
+    """Удаляет миниатюры вместе с оригиналом изображения."""
+    if success and file_name and field_name in get_image_fields(sender):
+        delete_derivatives(file_name, getattr(file, 'storage', None))
+
+
+@receiver(setting_changed)
+def reset_security_matcher(sender, setting, **kwargs):
+    """Пересобирает регулярное выражение проверки запросов при смене настроек."""
+    if setting == 'SECURITY_SCAN':
+        reset_matcher()
+
+
+@receiver(setting_changed)
+def reset_slow_query_threshold(sender, setting, **kwargs):
+    """Перечитывает порог медленных запросов при смене настроек."""
+    if setting == 'QUERY_INSPECTOR':
+        slow_query_logger.reset()
@@ -0,0 +1,190 @@
+"""
+Unique slug allocation.
+
+A free slug is found with one query: all existing ``base`` and
+``base-N`` values are fetched with a ``startswith`` lookup and the
+smallest free suffix is picked in Python. A base too long for a suffix
+is shortened before the lookup, so the lookup and the numbered slugs use
+the same prefix. ``assign_slugs`` does the same
+for a whole list of unsaved instances (bulk imports), and
+``save_with_unique_slug`` retries when a concurrent insert takes the slug
+first and the unique constraint fails.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .utils import transliterate
+
+
+SLUG_ATTEMPTS = 3
+STARTSWITH_BATCH_SIZE = 100
+# Цифр суффикса, под которые укорачивается длинный slug
+SUFFIX_DIGITS = 5
+
+
+def make_base_slug(text, max_length=50, fallback='item'):
+    """
+    Build a base slug from text with transliteration.
+
+    Args:
+        text: Source text (Cyrillic is transliterated)
+        max_length: Maximum slug length
+        fallback: Slug used when the text gives an empty slug
+
+    Returns:
+        str: Base slug
+    """
+    slug = slugify(transliterate(text or ''))[:max_length].strip('-')
+    return slug or fallback
+
+
+def _get_slug_model(model, field):
+    """Get the model whose table holds the slug field (parent for multi-table inheritance)."""
+    return model._meta.get_field(field).model
+
+
+def _stem(base_slug, max_length):
+    """
+    Get the part of base_slug that numbered slugs are built from.
+
+    A base longer than max_length minus the room for a SUFFIX_DIGITS suffix
+    is shortened once, so every base-N shares one searchable prefix.
+    """
+    limit = max_length - SUFFIX_DIGITS - 1
+    if len(base_slug) <= limit:
+        return base_slug
+    return base_slug[:limit].rstrip('-')
+
+
+def _suffix(stem, slug):
+    """Get the numeric suffix of slug for stem (None if slug is not stem-N)."""
+    rest = slug[len(stem) + 1:]
+    if slug.startswith(stem + '-') and rest.isdigit() and not rest.startswith('0'):
+        return int(rest)
+    return None
+
+
+def _taken_slugs(model, field, base_slugs, max_length, exclude_pk=None):
+    """Fetch existing slugs equal to a base slug or numbered from its stem."""
+    base_slugs = list(base_slugs)
+    taken = set()
+    for start in range(0, len(base_slugs), STARTSWITH_BATCH_SIZE):
+        condition = Q()
+        for base_slug in base_slugs[start:start + STARTSWITH_BATCH_SIZE]:
+            stem = _stem(base_slug, max_length)
+            condition |= Q(**{field: base_slug}) | Q(**{f'{field}__startswith': f'{stem}-'})
+        queryset = model._base_manager.filter(condition)
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        taken.update(queryset.values_list(field, flat=True))
+    return taken
+
+
+def _next_free(base_slug, taken, max_length):
+    """Get base_slug or the first stem-N that is not in taken."""
+    if base_slug not in taken:
+        return base_slug
+    stem = _stem(base_slug, max_length)
+    used = {_suffix(stem, slug) for slug in taken} - {None}
+    suffix = 1
+    while suffix in used:
+        suffix += 1
+    return f'{stem}-{suffix}'
+
+
+def allocate_slug(model, base_slug, instance=None, field='slug'):
+    """
+    Get a free slug for base_slug with one query.
+
+    Args:
+        model: Model class
+        base_slug: Desired slug
+        instance: Instance being saved (excluded from the check)
+        field: Slug field name
+
+    Returns:
+        str: base_slug or base_slug-N (base shortened to fit) with the
+        smallest free N
+    """
+    slug_model = _get_slug_model(model, field)
+    max_length = slug_model._meta.get_field(field).max_length
+    base_slug = base_slug[:max_length]
+    exclude_pk = instance.pk if instance is not None and instance.pk else None
+    taken = _taken_slugs(slug_model, field, [base_slug], max_length, exclude_pk)
+    return _next_free(base_slug, taken, max_length)
+
+
+def assign_slugs(instances, get_base_slug, field='slug'):
+    """
+    Assign free slugs to unsaved instances of one model at once.
+
+    Existing slugs for all base slugs are fetched with one query per
+    STARTSWITH_BATCH_SIZE bases; instances sharing a base get consecutive
+    suffixes. Instances that already have a slug keep it and reserve it.
+
+    Args:
+        instances: List of model instances
+        get_base_slug: Callable returning the base slug of an instance
+        field: Slug field name
+
+    Returns:
+        list: The same instances with slugs set
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+
+    slug_model = _get_slug_model(type(instances[0]), field)
+    max_length = slug_model._meta.get_field(field).max_length
+
+    pending = {}
+    reserved = set()
+    for instance in instances:
+        value = getattr(instance, field)
+        if value:
+            reserved.add(value)
+        else:
+            pending.setdefault(get_base_slug(instance)[:max_length], []).append(instance)
+
+    taken = _taken_slugs(slug_model, field, pending, max_length) | reserved
+    for base_slug, group in pending.items():
+        for instance in group:
+            slug = _next_free(base_slug, taken, max_length)
+            setattr(instance, field, slug)
+            taken.add(slug)
+    return instances
+
+
+def save_with_unique_slug(instance, base_slug, save, field='slug', attempts=SLUG_ATTEMPTS):
+    """
+    Allocate a slug and save, retrying on a concurrent slug collision.
+
+    Args:
+        instance: Instance being saved
+        base_slug: Desired slug
+        save: Callable performing the actual save
+        field: Slug field name
+        attempts: Number of attempts
+
+    Returns:
+        Result of save()
+
+    Raises:
+        IntegrityError: If saving fails for another reason or all attempts
+            collide
+    """
+    model = type(instance)
+    slug_model = _get_slug_model(model, field)
+    for attempt in range(attempts):
+        setattr(instance, field, allocate_slug(model, base_slug, instance, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            others = slug_model._base_manager.filter(**{field: getattr(instance, field)})
+            if instance.pk:
+                others = others.exclude(pk=instance.pk)
+            if attempt == attempts - 1 or not others.exists():
+                raise
@@ -0,0 +1,71 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core.images import FORMATS, get_manifest, get_srcset
+
+register = template.Library()
+
+
+@register.filter
+def srcset(file, fmt=None):
+    """
+    Return a srcset attribute value with derivatives of an image.
+
+    Example:
+    <img src="{{ post.image.url }}" srcset="{{ post.image|srcset:'webp' }}" sizes="50vw">
+
+    Args:
+        file: Image field file
+        fmt: Derivative format ('webp', 'avif'); the original format if None
+
+    Returns:
+        str: 'url 320w, url 640w, ...' or '' until derivatives are generated
+    """
+    if not file:
+        return ''
+    return get_srcset(file, fmt)
+
+
+@register.simple_tag
+def picture(file, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render a <picture> element with AVIF/WebP sources and resized fallbacks.
+
+    Example:
+    {% picture clinic.main_image.image alt=clinic.name sizes="(max-width: 768px) 100vw, 33vw" %}
+
+    Args:
+        file: Image field file
+        alt: Alternative text
+        css_class: Class of the <img> element
+        sizes: Value of the sizes attribute
+        loading: Value of the loading attribute ('' to omit)
+
+    Returns:
+        str: Markup; a plain <img> with the original until derivatives
+        are generated
+    """
+    if not file:
+        return ''
+    manifest = get_manifest(file.name, file.storage)
+    fallback = manifest.get('fallback')
+    sources = [
+        (FORMATS[fmt][2], get_srcset(file, fmt), sizes)
+        for fmt in ('avif', 'webp')
+        if fmt != fallback and manifest.get('sources', {}).get(fmt)
+    ]
+    img = format_html(
+        '<img src="{}"{} alt="{}"{}{} />',
+        file.url,
+        format_html(' srcset="{}" sizes="{}"', get_srcset(file), sizes) if fallback else '',
+        alt,
+        format_html(' class="{}"', css_class) if css_class else '',
+        format_html(' loading="{}"', loading) if loading else '',
+    )
+    if not sources:
+        return img
+    return format_html(
+        '<picture>{}{}</picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}" />', sources),
+        img,
+    )
@@ -0,0 +1,87 @@
+"""
+Тесты двухуровневого версионированного кэша.
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from core.caching import VersionedCache, bump_version, get_version
+from core.checks import check_shared_cache
+
+
+class VersionedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = VersionedCache('test')
+        self.build = mock.Mock(side_effect=lambda: ['value'])
+
+    def test_local_tier(self):
+        """Повторное чтение не обращается ни к базе, ни к общему кэшу"""
+        self.assertEqual(self.cache.get('key', self.build), ['value'])
+        with mock.patch('core.caching.cache') as shared:
+            self.assertEqual(self.cache.get('key', self.build), ['value'])
+        shared.get.assert_not_called()
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_shared_tier(self):
+        """Другой процесс берет значение из общего кэша"""
+        self.cache.get('key', self.build)
+        other = VersionedCache('test')
+        self.assertEqual(other.get('key', self.build), ['value'])
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_invalidate(self):
+        """Сброс виден своему процессу сразу, другим - после VERSION_TTL"""
+        other = VersionedCache('test')
+        other.get('key', self.build)
+        self.cache.invalidate()
+        self.cache.get('key', self.build)
+        self.assertEqual(self.build.call_count, 2)
+
+        other.get('key', self.build)
+        self.assertEqual(self.build.call_count, 2)
+        with override_settings(CONTEXT_CACHE={'VERSION_TTL': 0}):
+            self.assertEqual(other.get('key', self.build), ['value'])
+        # Новая версия уже собрана первым процессом и лежит в общем кэше
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_invalidate_on_change(self):
+        """Версия меняется сразу и еще раз после коммита"""
+        version = get_version(self.cache.version_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cache.invalidate_on_change()
+            self.assertEqual(get_version(self.cache.version_key), version + 1)
+        self.assertEqual(get_version(self.cache.version_key), version + 2)
+
+    @override_settings(CONTEXT_CACHE={'LOCAL_SIZE': 2})
+    def test_lru_size(self):
+        """Локальный уровень вытесняет давно не читанные ключи"""
+        for key in ('a', 'b', 'a', 'c'):
+            self.cache.get(key, self.build)
+        self.assertEqual([key for _, key in self.cache._local], ['a', 'c'])
+
+    def test_lazy(self):
+        """Ленивое значение не собирается без обращения"""
+        value = self.cache.lazy('key', self.build)
+        self.build.assert_not_called()
+        self.assertEqual(list(value), ['value'])
+
+    def test_version_kept_apart_from_values(self):
+        """Версия хранится вне кэша значений и не теряется при его очистке"""
+        version = bump_version(self.cache.version_key)
+        cache.clear()
+        self.assertEqual(get_version(self.cache.version_key), version)
+        self.assertEqual(bump_version(self.cache.version_key), version + 1)
+
+
+class SharedCacheCheckTest(TestCase):
+    def test_process_local_cache(self):
+        """check --deploy предупреждает о кэше, не общем для процессов"""
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['core.W001', 'core.W001'])
+
+    def test_missing_versions_alias(self):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://localhost:6379/0'}}
+        with override_settings(CACHES=caches):
+            self.assertEqual([w.id for w in check_shared_cache(None)], ['core.W002'])
@@ -0,0 +1,70 @@
+"""
+Тесты справочника городов в памяти.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from core.gazetteer import SEED_COORDINATES, gazetteer, invalidate_gazetteer
+from core.mixins import DEFAULT_GEO_DATA, GeoDataMixin
+from core.models import City, CityCoordinates, Region
+from facilities.models import Clinic, OrganizationType
+
+
+class GazetteerTest(TestCase):
+    def setUp(self):
+        invalidate_gazetteer()
+        self.region = Region.objects.create(name='Московская область', slug='gaz-region')
+        self.mytishchi = City.objects.create(name='Мытищи', slug='gaz-mytishchi', region=self.region)
+        CityCoordinates.objects.create(city=self.mytishchi, latitude='55.911600', longitude='37.730800')
+        # Координат в БД нет, берутся из начальных данных
+        self.tula = City.objects.create(name='Тула', slug='gaz-tula', region=self.region)
+        self.nowhere = City.objects.create(name='Без координат', slug='gaz-nowhere', region=self.region)
+
+    def test_lookups(self):
+        """Поиск по id, slug и названию"""
+        place = gazetteer.get(self.mytishchi.pk)
+        self.assertEqual((place.name, place.region), ('Мытищи', 'Московская область'))
+        self.assertAlmostEqual(place.latitude, 55.9116)
+        self.assertEqual(gazetteer.get_by_slug('gaz-mytishchi'), place)
+        self.assertEqual(gazetteer.get_by_name(' мытищи '), place)
+        self.assertIsNone(gazetteer.get_by_slug('unknown'))
+
+        self.assertEqual((gazetteer.get(self.tula.pk).latitude, gazetteer.get(self.tula.pk).longitude),
+                         SEED_COORDINATES['Тула'])
+        self.assertIsNone(gazetteer.get(self.nowhere.pk).latitude)
+
+    def test_loaded_once_and_reloaded_on_change(self):
+        """Данные загружаются один раз и перечитываются после изменений"""
+        gazetteer.get(self.mytishchi.pk)
+        with self.assertNumQueries(0):
+            gazetteer.get_by_name('Тула')
+
+        self.region.name = 'Подмосковье'
+        self.region.save()
+        self.assertEqual(gazetteer.get(self.mytishchi.pk).region, 'Подмосковье')
+
+        CityCoordinates.objects.filter(city=self.mytishchi).delete()
+        self.assertIsNone(gazetteer.get(self.mytishchi.pk).latitude)
+
+    def test_geo_data(self):
+        """GeoDataMixin не обращается к БД"""
+        organization_type = OrganizationType.objects.create(name='Клиника', slug='gaz-clinic', description='')
+        clinic = Clinic.objects.create(
+            name='Клиника', slug='gaz-clinic', city=self.mytishchi, organization_type=organization_type)
+        gazetteer.ensure_loaded()
+        with self.assertNumQueries(0):
+            data = GeoDataMixin().get_geo_data(clinic)
+        self.assertEqual(data['geo_position'], '55.911600;37.730800')
+        self.assertEqual(data['full_location'], 'Мытищи, Московская область')
+
+        clinic.city = self.nowhere
+        self.assertEqual(GeoDataMixin().get_geo_data(clinic), DEFAULT_GEO_DATA)
+        self.assertEqual(GeoDataMixin().get_geo_data(None), DEFAULT_GEO_DATA)
+
+    def test_add_city_coordinates(self):
+        """Команда записывает начальные координаты в БД"""
+        call_command('add_city_coordinates', stdout=StringIO())
+        coordinates = CityCoordinates.objects.get(city=self.tula)
+        self.assertEqual((float(coordinates.latitude), float(coordinates.longitude)), SEED_COORDINATES['Тула'])
@@ -0,0 +1,124 @@
+"""
+Тесты пакетной загрузки объектов по обобщенным связям.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.generic import prefetch_generic
+from core.models import Region, City
+from facilities.models import Clinic, RehabCenter, PrivateDoctor, OrganizationType
+from medical_services.models import FacilityService, Service
+
+
+class PrefetchGenericTest(TestCase):
+    def setUp(self):
+        region = Region.objects.create(name='Московская область', slug='generic-region')
+        self.city = City.objects.create(name='Москва', slug='generic-moscow', region=region)
+        organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='generic-clinic', description='Клиника')
+        self.service = Service.objects.create(name='Детокс', slug='generic-detox', description='')
+        self.clinics = [
+            Clinic.objects.create(
+                name=f'Клиника {i}', slug=f'generic-clinic-{i}', city=self.city,
+                organization_type=organization_type)
+            for i in range(3)
+        ]
+        self.rehab = RehabCenter.objects.create(
+            name='Центр', slug='generic-rehab', city=self.city, organization_type=organization_type)
+        self.doctor = PrivateDoctor.objects.create(
+            slug='generic-doctor', first_name='Иван', last_name='Петров', experience_years=5,
+            city=self.city, organization_type=organization_type)
+        for facility in self.clinics + [self.rehab, self.doctor]:
+            FacilityService.objects.create(
+                content_type=ContentType.objects.get_for_model(facility),
+                object_id=facility.pk, service=self.service)
+
+    def test_one_query_per_model(self):
+        """Объекты загружаются одним запросом на модель вместе с городом и фото"""
+        ContentType.objects.clear_cache()
+        ContentType.objects.get_for_models(Clinic, RehabCenter, PrivateDoctor)
+        facility_services = list(FacilityService.objects.all())
+        # Три модели: запрос объектов и запрос фотографий на каждую
+        with self.assertNumQueries(6):
+            prefetch_generic(facility_services)
+        with self.assertNumQueries(0):
+            facilities = [fs.facility for fs in facility_services]
+            regions = {facility.city.region.name for facility in facilities}
+            images = [facility.images.first() for facility in facilities]
+        self.assertEqual(set(facilities), set(self.clinics + [self.rehab, self.doctor]))
+        self.assertEqual(regions, {'Московская область'})
+        self.assertEqual(images, [None] * 5)
+
+    def test_missing_object(self):
+        """Удаленный объект дает None без дополнительных запросов"""
+        facility_services = list(FacilityService.objects.filter(
+            content_type=ContentType.objects.get_for_model(Clinic), object_id=self.clinics[0].pk))
+        Clinic.objects.filter(pk=self.clinics[0].pk).delete()
+        prefetch_generic(facility_services, 'facility')
+        with self.assertNumQueries(0):
+            self.assertEqual([fs.facility for fs in facility_services], [None])
+
+    def test_custom_queryset(self):
+        """Переданный queryset используется вместо стандартного"""
+        facility_services = list(FacilityService.objects.all())
+        prefetch_generic(facility_services, querysets={Clinic: Clinic.objects.filter(name='Клиника 1')})
+        clinics = [fs.facility for fs in facility_services if fs.content_type.model == 'clinic']
+        self.assertEqual(clinics.count(None), 2)
+        self.assertIn(self.clinics[1], clinics)
+
+    @override_settings(PAGE_CACHE={'ENABLED': False})
+    def test_service_detail_queries_do_not_grow(self):
+        """Число запросов страницы услуги не зависит от числа учреждений"""
+        url = reverse('medical_services:service_detail', kwargs={'slug': self.service.slug})
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['clinics']), 3)
+        self.assertEqual(response.context['rehab_centers'][0]['facility'], self.rehab)
+        self.assertEqual(response.context['private_doctors'][0]['facility'], self.doctor)
+
+        queries = self._count_queries(url)
+        organization_type = self.clinics[0].organization_type
+        for i in range(3, 6):
+            clinic = Clinic.objects.create(
+                name=f'Клиника {i}', slug=f'generic-clinic-{i}', city=self.city,
+                organization_type=organization_type)
+            FacilityService.objects.create(
+                content_type=ContentType.objects.get_for_model(Clinic),
+                object_id=clinic.pk, service=self.service)
+        self.assertEqual(self._count_queries(url), queries)
+
+    @override_settings(PAGE_CACHE={'ENABLED': False})
+    def test_service_detail_hides_inactive(self):
+        """Неактивные учреждения всех типов не показываются на странице услуги"""
+        Clinic.objects.filter(pk=self.clinics[0].pk).update(is_active=False)
+        RehabCenter.objects.filter(pk=self.rehab.pk).update(is_active=False)
+        PrivateDoctor.objects.filter(pk=self.doctor.pk).update(is_active=False)
+        response = self.client.get(reverse('medical_services:service_detail', kwargs={'slug': self.service.slug}))
+        self.assertEqual(
+            [item['facility'] for item in response.context['clinics']], self.clinics[1:])
+        self.assertEqual(response.context['rehab_centers'], [])
+        self.assertEqual(response.context['private_doctors'], [])
+        self.assertEqual(response.context['total_facilities'], 2)
+
+    def test_admin_changelist(self):
+        """Список в админке загружает учреждения пачкой"""
+        from django.contrib.auth import get_user_model
+
+        admin = get_user_model().objects.create_superuser('generic-admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        url = reverse('admin:medical_services_facilityservice_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, 'Клиника 2')
+        queries = self._count_queries(url)
+        FacilityService.objects.create(
+            content_type=ContentType.objects.get_for_model(Clinic),
+            object_id=self.clinics[1].pk, service=Service.objects.create(
+                name='Консультация', slug='generic-consult', description=''))
+        self.assertEqual(self._count_queries(url), queries)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context.captured_queries)
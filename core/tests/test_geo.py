@@ -0,0 +1,61 @@
+"""
+Тесты геопоиска по координатам городов.
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+from core.geo import CityGrid, bounding_box, haversine_km
+
+
+class GeoTests(SimpleTestCase):
+    """Тесты расстояний и сетки городов."""
+
+    def test_haversine(self):
+        """Расстояние Москва — Санкт-Петербург"""
+        distance = haversine_km(55.7558, 37.6173, 59.9343, 30.3351)
+        self.assertAlmostEqual(distance, 634, delta=3)
+        self.assertEqual(haversine_km(10, 20, 10, 20), 0)
+
+    def test_bounding_box_contains_circle(self):
+        """Ограничивающий прямоугольник содержит круг"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(55.75, 37.62, 100)
+        self.assertLess(min_lat, 55.75 - 0.89)
+        self.assertGreater(max_lat, 55.75 + 0.89)
+        self.assertLess(min_lon, 37.62 - 1.59)
+        self.assertGreater(max_lon, 37.62 + 1.59)
+        self.assertEqual(bounding_box(89.9, 0, 100)[2:], (-180.0, 180.0))
+
+    def test_grid_within(self):
+        """Сетка возвращает города в радиусе по возрастанию расстояния"""
+        grid = CityGrid(cell_size=1.0)
+        grid.add(1, 55.7558, 37.6173, 'moscow')
+        grid.add(2, 55.9116, 37.7308, 'mytishchi')
+        grid.add(3, 59.9343, 30.3351, 'spb')
+        self.assertEqual([city_id for city_id, _ in grid.within(55.75, 37.62, 50)], [1, 2])
+        self.assertEqual([city_id for city_id, _ in grid.within(55.75, 37.62, 700)], [1, 2, 3])
+        self.assertEqual(grid.get_city_coordinates('spb'), (59.9343, 30.3351))
+
+    def test_reload_keeps_grid_for_readers(self):
+        """Во время перезагрузки чтение видит прежнюю сетку целиком"""
+        grid = CityGrid(cell_size=1.0)
+        grid.add(1, 55.7558, 37.6173, 'moscow')
+        seen = []
+
+        def rows():
+            seen.append([city_id for city_id, _ in grid.within(55.75, 37.62, 50)])
+            yield (2, 'mytishchi', 55.9116, 37.7308)
+            seen.append(grid.get_city_coordinates('moscow'))
+
+        with mock.patch('core.models.CityCoordinates.objects') as objects:
+            objects.filter.return_value.values_list.return_value = rows()
+            grid.ensure_loaded()
+        self.assertEqual(seen, [[1], (55.7558, 37.6173)])
+        self.assertEqual([city_id for city_id, _ in grid.within(55.75, 37.62, 50)], [2])
+
+    def test_grid_antimeridian(self):
+        """Поиск через 180-й меридиан"""
+        grid = CityGrid()
+        grid.add(1, 64.7, 177.5, 'anadyr')
+        grid.add(2, 65.0, -179.5, 'east')
+        self.assertEqual({city_id for city_id, _ in grid.within(64.9, 179.9, 200)}, {1, 2})
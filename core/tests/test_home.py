@@ -0,0 +1,87 @@
+"""
+Тесты снимка блоков главной страницы.
+"""
+
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from blog.models import BlogCategory, BlogPost, Tag
+from core.home import get_home_snapshot, home_snapshot_cache
+from core.models import City, Region
+from facilities.models import Clinic, OrganizationType, PrivateDoctor, RehabCenter
+from recovery_stories.models import RecoveryCategory, RecoveryStory
+from staff.models import Specialization
+
+
+class HomeSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        home_snapshot_cache.invalidate()
+        region = Region.objects.create(name='Московская область', slug='home-region')
+        self.city = City.objects.create(name='Москва', slug='home-moscow', region=region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='home-clinic', description='Клиника')
+        self.clinics = [
+            Clinic.objects.create(
+                name=f'Клиника {i}', slug=f'home-clinic-{i}', city=self.city,
+                organization_type=self.organization_type)
+            for i in range(3)
+        ]
+        self.featured = RehabCenter.objects.create(
+            name='Старый центр', slug='home-rehab-featured', city=self.city,
+            organization_type=self.organization_type, is_featured=True)
+        RehabCenter.objects.create(
+            name='Новый центр', slug='home-rehab', city=self.city, organization_type=self.organization_type)
+        doctor = PrivateDoctor.objects.create(
+            slug='home-doctor', first_name='Иван', last_name='Петров', experience_years=5,
+            city=self.city, organization_type=self.organization_type)
+        doctor.specializations.add(Specialization.objects.create(name='Нарколог', slug='home-narcologist'))
+        category = RecoveryCategory.objects.create(name='Алкоголизм', slug='home-alcoholism', description='')
+        self.story = RecoveryStory.objects.create(
+            title='История', slug='home-story', category=category, author='Аноним',
+            content='Текст', excerpt='Кратко', is_published=True)
+        post = BlogPost.objects.create(
+            title='Статья', slug='home-post', category=BlogCategory.objects.create(name='Статьи', description=''),
+            preview_text='Кратко', content='Текст', is_published=True)
+        post.tags.add(Tag.objects.create(name='Психиатрия', slug='home-psychiatry'))
+
+    def test_featured_first(self):
+        """Выделенные учреждения идут первыми, затем новые"""
+        snapshot = get_home_snapshot()
+        self.assertEqual(snapshot['rehab_centers'][0], self.featured)
+        self.assertEqual(len(snapshot['clinics']), 3)
+        self.assertEqual(snapshot['clinics'][0], self.clinics[-1])
+        self.assertEqual(snapshot['recovery_stories'], [self.story])
+
+    def test_steady_state_without_queries(self):
+        """Повторный показ главной не обращается к БД"""
+        url = reverse('core:home')
+        response = self.client.get(url)
+        self.assertContains(response, 'Клиника 2')
+        self.assertContains(response, 'Нарколог')
+        self.assertContains(response, 'Психиатрия')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Клиника 2')
+
+    def test_refreshed_on_change(self):
+        """Изменение показанных моделей сбрасывает снимок, счетчик просмотров - нет"""
+        snapshot = get_home_snapshot()
+        self.story.views += 1
+        self.story.save(update_fields=['views'])
+        self.assertIs(get_home_snapshot(), snapshot)
+
+        clinic = Clinic.objects.create(
+            name='Клиника 3', slug='home-clinic-3', city=self.city, organization_type=self.organization_type)
+        self.assertEqual(get_home_snapshot()['clinics'][0], clinic)
+
+    def test_command(self):
+        """Команда перестраивает снимок"""
+        snapshot = get_home_snapshot()
+        out = StringIO()
+        call_command('refresh_home_snapshot', stdout=out)
+        self.assertIn('Снимок главной страницы обновлен', out.getvalue())
+        self.assertIsNot(get_home_snapshot(), snapshot)
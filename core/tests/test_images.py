@@ -0,0 +1,149 @@
+"""
+Тесты миниатюр и WebP/AVIF-вариантов загруженных изображений.
+"""
+
+import io
+import json
+import shutil
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image, features
+from content.models import Banner
+from core.images import (
+    derivative_name, generate_derivatives, get_manifest, manifest_name,
+    schedule_derivatives, shutdown_executor,
+)
+
+
+def make_image(size, fmt='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ImageDerivativesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_DERIVATIVES={'WIDTHS': (320, 640), 'FORMATS': ('webp',), 'ASYNC': False},
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _banner(self, size=(1000, 500)):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Banner.objects.create(
+                title='Баннер', description='', start_date=date.today(), end_date=date.today(),
+                image=SimpleUploadedFile('promo.jpg', make_image(size), content_type='image/jpeg'))
+
+    def test_generate(self):
+        """Создаются миниатюры оригинального формата и WebP без увеличения"""
+        name = default_storage.save('banners/photo.jpg', io.BytesIO(make_image((1000, 500))))
+        manifest = generate_derivatives(name)
+
+        self.assertEqual(manifest['sources']['jpeg'], [
+            [320, derivative_name(name, 320, 'jpeg')],
+            [640, derivative_name(name, 640, 'jpeg')],
+            [1000, name],
+        ])
+        self.assertEqual([w for w, _ in manifest['sources']['webp']], [320, 640, 1000])
+        for _, variant in manifest['sources']['webp']:
+            with default_storage.open(variant) as file:
+                self.assertEqual(Image.open(file).format, 'WEBP')
+        with default_storage.open(derivative_name(name, 320, 'jpeg')) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
+
+        small = default_storage.save('banners/small.png', io.BytesIO(make_image((200, 100), 'PNG')))
+        manifest = generate_derivatives(small)
+        self.assertEqual(manifest['sources']['png'], [[200, small]])
+        self.assertEqual(manifest['fallback'], 'png')
+
+    @override_settings(IMAGE_DERIVATIVES={'FORMATS': ('webp', 'avif'), 'ASYNC': False})
+    def test_avif_only_when_supported(self):
+        """AVIF создается только при поддержке в Pillow"""
+        name = default_storage.save('banners/photo.jpg', io.BytesIO(make_image((400, 200))))
+        manifest = generate_derivatives(name)
+        self.assertEqual('avif' in manifest['sources'], features.check('avif'))
+
+    def test_upload_and_delete(self):
+        """Загрузка создает варианты после коммита, удаление убирает их"""
+        banner = self._banner()
+        name = banner.image.name
+        manifest = get_manifest(name)
+        self.assertTrue(manifest)
+        variants = [variant for sources in manifest['sources'].values() for _, variant in sources]
+
+        # Повторное сохранение без новой загрузки не перегенерирует варианты
+        with mock.patch('core.signals.schedule_derivatives') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                banner.title = 'Новый заголовок'
+                banner.save()
+        schedule.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            banner.delete()
+        self.assertFalse(any(default_storage.exists(variant) for variant in variants))
+        self.assertFalse(default_storage.exists(manifest_name(name)))
+        self.assertEqual(get_manifest(name), {})
+
+    def test_template_tags(self):
+        """Шаблонные теги выводят srcset и <picture>"""
+        banner = self._banner()
+        html = Template(
+            "{% load images %}{{ banner.image|srcset:'webp' }}|{% picture banner.image alt=banner.title %}"
+        ).render(Context({'banner': banner}))
+        srcset, picture = html.split('|')
+        self.assertIn('.w320.webp 320w', srcset)
+        self.assertIn('.w640.webp 640w', srcset)
+        self.assertIn('<source type="image/webp"', picture)
+        self.assertIn(f'src="{banner.image.url}"', picture)
+        self.assertIn('alt="Баннер"', picture)
+
+    def test_template_tags_without_derivatives(self):
+        """Без вариантов выводится оригинал"""
+        with self.settings(IMAGE_DERIVATIVES={'FORMATS': ('webp',), 'ASYNC': False, 'FIELDS': {}}):
+            banner = self._banner()
+        html = Template('{% load images %}{% picture banner.image %}').render(Context({'banner': banner}))
+        self.assertEqual(html, f'<img src="{banner.image.url}" alt="" loading="lazy" />')
+
+    def test_backfill_command(self):
+        """Команда создает варианты для уже загруженных файлов"""
+        with self.settings(IMAGE_DERIVATIVES={'FORMATS': ('webp',), 'ASYNC': False, 'FIELDS': {}}):
+            banner = self._banner()
+        self.assertFalse(default_storage.exists(manifest_name(banner.image.name)))
+
+        out = StringIO()
+        call_command('generate_image_derivatives', model=['content.Banner'], workers=0, stdout=out)
+        self.assertIn('Обработано: 1, ошибок: 0', out.getvalue())
+        with default_storage.open(manifest_name(banner.image.name)) as file:
+            self.assertIn('webp', json.loads(file.read())['sources'])
+
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=0, stdout=out)
+        self.assertIn('Обработано: 0', out.getvalue())
+
+    def test_process_pool(self):
+        """В асинхронном режиме работа выполняется в пуле процессов"""
+        name = default_storage.save('banners/photo.jpg', io.BytesIO(make_image((800, 400))))
+        try:
+            with self.settings(IMAGE_DERIVATIVES={'WIDTHS': (320,), 'FORMATS': ('webp',), 'WORKERS': 1}):
+                future = schedule_derivatives(name)
+                manifest = future.result(timeout=60)
+        finally:
+            shutdown_executor()
+        self.assertTrue(default_storage.exists(derivative_name(name, 320, 'webp')))
+        self.assertEqual(get_manifest(name), manifest)
@@ -6,15 +6,21 @@
 
 import json
 import logging
+import logging.handlers
+import sys
+import tempfile
+from unittest import mock
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from pathlib import Path
 
+from core import logging as core_logging
 from core.logging import (
     BusinessLogger, SecurityLogger, PerformanceLogger, 
     ErrorLogger, DatabaseLogger,
     business_logger, security_logger, performance_logger,
-    error_logger, database_logger
+    error_logger, database_logger, flush_logs,
+    BatchedTimedRotatingFileHandler, LogWriter, QueuedLogHandler
 )
 
 User = get_user_model()
@@ -45,6 +51,9 @@ class LoggingSystemTests(TestCase):
             ip_address='127.0.0.1'
         )
         
+        # Записи пишутся в фоновом потоке
+        self.assertTrue(flush_logs())
+        
         # Проверяем, что лог записан
         log_file = self.logs_dir / 'business.log'
         self.assertTrue(log_file.exists())
@@ -83,6 +92,9 @@ class LoggingSystemTests(TestCase):
             status_code=200
         )
         
+        # Записи пишутся в фоновом потоке
+        self.assertTrue(flush_logs())
+        
         # Проверяем, что лог записан
         log_file = self.logs_dir / 'performance.log'
         self.assertTrue(log_file.exists())
@@ -102,6 +114,9 @@ class LoggingSystemTests(TestCase):
             user=self.user
         )
         
+        # Записи пишутся в фоновом потоке
+        self.assertTrue(flush_logs())
+        
         # Проверяем, что лог записан
         log_file = self.logs_dir / 'errors.log'
         self.assertTrue(log_file.exists())
@@ -121,6 +136,9 @@ class LoggingSystemTests(TestCase):
             user=self.user
         )
         
+        # Записи пишутся в фоновом потоке
+        self.assertTrue(flush_logs())
+        
         # Проверяем, что лог записан
         log_file = self.logs_dir / 'database.log'
         self.assertTrue(log_file.exists())
@@ -128,4 +146,78 @@ class LoggingSystemTests(TestCase):
         with open(log_file, 'r', encoding='utf-8') as f:
             content = f.read()
             self.assertIn('MODEL_CHANGE', content)
-            self.assertIn('test.Model', content) 
\ No newline at end of file
+            self.assertIn('test.Model', content) 
+
+class QueuedLoggingTests(TestCase):
+    """Тесты очереди логов."""
+    
+    def _record(self, level, message):
+        return logging.LogRecord('test', level, __file__, 0, message, None, None)
+    
+    def test_logger_uses_queue(self):
+        """Обработчики логгеров подключены через очередь."""
+        handlers = logging.getLogger('business').handlers
+        self.assertEqual(len(handlers), 1)
+        self.assertIsInstance(handlers[0], QueuedLogHandler)
+    
+    def test_overflow_reported_to_root_handlers(self):
+        """О переполнении пишется в обработчики корневого логгера."""
+        root_handler, = logging.getLogger().handlers
+        self.assertEqual(core_logging.log_writer.overflow_targets, root_handler.targets)
+    
+    def test_overflow_drops_info_first(self):
+        """При переполнении сначала отбрасываются DEBUG/INFO записи."""
+        writer = LogWriter(maxsize=2, flush_interval=0)
+        target = logging.handlers.BufferingHandler(100)
+        writer.overflow_targets = (target,)
+        
+        self.assertTrue(writer.submit((target,), self._record(logging.INFO, 'info 1')))
+        self.assertTrue(writer.submit((target,), self._record(logging.INFO, 'info 2')))
+        self.assertFalse(writer.submit((target,), self._record(logging.INFO, 'info 3')))
+        self.assertTrue(writer.submit((target,), self._record(logging.ERROR, 'error 1')))
+        self.assertTrue(writer.submit((target,), self._record(logging.ERROR, 'error 2')))
+        self.assertFalse(writer.submit((target,), self._record(logging.ERROR, 'error 3')))
+        self.assertEqual(writer.queue.dropped, {'INFO': 3, 'ERROR': 1})
+        
+        writer.start()
+        self.assertTrue(writer.flush())
+        writer.stop()
+        messages = [record.getMessage() for record in target.buffer]
+        self.assertEqual(messages[:2], ['error 1', 'error 2'])
+        self.assertIn('LOG_QUEUE_OVERFLOW', messages[2])
+    
+    def test_message_prepared_in_caller_thread(self):
+        """Сообщение и traceback вычисляются до постановки в очередь."""
+        writer = LogWriter()
+        target = logging.handlers.BufferingHandler(10)
+        handler = QueuedLogHandler(writer, [target])
+        details = {'step': 1}
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('test', logging.ERROR, __file__, 0, 'details: %s', (details,), sys.exc_info())
+        handler.handle(record)
+        details['step'] = 2
+        # Исходная запись не меняется: ее получают и другие обработчики
+        self.assertEqual(record.msg, 'details: %s')
+        self.assertIs(record.args, details)
+        self.assertIsNotNone(record.exc_info)
+        
+        writer.start()
+        writer.stop()
+        self.assertEqual(target.buffer[0].getMessage(), "details: {'step': 1}")
+        self.assertIn('ValueError: boom', target.buffer[0].exc_text)
+    
+    def test_batched_flush(self):
+        """Файл сбрасывается один раз на пакет, остаток пишется при остановке."""
+        with tempfile.TemporaryDirectory() as directory:
+            target = BatchedTimedRotatingFileHandler(Path(directory) / 'test.log')
+            writer = LogWriter(flush_interval=60)
+            with mock.patch.object(target.stream, 'flush', wraps=target.stream.flush) as stream_flush:
+                writer.start()
+                for index in range(50):
+                    writer.submit((target,), self._record(logging.INFO, f'line {index}'))
+                writer.stop()
+            target.close()
+            self.assertEqual(stream_flush.call_count, 1)
+            self.assertEqual(len((Path(directory) / 'test.log').read_text().splitlines()), 50)
@@ -0,0 +1,150 @@
+"""
+Тесты гистограмм задержек запросов.
+"""
+
+import gc
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.metrics import (
+    LatencyRegistry, collect, latency_registry, quantile, register_process, render_prometheus,
+)
+
+
+class LatencyRegistryTest(TestCase):
+    def test_shards_merged(self):
+        """Записи разных потоков суммируются в снимке"""
+        registry = LatencyRegistry((0.1, 1.0))
+
+        def work():
+            for _ in range(100):
+                registry.observe('core:home', 'GET', 200, 0.05)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry.observe('core:home', 'GET', 500, 3.0)
+
+        series = registry.snapshot()['series'][('core:home', 'GET')]
+        self.assertEqual(series['counts'], [400, 0, 1])
+        self.assertEqual(series['statuses'], {200: 400, 500: 1})
+        self.assertAlmostEqual(series['sum'], 23.0)
+
+    def test_finished_thread_shards_retired(self):
+        """Шарды завершившихся потоков сливаются и не накапливаются"""
+        registry = LatencyRegistry((0.1, 1.0))
+
+        def work():
+            registry.observe('core:home', 'GET', 200, 0.05)
+
+        for _ in range(20):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        gc.collect()
+        registry.observe('core:home', 'GET', 200, 0.5)
+
+        self.assertEqual(len(registry._shards), 1)
+        series = registry.snapshot()['series'][('core:home', 'GET')]
+        self.assertEqual(series['counts'], [20, 1, 0])
+        registry.reset()
+        self.assertEqual(registry.snapshot()['series'], {})
+
+    def test_quantile(self):
+        """Квантиль интерполируется внутри корзины"""
+        buckets = (0.1, 0.2, 0.4)
+        self.assertAlmostEqual(quantile(buckets, [50, 50, 0, 0], 0.5), 0.1)
+        self.assertAlmostEqual(quantile(buckets, [50, 50, 0, 0], 0.75), 0.15)
+        self.assertEqual(quantile(buckets, [0, 0, 0, 10], 0.99), 0.4)
+
+    def test_prometheus_format(self):
+        registry = LatencyRegistry((0.1, 1.0))
+        registry.observe('core:home', 'GET', 200, 0.05)
+        registry.observe('core:home', 'GET', 200, 0.5)
+        text = render_prometheus(registry.snapshot())
+        self.assertIn('http_request_duration_seconds_bucket{route="core:home",method="GET",le="0.1"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="core:home",method="GET",le="+Inf"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{route="core:home",method="GET"} 2', text)
+        self.assertIn('http_responses_total{route="core:home",method="GET",status="200"} 2', text)
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        latency_registry.reset()
+        self.url = reverse('core:metrics')
+
+    def test_middleware_records_route(self):
+        """Middleware записывает ответ под именем маршрута"""
+        self.client.get(reverse('core:contacts'))
+        self.client.get('/no-such-page/')
+        series = latency_registry.snapshot()['series']
+        self.assertEqual(series[('core:contacts', 'GET')]['statuses'], {200: 1})
+        self.assertEqual(series[('<unmatched>', 'GET')]['statuses'], {404: 1})
+
+    def test_endpoint_access(self):
+        """Метрики доступны персоналу и по токену"""
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        staff = get_user_model().objects.create_user(
+            username='metrics', email='metrics@example.com', password='secret', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('core:contacts'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('route="core:contacts",method="GET"', response.content.decode())
+        self.client.logout()
+
+        with override_settings(METRICS={'TOKEN': 'scrape'}):
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+    def test_processes_merged(self):
+        """Снимки других процессов из кэша суммируются с текущим"""
+        latency_registry.observe('core:home', 'GET', 200, 0.05)
+        buckets = latency_registry.buckets
+        other = {'buckets': buckets, 'series': {
+            ('core:home', 'GET'): {'counts': [1] + [0] * len(buckets), 'sum': 0.001, 'statuses': {200: 1}},
+        }}
+        cache.set('latency:process:other:1', other)
+        cache.set('latency:processes', {'latency:process:other:1': 0})
+
+        series = collect()['series'][('core:home', 'GET')]
+        self.assertEqual(sum(series['counts']), 2)
+        self.assertEqual(series['statuses'], {200: 2})
+
+    def test_register_process(self):
+        """Процессы добавляются в общий список под блокировкой"""
+        with mock.patch('core.metrics.process_key', return_value='latency:process:a:1'):
+            self.assertTrue(register_process(300))
+        cache.add('latency:processes:lock', 1)
+        with mock.patch('core.metrics.process_key', return_value='latency:process:b:2'):
+            self.assertFalse(register_process(300))
+        cache.delete('latency:processes:lock')
+        with mock.patch('core.metrics.process_key', return_value='latency:process:b:2'):
+            self.assertTrue(register_process(300))
+        self.assertEqual(set(cache.get('latency:processes')), {'latency:process:a:1', 'latency:process:b:2'})
+
+    def test_perf_report(self):
+        """Команда выводит квантили по маршрутам"""
+        for _ in range(10):
+            latency_registry.observe('core:home', 'GET', 200, 0.02)
+        latency_registry.observe('core:contacts', 'GET', 500, 0.2)
+        out = StringIO()
+        call_command('perf_report', sort='errors', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('p95', lines[0])
+        self.assertTrue(lines[1].startswith('GET core:contacts'))
+        self.assertIn('GET core:home', lines[2])
+
+        out = StringIO()
+        call_command('perf_report', route='nothing', stdout=out)
+        self.assertIn('Нет данных', out.getvalue())
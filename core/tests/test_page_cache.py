@@ -0,0 +1,100 @@
+"""
+Тесты кэша страниц для анонимных посетителей.
+"""
+
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from core.page_cache import CSRF_PLACEHOLDER, acquire_lock, invalidate_tags, normalize_query, release_lock
+from medical_services.models import Service
+from medical_services.views import ServiceListView
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('medical_services:service_list')
+        Service.objects.create(name='Детокс', slug='page-cache-detox', description='')
+
+    def _key(self, query=''):
+        view = ServiceListView()
+        view.setup(RequestFactory().get(self.url + query))
+        return view.get_cache_key()
+
+    def test_hit_without_queries(self):
+        """Повторный запрос отдается из кэша без обращений к БД"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Детокс')
+
+    def test_query_normalized(self):
+        """Порядок параметров, пустые значения и метки utm не влияют на ключ"""
+        self.assertEqual(self._key('?search=a&category=b&page='), self._key('?category=b&search=a&utm_source=x'))
+        self.assertNotEqual(self._key('?search=a'), self._key('?search=b'))
+        self.assertEqual(normalize_query(RequestFactory().get('/?b=2&a=1&a=0').GET), 'a=0&a=1&b=2')
+
+    def test_invalidated_by_model_change(self):
+        """Изменение модели из тегов делает страницу устаревшей"""
+        self.client.get(self.url)
+        Service.objects.create(name='Кодирование', slug='page-cache-coding', description='')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Кодирование')
+
+    def test_stale_while_revalidate(self):
+        """Пока страницу перестраивает другой запрос, отдается устаревшая копия"""
+        self.client.get(self.url)
+        invalidate_tags('medical_services.Service')
+        self.assertTrue(acquire_lock(self._key(), 30))
+        try:
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url)
+            self.assertEqual(response['X-Page-Cache'], 'stale')
+        finally:
+            release_lock(self._key())
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'miss')
+
+        # Истекший срок свежести тоже перестраивается одним запросом
+        with mock.patch('core.page_cache.time.time', return_value=time.time() + 3600):
+            self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'miss')
+
+    @override_settings(PAGE_CACHE={'LOCK_WAIT': 0.1})
+    def test_single_flight_without_entry(self):
+        """Без копии запрос ждет владельца блокировки, затем строит страницу сам"""
+        self.assertTrue(acquire_lock(self._key(), 30))
+        try:
+            with mock.patch('core.page_cache.time.sleep') as sleep:
+                response = self.client.get(self.url)
+            self.assertTrue(sleep.called)
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+        finally:
+            release_lock(self._key())
+
+    def test_csrf_token_not_shared(self):
+        """Токен CSRF не сохраняется в кэше, каждый посетитель получает свой"""
+        first = self.client.get(self.url)
+        self.assertNotIn(CSRF_PLACEHOLDER, first.content.decode())
+        self.assertIn(CSRF_PLACEHOLDER, cache.get(self._key())['content'])
+
+        second = self.client_class().get(self.url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertNotIn(CSRF_PLACEHOLDER, second.content.decode())
+        self.assertIn('csrftoken', second.cookies)
+
+    def test_bypass(self):
+        """Авторизованные пользователи и посетители с сессией не используют кэш"""
+        self.client.get(self.url)
+        user = get_user_model().objects.create_user(username='page-cache', email='page-cache@example.com', password='secret')
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+        with override_settings(PAGE_CACHE={'ENABLED': False}):
+            self.assertFalse(self.client_class().get(self.url).has_header('X-Page-Cache'))
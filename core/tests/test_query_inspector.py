@@ -0,0 +1,138 @@
+"""
+Тесты подсчета SQL-запросов и обнаружения N+1.
+"""
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from core.models import City, Region
+from core.query_inspector import (
+    QueryCounter, current_request, fingerprint, get_query_inspector_settings, slow_query_logger,
+)
+
+
+class FingerprintTest(TestCase):
+    def test_literals_normalized(self):
+        """Литералы, плейсхолдеры и списки IN заменяются"""
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s, %s,  %s) AND name = \'O\'\'Neil\' LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (...)',
+        )
+        # Цифры в идентификаторах не трогаются
+        self.assertEqual(fingerprint('SELECT t1.x FROM t1 WHERE t1.y = 3.5'), 'SELECT t1.x FROM t1 WHERE t1.y = ?')
+
+
+class QueryCounterTest(TestCase):
+    def test_repeated_shapes(self):
+        """Однотипные запросы в цикле определяются как N+1"""
+        region = Region.objects.create(name='Регион', slug='qi-region')
+        cities = [City.objects.create(name=f'Город {i}', slug=f'qi-{i}', region=region) for i in range(6)]
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            list(Region.objects.all())
+            for city in cities:
+                City.objects.get(pk=city.pk)
+
+        self.assertEqual(counter.count, 7)
+        self.assertGreater(counter.duration, 0)
+        repeated = counter.repeated(5)
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('"core_city"', repeated[0][0])
+        self.assertEqual(repeated[0][1], 6)
+        self.assertEqual(counter.repeated(10), [])
+
+
+class QueryInspectorMiddlewareTest(TestCase):
+    def setUp(self):
+        self.url = reverse('core:contacts')
+
+    def test_staff_headers(self):
+        """Заголовки с числом запросов получает только персонал"""
+        response = self.client.get(self.url)
+        self.assertNotIn('X-DB-Queries', response)
+
+        staff = get_user_model().objects.create_user(
+            username='inspector', email='inspector@example.com', password='secret', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(self.url)
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+        with override_settings(QUERY_INSPECTOR={'ENABLED': False}):
+            self.assertNotIn('X-DB-Queries', self.client.get(self.url))
+
+    def test_performance_log(self):
+        """Итоги и повторяющиеся запросы пишутся в лог производительности"""
+        staff = get_user_model().objects.create_user(
+            username='inspector', email='inspector@example.com', password='secret', is_staff=True)
+        self.client.force_login(staff)
+        with self.assertLogs('performance', level='INFO') as logs:
+            self.client.get(self.url)
+        self.assertTrue(any('REQUEST_QUERIES' in line for line in logs.output))
+
+        with override_settings(QUERY_INSPECTOR={'N_PLUS_ONE_THRESHOLD': 1}):
+            with self.assertLogs('performance', level='WARNING') as logs:
+                self.client.get(self.url)
+        self.assertTrue(any('N_PLUS_ONE' in line and '"repeated"' in line for line in logs.output))
+
+
+class SlowQueryLoggerTest(TestCase):
+    def test_installed_on_connection(self):
+        """Журнал подключается к соединению один раз"""
+        self.assertEqual(connection.execute_wrappers.count(slow_query_logger), 1)
+
+    @override_settings(QUERY_INSPECTOR={'SLOW_QUERY_THRESHOLD': 0})
+    def test_slow_query_reported(self):
+        """Медленный запрос пишется с формой SQL и местом вызова"""
+        with self.assertLogs('performance', level='WARNING') as logs:
+            City.objects.filter(pk=42).first()
+        line = next(line for line in logs.output if 'SLOW_QUERY' in line)
+        self.assertIn('core_city', line)
+        self.assertIn('= ? ORDER BY', line)
+        self.assertIn('"params_count": 1', line)
+        self.assertIn('core/tests/test_query_inspector.py', line)
+        self.assertNotIn('"explain"', line)
+
+    @override_settings(QUERY_INSPECTOR={'SLOW_QUERY_THRESHOLD': 0, 'EXPLAIN_SLOW_QUERIES': True})
+    def test_explain_and_view(self):
+        """План запроса и представление текущего запроса добавляются в запись"""
+        request = RequestFactory().get(reverse('core:contacts'))
+        token = current_request.set(request)
+        try:
+            with self.assertLogs('performance', level='WARNING') as logs:
+                City.objects.filter(pk=42).first()
+                # После разрешения URL вместо пути пишется имя представления
+                request.resolver_match = resolve(request.path)
+                City.objects.filter(slug='qi').first()
+        finally:
+            current_request.reset(token)
+        lines = [line for line in logs.output if 'SLOW_QUERY' in line]
+        self.assertIn('"view": "/contacts/"', lines[0])
+        self.assertIn('"view": "core:contacts"', lines[1])
+        self.assertIn('"explain": "', lines[1])
+
+    def test_threshold_read_once(self):
+        """Порог читается из настроек один раз и заново после их смены"""
+        slow_query_logger.reset()
+        with mock.patch(
+            'core.query_inspector.get_query_inspector_settings', wraps=get_query_inspector_settings
+        ) as read:
+            City.objects.filter(pk=42).first()
+            City.objects.filter(pk=43).first()
+            self.assertEqual(read.call_count, 1)
+            with override_settings(QUERY_INSPECTOR={'SLOW_QUERY_THRESHOLD': 0}):
+                self.assertEqual(slow_query_logger.threshold, 0)
+            self.assertEqual(slow_query_logger.threshold, 0.5)
+
+    @override_settings(QUERY_INSPECTOR={'SLOW_QUERY_THRESHOLD': None})
+    def test_disabled(self):
+        with self.assertNoLogs('performance', level='WARNING'):
+            City.objects.filter(pk=42).first()
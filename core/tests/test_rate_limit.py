@@ -0,0 +1,33 @@
+"""
+Тесты скользящего окна ограничения частоты.
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from core.rate_limit import hit, normalize_phone
+
+
+class SlidingWindowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_within_window(self):
+        """Запросы сверх лимита в окне отклоняются до его конца"""
+        for _ in range(3):
+            self.assertEqual(hit('test', 3, 60, now=6000), 0)
+        self.assertEqual(hit('test', 3, 60, now=6015), 45)
+
+    def test_previous_window_weighted(self):
+        """Предыдущее окно учитывается с убывающим весом"""
+        for _ in range(4):
+            hit('test', 4, 60, now=6030)
+        # Начало следующего окна: предыдущее весит почти полностью
+        self.assertGreater(hit('test', 4, 60, now=6001 + 59), 0)
+        # Через три четверти окна вес предыдущего - 1, запрос проходит
+        self.assertEqual(hit('test', 4, 60, now=6120 + 45), 0)
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone('+7 (999) 123-45-67'), '9991234567')
+        self.assertEqual(normalize_phone('89991234567'), '9991234567')
+        self.assertEqual(normalize_phone('123'), '')
+        self.assertEqual(normalize_phone(None), '')
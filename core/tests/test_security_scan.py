@@ -0,0 +1,72 @@
+"""
+Тесты проверки запросов на подозрительные паттерны.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from core.security_scan import PatternMatcher, get_matcher, scan_request
+
+
+class PatternMatcherTest(TestCase):
+    def setUp(self):
+        self.matcher = PatternMatcher({
+            'sql_injection_attempt': ['union select', 'drop table'],
+            'xss_attempt': ['<script', 'javascript:'],
+        })
+
+    def test_first_match_per_segment(self):
+        """В каждом сегменте сообщается первое совпадение без учета регистра"""
+        found = self.matcher.scan(['/a/UNION SELECT/', 'ok', 'x<SCRIPT>javascript:', 'drop table'])
+        self.assertEqual(found, [
+            (0, 'sql_injection_attempt', 'union select'),
+            (2, 'xss_attempt', '<script'),
+            (3, 'sql_injection_attempt', 'drop table'),
+        ])
+        self.assertEqual(self.matcher.scan(['/clinics/', 'moskva']), [])
+
+    def test_no_match_across_segments(self):
+        """Паттерн не находится на стыке двух сегментов"""
+        self.assertEqual(self.matcher.scan(['union', 'select']), [])
+
+    def test_unicode_offsets(self):
+        """Смещения верны, если нижний регистр меняет длину строки"""
+        found = self.matcher.scan(['İİİ', 'javascript:void(0)'])
+        self.assertEqual(found, [(1, 'xss_attempt', 'javascript:')])
+
+    def test_scan_request(self):
+        request = RequestFactory().get('/search/', {'q': ['ok', '<script>alert(1)</script>'], 'page': '2'})
+        self.assertEqual(scan_request(request, self.matcher), [
+            ('q', '<script>alert(1)</script>', 'xss_attempt', '<script'),
+        ])
+
+    def test_settings(self):
+        """Правила берутся из настроек и пересобираются при их смене"""
+        with override_settings(SECURITY_SCAN={'RULES': {'probe': ['wp-admin']}}):
+            self.assertEqual(get_matcher().scan(['/wp-admin/']), [(0, 'probe', 'wp-admin')])
+        with override_settings(SECURITY_SCAN={'ENABLED': False}):
+            self.assertIsNone(get_matcher())
+        self.assertEqual(get_matcher().scan(['/wp-admin/']), [])
+
+
+class SecurityMiddlewareTest(TestCase):
+    def test_suspicious_request_logged(self):
+        """Совпадения в пути и параметрах пишутся в журнал безопасности"""
+        with self.assertLogs('security', level='WARNING') as logs:
+            self.client.get('/test/drop table/', {'param': '<script>alert("xss")</script>', 'page': '1'})
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('"activity_type": "sql_injection_attempt"', logs.output[0])
+        self.assertIn('"activity_type": "xss_attempt"', logs.output[1])
+        self.assertIn('"parameter": "param"', logs.output[1])
+
+    def test_clean_request(self):
+        with self.assertNoLogs('security', level='WARNING'):
+            self.client.get('/clinics/', {'city': 'moskva'})
+
+    def test_benchmark_command(self):
+        """Команда замера выводит время на каждый URL"""
+        out = StringIO()
+        call_command('benchmark_security_scan', iterations=10, url=['/clinics/?page=2'], stdout=out)
+        self.assertIn('/clinics/?page=2', out.getvalue())
+        self.assertIn('мкс на запрос', out.getvalue())
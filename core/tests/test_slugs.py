@@ -0,0 +1,101 @@
+"""
+Тесты выделения уникальных slug.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+from core.models import Region, City
+from core.slugs import allocate_slug, assign_slugs, make_base_slug
+from facilities.models import Clinic, OrganizationType
+from staff.models import FacilitySpecialist
+from django.contrib.contenttypes.models import ContentType
+
+
+class SlugAllocationTests(TestCase):
+    """Тесты аллокатора slug."""
+
+    def setUp(self):
+        region = Region.objects.create(name='Регион', slug='slug-region')
+        self.city = City.objects.create(name='Город', slug='slug-city', region=region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic-slug', description='Клиника')
+
+    def _clinic(self, name, slug=''):
+        return Clinic.objects.create(
+            name=name, slug=slug, city=self.city, organization_type=self.organization_type)
+
+    def test_transliterated_slug(self):
+        """Кириллическое название транслитерируется"""
+        self.assertEqual(self._clinic('Клиника Здоровье').slug, 'klinika-zdorove')
+        self.assertEqual(make_base_slug('!!!', fallback='clinic'), 'clinic')
+
+    def test_suffixes(self):
+        """Повторяющиеся названия получают числовые суффиксы"""
+        slugs = [self._clinic('Надежда').slug for _ in range(3)]
+        self.assertEqual(slugs, ['nadezhda', 'nadezhda-1', 'nadezhda-2'])
+        Clinic.objects.filter(slug='nadezhda-1').delete()
+        self.assertEqual(self._clinic('Надежда').slug, 'nadezhda-1')
+
+    def test_single_query(self):
+        """Свободный slug выбирается одним запросом"""
+        for _ in range(5):
+            self._clinic('Надежда')
+        self._clinic('Надежда плюс')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Clinic, 'nadezhda'), 'nadezhda-5')
+
+    def test_long_slug_fits(self):
+        """Суффикс помещается в max_length"""
+        first = self._clinic('о' * 80)
+        second = self._clinic('о' * 80)
+        self.assertEqual(len(first.slug), 50)
+        self.assertTrue(second.slug.endswith('-1'))
+        self.assertLessEqual(len(second.slug), 50)
+
+    def test_long_duplicates(self):
+        """Третий и следующие длинные одинаковые названия не конфликтуют"""
+        name = 'Наркологическая клиника восстановления здоровья и реабилитации'
+        slugs = [self._clinic(name).slug for _ in range(4)]
+        self.assertEqual(len(set(slugs)), 4)
+        self.assertTrue(all(len(slug) <= 50 for slug in slugs))
+        self.assertEqual([slug.rsplit('-', 1)[1] for slug in slugs[1:]], ['1', '2', '3'])
+
+        clinics = [
+            Clinic(name=name, city=self.city, organization_type=self.organization_type)
+            for _ in range(3)
+        ]
+        assign_slugs(clinics, lambda clinic: make_base_slug(clinic.name))
+        self.assertEqual([clinic.slug.rsplit('-', 1)[1] for clinic in clinics], ['4', '5', '6'])
+        Clinic.objects.bulk_create(clinics)
+
+    def test_assign_slugs_batch(self):
+        """Пакетное выделение slug для несохраненных объектов"""
+        self._clinic('Надежда')
+        clinics = [
+            Clinic(name='Надежда', city=self.city, organization_type=self.organization_type),
+            Clinic(name='Надежда', city=self.city, organization_type=self.organization_type),
+            Clinic(name='Вера', slug='vera-1', city=self.city, organization_type=self.organization_type),
+            Clinic(name='Вера', city=self.city, organization_type=self.organization_type),
+        ]
+        with self.assertNumQueries(1):
+            assign_slugs(clinics, lambda clinic: make_base_slug(clinic.name))
+        self.assertEqual([c.slug for c in clinics], ['nadezhda-1', 'nadezhda-2', 'vera-1', 'vera'])
+        Clinic.objects.bulk_create(clinics)
+
+    def test_retry_on_collision(self):
+        """Повтор при конфликте уникальности из-за параллельной вставки"""
+        self._clinic('Надежда')
+        with mock.patch('core.slugs.allocate_slug', side_effect=['nadezhda', 'nadezhda-1']) as allocate:
+            clinic = self._clinic('Надежда')
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(clinic.slug, 'nadezhda-1')
+
+    def test_specialist_parent_table(self):
+        """Slug специалиста проверяется по таблице родительской модели"""
+        clinic = self._clinic('Клиника')
+        kwargs = dict(first_name='Иван', last_name='Петров', experience_years=1,
+                      content_type=ContentType.objects.get_for_model(Clinic), object_id=clinic.id)
+        first = FacilitySpecialist.objects.create(**kwargs)
+        second = FacilitySpecialist.objects.create(**kwargs)
+        self.assertEqual((first.slug, second.slug), ('petrov-ivan', 'petrov-ivan-1'))
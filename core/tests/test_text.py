@@ -0,0 +1,35 @@
+"""
+Тесты нормализации текста и стемминга для поиска.
+"""
+
+from django.test import SimpleTestCase
+from core.text import russian_stem, stem_tokens, tokenize
+
+
+class RussianStemTests(SimpleTestCase):
+    """Тесты стеммера русского языка."""
+
+    def test_inflected_forms_share_stem(self):
+        """Падежные формы слова приводятся к одной основе"""
+        for forms in (
+            ('клиника', 'клиники', 'клиникой', 'клиник'),
+            ('наркология', 'наркологии', 'наркологию'),
+            ('центр', 'центра', 'центров', 'центрах'),
+            ('лечение', 'лечения', 'лечением'),
+        ):
+            self.assertEqual(len({russian_stem(form) for form in forms}), 1, forms)
+
+    def test_derivational_and_superlative(self):
+        """Удаление словообразовательных и превосходных суффиксов"""
+        self.assertEqual(russian_stem('жестокость'), 'жесток')
+        self.assertEqual(russian_stem('красивейшей'), 'красив')
+
+    def test_non_cyrillic_unchanged(self):
+        """Слова без гласных кириллицы не изменяются"""
+        self.assertEqual(russian_stem('12'), '12')
+        self.assertEqual(russian_stem('abc'), 'abc')
+
+    def test_tokenize_strips_html(self):
+        """Токенизация удаляет HTML и заменяет ё"""
+        self.assertEqual(tokenize('<p>Ёлка, <b>Дом</b> 5</p>'), ['елка', 'дом', '5'])
+        self.assertEqual(stem_tokens('Клиники Москвы'), ['клиник', 'москв'])
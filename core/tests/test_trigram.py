@@ -0,0 +1,41 @@
+"""
+Тесты триграммного поиска по ФИО.
+"""
+
+from django.test import SimpleTestCase
+from core.trigram import TrigramIndex, trigram_similarity, word_trigrams
+
+
+class TrigramIndexTests(SimpleTestCase):
+    """Тесты индекса триграмм."""
+
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.add(1, 'Иванов Иван Иванович')
+        self.index.add(2, 'Петров Петр Сергеевич')
+        self.index.add(3, 'Сидорова Анна')
+
+    def test_word_trigrams_padded(self):
+        """Триграммы дополняются пробелами как в pg_trgm"""
+        self.assertEqual(word_trigrams('кот'), {'  к', ' ко', 'кот', 'от '})
+        self.assertEqual(trigram_similarity('Иванов', 'иванов'), 1.0)
+
+    def test_misspelled_surname(self):
+        """Фамилия с опечаткой находит специалиста"""
+        self.assertEqual([key for key, _ in self.index.search('Иванво')], [1])
+        self.assertEqual([key for key, _ in self.index.search('Сидорова')], [3])
+        self.assertEqual(self.index.search('Петрв Петр')[0][0], 2)
+
+    def test_no_match_below_threshold(self):
+        """Непохожие запросы ничего не находят"""
+        self.assertEqual(self.index.search('Кузнецов'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_replace_and_remove(self):
+        """Обновление и удаление документов"""
+        self.index.add(2, 'Кузнецов Петр')
+        self.assertEqual(self.index.search('Сергеевич'), [])
+        self.assertEqual([key for key, _ in self.index.search('Кузнецов')], [2])
+        self.index.remove(2)
+        self.assertEqual(self.index.search('Кузнецов'), [])
+        self.assertEqual(len(self.index), 2)
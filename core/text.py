@@ -0,0 +1,198 @@
+"""
+Text normalization helpers for search.
+
+Contains a tokenizer and an implementation of the Snowball stemming
+algorithm for Russian, used where the database has no Russian morphology
+(SQLite FTS5 and in-process search).
+"""
+
+import re
+
+from django.utils.html import strip_tags
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий',
+    'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_1 = (
+    'ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют',
+    'ны', 'ть', 'й', 'л', 'н',
+)
+VERB_2 = (
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено',
+    'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым',
+    'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи',
+    'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия',
+    'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def normalize_text(text):
+    """
+    Lowercase text, strip HTML tags and replace 'ё' with 'е'.
+
+    Args:
+        text: Source text (may contain HTML)
+
+    Returns:
+        str: Normalized text
+    """
+    if not text:
+        return ''
+    return strip_tags(str(text)).lower().replace('ё', 'е')
+
+
+def tokenize(text):
+    """
+    Split text into normalized word tokens.
+
+    Args:
+        text: Source text
+
+    Returns:
+        list: Lowercase tokens
+    """
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def _regions(word):
+    """Get start indexes of RV and R2 regions of the word."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+
+def _strip_suffix(rv, suffixes, preceded=False):
+    """
+    Remove the longest matching suffix from the RV region.
+
+    If ``preceded`` is True the suffix must follow 'а' or 'я', which is kept.
+    Returns the new region or None if nothing matched.
+    """
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if not rv.endswith(suffix):
+            continue
+        stem = rv[:-len(suffix)]
+        if preceded and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def _strip_group(rv, group_1, group_2):
+    """Remove the longest suffix of a two-group class (group 1 needs 'а'/'я' before)."""
+    candidates = [(s, True) for s in group_1] + [(s, False) for s in group_2]
+    for suffix, preceded in sorted(candidates, key=lambda c: len(c[0]), reverse=True):
+        if not rv.endswith(suffix):
+            continue
+        stem = rv[:-len(suffix)]
+        if preceded and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def russian_stem(word):
+    """
+    Get the stem of a Russian word (Snowball algorithm).
+
+    Words without Cyrillic letters are returned unchanged.
+
+    Args:
+        word: Lowercase word
+
+    Returns:
+        str: Stem of the word
+    """
+    word = word.replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    if rv_start >= len(word):
+        return word
+
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Step 1
+    stem = _strip_group(rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if stem is not None:
+        rv = stem
+    else:
+        stem = _strip_suffix(rv, REFLEXIVE)
+        if stem is not None:
+            rv = stem
+
+        stem = _strip_suffix(rv, ADJECTIVE)
+        if stem is not None:
+            rv = stem
+            stem = _strip_group(rv, PARTICIPLE_1, PARTICIPLE_2)
+            if stem is not None:
+                rv = stem
+        else:
+            stem = _strip_group(rv, VERB_1, VERB_2)
+            if stem is None:
+                stem = _strip_suffix(rv, NOUN)
+            if stem is not None:
+                rv = stem
+
+    # Step 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Step 3: derivational suffix in R2
+    for suffix in DERIVATIONAL:
+        if rv.endswith(suffix) and len(prefix) + len(rv) - len(suffix) >= r2_start:
+            rv = rv[:-len(suffix)]
+            break
+
+    # Step 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stem = _strip_suffix(rv, SUPERLATIVE)
+        if stem is not None:
+            rv = stem
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def stem_tokens(text):
+    """
+    Tokenize text and stem every token.
+
+    Args:
+        text: Source text
+
+    Returns:
+        list: Stems in the order of tokens
+    """
+    return [russian_stem(token) for token in tokenize(text)]
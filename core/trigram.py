@@ -0,0 +1,528 @@
+"""
+Typo-tolerant name search based on trigrams.
+
+On PostgreSQL the lookup uses pg_trgm: the ``<%`` word similarity operator
+over the full name expression, backed by a GIN ``gin_trgm_ops`` index
+created in migrations. On other databases an in-process inverted index
+of word trigrams is used: it is built lazily once per process and kept
+up to date from model signals. Other processes notice changes through a
+version number stored in the Django cache; every save or delete also
+records the changed primary key under its version, so a process that is
+a few versions behind re-reads only those rows. A full reload happens on
+first use, after invalidate() or when the change log has been evicted.
+
+Usage::
+
+    doctor_name_search = NameSearch('facilities.PrivateDoctor')
+    doctors = doctor_name_search.search(PrivateDoctor.objects.all(), 'Иванво')
+"""
+
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, Case, CharField, F, FloatField, Func, Q, Value, When
+from django.db.models.signals import post_save, post_delete
+
+from .caching import bump_version, get_version
+from .text import tokenize
+
+
+DEFAULT_NAME_FIELDS = ('last_name', 'first_name', 'middle_name')
+DEFAULT_THRESHOLD = 0.4
+MIN_WORD_SIMILARITY = 0.3
+DEFAULT_LIMIT = 100
+# Журнал изменений: сколько версий можно догнать без полной перезагрузки
+MAX_REPLAYED_CHANGES = 100
+CHANGE_LOG_TIMEOUT = 3600
+
+
+def word_trigrams(word):
+    """
+    Get trigrams of one word, padded like pg_trgm ('  w', ' wo', ..., 'rd ').
+
+    Args:
+        word: Normalized word
+
+    Returns:
+        set: Trigrams
+    """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(text):
+    """
+    Get trigrams of all words of the text.
+
+    Args:
+        text: Source text
+
+    Returns:
+        set: Trigrams
+    """
+    result = set()
+    for word in tokenize(text):
+        result |= word_trigrams(word)
+    return result
+
+
+def trigram_similarity(a, b):
+    """
+    Get trigram similarity of two strings (0..1, as pg_trgm similarity()).
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        float: Shared trigrams divided by all distinct trigrams
+    """
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+class TrigramIndex:
+    """
+    In-memory inverted index from word trigrams to documents.
+
+    Trigrams point to distinct words and words point to documents, so a
+    query is compared with the vocabulary (names repeat a lot) instead of
+    every document. A document is scored as the mean over query words of
+    the best similarity with any of its words, so 'иванво' matches
+    'Иванов Иван Иванович' regardless of the other words.
+    """
+
+    def __init__(self, min_word_similarity=MIN_WORD_SIMILARITY):
+        self.min_word_similarity = min_word_similarity
+        self._lock = threading.RLock()
+        self._word_ids = {}
+        self._word_sizes = {}
+        self._gram_words = {}
+        self._word_docs = {}
+        self._doc_words = {}
+        self._next_word_id = 0
+
+    def __len__(self):
+        return len(self._doc_words)
+
+    def _get_word_id(self, word):
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._next_word_id
+            self._next_word_id += 1
+            grams = word_trigrams(word)
+            self._word_ids[word] = word_id
+            self._word_sizes[word_id] = (word, len(grams))
+            self._word_docs[word_id] = set()
+            for gram in grams:
+                self._gram_words.setdefault(gram, set()).add(word_id)
+        return word_id
+
+    def _drop_word(self, word_id):
+        word, _ = self._word_sizes.pop(word_id)
+        del self._word_ids[word]
+        del self._word_docs[word_id]
+        for gram in word_trigrams(word):
+            words = self._gram_words.get(gram)
+            if words is not None:
+                words.discard(word_id)
+                if not words:
+                    del self._gram_words[gram]
+
+    def add(self, key, text):
+        """
+        Add or replace a document.
+
+        Args:
+            key: Document key (primary key)
+            text: Document text
+        """
+        with self._lock:
+            self.remove(key)
+            word_ids = tuple(self._get_word_id(word) for word in dict.fromkeys(tokenize(text)))
+            self._doc_words[key] = word_ids
+            for word_id in word_ids:
+                self._word_docs[word_id].add(key)
+
+    def remove(self, key):
+        """
+        Remove a document if present.
+
+        Args:
+            key: Document key
+        """
+        with self._lock:
+            for word_id in self._doc_words.pop(key, ()):
+                docs = self._word_docs[word_id]
+                docs.discard(key)
+                if not docs:
+                    self._drop_word(word_id)
+
+    def clear(self):
+        """Remove all documents."""
+        with self._lock:
+            self._word_ids.clear()
+            self._word_sizes.clear()
+            self._gram_words.clear()
+            self._word_docs.clear()
+            self._doc_words.clear()
+
+    def similar_words(self, word):
+        """
+        Get vocabulary words similar to the word.
+
+        Args:
+            word: Normalized query word
+
+        Returns:
+            dict: Word id -> similarity for words above min_word_similarity
+        """
+        grams = word_trigrams(word)
+        shared = Counter()
+        with self._lock:
+            for gram in grams:
+                shared.update(self._gram_words.get(gram, ()))
+            result = {}
+            for word_id, count in shared.items():
+                score = count / (len(grams) + self._word_sizes[word_id][1] - count)
+                if score >= self.min_word_similarity:
+                    result[word_id] = score
+        return result
+
+    def search(self, query, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+        """
+        Find documents similar to the query.
+
+        Args:
+            query: Search string
+            limit: Maximum number of results
+            threshold: Minimum score (0..1)
+
+        Returns:
+            list: (key, score) pairs, best first
+        """
+        query_words = list(dict.fromkeys(tokenize(query)))
+        if not query_words:
+            return []
+
+        if len(query_words) == 1:
+            return self._search_word(query_words[0], limit, threshold)
+
+        totals = Counter()
+        with self._lock:
+            for word in query_words:
+                best = {}
+                for word_id, score in self.similar_words(word).items():
+                    for key in self._word_docs[word_id]:
+                        if score > best.get(key, 0.0):
+                            best[key] = score
+                totals.update(best)
+
+        count = len(query_words)
+        results = [(key, total / count) for key, total in totals.items() if total / count >= threshold]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+    def _search_word(self, word, limit, threshold):
+        """
+        Search a one-word query.
+
+        All documents of a vocabulary word share its score, so documents
+        are collected from the best words until the limit is reached.
+        """
+        by_score = {}
+        with self._lock:
+            for word_id, score in self.similar_words(word).items():
+                if score >= threshold:
+                    by_score.setdefault(score, []).append(word_id)
+
+            results = []
+            seen = set()
+            for score in sorted(by_score, reverse=True):
+                keys = set()
+                for word_id in by_score[score]:
+                    keys |= self._word_docs[word_id]
+                for key in sorted(keys - seen):
+                    results.append((key, score))
+                    if len(results) >= limit:
+                        return results
+                seen |= keys
+        return results
+
+
+class FullName(Func):
+    """
+    Full name expression: fields joined with spaces, NULL as empty string.
+
+    The SQL matches the expression of the trigram GIN indexes.
+    """
+
+    output_field = CharField()
+
+    def __init__(self, *fields):
+        super().__init__(*[F(field) for field in fields])
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(f"COALESCE({sql}, '')")
+            params.extend(expression_params)
+        return '(' + " || ' ' || ".join(parts) + ')', params
+
+
+class TrigramWordSimilar(Func):
+    """pg_trgm ``query <% text`` operator (word similarity above threshold)."""
+
+    arg_joiner = ' <%% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class TrigramWordSimilarity(Func):
+    """pg_trgm ``word_similarity(query, text)`` function."""
+
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+class NameSearch:
+    """
+    Similarity-ranked name search for one model.
+
+    Args:
+        model_label: Model label ('app_label.ModelName'); subclasses of the
+            model (multi-table inheritance) are found through the parent
+        fields: Name fields, in the order of get_full_name()
+        threshold: Minimum similarity (0..1)
+    """
+
+    def __init__(self, model_label, fields=DEFAULT_NAME_FIELDS, threshold=DEFAULT_THRESHOLD):
+        self.model_label = model_label
+        self.fields = tuple(fields)
+        self.threshold = threshold
+        self._index = TrigramIndex()
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def version_key(self):
+        return f'trigram_index:{self.model_label.lower()}:version'
+
+    def uses_database(self):
+        """Whether pg_trgm is used instead of the in-process index."""
+        return connection.vendor == 'postgresql'
+
+    def match(self, query, limit=DEFAULT_LIMIT):
+        """
+        Build a filter condition and a similarity expression for the query.
+
+        Lets callers combine name matches with other conditions, e.g. OR
+        them with full-text search hits and rank both in one queryset.
+
+        Args:
+            query: Search string, may contain typos
+            limit: Maximum number of candidates for the in-process index
+
+        Returns:
+            tuple: (Q, similarity expression), or None if nothing can match;
+            the similarity is NULL for rows that are not name matches
+        """
+        if not tokenize(query):
+            return None
+
+        if self.uses_database():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+                    [str(self.threshold)]
+                )
+            full_name = FullName(*self.fields)
+            return (
+                Q(TrigramWordSimilar(Value(query), full_name)),
+                TrigramWordSimilarity(Value(query), full_name),
+            )
+
+        matches = self.search_index(query, limit)
+        if not matches:
+            return None
+        return (
+            Q(pk__in=[pk for pk, _ in matches]),
+            Case(
+                *[When(pk=pk, then=Value(score)) for pk, score in matches],
+                output_field=FloatField()
+            ),
+        )
+
+    def search(self, queryset, query, limit=DEFAULT_LIMIT):
+        """
+        Filter queryset to objects with names similar to the query.
+
+        Args:
+            queryset: QuerySet of the model or its subclass
+            query: Search string, may contain typos
+            limit: Maximum number of candidates for the in-process index
+
+        Returns:
+            QuerySet: Matching objects annotated with ``name_similarity``
+            and ordered by it, best first
+        """
+        match = self.match(query, limit)
+        if match is None:
+            return queryset.none()
+        condition, similarity = match
+        return queryset.filter(condition).annotate(
+            name_similarity=similarity
+        ).order_by('-name_similarity', 'pk')
+
+    def search_index(self, query, limit=DEFAULT_LIMIT):
+        """
+        Search the in-process index, loading it if needed.
+
+        Args:
+            query: Search string
+            limit: Maximum number of results
+
+        Returns:
+            list: (pk, score) pairs, best first
+        """
+        self._ensure_loaded()
+        return self._index.search(query, limit=limit, threshold=self.threshold)
+
+    def get_text(self, values):
+        """Join name field values into a full name."""
+        return ' '.join(value for value in values if value)
+
+    def _change_key(self, version):
+        return f'trigram_index:{self.model_label.lower()}:changes:{version}'
+
+    def _ensure_loaded(self):
+        version = get_version(self.version_key)
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version == version:
+                return
+            pks = self._changed_pks(version)
+            if pks is None:
+                self._reload()
+            else:
+                self._refresh(pks)
+            self._version = version
+
+    def _changed_pks(self, version):
+        """
+        Get primary keys changed since the loaded version.
+
+        Returns:
+            set: Changed keys, or None if the change log does not cover the
+            gap (not loaded yet, too far behind, entries evicted or the
+            version bumped by invalidate())
+        """
+        if self._version is None or not 0 < version - self._version <= MAX_REPLAYED_CHANGES:
+            return None
+        keys = [self._change_key(number) for number in range(self._version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        pks = set()
+        for changed in changes.values():
+            pks.update(changed)
+        return pks
+
+    def _reload(self):
+        self._index.clear()
+        rows = self.model._base_manager.values_list('pk', *self.fields)
+        for pk, *values in rows.iterator(chunk_size=2000):
+            self._index.add(pk, self.get_text(values))
+
+    def _refresh(self, pks):
+        found = set()
+        for pk, *values in self.model._base_manager.filter(pk__in=pks).values_list('pk', *self.fields):
+            self._index.add(pk, self.get_text(values))
+            found.add(pk)
+        for pk in pks - found:
+            self._index.remove(pk)
+
+    def _bump_version(self, pks=None):
+        version = bump_version(self.version_key)
+        if pks is not None:
+            # Другие процессы перечитывают только эти строки
+            cache.set(self._change_key(version), list(pks), CHANGE_LOG_TIMEOUT)
+        return version
+
+    def update(self, instance):
+        """
+        Update the name of an object in the in-process index.
+
+        Args:
+            instance: Saved model instance
+        """
+        if self.uses_database():
+            return
+        loaded = self._version is not None
+        self._index.add(instance.pk, self.get_text(getattr(instance, field) for field in self.fields))
+        version = self._bump_version([instance.pk])
+        if loaded and self._version == version - 1:
+            self._version = version
+
+    def remove(self, pk):
+        """
+        Remove an object from the in-process index.
+
+        Args:
+            pk: Primary key of the deleted object
+        """
+        if self.uses_database():
+            return
+        loaded = self._version is not None
+        self._index.remove(pk)
+        version = self._bump_version([pk])
+        if loaded and self._version == version - 1:
+            self._version = version
+
+    def invalidate(self):
+        """Make every process reload its index (after bulk changes without signals)."""
+        if not self.uses_database():
+            self._bump_version()
+
+    def reset(self):
+        """Drop the in-process index; it is loaded again on next search."""
+        with self._lock:
+            self._index.clear()
+            self._version = None
+
+    def connect_signals(self):
+        """
+        Keep the in-process index up to date on save and delete.
+
+        Connects the model and all its concrete subclasses.
+        """
+        model = self.model
+        senders = [m for m in apps.get_models() if issubclass(m, model)]
+        for sender in senders:
+            post_save.connect(
+                self._on_save, sender=sender, weak=False,
+                dispatch_uid=f'trigram_save:{self.model_label}:{sender._meta.label}'
+            )
+            post_delete.connect(
+                self._on_delete, sender=sender, weak=False,
+                dispatch_uid=f'trigram_delete:{self.model_label}:{sender._meta.label}'
+            )
+
+    def _on_save(self, sender, instance, raw=False, **kwargs):
+        if not raw:
+            self.update(instance)
+
+    def _on_delete(self, sender, instance, **kwargs):
+        self.remove(instance.pk)
@@ -6,4 +6,5 @@ app_name = 'core'
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     path('contacts/', views.ContactsView.as_view(), name='contacts'),
+    path('metrics/', views.metrics, name='metrics'),
 ] 
\ No newline at end of file
@@ -36,6 +36,7 @@ def generate_slug(text, model_class, instance=None):
         str: Уникальный slug
     """
     from django.utils.text import slugify
+    from .slugs import allocate_slug
     
     # Транслитерируем текст
     transliterated_text = transliterate(text)
@@ -47,12 +48,5 @@ def generate_slug(text, model_class, instance=None):
     if not base_slug:
         base_slug = f"item-{instance.id}" if instance and instance.id else "item"
     
-    slug = base_slug
-    
-    # Проверяем уникальность и добавляем суффикс при необходимости
-    counter = 1
-    while model_class.objects.filter(slug=slug).exclude(pk=instance.pk if instance else None).exists():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    
-    return slug 
\ No newline at end of file
+    # Свободный суффикс выбирается по одному запросу
+    return allocate_slug(model_class, base_slug, instance)
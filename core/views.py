@@ -1,11 +1,10 @@
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
 from django.views.generic import TemplateView
-from facilities.models import RehabCenter, Clinic, PrivateDoctor
-from staff.models import MedicalSpecialist
-from medical_services.models import ServiceCategory, Service
-from recovery_stories.models import RecoveryStory
-from blog.models import Tag, BlogPost
-from django.db import models
+from .home import get_home_snapshot
+from .metrics import collect, get_metrics_settings, render_prometheus
 
 # Create your views here.
 
@@ -19,25 +18,8 @@ class HomeView(TemplateView):
         context['meta_title'] = 'Центр помощи зависимым - Лечение алкоголизма, наркомании, игромании по всей России'
         context['meta_description'] = 'Профессиональная помощь в лечении зависимостей. Реабилитационные центры, клиники, частные врачи по всей России. Анонимно, 24/7. Бесплатная консультация.'
         
-        # Получаем данные для главной страницы с приоритетом featured учреждений
-        # Реабилитационные центры
-        featured_rehabs = RehabCenter.objects.filter(is_active=True, is_featured=True).order_by('-created_at')
-        regular_rehabs = RehabCenter.objects.filter(is_active=True, is_featured=False).order_by('-created_at')[:12-len(featured_rehabs)]
-        context['rehab_centers'] = list(featured_rehabs) + list(regular_rehabs)
-        
-        # Клиники
-        featured_clinics = Clinic.objects.filter(is_active=True, is_featured=True).order_by('-created_at')
-        regular_clinics = Clinic.objects.filter(is_active=True, is_featured=False).order_by('-created_at')[:12-len(featured_clinics)]
-        context['clinics'] = list(featured_clinics) + list(regular_clinics)
-        
-        # Частные врачи
-        featured_doctors = PrivateDoctor.objects.filter(is_active=True, is_featured=True).order_by('-created_at')
-        regular_doctors = PrivateDoctor.objects.filter(is_active=True, is_featured=False).order_by('-created_at')[:12-len(featured_doctors)]
-        context['private_doctors'] = list(featured_doctors) + list(regular_doctors)
-        
-        context['specialists'] = MedicalSpecialist.objects.filter(is_active=True).order_by('-created_at')[:12]
-        context['recovery_stories'] = RecoveryStory.objects.filter(is_published=True).order_by('-created_at')[:6]
-        context['useful_info_cards'] = BlogPost.objects.filter(is_published=True).order_by('-created_at')[:3]
+        # Блоки страницы берутся из снимка; запросы выполняются только при его перестроении
+        context.update(get_home_snapshot())
         
         return context
 
@@ -61,3 +43,21 @@ class ConsultationView(TemplateView):
 
 def page_not_found(request, exception):
     return render(request, '404.html', status=404)
+
+
+@never_cache
+def metrics(request):
+    """
+    Request latency histograms in the Prometheus text format.
+
+    Available to staff users and to scrapers sending
+    ``Authorization: Bearer <METRICS['TOKEN']>``.
+    """
+    token = get_metrics_settings()['TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    allowed = request.user.is_active and request.user.is_staff
+    if not allowed and token and authorization.startswith('Bearer '):
+        allowed = constant_time_compare(authorization[len('Bearer '):], token)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
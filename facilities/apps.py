@@ -6,3 +6,9 @@ class FacilitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'facilities'
     verbose_name = _('Учреждения')
+
+    def ready(self):
+        """Подключение сигналов и индекса поиска по ФИО врачей."""
+        import facilities.signals
+        from facilities.search import doctor_name_search
+        doctor_name_search.connect_signals()
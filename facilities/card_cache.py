@@ -0,0 +1,191 @@
+"""
+Fragment cache for facility cards.
+
+Rendered cards are cached by facility type, pk and ``updated_at``. Saving a
+facility changes ``updated_at``; image, specialization and organization
+type changes touch it (see facilities.signals), so stale fragments are
+never read again and simply expire. A page of cards is fetched with one
+``get_many`` call and only missing cards are rendered and stored with
+``set_many``.
+
+A card rendered while the derivatives of its main image are still being
+generated (core.images) has no srcset, so it is kept only for
+CARD_CACHE_PENDING_TIMEOUT seconds and re-rendered once they exist.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.images import get_manifest
+from .models import Clinic, RehabCenter, PrivateDoctor
+
+
+CARD_TEMPLATES = {
+    Clinic: ('includes/cards/clinic_card.html', 'clinic'),
+    RehabCenter: ('includes/cards/rehab_card.html', 'facility'),
+    PrivateDoctor: ('includes/cards/private_doctor_card.html', 'doctor'),
+}
+
+CARD_CACHE_PREFIX = 'facility_card'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_card_cache_timeout():
+    """
+    Get card cache timeout from settings.
+
+    Returns:
+        int: Timeout in seconds (CARD_CACHE_TIMEOUT, 24 hours by default)
+    """
+    return getattr(settings, 'CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def get_card_cache_pending_timeout():
+    """
+    Get the timeout of cards whose image derivatives are not generated yet.
+
+    Returns:
+        int: Timeout in seconds (CARD_CACHE_PENDING_TIMEOUT, 1 minute by default)
+    """
+    return getattr(settings, 'CARD_CACHE_PENDING_TIMEOUT', 60)
+
+
+def card_cache_key(obj):
+    """
+    Build the cache key of a facility card.
+
+    Args:
+        obj: Clinic, RehabCenter or PrivateDoctor instance
+
+    Returns:
+        str: Cache key including type, pk and updated_at
+    """
+    version = obj.updated_at.timestamp() if obj.updated_at else 0
+    return f"{CARD_CACHE_PREFIX}:{obj._meta.label_lower}:{obj.pk}:{version}"
+
+
+def render_card(obj):
+    """
+    Render a facility card without caching.
+
+    Cards do not depend on the request, so context processors are not run.
+
+    Args:
+        obj: Facility instance
+
+    Returns:
+        str: Card HTML
+    """
+    template_name, context_name = CARD_TEMPLATES[type(obj)]
+    return render_to_string(template_name, {context_name: obj})
+
+
+def derivatives_pending(obj):
+    """
+    Check whether the main image of a facility has no derivatives yet.
+
+    Args:
+        obj: Facility instance
+
+    Returns:
+        bool: True if the card would be rendered without a srcset
+    """
+    image = obj.main_image
+    if image is None or not image.image:
+        return False
+    return not get_manifest(image.image.name, image.image.storage).get('sources')
+
+
+def render_cards(objects):
+    """
+    Render facility cards using the fragment cache.
+
+    Args:
+        objects: Iterable of facility instances
+
+    Returns:
+        list: Safe HTML strings in the order of objects
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+
+    keys = [card_cache_key(obj) for obj in objects]
+    cached = cache.get_many(keys)
+
+    missing = {}
+    pending = set()
+    cards = []
+    for key, obj in zip(keys, objects):
+        html = cached.get(key)
+        if html is None:
+            html = missing.get(key)
+            if html is None:
+                html = render_card(obj)
+                missing[key] = html
+                if derivatives_pending(obj):
+                    pending.add(key)
+        cards.append(mark_safe(html))
+
+    ready = {key: html for key, html in missing.items() if key not in pending}
+    if ready:
+        cache.set_many(ready, get_card_cache_timeout())
+    if pending:
+        cache.set_many({key: missing[key] for key in pending}, get_card_cache_pending_timeout())
+
+    with _stats_lock:
+        _stats['hits'] += len(objects) - len(missing)
+        _stats['misses'] += len(missing)
+    return cards
+
+
+def get_card_cache_stats():
+    """
+    Get card cache hit and miss counters of the current process.
+
+    Returns:
+        dict: Counters 'hits', 'misses' and 'hit_ratio'
+    """
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_card_cache_stats():
+    """Reset card cache counters of the current process."""
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
+
+
+class CardFragmentMixin:
+    """
+    Mixin for list views that adds pre-rendered cached cards to context.
+
+    The cards of the current page are available as ``cards``.
+    """
+
+    def get_context_data(self, **kwargs):
+        """
+        Add cached card fragments to context.
+
+        Args:
+            **kwargs: Additional context data
+
+        Returns:
+            dict: Context with rendered cards added
+        """
+        context = super().get_context_data(**kwargs)
+        context['cards'] = render_cards(context.get('object_list') or [])
+        return context
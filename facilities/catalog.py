@@ -0,0 +1,140 @@
+"""
+Unified facility catalog.
+
+Builds a UNION queryset over clinics, rehabilitation centers and private
+doctors with the common card fields, so filtering, ordering and
+LIMIT/OFFSET are executed by the database. Only the rows of the current
+page are then hydrated into model instances for the card templates, and
+main images are looked up for these rows only.
+"""
+
+from django.db.models import CharField, F, Q, Value
+
+from .managers import main_image_prefetch
+from .models import Clinic, RehabCenter, PrivateDoctor
+
+
+CATALOG_MODELS = {
+    'clinic': Clinic,
+    'rehab': RehabCenter,
+    'private_doctor': PrivateDoctor,
+}
+
+CATALOG_FIELDS = (
+    'facility_type',
+    'facility_id',
+    'facility_name',
+    'facility_slug',
+    'city_name',
+    'region_name',
+    'featured',
+    'rating',
+    'review_count',
+    'created',
+)
+
+CATALOG_ORDERINGS = {
+    'name': ('-featured', 'facility_name', 'facility_type', 'facility_id'),
+    'rating': ('-rating', '-review_count', 'facility_name', 'facility_type', 'facility_id'),
+    'new': ('-created', 'facility_type', '-facility_id'),
+}
+
+DEFAULT_CATALOG_ORDERING = 'name'
+
+
+def _catalog_part(facility_type, city=None, search=None, featured=None):
+    """
+    Build a values queryset with catalog fields for one facility type.
+
+    Every column is an annotation declared in the same order for all types,
+    so the SELECT lists of the UNION parts are compatible.
+    """
+    model = CATALOG_MODELS[facility_type]
+    queryset = model.objects.filter(is_active=True)
+    if city:
+        queryset = queryset.filter(city__slug=city)
+    if search:
+        queryset = queryset.filter(Q(name__icontains=search) | Q(address__icontains=search))
+    if featured is not None:
+        queryset = queryset.filter(is_featured=featured)
+
+    return queryset.annotate(
+        facility_type=Value(facility_type, output_field=CharField()),
+        facility_id=F('pk'),
+        facility_name=F('name'),
+        facility_slug=F('slug'),
+        city_name=F('city__name'),
+        region_name=F('city__region__name'),
+        featured=F('is_featured'),
+        rating=F('rating_avg'),
+        review_count=F('rating_count'),
+        created=F('created_at'),
+    ).values(*CATALOG_FIELDS).order_by()
+
+
+def catalog_queryset(facility_types=None, city=None, search=None, featured=None,
+                     ordering=DEFAULT_CATALOG_ORDERING):
+    """
+    Get the unified catalog of active facilities.
+
+    Args:
+        facility_types: Iterable of catalog type keys (all types if empty)
+        city: City slug to filter by
+        search: Search string for name and address
+        featured: Filter by is_featured flag if not None
+        ordering: Key of CATALOG_ORDERINGS
+
+    Returns:
+        QuerySet: UNION values queryset ordered in the database; supports
+        count() and slicing, so it can be passed to Paginator
+    """
+    types = [t for t in (facility_types or CATALOG_MODELS) if t in CATALOG_MODELS]
+    if not types:
+        return Clinic.objects.none().values()
+
+    parts = [_catalog_part(t, city=city, search=search, featured=featured) for t in types]
+    queryset = parts[0]
+    if len(parts) > 1:
+        queryset = queryset.union(*parts[1:], all=True)
+
+    order_fields = CATALOG_ORDERINGS.get(ordering, CATALOG_ORDERINGS[DEFAULT_CATALOG_ORDERING])
+    return queryset.order_by(*order_fields)
+
+
+def hydrate_catalog_rows(rows):
+    """
+    Load model instances for catalog rows, keeping the row order.
+
+    Issues one query per facility type present in the rows, plus one for
+    their main images (main_image_prefetch), so cards do not query images
+    again.
+
+    Args:
+        rows: Iterable of catalog row dicts
+
+    Returns:
+        list: Facility instances with ``facility_type`` attribute set
+    """
+    rows = list(rows)
+    ids_by_type = {}
+    for row in rows:
+        ids_by_type.setdefault(row['facility_type'], []).append(row['facility_id'])
+
+    loaded = {}
+    for facility_type, ids in ids_by_type.items():
+        queryset = CATALOG_MODELS[facility_type].objects.select_related(
+            'city', 'city__region', 'organization_type'
+        ).prefetch_related(main_image_prefetch())
+        if facility_type == 'private_doctor':
+            queryset = queryset.prefetch_related('specializations')
+        for pk, obj in queryset.in_bulk(ids).items():
+            loaded[(facility_type, pk)] = obj
+
+    facilities = []
+    for row in rows:
+        obj = loaded.get((row['facility_type'], row['facility_id']))
+        if obj is None:
+            continue
+        obj.facility_type = row['facility_type']
+        facilities.append(obj)
+    return facilities
@@ -0,0 +1,512 @@
+"""
+Bulk import of clinics, rehab centers and private doctors.
+
+Rows are streamed from CSV or JSON and grouped into chunks per model.
+Cities, organization types and specializations are resolved from maps
+loaded once per import, slugs of a chunk are allocated with one query
+(see core.slugs.assign_slugs) and the chunk is written with
+``bulk_create``/``bulk_update`` inside a transaction.
+
+Bulk operations send no ``post_save`` signals, so the search index, the
+doctor name index, the facet counts, the related objects table, the page
+cache tags and the homepage snapshot are updated explicitly. Cached cards
+need no reset: their keys include updated_at, which is set on update. A
+row that fails validation is reported with its number and skipped; if the
+database rejects a chunk, its rows are written one by one in savepoints
+to find the failing ones.
+"""
+
+import csv
+import json
+import re
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import FileField, prefetch_related_objects
+from django.utils import timezone
+
+from core.facets import invalidate_facets
+from core.home import SNAPSHOT_MODELS, home_snapshot_cache
+from core.models import City
+from core.page_cache import invalidate_tags
+from core.slugs import assign_slugs
+from staff.models import Specialization
+
+from .models import Clinic, OrganizationType, PrivateDoctor, RehabCenter
+from .related import rebuild_related
+from .search import doctor_name_search, get_search_kind, index_facilities
+
+
+DEFAULT_BATCH_SIZE = 500
+JSON_READ_SIZE = 64 * 1024
+
+# Столбцы, которые обрабатываются отдельно от полей модели
+RELATED_COLUMNS = ('type', 'slug', 'city', 'organization_type', 'specializations')
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'да', '+'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', 'нет', '-'}
+
+LIST_SEPARATORS_RE = re.compile(r'\s*[,;|]\s*')
+
+
+class RowError(Exception):
+    """Row cannot be imported; the message is shown in the report."""
+
+
+def get_import_models():
+    """
+    Get importable models by type key.
+
+    Returns:
+        dict: 'clinic', 'rehab' and 'private_doctor' model classes
+    """
+    return {get_search_kind(model): model for model in (Clinic, RehabCenter, PrivateDoctor)}
+
+
+def iter_csv_rows(stream, delimiter=','):
+    """
+    Read rows of a CSV file with a header line.
+
+    Args:
+        stream: Text file object
+        delimiter: Field delimiter
+
+    Yields:
+        dict: Row values by column name
+    """
+    yield from csv.DictReader(stream, delimiter=delimiter)
+
+
+def iter_json_rows(stream, read_size=JSON_READ_SIZE):
+    """
+    Read objects of a JSON array or of JSON Lines without loading the whole file.
+
+    Args:
+        stream: Text file object
+        read_size: Number of characters read at a time
+
+    Yields:
+        Decoded items (rows are expected to be objects)
+
+    Raises:
+        ValueError: If the file is not valid JSON
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    in_array = None
+
+    while True:
+        # Пропускаем пробелы и разделители между элементами
+        while True:
+            while position < len(buffer) and (
+                buffer[position].isspace() or (in_array and buffer[position] == ',')
+            ):
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(read_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+
+        if position >= len(buffer):
+            if in_array:
+                raise ValueError('JSON: массив не закрыт')
+            return
+
+        if in_array is None:
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array and buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise ValueError(f'JSON: {error}') from error
+            chunk = stream.read(read_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+
+        yield item
+        buffer, position = buffer[end:], 0
+
+
+@dataclass
+class ImportRow:
+    """Parsed row waiting to be written."""
+
+    number: int
+    instance: object
+    fields: set
+    specializations: list = None
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import."""
+
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+    ignored_columns: set = field(default_factory=set)
+
+    def add_error(self, number, message):
+        self.errors.append((number, message))
+
+
+class FacilityImporter:
+    """
+    Import facilities from an iterable of row dicts.
+
+    Args:
+        facility_type: Type key for all rows ('clinic', 'rehab',
+            'private_doctor'); if None it is read from the 'type' column
+        batch_size: Number of rows written per transaction
+        update_existing: Update facilities whose slug already exists
+            instead of reporting an error
+        dry_run: Validate and write inside a transaction that is rolled back
+    """
+
+    def __init__(self, facility_type=None, batch_size=DEFAULT_BATCH_SIZE,
+                 update_existing=False, dry_run=False):
+        self.models = get_import_models()
+        if facility_type is not None and facility_type not in self.models:
+            raise ValueError(f'Неизвестный тип учреждения: {facility_type}')
+        if batch_size < 1:
+            raise ValueError('Размер пакета должен быть положительным')
+        self.facility_type = facility_type
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self._fields = {}
+
+    def run(self, rows):
+        """
+        Import rows.
+
+        Args:
+            rows: Iterable of dicts (e.g. from iter_csv_rows or iter_json_rows)
+
+        Returns:
+            ImportResult: Counts and per-row errors
+        """
+        result = ImportResult()
+        # Без dry_run каждый пакет фиксируется в своей транзакции
+        with transaction.atomic() if self.dry_run else nullcontext():
+            self.load_maps()
+            self._seen_slugs = {model: set() for model in self.models.values()}
+            self._written_models = set()
+            pending = {model: [] for model in self.models.values()}
+
+            for number, row in enumerate(rows, start=1):
+                try:
+                    import_row, model = self.parse_row(number, row, result)
+                except RowError as error:
+                    result.add_error(number, str(error))
+                    continue
+                batch = pending[model]
+                batch.append(import_row)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(model, batch, result)
+                    batch.clear()
+
+            for model, batch in pending.items():
+                if batch:
+                    self.write_batch(model, batch, result)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        if not self.dry_run and (result.created or result.updated):
+            self.invalidate_caches()
+        return result
+
+    def invalidate_caches(self):
+        """Reset caches and indexes that model signals would have updated."""
+        doctor_name_search.invalidate()
+        invalidate_facets(PrivateDoctor._meta.label_lower)
+        labels = {model._meta.label for model in self._written_models}
+        if PrivateDoctor in self._written_models:
+            # Специализации врачей заменяются без сигналов m2m_changed
+            labels.add(Specialization._meta.label)
+        invalidate_tags(*labels)
+        if not labels.isdisjoint(SNAPSHOT_MODELS):
+            home_snapshot_cache.invalidate()
+        for model in self._written_models:
+            rebuild_related(model)
+
+    def load_maps(self):
+        """Load cities, organization types and specializations by slug and lowercase name."""
+        self.cities = {}
+        for city in City.objects.select_related('region'):
+            for key in (city.slug, city.name.lower()):
+                # Одинаковые названия в разных регионах различаются по 'регион/город'
+                if key in self.cities and self.cities[key] != city:
+                    self.cities[key] = None
+                else:
+                    self.cities[key] = city
+            self.cities[f'{city.region.slug}/{city.slug}'] = city
+
+        self.organization_types = {}
+        for organization_type in OrganizationType.objects.all():
+            self.organization_types[organization_type.slug] = organization_type
+            self.organization_types.setdefault(organization_type.name.lower(), organization_type)
+
+        self.specializations = {}
+        for specialization in Specialization.objects.all():
+            self.specializations[specialization.slug] = specialization
+            self.specializations.setdefault(specialization.name.lower(), specialization)
+
+    def get_fields(self, model):
+        """Get editable non-relational fields filled from columns with the same name."""
+        if model not in self._fields:
+            self._fields[model] = {
+                f.name: f for f in model._meta.concrete_fields
+                if f.editable and not f.primary_key and not f.is_relation
+                and not isinstance(f, FileField) and f.name != 'slug'
+            }
+        return self._fields[model]
+
+    def parse_row(self, number, row, result):
+        """
+        Build an unsaved instance from a row.
+
+        Empty values are skipped, so model defaults apply to new rows and
+        existing values are kept on update.
+
+        Returns:
+            tuple: (ImportRow, model class)
+
+        Raises:
+            RowError: If the row cannot be parsed
+        """
+        if not isinstance(row, dict):
+            raise RowError('Строка должна быть объектом')
+        row = {str(key).strip(): _clean(value) for key, value in row.items() if key is not None}
+
+        type_key = self.facility_type or row.get('type')
+        model = self.models.get(type_key)
+        if model is None:
+            raise RowError(f'Неизвестный тип учреждения: {type_key or "не указан"}')
+
+        instance = model()
+        fields = set()
+        model_fields = self.get_fields(model)
+        for column, value in row.items():
+            if column in RELATED_COLUMNS or value is None:
+                continue
+            model_field = model_fields.get(column)
+            if model_field is None:
+                result.ignored_columns.add(column)
+                continue
+            try:
+                setattr(instance, model_field.attname, _to_python(model_field, value))
+            except ValidationError as error:
+                raise RowError(f'{column}: {"; ".join(error.messages)}')
+            fields.add(model_field.name)
+
+        if row.get('slug'):
+            instance.slug = str(row['slug'])
+        if row.get('city'):
+            instance.city = self._lookup(self.cities, row['city'], 'Неизвестный или неоднозначный город')
+            fields.add('city')
+        if row.get('organization_type'):
+            instance.organization_type = self._lookup(
+                self.organization_types, row['organization_type'], 'Неизвестный тип организации'
+            )
+            fields.add('organization_type')
+
+        specializations = None
+        if model is PrivateDoctor:
+            if not instance.name and instance.last_name and instance.first_name:
+                instance.name = instance.get_full_name()
+                fields.add('name')
+            if row.get('specializations'):
+                values = row['specializations']
+                if isinstance(values, str):
+                    values = LIST_SEPARATORS_RE.split(values)
+                specializations = [
+                    self._lookup(self.specializations, value, 'Неизвестная специализация')
+                    for value in values if value
+                ]
+        elif row.get('specializations'):
+            result.ignored_columns.add('specializations')
+
+        return ImportRow(number, instance, fields, specializations), model
+
+    def _lookup(self, mapping, value, message):
+        obj = mapping.get(str(value).strip().lower())
+        if obj is None:
+            raise RowError(f'{message}: {value}')
+        return obj
+
+    def write_batch(self, model, batch, result):
+        """
+        Validate and write one chunk of rows of a model.
+
+        Args:
+            model: Facility model class
+            batch: List of ImportRow
+            result: ImportResult to update
+        """
+        creates, updates = self._split_existing(model, batch, result)
+        assign_slugs([row.instance for row in creates], lambda instance: instance.get_base_slug())
+
+        creates = [row for row in creates if self._validate(row, result, partial=False)]
+        updates = [row for row in updates if self._validate(row, result, partial=True)]
+        if not creates and not updates:
+            return
+
+        try:
+            with transaction.atomic():
+                self._write(model, creates, updates)
+        except DatabaseError:
+            # Ищем строки, которые отклоняет база, записывая их по одной.
+            # Откаченная вставка могла успеть выдать id части новых строк
+            for row in creates:
+                _reset_pk(row.instance)
+            new = {row.number for row in creates}
+            failed = set()
+            for row in creates + updates:
+                is_new = row.number in new
+                try:
+                    with transaction.atomic():
+                        self._write(model, [row] if is_new else [], [] if is_new else [row])
+                except DatabaseError as error:
+                    if is_new:
+                        _reset_pk(row.instance)
+                    result.add_error(row.number, f'Ошибка базы данных: {error}')
+                    failed.add(row.number)
+            creates = [row for row in creates if row.number not in failed]
+            updates = [row for row in updates if row.number not in failed]
+
+        result.created += len(creates)
+        result.updated += len(updates)
+        if creates or updates:
+            self._written_models.add(model)
+
+    def _split_existing(self, model, batch, result):
+        """Split rows into new and existing facilities by slug."""
+        slugs = [row.instance.slug for row in batch if row.instance.slug]
+        existing = dict(model._base_manager.filter(slug__in=slugs).values_list('slug', 'pk'))
+        seen = self._seen_slugs[model]
+
+        creates, updates = [], []
+        for row in batch:
+            slug = row.instance.slug
+            if slug and slug in seen:
+                result.add_error(row.number, f'Slug повторяется в файле: {slug}')
+                continue
+            if slug:
+                seen.add(slug)
+            if slug in existing:
+                if not self.update_existing:
+                    result.add_error(row.number, f'Учреждение со slug {slug} уже существует')
+                    continue
+                row.instance.pk = existing[slug]
+                row.instance._state.adding = False
+                updates.append(row)
+            else:
+                creates.append(row)
+        return creates, updates
+
+    def _validate(self, row, result, partial):
+        """Validate field values of a row; related objects are already resolved."""
+        instance = row.instance
+        if not partial and instance.organization_type_id is None:
+            result.add_error(row.number, 'organization_type: обязательное поле')
+            return False
+
+        # Значения по умолчанию не проверяются: пустые description или phone
+        # допустимы для импорта, хотя в админке эти поля обязательны
+        exclude = [
+            f.name for f in instance._meta.fields
+            if f.is_relation or (f.name not in row.fields and (partial or f.has_default()))
+        ]
+        try:
+            instance.clean_fields(exclude=exclude)
+        except ValidationError as error:
+            messages = [
+                f'{name}: {"; ".join(errors)}' for name, errors in error.message_dict.items()
+            ]
+            result.add_error(row.number, ', '.join(messages))
+            return False
+        return True
+
+    def _write(self, model, creates, updates):
+        """Write rows, set doctor specializations and index the facilities."""
+        if creates:
+            instances = [row.instance for row in creates]
+            model._base_manager.bulk_create(instances)
+            if any(instance.pk is None for instance in instances):
+                pks = dict(model._base_manager.filter(
+                    slug__in=[instance.slug for instance in instances]
+                ).values_list('slug', 'pk'))
+                for instance in instances:
+                    instance.pk = pks[instance.slug]
+
+        now = timezone.now()
+        groups = {}
+        for row in updates:
+            row.instance.updated_at = now
+            groups.setdefault(tuple(sorted(row.fields)), []).append(row.instance)
+        for fields, instances in groups.items():
+            model._base_manager.bulk_update(instances, [*fields, 'updated_at'])
+
+        rows = creates + updates
+        if model is PrivateDoctor:
+            self._set_specializations([row for row in rows if row.specializations is not None])
+
+        objects = list(
+            model._base_manager.filter(pk__in=[row.instance.pk for row in rows])
+            .select_related('city', 'city__region')
+        )
+        if model is PrivateDoctor:
+            prefetch_related_objects(objects, 'specializations')
+        index_facilities(objects)
+
+    def _set_specializations(self, rows):
+        """Replace specializations of doctors with one delete and one insert."""
+        if not rows:
+            return
+        m2m_field = PrivateDoctor._meta.get_field('specializations')
+        through = m2m_field.remote_field.through
+        source, target = f'{m2m_field.m2m_field_name()}_id', f'{m2m_field.m2m_reverse_field_name()}_id'
+
+        through.objects.filter(**{f'{source}__in': [row.instance.pk for row in rows]}).delete()
+        through.objects.bulk_create([
+            through(**{source: row.instance.pk, target: specialization.pk})
+            for row in rows
+            for specialization in {s.pk: s for s in row.specializations}.values()
+        ])
+
+
+def _reset_pk(instance):
+    """Make an instance new again after its insert was rolled back."""
+    instance.pk = None
+    instance._state.adding = True
+
+
+def _clean(value):
+    """Strip strings and turn empty values into None."""
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', None) else value
+
+
+def _to_python(model_field, value):
+    """Convert a CSV/JSON value to the Python value of a model field."""
+    if model_field.get_internal_type() == 'BooleanField' and isinstance(value, str):
+        lowered = value.lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+        raise ValidationError(f'Некорректное логическое значение: {value}')
+    if isinstance(value, (dict, list)):
+        raise ValidationError('Ожидалось простое значение')
+    return model_field.to_python(value)
@@ -0,0 +1,116 @@
+"""
+Django management command для массового импорта клиник, центров и врачей.
+
+Использование:
+    python manage.py import_facilities clinics.csv --type clinic
+    python manage.py import_facilities catalog.json --batch-size 1000 --update
+    python manage.py import_facilities doctors.jsonl --type private_doctor --dry-run
+    cat catalog.csv | python manage.py import_facilities - --format csv
+
+Город, тип организации и специализации указываются slug'ом или названием;
+для городов с одинаковым slug в разных регионах — 'регион/город'.
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from facilities.importing import (
+    DEFAULT_BATCH_SIZE, FacilityImporter, get_import_models, iter_csv_rows, iter_json_rows
+)
+
+
+MAX_REPORTED_ERRORS = 100
+
+
+class Command(BaseCommand):
+    help = 'Импортирует клиники, реабилитационные центры и частных врачей из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help="Путь к файлу или '-' для чтения из stdin",
+        )
+        parser.add_argument(
+            '--type',
+            choices=sorted(get_import_models()),
+            help="Тип всех строк; по умолчанию берется из столбца 'type'",
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Формат файла; по умолчанию определяется по расширению (.json и .jsonl — JSON)',
+        )
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Разделитель полей CSV',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Кодировка файла',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк, записываемых в одной транзакции',
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Обновлять учреждения с существующим slug вместо ошибки',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Проверить файл без сохранения изменений',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('json' if path.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv')
+
+        try:
+            importer = FacilityImporter(
+                facility_type=options['type'],
+                batch_size=options['batch_size'],
+                update_existing=options['update'],
+                dry_run=options['dry_run'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding=options['encoding'], newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+
+        try:
+            if file_format == 'json':
+                rows = iter_json_rows(stream)
+            else:
+                rows = iter_csv_rows(stream, delimiter=options['delimiter'])
+            result = importer.run(rows)
+        except (ValueError, UnicodeDecodeError) as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for number, message in result.errors[:MAX_REPORTED_ERRORS]:
+            self.stdout.write(self.style.ERROR(f'✗ Строка {number}: {message}'))
+        if len(result.errors) > MAX_REPORTED_ERRORS:
+            self.stdout.write(self.style.ERROR(
+                f'... и еще {len(result.errors) - MAX_REPORTED_ERRORS} ошибок'
+            ))
+        if result.ignored_columns:
+            self.stdout.write(self.style.WARNING(
+                f"Пропущены неизвестные столбцы: {', '.join(sorted(result.ignored_columns))}"
+            ))
+
+        prefix = 'Проверка завершена (изменения не сохранены)' if options['dry_run'] else 'Импорт завершен'
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ {prefix}: создано {result.created}, обновлено {result.updated}, '
+            f'ошибок {len(result.errors)}'
+        ))
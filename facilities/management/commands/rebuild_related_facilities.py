@@ -0,0 +1,39 @@
+"""
+Django management command для пересчета похожих учреждений и врачей.
+
+Использование:
+    python manage.py rebuild_related_facilities
+    python manage.py rebuild_related_facilities --type private_doctor
+
+Изменения отдельных учреждений пересчитываются автоматически в фоновом
+потоке (сигналы); команда нужна после массового импорта и для
+периодического обновления оценок по рейтингу (например, по cron), а также
+подбирает изменения, очередь которых потерялась при перезапуске процесса.
+Существующие данные заполняются миграцией 0006_related_facility.
+"""
+
+from django.core.management.base import BaseCommand
+from facilities.related import get_related_models, rebuild_related
+from facilities.search import get_search_kind
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих клиник, центров и врачей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            choices=[get_search_kind(model) for model in get_related_models()],
+            help='Пересчитать только один тип объектов',
+        )
+
+    def handle(self, *args, **options):
+        for model in get_related_models():
+            if options['type'] and get_search_kind(model) != options['type']:
+                continue
+            count = rebuild_related(model)
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {model._meta.verbose_name_plural}: {count}')
+            )
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Похожие объекты пересчитаны'))
@@ -0,0 +1,33 @@
+"""
+Django management command для перестроения полнотекстового индекса учреждений.
+
+Использование:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from facilities.search import rebuild_search_index, get_search_settings
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый поисковый индекс клиник, центров и врачей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество учреждений, индексируемых за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Перестроение индекса ({get_search_settings()['BACKEND']})...")
+        
+        counts = rebuild_search_index(batch_size=options['batch_size'])
+        for model, count in counts.items():
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {model._meta.verbose_name_plural}: {count}')
+            )
+        
+        self.stdout.write(self.style.SUCCESS('\n✓ Поисковый индекс перестроен'))
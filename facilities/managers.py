@@ -5,7 +5,36 @@ This module provides optimized query methods for facilities models.
 """
 
 from django.db import models
-from django.db.models import Q, Prefetch
+from django.db.models import Prefetch
+
+
+MAIN_IMAGE_ATTR = 'prefetched_main_images'
+
+
+def main_image_prefetch():
+    """
+    Build a Prefetch that resolves the main image of each facility.
+    
+    A ROW_NUMBER() window over (content_type, object_id) keeps only the best
+    active image per facility: is_main first, then by order and creation
+    date. All facilities of a page are resolved with one query.
+    
+    Returns:
+        Prefetch: Prefetch storing a list with at most one image in
+        the ``prefetched_main_images`` attribute
+    """
+    from django.db.models import F, Window
+    from django.db.models.functions import RowNumber
+    from .models import FacilityImage
+    
+    queryset = FacilityImage.objects.filter(is_active=True).annotate(
+        main_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('content_type'), F('object_id')],
+            order_by=[F('is_main').desc(), F('order').asc(), F('created_at').asc()],
+        )
+    ).filter(main_rank=1)
+    return Prefetch('images', queryset=queryset, to_attr=MAIN_IMAGE_ATTR)
 
 
 class FacilityManager(models.Manager):
@@ -21,7 +50,16 @@ class FacilityManager(models.Manager):
             QuerySet: Facilities with prefetched related data
         """
         return self.select_related('city', 'city__region')\
-                   .prefetch_related('images')
+                   .prefetch_related(main_image_prefetch())
+    
+    def with_main_image(self):
+        """
+        Get facilities with the main image resolved in one batched query.
+        
+        Returns:
+            QuerySet: Facilities with prefetched main image
+        """
+        return self.prefetch_related(main_image_prefetch())
     
     def with_full_data(self):
         """
@@ -75,10 +113,56 @@ class FacilityManager(models.Manager):
             return self.filter(city=city)
         return self.filter(city__slug=city)
     
+    def with_min_rating(self, rating):
+        """
+        Get facilities with average rating not lower than the given value.
+        
+        Uses denormalized rating fields, no join with reviews.
+        
+        Args:
+            rating: Minimal average rating (1-5)
+            
+        Returns:
+            QuerySet: Facilities with sufficient rating
+        """
+        return self.filter(rating_count__gt=0, rating_avg__gte=rating)
+    
+    def top_rated(self):
+        """
+        Get facilities ordered by rating.
+        
+        Facilities with equal average rating are ordered by review count.
+        
+        Returns:
+            QuerySet: Facilities ordered by rating descending
+        """
+        return self.order_by('-rating_avg', '-rating_count', 'name')
+    
+    def near(self, near, radius_km=None):
+        """
+        Get facilities located within the radius, nearest first.
+        
+        Facilities are located by the coordinates of their city.
+        
+        Args:
+            near: 'lat,lon' string, (lat, lon) tuple or city slug
+            radius_km: Radius in kilometers (default from GEO_SEARCH settings)
+            
+        Returns:
+            QuerySet: Facilities annotated with ``distance_km``
+            
+        Raises:
+            ValueError: If the origin or radius is invalid
+        """
+        from core.geo import filter_near
+        return filter_near(self.get_queryset(), near, radius_km)
+    
     def search(self, query):
         """
         Search facilities by name, description, or address.
         
+        Uses the full-text search backend, results are ordered by relevance.
+        
         Args:
             query: Search query string
             
@@ -88,11 +172,8 @@ class FacilityManager(models.Manager):
         if not query:
             return self.none()
         
-        return self.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(address__icontains=query)
-        )
+        from .search import get_search_backend
+        return get_search_backend().filter(self.get_queryset(), query)
 
 
 class ClinicManager(FacilityManager):
@@ -194,7 +275,7 @@ class PrivateDoctorManager(FacilityManager):
         """
         return self.filter(is_active=True)\
                    .select_related('city', 'city__region')\
-                   .prefetch_related('specializations', 'images')\
+                   .prefetch_related('specializations', main_image_prefetch())\
                    .order_by('last_name', 'first_name')
     
     def with_full_data(self):
@@ -241,6 +322,8 @@ class PrivateDoctorManager(FacilityManager):
         """
         Search private doctors by name, specialization, or city.
         
+        Uses the full-text search backend, results are ordered by relevance.
+        
         Args:
             query: Search query string
             
@@ -250,10 +333,20 @@ class PrivateDoctorManager(FacilityManager):
         if not query:
             return self.none()
         
-        return self.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(middle_name__icontains=query) |
-            Q(specializations__name__icontains=query) |
-            Q(city__name__icontains=query)
-        ).distinct() 
\ No newline at end of file
+        from .search import get_search_backend
+        return get_search_backend().filter(self.get_queryset(), query)
+    
+    def search_by_name(self, query):
+        """
+        Search private doctors by full name, tolerating typos.
+        
+        Uses a trigram index (pg_trgm on PostgreSQL, in-process otherwise).
+        
+        Args:
+            query: Name or part of the name, may be misspelled
+            
+        Returns:
+            QuerySet: Doctors ordered by name similarity (``name_similarity``)
+        """
+        from .search import doctor_name_search
+        return doctor_name_search.search(self.get_queryset(), query) 
\ No newline at end of file
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS facilities_search_fts "
+    "USING fts5(kind UNINDEXED, title, keywords, body, tokenize = 'unicode61 remove_diacritics 2')"
+)
+SQLITE_DROP = "DROP TABLE IF EXISTS facilities_search_fts"
+
+POSTGRES_CREATE = (
+    "CREATE TABLE IF NOT EXISTS facilities_search_index ("
+    "kind varchar(32) NOT NULL, "
+    "object_id bigint NOT NULL, "
+    "document tsvector NOT NULL, "
+    "PRIMARY KEY (kind, object_id))",
+    "CREATE INDEX IF NOT EXISTS facilities_search_index_document "
+    "ON facilities_search_index USING GIN (document)",
+)
+POSTGRES_DROP = "DROP TABLE IF EXISTS facilities_search_index"
+
+
+def create_search_index(apps, schema_editor):
+    """Создает таблицу полнотекстового индекса для текущей СУБД."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def fill_search_index(apps, schema_editor):
+    """Индексирует существующие клиники, центры и врачей."""
+    from facilities.search import rebuild_search_index
+
+    rebuild_search_index(apps=apps)
+
+
+def drop_search_index(apps, schema_editor):
+    """Удаляет таблицу полнотекстового индекса."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_DROP)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0003_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+POSTGRES_CREATE = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS facilities_privatedoctor_name_trgm "
+    "ON facilities_privatedoctor USING GIN (("
+    "COALESCE(last_name, '') || ' ' || COALESCE(first_name, '') || ' ' || COALESCE(middle_name, '')"
+    ") gin_trgm_ops)",
+)
+POSTGRES_DROP = "DROP INDEX IF EXISTS facilities_privatedoctor_name_trgm"
+
+
+def create_name_index(apps, schema_editor):
+    """Создает триграммный индекс ФИО врачей (только PostgreSQL)."""
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_name_index(apps, schema_editor):
+    """Удаляет триграммный индекс ФИО врачей."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.11 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_related(apps, schema_editor):
+    """Рассчитывает похожие объекты для существующих учреждений и врачей."""
+    from facilities.related import rebuild_related
+
+    for model_name in ('Clinic', 'RehabCenter', 'PrivateDoctor'):
+        rebuild_related(apps.get_model('facilities', model_name), apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('facilities', '0005_doctor_name_trigram_index'),
+        ('medical_services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedFacility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('target_id', models.PositiveIntegerField(verbose_name='ID похожего объекта')),
+                ('score', models.FloatField(verbose_name='Оценка сходства')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Позиция')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='Тип контента')),
+            ],
+            options={
+                'verbose_name': 'Похожий объект',
+                'verbose_name_plural': 'Похожие объекты',
+                'ordering': ['content_type', 'source_id', 'rank'],
+                'indexes': [models.Index(fields=['content_type', 'source_id', 'rank'], name='facilities_related_source'), models.Index(fields=['content_type', 'target_id'], name='facilities_related_target')],
+                'unique_together': {('content_type', 'source_id', 'target_id')},
+            },
+        ),
+        migrations.RunPython(fill_related, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,18 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
-from django.utils.text import slugify
-from django.db.models import Q
 from django.urls import reverse
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from .managers import FacilityManager, ClinicManager, RehabCenterManager, PrivateDoctorManager
+from .managers import FacilityManager, ClinicManager, RehabCenterManager, PrivateDoctorManager, MAIN_IMAGE_ATTR
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from core.models import TimeStampedModel
 from core.utils import generate_slug
+from core.slugs import make_base_slug, save_with_unique_slug
 from staff.models import MedicalSpecialist
+from reviews.models import RatingAggregateModel
 
 class OrganizationType(TimeStampedModel):
     """
@@ -47,7 +47,7 @@ class OrganizationType(TimeStampedModel):
         """
         return self.name
 
-class AbstractMedicalFacility(TimeStampedModel):
+class AbstractMedicalFacility(RatingAggregateModel, TimeStampedModel):
     """
     Абстрактная базовая модель для всех медицинских учреждений
     """
@@ -142,25 +142,28 @@ class AbstractMedicalFacility(TimeStampedModel):
         """
         return f"{self.name} ({self.organization_type.name}) [ID: {self.id}]"
 
+    def get_base_slug(self):
+        """
+        Get the slug to start from when allocating a unique one.
+        
+        Returns:
+            str: Transliterated name or the model name if it is empty
+        """
+        return make_base_slug(self.name, fallback=self._meta.model_name)
+
     def save(self, *args, **kwargs):
         """
         Save the facility with automatic slug generation.
         
-        If slug is not provided, generates it from name.
-        Handles slug duplication by adding numeric suffix.
+        If slug is not provided, generates it from the transliterated name.
+        A free numeric suffix is found with one query (see core.slugs).
         """
         # Формируем слаг из названия
         if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            
-            # Проверяем, существует ли уже такой слаг
-            counter = 1
-            while self.__class__.objects.filter(Q(slug=slug) & ~Q(pk=self.pk)).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-                
-            self.slug = slug
+            return save_with_unique_slug(
+                self, self.get_base_slug(),
+                lambda: super(AbstractMedicalFacility, self).save(*args, **kwargs)
+            )
             
         super().save(*args, **kwargs)
 
@@ -169,9 +172,21 @@ class AbstractMedicalFacility(TimeStampedModel):
         """
         Get the main image of the facility.
         
+        Uses the image resolved by ``with_main_image()`` or prefetched
+        ``images`` when available, and queries the database only otherwise.
+        
         Returns:
             FacilityImage or None: Main image (is_main=True) or first image or None
         """
+        prefetched = getattr(self, MAIN_IMAGE_ATTR, None)
+        if prefetched is not None:
+            return prefetched[0] if prefetched else None
+        
+        if 'images' in getattr(self, '_prefetched_objects_cache', {}):
+            active = [img for img in self.images.all() if img.is_active]
+            active.sort(key=lambda img: (not img.is_main, img.order, img.created_at))
+            return active[0] if active else None
+        
         return self.images.filter(is_active=True, is_main=True).first() or self.images.filter(is_active=True).first()
 
 class Clinic(AbstractMedicalFacility):
@@ -786,13 +801,22 @@ class PrivateDoctor(AbstractMedicalFacility):
         """
         return reverse('facilities:private_doctor_detail', kwargs={'slug': self.slug})
 
+    def get_base_slug(self):
+        """
+        Get the slug to start from when allocating a unique one.
+        
+        Returns:
+            str: Transliterated last and first name or 'doctor'
+        """
+        return make_base_slug(f"{self.last_name}-{self.first_name}", fallback='doctor')
+
     def save(self, *args, **kwargs):
         """
         Save the doctor with automatic name and slug generation.
         
         If name is not provided, generates it from first and last name.
         If slug is not provided, generates it from last and first name.
-        Handles slug duplication by adding numeric suffix.
+        A free numeric suffix is found with one query (see core.slugs).
         """
         # Формируем название из имени и фамилии
         if not self.name:
@@ -800,38 +824,76 @@ class PrivateDoctor(AbstractMedicalFacility):
         
         # Формируем базовый слаг из фамилии и имени
         if not self.slug:
-            base_slug = slugify(f"{self.last_name}-{self.first_name}")
-            slug = base_slug
-            
-            # Проверяем, существует ли уже такой слаг
-            counter = 1
-            while PrivateDoctor.objects.filter(Q(slug=slug) & ~Q(pk=self.pk)).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-                
-            self.slug = slug
+            return save_with_unique_slug(
+                self, self.get_base_slug(),
+                lambda: super(PrivateDoctor, self).save(*args, **kwargs)
+            )
             
         super().save(*args, **kwargs)
 
     @property
     def average_rating(self):
         """
-        Calculate the average rating from all reviews.
+        Get the average rating of published reviews.
+        
+        Reads the denormalized aggregate instead of loading reviews.
         
         Returns:
             float: Average rating (0.0 if no reviews)
         """
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+        return float(self.rating_avg)
 
     @property
     def reviews_count(self):
         """
-        Get the total number of reviews.
+        Get the number of published reviews.
         
         Returns:
             int: Number of reviews
         """
-        return self.reviews.count()
+        return self.rating_count
+
+
+class RelatedFacility(models.Model):
+    """
+    Предрассчитанный похожий объект того же типа (клиника, центр или врач).
+    
+    Строки поддерживаются facilities.related: для каждого объекта хранятся
+    лучшие TOP_K соседей по убыванию оценки.
+    """
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        verbose_name=_('Тип контента')
+    )
+    source_id = models.PositiveIntegerField(
+        verbose_name=_('ID объекта')
+    )
+    target_id = models.PositiveIntegerField(
+        verbose_name=_('ID похожего объекта')
+    )
+    score = models.FloatField(
+        verbose_name=_('Оценка сходства')
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name=_('Позиция')
+    )
+
+    class Meta:
+        verbose_name = _('Похожий объект')
+        verbose_name_plural = _('Похожие объекты')
+        ordering = ['content_type', 'source_id', 'rank']
+        unique_together = ['content_type', 'source_id', 'target_id']
+        indexes = [
+            models.Index(fields=['content_type', 'source_id', 'rank'], name='facilities_related_source'),
+            models.Index(fields=['content_type', 'target_id'], name='facilities_related_target'),
+        ]
+
+    def __str__(self):
+        """
+        String representation of the link.
+        
+        Returns:
+            str: Source, target and rank
+        """
+        return f"{self.content_type.model} {self.source_id} -> {self.target_id} (#{self.rank})"
@@ -0,0 +1,448 @@
+"""
+Precomputed related facilities and doctors.
+
+Objects of one model (clinics, rehab centers or private doctors) are
+scored pairwise on the same city or region, shared specializations,
+shared services (FacilityService) and the rating of the candidate. The
+best TOP_K neighbors of every active object are stored in RelatedFacility,
+so detail pages read them with one indexed query (get_related).
+
+Candidates are taken from inverted indexes (city, region, specialization,
+service), so only objects with something in common are scored. When
+objects change, refresh_related() recomputes their own lists and merges
+their new scores into the stored lists of objects that share a feature
+with them; a list is rebuilt from scratch only when a changed neighbor
+drops out of a full list. ``rebuild_related_facilities`` recomputes
+everything.
+
+Refreshing loads the features of the whole model, so it does not run on
+the request thread: changes committed by requests are queued and one
+background thread refreshes them in batches (ASYNC). Queued changes are
+lost if the process exits; the periodic full rebuild picks them up.
+"""
+
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
+
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+
+# Очередь фонового пересчета: модель -> первичные ключи
+_queued = defaultdict(set)
+_queue_lock = threading.Lock()
+_drain_scheduled = False
+_executor = None
+
+
+@dataclass(frozen=True)
+class Features:
+    """Features of an object used for scoring."""
+
+    city_id: int = None
+    region_id: int = None
+    rating: float = 0.0
+    specializations: frozenset = frozenset()
+    services: frozenset = frozenset()
+
+
+def get_related_settings():
+    """
+    Get related objects settings merged with defaults.
+
+    Returns:
+        dict: TOP_K, score weights and ASYNC (refresh after commits in a
+        background thread instead of inline)
+    """
+    options = {
+        'ASYNC': True,
+        'TOP_K': 6,
+        'CITY_WEIGHT': 3.0,
+        'REGION_WEIGHT': 1.0,
+        'SPECIALIZATIONS_WEIGHT': 4.0,
+        'SERVICES_WEIGHT': 3.0,
+        'RATING_WEIGHT': 1.0,
+    }
+    options.update(getattr(settings, 'RELATED_FACILITIES', {}))
+    return options
+
+
+def get_related_models():
+    """
+    Get models with precomputed related objects.
+
+    Returns:
+        list: Model classes
+    """
+    from .models import Clinic, RehabCenter, PrivateDoctor
+
+    return [Clinic, RehabCenter, PrivateDoctor]
+
+
+def _get_models(apps=None):
+    """
+    Get the models used by the index.
+
+    Args:
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        tuple: FacilityService, RelatedFacility and ContentType classes
+    """
+    apps = apps or global_apps
+    return (
+        apps.get_model('medical_services', 'FacilityService'),
+        apps.get_model('facilities', 'RelatedFacility'),
+        apps.get_model('contenttypes', 'ContentType'),
+    )
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityIndex:
+    """
+    Features and inverted indexes of all active objects of a model.
+
+    Args:
+        model: Clinic, RehabCenter or PrivateDoctor class
+        options: Settings from get_related_settings()
+    """
+
+    def __init__(self, model, options=None):
+        self.model = model
+        self.options = options or get_related_settings()
+        self.features = {}
+        self._buckets = defaultdict(set)
+
+    @classmethod
+    def load(cls, model, options=None, apps=None):
+        """
+        Load features of active objects with three queries.
+
+        Returns:
+            SimilarityIndex: Loaded index
+        """
+        FacilityService, _, ContentType = _get_models(apps)
+        index = cls(model, options)
+        rows = model._base_manager.filter(is_active=True).order_by().values_list(
+            'pk', 'city_id', 'city__region_id', 'rating_avg'
+        )
+        specializations = defaultdict(set)
+        if hasattr(model, 'specializations'):
+            through = model.specializations.through
+            m2m_field = model._meta.get_field('specializations')
+            for source, target in through.objects.values_list(
+                f'{m2m_field.m2m_field_name()}_id', f'{m2m_field.m2m_reverse_field_name()}_id'
+            ):
+                specializations[source].add(target)
+        services = defaultdict(set)
+        for object_id, service_id in FacilityService.objects.filter(
+            content_type=ContentType.objects.get_for_model(model), is_active=True
+        ).order_by().values_list('object_id', 'service_id'):
+            services[object_id].add(service_id)
+
+        for pk, city_id, region_id, rating in rows:
+            index.add(pk, Features(
+                city_id, region_id, float(rating or 0),
+                frozenset(specializations.get(pk, ())), frozenset(services.get(pk, ())),
+            ))
+        return index
+
+    def __contains__(self, pk):
+        return pk in self.features
+
+    def _keys(self, features):
+        keys = []
+        if features.city_id:
+            keys.append(('city', features.city_id))
+        if features.region_id:
+            keys.append(('region', features.region_id))
+        keys.extend(('specialization', pk) for pk in features.specializations)
+        keys.extend(('service', pk) for pk in features.services)
+        return keys
+
+    def add(self, pk, features):
+        """Add an object to the index."""
+        self.features[pk] = features
+        for key in self._keys(features):
+            self._buckets[key].add(pk)
+
+    def candidates(self, pk):
+        """Get objects sharing at least one feature with the object."""
+        result = set()
+        for key in self._keys(self.features[pk]):
+            result |= self._buckets[key]
+        result.discard(pk)
+        return result
+
+    def score(self, source, target):
+        """
+        Score how related target is to source.
+
+        Returns:
+            float: 0 if the objects have nothing in common
+        """
+        a, b = self.features[source], self.features[target]
+        options = self.options
+        score = 0.0
+        if a.city_id and a.city_id == b.city_id:
+            score += options['CITY_WEIGHT']
+        elif a.region_id and a.region_id == b.region_id:
+            score += options['REGION_WEIGHT']
+        score += options['SPECIALIZATIONS_WEIGHT'] * _jaccard(a.specializations, b.specializations)
+        score += options['SERVICES_WEIGHT'] * _jaccard(a.services, b.services)
+        if not score:
+            return 0.0
+        return round(score + options['RATING_WEIGHT'] * b.rating / 5, 6)
+
+    def neighbors(self, pk, limit=None):
+        """
+        Get the best related objects.
+
+        Returns:
+            list: (target_pk, score) pairs, best first
+        """
+        scored = ((target, self.score(pk, target)) for target in self.candidates(pk))
+        return heapq.nsmallest(
+            limit or self.options['TOP_K'],
+            ((target, score) for target, score in scored if score > 0),
+            key=_order
+        )
+
+
+def _order(item):
+    """Sort key of (target, score) pairs: best score first, then lower pk."""
+    return -item[1], item[0]
+
+
+def _store(content_type, lists, replace=True, apps=None):
+    """Save lists of the given sources, replacing stored ones."""
+    _, RelatedFacility, _ = _get_models(apps)
+
+    if not lists:
+        return
+    if replace:
+        RelatedFacility.objects.filter(content_type=content_type, source_id__in=list(lists)).delete()
+    RelatedFacility.objects.bulk_create([
+        RelatedFacility(
+            content_type=content_type, source_id=source, target_id=target, score=score, rank=rank
+        )
+        for source, neighbors in lists.items()
+        for rank, (target, score) in enumerate(neighbors)
+    ], batch_size=1000)
+
+
+def rebuild_related(model, apps=None):
+    """
+    Recompute related objects of all objects of a model.
+
+    Args:
+        model: Facility model class
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        int: Number of objects with stored lists
+    """
+    _, RelatedFacility, ContentType = _get_models(apps)
+
+    index = SimilarityIndex.load(model, apps=apps)
+    content_type = ContentType.objects.get_for_model(model)
+    lists = {pk: index.neighbors(pk) for pk in index.features}
+    with transaction.atomic():
+        RelatedFacility.objects.filter(content_type=content_type).delete()
+        _store(
+            content_type, {pk: neighbors for pk, neighbors in lists.items() if neighbors},
+            replace=False, apps=apps,
+        )
+    return sum(1 for neighbors in lists.values() if neighbors)
+
+
+def refresh_related(model, pks):
+    """
+    Update related objects after objects of a model changed.
+
+    Args:
+        model: Facility model class
+        pks: Primary keys of changed (or deleted) objects
+    """
+    _, RelatedFacility, ContentType = _get_models()
+
+    changed = set(pks)
+    if not changed:
+        return
+    index = SimilarityIndex.load(model)
+    top_k = index.options['TOP_K']
+    content_type = ContentType.objects.get_for_model(model)
+    links = RelatedFacility.objects.filter(content_type=content_type)
+
+    affected = set(
+        links.filter(target_id__in=changed).values_list('source_id', flat=True)
+    )
+    for pk in changed & index.features.keys():
+        affected |= index.candidates(pk)
+    affected -= changed
+
+    stored = defaultdict(list)
+    for source, target, score in links.filter(source_id__in=affected).values_list(
+        'source_id', 'target_id', 'score'
+    ).order_by('source_id', 'rank'):
+        stored[source].append((target, score))
+
+    lists = {pk: index.neighbors(pk) if pk in index else [] for pk in changed}
+    for source in affected:
+        old = stored.get(source, [])
+        if source not in index:
+            lists[source] = []
+            continue
+        new_scores = {pk: index.score(source, pk) for pk in changed if pk in index}
+        # Измененный сосед в полном списке потерял оценку: за пределами
+        # списка может быть объект лучше, список пересчитывается целиком
+        if len(old) >= top_k and any(
+            target in changed and new_scores.get(target, 0) < score for target, score in old
+        ):
+            neighbors = index.neighbors(source)
+        else:
+            merged = [(target, score) for target, score in old if target not in changed]
+            merged += [(pk, score) for pk, score in new_scores.items() if score > 0]
+            neighbors = sorted(merged, key=_order)[:top_k]
+        if neighbors != old:
+            lists[source] = neighbors
+
+    with transaction.atomic():
+        _store(content_type, lists)
+
+
+def schedule_related_refresh(model, pks):
+    """
+    Refresh related objects after the current transaction commits.
+
+    Changes made in one transaction (e.g. a doctor and its specializations
+    saved from the admin) are refreshed together.
+    """
+    pending = getattr(_pending, 'models', None)
+    if pending is None:
+        pending = _pending.models = defaultdict(set)
+    pending[model].update(pks)
+    transaction.on_commit(_run_pending_refresh)
+
+
+def _run_pending_refresh():
+    pending, _pending.models = getattr(_pending, 'models', None), None
+    if not pending:
+        return
+    if not get_related_settings()['ASYNC']:
+        for model, pks in pending.items():
+            refresh_related(model, pks)
+        return
+    enqueue_related_refresh(pending)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='related-refresh')
+    return _executor
+
+
+def enqueue_related_refresh(pending):
+    """
+    Queue changed objects for the background refresh.
+
+    Changes queued while a batch is running are merged and refreshed by
+    the next batch, so a burst of saves loads each model once.
+
+    Args:
+        pending: Mapping of model class to changed primary keys
+    """
+    global _drain_scheduled
+    with _queue_lock:
+        for model, pks in pending.items():
+            _queued[model].update(pks)
+        if _drain_scheduled:
+            return
+        _drain_scheduled = True
+        try:
+            _get_executor().submit(_drain_queue)
+        except Exception:
+            # Пул остановлен: следующий вызов попробует снова
+            _drain_scheduled = False
+            raise
+
+
+def _drain_queue():
+    global _drain_scheduled
+    finished = False
+    try:
+        while True:
+            with _queue_lock:
+                batch = dict(_queued)
+                _queued.clear()
+                if not batch:
+                    _drain_scheduled = False
+                    finished = True
+                    return
+            for model, pks in batch.items():
+                try:
+                    refresh_related(model, pks)
+                except Exception:
+                    # Ошибка одной модели не останавливает обработку очереди
+                    logger.exception('Failed to refresh related objects of %s', model._meta.label)
+    finally:
+        if not finished:
+            # Без сброса флага новые изменения больше не попадут в обработку
+            with _queue_lock:
+                _drain_scheduled = False
+        # Соединения потока-обработчика не закрываются обработчиком запросов
+        connections.close_all()
+
+
+def wait_for_related_refresh():
+    """Block until queued background refreshes finish (for commands and tests)."""
+    while True:
+        with _queue_lock:
+            if not _drain_scheduled:
+                return
+            executor = _get_executor()
+        executor.submit(lambda: None).result()
+
+
+def get_related(obj, limit=None, queryset=None):
+    """
+    Get precomputed related objects of an object.
+
+    Args:
+        obj: Facility or doctor instance
+        limit: Maximum number of objects
+        queryset: Base queryset of the model (active objects by default)
+
+    Returns:
+        QuerySet: Related objects in the order of relevance
+    """
+    _, RelatedFacility, ContentType = _get_models()
+
+    model = type(obj)
+    if queryset is None:
+        queryset = model.objects.all()
+    links = RelatedFacility.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), source_id=obj.pk
+    )
+    related = queryset.filter(
+        is_active=True, pk__in=links.values('target_id')
+    ).annotate(
+        related_rank=Subquery(links.filter(target_id=OuterRef('pk')).values('rank')[:1])
+    ).order_by('related_rank')
+    return related[:limit] if limit else related
@@ -0,0 +1,597 @@
+"""
+Full-text search over facilities.
+
+The search backend keeps an index of clinics, rehabilitation centers and
+private doctors and returns ranked ids for a query:
+
+- SQLiteFTSBackend: FTS5 virtual table with BM25 ranking. SQLite has no
+  Russian morphology, so documents and queries are stemmed in Python
+  (core.text.russian_stem).
+- PostgresSearchBackend: tsvector table with the 'russian' configuration,
+  GIN index and ts_rank ordering.
+- ContainsSearchBackend: icontains filtering without an index, used for
+  other databases.
+
+Querysets are filtered and ranked inside the database (a subquery on the
+index table), so pagination counts and slices all matching rows.
+
+The index tables are created and filled by migration 0004_search_index and
+kept up to date from facility signals (see facilities.signals). The whole
+index can be rebuilt with ``python manage.py rebuild_search_index``.
+
+Doctor names also have a typo-tolerant trigram search (doctor_name_search,
+see core.trigram); its hits are merged with the full-text hits.
+
+Settings (all optional)::
+
+    FACILITY_SEARCH = {
+        'BACKEND': 'facilities.search.SQLiteFTSBackend',
+        'POSTGRES_CONFIG': 'russian',
+    }
+"""
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Expression, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from core.mixins import SearchMixin
+from core.text import normalize_text, russian_stem, stem_tokens, tokenize
+from core.trigram import NameSearch
+
+
+SEARCH_KINDS = {
+    'clinic': 1,
+    'rehab': 2,
+    'private_doctor': 3,
+}
+
+# Ranking weights of document columns: title, keywords, body
+TITLE_WEIGHT = 10.0
+KEYWORDS_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+# Ранг строк, найденных только по ФИО: BM25 и -ts_rank не больше нуля
+UNRANKED = 1.0
+
+doctor_name_search = NameSearch('facilities.PrivateDoctor')
+
+DEFAULT_BACKENDS = {
+    'sqlite': 'facilities.search.SQLiteFTSBackend',
+    'postgresql': 'facilities.search.PostgresSearchBackend',
+}
+
+
+def get_search_settings():
+    """
+    Get search settings merged with defaults.
+
+    Returns:
+        dict: Search settings
+    """
+    options = {
+        'BACKEND': DEFAULT_BACKENDS.get(connection.vendor, 'facilities.search.ContainsSearchBackend'),
+        'POSTGRES_CONFIG': 'russian',
+    }
+    options.update(getattr(settings, 'FACILITY_SEARCH', {}))
+    return options
+
+
+INDEXED_MODELS = {
+    'facilities.clinic': 'clinic',
+    'facilities.rehabcenter': 'rehab',
+    'facilities.privatedoctor': 'private_doctor',
+}
+
+
+def get_search_kind(model):
+    """
+    Get the search kind key of a facility model.
+
+    Args:
+        model: Clinic, RehabCenter or PrivateDoctor class (a historical
+            model from migrations as well)
+
+    Returns:
+        str: Kind key or None if the model is not indexed
+    """
+    # Модели сравниваются по метке: в миграциях классы исторические
+    return INDEXED_MODELS.get(model._meta.label_lower) if model is not None else None
+
+
+def get_indexed_models(apps=None):
+    """
+    Get facility models stored in the search index.
+
+    Args:
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        list: Model classes
+    """
+    if apps is None:
+        from django.apps import apps
+
+    return [apps.get_model(label) for label in INDEXED_MODELS]
+
+
+def build_search_document(obj):
+    """
+    Build the searchable text of a facility.
+
+    Args:
+        obj: Facility instance
+
+    Returns:
+        dict: Texts of 'title', 'keywords' and 'body' columns
+    """
+    keywords = []
+    if obj.city_id:
+        keywords.append(obj.city.name)
+        if obj.city.region_id:
+            keywords.append(obj.city.region.name)
+    if get_search_kind(type(obj)) == 'private_doctor':
+        # Как PrivateDoctor.get_full_name(): у исторических моделей нет методов
+        keywords.append(' '.join(filter(None, (obj.last_name, obj.first_name, obj.middle_name))))
+        if obj.pk:
+            keywords.extend(s.name for s in obj.specializations.all())
+
+    return {
+        'title': normalize_text(obj.name),
+        'keywords': normalize_text(' '.join(keywords)),
+        'body': normalize_text(f'{obj.description or ""} {obj.address or ""}'),
+    }
+
+
+class SearchRank(Expression):
+    """
+    Relevance of a row as a correlated subquery on the search index.
+
+    Args:
+        sql: Subquery SQL with a ``{pk}`` placeholder for the row primary
+            key; the placeholder goes after all other parameters
+        params: Parameters of the subquery
+    """
+
+    output_field = FloatField()
+
+    def __init__(self, sql, params):
+        super().__init__()
+        self.sql = sql
+        self.params = list(params)
+        self.pk = F('pk')
+
+    def get_source_expressions(self):
+        return [self.pk]
+
+    def set_source_expressions(self, exprs):
+        self.pk, = exprs
+
+    def as_sql(self, compiler, connection):
+        pk_sql, pk_params = compiler.compile(self.pk)
+        return f'({self.sql.format(pk=pk_sql)})', [*self.params, *pk_params]
+
+
+def rank_ordering(annotations):
+    """
+    Get the ordering of search results by the rank annotations present.
+
+    Args:
+        annotations: Names of annotations set by the search
+            (``search_rank``, ``name_similarity``)
+
+    Returns:
+        list: order_by() field names, usable by keyset pagination
+    """
+    ordering = []
+    if 'search_rank' in annotations:
+        ordering.append('search_rank')
+    if 'name_similarity' in annotations:
+        ordering.append('-name_similarity')
+    return [*ordering, 'pk']
+
+
+class BaseSearchBackend:
+    """
+    Base class of facility search backends.
+
+    Subclasses implement index(), remove(), clear(), match_sql() and
+    rank_sql().
+    """
+
+    def __init__(self, options=None):
+        self.options = options or get_search_settings()
+
+    def index(self, objects):
+        """
+        Add or replace facilities in the index.
+
+        Args:
+            objects: Iterable of facility instances
+        """
+        raise NotImplementedError
+
+    def remove(self, model, pks):
+        """
+        Remove facilities from the index.
+
+        Args:
+            model: Facility model class
+            pks: Iterable of primary keys
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all documents from the index."""
+        raise NotImplementedError
+
+    def match_sql(self, model, query):
+        """
+        Build SQL selecting ids of facilities matching the query.
+
+        Args:
+            model: Facility model class
+            query: Search string
+
+        Returns:
+            tuple: (sql, params), or None if the query has no searchable words
+        """
+        raise NotImplementedError
+
+    def rank_sql(self, model, query):
+        """
+        Build SQL computing the rank of one facility (lower is better).
+
+        Args:
+            model: Facility model class
+            query: Search string
+
+        Returns:
+            tuple: (sql, params) for SearchRank, or None if the query has no
+            searchable words
+        """
+        raise NotImplementedError
+
+    def search_ids(self, model, query, limit=None):
+        """
+        Get ids of facilities matching the query, best first.
+
+        Args:
+            model: Facility model class
+            query: Search string
+            limit: Maximum number of ids (all by default)
+
+        Returns:
+            list: Primary keys ordered by relevance
+        """
+        queryset = self.filter(model._default_manager.all(), query)
+        return list(queryset.values_list('pk', flat=True)[:limit])
+
+    def filter(self, queryset, query, order_by_rank=True, name_search=None):
+        """
+        Filter a queryset by the search query.
+
+        Matching rows are annotated with ``search_rank`` (lower is better),
+        so the ordering can be used by keyset pagination. Filtering and
+        ranking run in the database: counts and pages cover all matches.
+
+        With ``name_search`` rows whose names are similar to the query
+        (misspelled surnames) are matched too and annotated with
+        ``name_similarity``: full-text hits come first, by rank and then
+        by name similarity, followed by name-only hits.
+
+        Args:
+            queryset: QuerySet of an indexed facility model
+            query: Search string
+            order_by_rank: Order results by relevance
+            name_search: core.trigram.NameSearch of the model, optional
+
+        Returns:
+            QuerySet: Filtered queryset
+        """
+        condition, annotations = Q(), {}
+        match = self.match_sql(queryset.model, query)
+        if match is not None:
+            condition |= Q(pk__in=RawSQL(*match))
+            annotations['search_rank'] = Coalesce(
+                SearchRank(*self.rank_sql(queryset.model, query)), Value(UNRANKED)
+            )
+        names = name_search.match(query) if name_search is not None else None
+        if names is not None:
+            condition |= names[0]
+            annotations['name_similarity'] = Coalesce(names[1], Value(0.0))
+        if not annotations:
+            return queryset.none()
+
+        queryset = queryset.filter(condition).annotate(**annotations)
+        if order_by_rank:
+            queryset = queryset.order_by(*rank_ordering(annotations))
+        return queryset
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    """
+    Backend without an index: icontains over name, description and address.
+    """
+
+    def index(self, objects):
+        pass
+
+    def remove(self, model, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def filter(self, queryset, query, order_by_rank=True, name_search=None):
+        q_objects = Q(name__icontains=query) | Q(description__icontains=query) | Q(address__icontains=query)
+        is_doctor = get_search_kind(queryset.model) == 'private_doctor'
+        if is_doctor:
+            q_objects |= (
+                Q(first_name__icontains=query) |
+                Q(last_name__icontains=query) |
+                Q(middle_name__icontains=query) |
+                Q(specializations__name__icontains=query) |
+                Q(city__name__icontains=query)
+            )
+        names = name_search.match(query) if name_search is not None else None
+        if names is not None:
+            queryset = queryset.filter(q_objects | names[0]).annotate(
+                name_similarity=Coalesce(names[1], Value(0.0))
+            )
+            if order_by_rank:
+                queryset = queryset.order_by(*rank_ordering(['name_similarity']))
+        else:
+            queryset = queryset.filter(q_objects)
+        return queryset.distinct() if is_doctor else queryset
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 backend with Python-side Russian stemming and BM25 ranking.
+
+    The row id encodes the facility: ``pk * 4 + kind code``, so a document
+    is replaced or removed by its rowid without a scan.
+    """
+
+    table = 'facilities_search_fts'
+
+    @staticmethod
+    def _rowid(kind, pk):
+        return pk * 4 + SEARCH_KINDS[kind]
+
+    @staticmethod
+    def _stemmed(text):
+        # Original words are kept next to stems: the stemmer cuts some forms
+        # shorter than the query stem (e.g. surnames 'сидоров' -> 'сидор')
+        tokens = tokenize(text)
+        stems = [russian_stem(token) for token in tokens]
+        return ' '.join(stems + [token for token, stem in zip(tokens, stems) if token != stem])
+
+    def index(self, objects):
+        rows = []
+        for obj in objects:
+            kind = get_search_kind(type(obj))
+            document = build_search_document(obj)
+            rows.append((
+                self._rowid(kind, obj.pk),
+                kind,
+                self._stemmed(document['title']),
+                self._stemmed(document['keywords']),
+                self._stemmed(document['body']),
+            ))
+        if not rows:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, kind, title, keywords, body) VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+
+    def remove(self, model, pks):
+        kind = get_search_kind(model)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(self._rowid(kind, pk),) for pk in pks]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    @staticmethod
+    def _match(query):
+        stems = stem_tokens(query)
+        # Every stem is matched as a prefix, so incomplete words also match
+        return ' AND '.join(f'"{stem}"*' for stem in stems) if stems else None
+
+    def match_sql(self, model, query):
+        match = self._match(query)
+        if match is None:
+            return None
+        return (
+            f'SELECT rowid / 4 FROM {self.table} WHERE {self.table} MATCH %s AND kind = %s',
+            [match, get_search_kind(model)],
+        )
+
+    def rank_sql(self, model, query):
+        match = self._match(query)
+        if match is None:
+            return None
+        # Поиск по rowid документа: FTS5 не перебирает все совпадения
+        return (
+            f'SELECT bm25({self.table}, 0.0, %s, %s, %s) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = %s + {{pk}} * 4',
+            [TITLE_WEIGHT, KEYWORDS_WEIGHT, BODY_WEIGHT, match, SEARCH_KINDS[get_search_kind(model)]],
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL backend: weighted tsvector documents and ts_rank ordering.
+    """
+
+    table = 'facilities_search_index'
+
+    @property
+    def config(self):
+        return self.options['POSTGRES_CONFIG']
+
+    def index(self, objects):
+        rows = []
+        for obj in objects:
+            document = build_search_document(obj)
+            rows.append((
+                get_search_kind(type(obj)), obj.pk,
+                self.config, document['title'],
+                self.config, document['keywords'],
+                self.config, document['body'],
+            ))
+        if not rows:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (kind, object_id, document) VALUES (%s, %s, '
+                f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'C')) "
+                f'ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def remove(self, model, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE kind = %s AND object_id = ANY(%s)',
+                [get_search_kind(model), list(pks)]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    @staticmethod
+    def _tsquery(query):
+        tokens = tokenize(query)
+        return ' & '.join(f'{token}:*' for token in tokens) if tokens else None
+
+    def match_sql(self, model, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return None
+        return (
+            f'SELECT object_id FROM {self.table} '
+            f'WHERE kind = %s AND document @@ to_tsquery(%s::regconfig, %s)',
+            [get_search_kind(model), self.config, tsquery],
+        )
+
+    def rank_sql(self, model, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return None
+        return (
+            f'SELECT -ts_rank(document, to_tsquery(%s::regconfig, %s)) FROM {self.table} '
+            f'WHERE kind = %s AND object_id = {{pk}}',
+            [self.config, tsquery, get_search_kind(model)],
+        )
+
+
+def get_search_backend():
+    """
+    Get the configured search backend.
+
+    Returns:
+        BaseSearchBackend: Backend instance
+    """
+    options = get_search_settings()
+    return import_string(options['BACKEND'])(options)
+
+
+class FullTextSearchMixin(SearchMixin):
+    """
+    SearchMixin that filters with the full-text search backend.
+
+    Results are ordered by relevance unless the ``sort`` parameter is set.
+    If ``name_search`` is set, names similar to the query (misspelled
+    surnames) are found too and ranked after the full-text hits.
+    """
+
+    name_search = None
+
+    def filter_search(self, queryset, search_query):
+        """
+        Filter queryset with the search backend.
+
+        Args:
+            queryset: QuerySet of an indexed facility model
+            search_query: Non-empty search query
+
+        Returns:
+            QuerySet: Matching facilities
+        """
+        return get_search_backend().filter(
+            queryset, search_query,
+            order_by_rank=not self.request.GET.get('sort'),
+            name_search=self.name_search,
+        )
+
+
+def index_facilities(objects):
+    """
+    Add or replace facilities in the search index.
+
+    Args:
+        objects: Iterable of facility instances
+    """
+    get_search_backend().index(objects)
+
+
+def remove_facilities(model, pks):
+    """
+    Remove facilities from the search index.
+
+    Args:
+        model: Facility model class
+        pks: Iterable of primary keys
+    """
+    get_search_backend().remove(model, pks)
+
+
+def rebuild_search_index(batch_size=500, apps=None):
+    """
+    Rebuild the whole search index.
+
+    Args:
+        batch_size: Number of facilities indexed per batch
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        dict: Number of indexed facilities per model
+    """
+    backend = get_search_backend()
+    backend.clear()
+
+    counts = {}
+    for model in get_indexed_models(apps):
+        queryset = model._default_manager.select_related('city', 'city__region').order_by('pk')
+        if get_search_kind(model) == 'private_doctor':
+            queryset = queryset.prefetch_related('specializations')
+
+        batch = []
+        counts[model] = 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                backend.index(batch)
+                counts[model] += len(batch)
+                batch = []
+        if batch:
+            backend.index(batch)
+            counts[model] += len(batch)
+    return counts
@@ -0,0 +1,176 @@
+"""
+Сигналы приложения facilities.
+
+Кэш карточек учреждений (facilities.card_cache) версионируется полем
+updated_at. Изменения связанных данных, которые видны на карточке
+(изображения, специализации, город, тип организации врача), обновляют
+updated_at учреждения, чтобы карточка была перерисована.
+
+Те же сигналы поддерживают полнотекстовый индекс (facilities.search):
+документ учреждения обновляется при его сохранении и при изменении
+специализаций, города или региона.
+
+Похожие объекты (facilities.related) пересчитываются в фоновом потоке
+после фиксации транзакции при изменении учреждения, его услуг или
+специализаций врача.
+
+Счетчики фильтров списка врачей (core.facets) сбрасываются при изменении
+врачей, их специализаций и городов.
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.facets import invalidate_facets
+from core.models import City, Region
+from medical_services.models import FacilityService
+from staff.models import Specialization
+from .models import Clinic, RehabCenter, PrivateDoctor, FacilityImage, OrganizationType
+from .related import schedule_related_refresh
+from .search import index_facilities, remove_facilities
+
+
+CARD_MODELS = (Clinic, RehabCenter, PrivateDoctor)
+
+DOCTOR_FACETS = PrivateDoctor._meta.label_lower
+
+
+def touch_facilities(model, **filters):
+    """Обновляет updated_at учреждений без вызова save() и сигналов."""
+    model.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def refresh_facilities(model, **filters):
+    """Обновляет updated_at и поисковые документы учреждений."""
+    touch_facilities(model, **filters)
+    queryset = model.objects.filter(**filters).select_related('city', 'city__region')
+    if model is PrivateDoctor:
+        queryset = queryset.prefetch_related('specializations')
+    index_facilities(queryset)
+
+
+@receiver(post_save, sender=Clinic)
+@receiver(post_save, sender=RehabCenter)
+@receiver(post_save, sender=PrivateDoctor)
+def index_facility_on_save(sender, instance, raw=False, **kwargs):
+    """Обновляет поисковый документ учреждения после сохранения."""
+    if raw:
+        return
+    index_facilities([instance])
+
+
+@receiver(post_delete, sender=Clinic)
+@receiver(post_delete, sender=RehabCenter)
+@receiver(post_delete, sender=PrivateDoctor)
+def remove_facility_on_delete(sender, instance, **kwargs):
+    """Удаляет поисковый документ удаленного учреждения."""
+    remove_facilities(sender, [instance.pk])
+
+
+@receiver(post_save, sender=FacilityImage)
+@receiver(post_delete, sender=FacilityImage)
+def touch_facility_on_image_change(sender, instance, **kwargs):
+    """Сбрасывает карточку учреждения при изменении его изображений."""
+    model = instance.content_type.model_class() if instance.content_type_id else None
+    if model in CARD_MODELS:
+        touch_facilities(model, pk=instance.object_id)
+
+
+@receiver(post_save, sender=OrganizationType)
+def touch_doctors_on_organization_type_change(sender, instance, created, raw=False, **kwargs):
+    """Сбрасывает карточки врачей при изменении типа организации."""
+    if created or raw:
+        return
+    # Название типа выводится только на карточке врача
+    touch_facilities(PrivateDoctor, organization_type=instance)
+
+
+@receiver(m2m_changed, sender=PrivateDoctor.specializations.through)
+def refresh_doctor_on_specializations_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет карточки и поисковые документы врачей при изменении специализаций."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_facilities(PrivateDoctor, pk=instance.pk)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        refresh_facilities(PrivateDoctor, pk__in=pk_set)
+    elif action == 'pre_clear':
+        # После очистки связей затронутых врачей уже не найти
+        instance._cleared_doctor_ids = list(
+            PrivateDoctor.objects.filter(specializations=instance).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        refresh_facilities(PrivateDoctor, pk__in=getattr(instance, '_cleared_doctor_ids', []))
+
+
+@receiver(post_save, sender=Specialization)
+def refresh_doctors_on_specialization_change(sender, instance, created, raw=False, **kwargs):
+    """Обновляет карточки и поисковые документы врачей при изменении специализации."""
+    if created or raw:
+        return
+    refresh_facilities(PrivateDoctor, specializations=instance)
+
+
+@receiver(post_save, sender=City)
+def refresh_facilities_on_city_change(sender, instance, created, raw=False, **kwargs):
+    """Обновляет карточки и поисковые документы учреждений города."""
+    if created or raw:
+        return
+    for model in CARD_MODELS:
+        refresh_facilities(model, city=instance)
+
+
+@receiver(post_save, sender=Region)
+def refresh_facilities_on_region_change(sender, instance, created, raw=False, **kwargs):
+    """Обновляет карточки и поисковые документы учреждений региона."""
+    if created or raw:
+        return
+    for model in CARD_MODELS:
+        refresh_facilities(model, city__region=instance)
+
+
+@receiver(post_save, sender=PrivateDoctor)
+@receiver(post_delete, sender=PrivateDoctor)
+@receiver(m2m_changed, sender=PrivateDoctor.specializations.through)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_doctor_facets(sender, raw=False, action=None, **kwargs):
+    """Сбрасывает счетчики фильтров списка врачей."""
+    if raw or action not in (None, 'post_add', 'post_remove', 'post_clear'):
+        return
+    invalidate_facets(DOCTOR_FACETS)
+
+
+@receiver(post_save, sender=Clinic)
+@receiver(post_save, sender=RehabCenter)
+@receiver(post_save, sender=PrivateDoctor)
+@receiver(post_delete, sender=Clinic)
+@receiver(post_delete, sender=RehabCenter)
+@receiver(post_delete, sender=PrivateDoctor)
+def refresh_related_on_facility_change(sender, instance, raw=False, **kwargs):
+    """Пересчитывает похожие объекты после изменения или удаления учреждения."""
+    if not raw:
+        schedule_related_refresh(sender, [instance.pk])
+
+
+@receiver(post_save, sender=FacilityService)
+@receiver(post_delete, sender=FacilityService)
+def refresh_related_on_service_change(sender, instance, raw=False, **kwargs):
+    """Пересчитывает похожие объекты после изменения услуг учреждения."""
+    model = instance.content_type.model_class() if instance.content_type_id else None
+    if not raw and model in CARD_MODELS:
+        schedule_related_refresh(model, [instance.object_id])
+
+
+@receiver(m2m_changed, sender=PrivateDoctor.specializations.through)
+def refresh_related_on_specializations_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Пересчитывает похожих врачей после изменения специализаций."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_related_refresh(PrivateDoctor, [instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        schedule_related_refresh(PrivateDoctor, pk_set)
+    elif action == 'post_clear':
+        schedule_related_refresh(PrivateDoctor, getattr(instance, '_cleared_doctor_ids', []))
@@ -0,0 +1,125 @@
+"""
+Тесты кэша отрендеренных карточек учреждений.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.contenttypes.models import ContentType
+from facilities.models import Clinic, PrivateDoctor, FacilityImage, OrganizationType
+from facilities.card_cache import (
+    card_cache_key, render_cards, get_card_cache_stats, reset_card_cache_stats
+)
+from staff.models import Specialization
+from core.models import Region, City
+
+
+class CardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_card_cache_stats()
+        self.region = Region.objects.create(name='Регион карточек', slug='card-region')
+        self.city = City.objects.create(name='Город карточек', slug='card-city', region=self.region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic-card', description='Медицинская клиника')
+        self.clinic = Clinic.objects.create(
+            name='Клиника карточек', slug='clinic-card', city=self.city, organization_type=self.organization_type)
+        self.doctor = PrivateDoctor.objects.create(
+            name='Доктор карточек', slug='doctor-card', city=self.city, organization_type=self.organization_type,
+            first_name='Пётр', last_name='Карточкин', experience_years=7)
+        self.specialization = Specialization.objects.create(
+            name='Кардиология', slug='cardiology-card')
+
+    def test_cards_rendered_once(self):
+        """Повторный рендер берёт карточки из кэша"""
+        first = render_cards([self.clinic, self.doctor])
+        second = render_cards([self.clinic, self.doctor])
+        self.assertEqual(first, second)
+        self.assertIn('Клиника карточек', first[0])
+        stats = get_card_cache_stats()
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_cached_page_does_not_render(self):
+        """Закэшированная страница не выполняет запросов при рендере карточек"""
+        clinic = Clinic.objects.get(pk=self.clinic.pk)
+        render_cards([clinic])
+        clinic = Clinic.objects.get(pk=self.clinic.pk)
+        with self.assertNumQueries(0):
+            render_cards([clinic])
+
+    def test_image_change_invalidates_card(self):
+        """Добавление изображения обновляет версию карточки"""
+        key = card_cache_key(self.clinic)
+        render_cards([self.clinic])
+        FacilityImage.objects.create(
+            content_type=ContentType.objects.get_for_model(Clinic),
+            object_id=self.clinic.id,
+            image='card.jpg',
+            is_main=True
+        )
+        self.clinic.refresh_from_db()
+        self.assertNotEqual(card_cache_key(self.clinic), key)
+        self.assertIn('card.jpg', render_cards([self.clinic])[0])
+
+    def test_specialization_change_invalidates_card(self):
+        """Изменение специализаций врача обновляет версию карточки"""
+        key = card_cache_key(self.doctor)
+        self.doctor.specializations.add(self.specialization)
+        self.doctor.refresh_from_db()
+        self.assertNotEqual(card_cache_key(self.doctor), key)
+        self.assertIn('Кардиология', render_cards([self.doctor])[0])
+
+    def test_city_change_invalidates_card(self):
+        """Переименование города обновляет версию карточки"""
+        key = card_cache_key(self.clinic)
+        self.city.name = 'Новый город'
+        self.city.save()
+        self.clinic.refresh_from_db()
+        self.assertNotEqual(card_cache_key(self.clinic), key)
+
+    def test_organization_type_change_invalidates_doctor_card(self):
+        """Переименование типа организации обновляет карточку врача"""
+        FacilityImage.objects.create(
+            content_type=ContentType.objects.get_for_model(PrivateDoctor),
+            object_id=self.doctor.id,
+            image='doctor.jpg',
+            is_main=True
+        )
+        self.doctor.refresh_from_db()
+        key = card_cache_key(self.doctor)
+        self.organization_type.name = 'Частная практика'
+        self.organization_type.save()
+        self.doctor.refresh_from_db()
+        self.assertNotEqual(card_cache_key(self.doctor), key)
+        self.assertIn('Частная практика', render_cards([self.doctor])[0])
+
+    def test_card_without_derivatives_cached_briefly(self):
+        """Карточка без производных изображения хранится недолго"""
+        FacilityImage.objects.create(
+            content_type=ContentType.objects.get_for_model(Clinic),
+            object_id=self.clinic.id,
+            image='pending.jpg',
+            is_main=True
+        )
+        self.clinic.refresh_from_db()
+        with mock.patch('facilities.card_cache.cache', wraps=cache) as shared:
+            render_cards([self.clinic])
+        shared.set_many.assert_called_once_with(mock.ANY, 60)
+
+        cache.clear()
+        manifest = {'fallback': 'jpeg', 'sources': {'jpeg': [[320, 'pending.w320.jpg']]}}
+        with mock.patch('facilities.card_cache.cache', wraps=cache) as shared, \
+                mock.patch('facilities.card_cache.get_manifest', return_value=manifest):
+            render_cards([self.clinic])
+        shared.set_many.assert_called_once_with(mock.ANY, 60 * 60 * 24)
+
+    def test_list_and_load_more_use_cache(self):
+        """Список и подгрузка используют одни и те же карточки"""
+        response = self.client.get(reverse('facilities:clinic_list'))
+        self.assertContains(response, 'Клиника карточек')
+        response = self.client.get(reverse('facilities:load_more_clinics'), {'offset': 0})
+        self.assertIn('Клиника карточек', response.json()['cards'])
+        self.assertEqual(get_card_cache_stats()['hits'], 1)
@@ -10,10 +10,14 @@
 - Работу с изображениями
 """
 
+from datetime import timedelta
+
 from django.test import TestCase, Client
+from django.utils import timezone
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from facilities.models import Clinic, RehabCenter, OrganizationType, Review, FacilityImage
+from facilities.catalog import catalog_queryset
 from core.models import Region, City
 from django.contrib.auth import get_user_model
 
@@ -291,4 +295,66 @@ class CatalogViewsTest(TestCase):
         self.assertTrue(self.clinic.images.filter(is_main=True).exists())
         main_image = self.clinic.images.get(is_main=True)
         self.assertTrue(main_image.image.name.endswith('.gif'))
-        self.assertEqual(main_image.title, 'Главное фото') 
\ No newline at end of file
+        self.assertEqual(main_image.title, 'Главное фото') 
+
+    def test_unified_catalog_view(self):
+        """
+        Тест общего каталога учреждений.
+        
+        Проверяет, что клиники и центры выводятся одним списком,
+        а фильтрация по типу и поиск выполняются в запросе.
+        """
+        FacilityImage.objects.create(
+            facility=self.rehab,
+            image='facilities/images/rehab.jpg',
+            title='Фото центра',
+            is_main=True
+        )
+        
+        response = self.client.get(reverse('facilities:list'))
+        self.assertEqual(response.status_code, 200)
+        facilities = response.context['facilities']
+        self.assertEqual([f.name for f in facilities], ['Тестовая клиника', 'Тестовый центр'])
+        self.assertEqual(facilities[1].main_image.image.name, 'facilities/images/rehab.jpg')
+        self.assertIsNone(facilities[0].main_image)
+        
+        response = self.client.get(reverse('facilities:list'), {'type': 'rehab'})
+        self.assertEqual([f.pk for f in response.context['facilities']], [self.rehab.pk])
+        
+        response = self.client.get(reverse('facilities:list'), {'search': 'клиника'})
+        self.assertEqual([f.pk for f in response.context['facilities']], [self.clinic.pk])
+
+    def test_unified_catalog_pagination(self):
+        """
+        Тест постраничного вывода общего каталога на уровне БД.
+        """
+        for i in range(13):
+            Clinic.objects.create(
+                name=f'Клиника {i:02d}',
+                slug=f'catalog-clinic-{i}',
+                organization_type=self.clinic_type,
+                city=self.city,
+                is_featured=(i == 12)
+            )
+        
+        response = self.client.get(reverse('facilities:list'))
+        self.assertEqual(response.context['paginator'].count, 15)
+        self.assertEqual(len(response.context['facilities']), 12)
+        # Приоритетные учреждения выводятся первыми
+        self.assertEqual(response.context['facilities'][0].name, 'Клиника 12')
+        
+        response = self.client.get(reverse('facilities:list'), {'page': 2})
+        self.assertEqual(len(response.context['facilities']), 3)
+
+    def test_unified_catalog_new_ordering(self):
+        """
+        Тест сортировки общего каталога по новизне.
+        
+        Id разных таблиц не сравнимы, поэтому порядок задает дата создания.
+        """
+        Clinic.objects.filter(pk=self.clinic.pk).update(created_at=timezone.now() - timedelta(days=1))
+        rows = catalog_queryset(ordering='new')
+        self.assertEqual(
+            [(row['facility_type'], row['facility_id']) for row in rows],
+            [('rehab', self.rehab.pk), ('clinic', self.clinic.pk)]
+        )
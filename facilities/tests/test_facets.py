@@ -0,0 +1,119 @@
+"""
+Тесты счетчиков фильтров списка частных врачей.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.facets import facet_signature
+from core.models import Region, City
+from facilities.models import PrivateDoctor, OrganizationType
+from staff.models import Specialization
+
+
+@override_settings(PAGE_CACHE={'ENABLED': False})
+class DoctorFacetsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        region = Region.objects.create(name='Московская область', slug='facets-region')
+        self.moscow = City.objects.create(name='Москва', slug='moscow', region=region)
+        self.tula = City.objects.create(name='Тула', slug='tula', region=region)
+        organization_type = OrganizationType.objects.create(
+            name='Частный врач', slug='facets-doctor', description='Врач')
+        self.narcology = Specialization.objects.create(name='Наркология', slug='narcology')
+        self.psychiatry = Specialization.objects.create(name='Психиатрия', slug='psychiatry')
+
+        def doctor(slug, city, specializations, home_visits):
+            obj = PrivateDoctor.objects.create(
+                slug=slug, first_name='Иван', last_name=slug, experience_years=5,
+                city=city, home_visits=home_visits, organization_type=organization_type)
+            obj.specializations.set(specializations)
+            return obj
+
+        self.first = doctor('first', self.moscow, [self.narcology, self.psychiatry], True)
+        doctor('second', self.moscow, [self.narcology], False)
+        doctor('third', self.tula, [self.psychiatry], True)
+
+    def _facets(self, **params):
+        response = self.client.get(reverse('facilities:private_doctors_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return {
+            param: {option['value']: option['count'] for option in options}
+            for param, options in response.context['facets'].items()
+        }
+
+    def test_counts(self):
+        """Счетчики всех значений без фильтров"""
+        facets = self._facets()
+        self.assertEqual(facets['city'], {'moscow': 2, 'tula': 1})
+        self.assertEqual(facets['specialization'], {'narcology': 2, 'psychiatry': 2})
+        self.assertEqual(facets['home_visits'], {'True': 2, 'False': 1})
+
+    def test_own_filter_not_applied(self):
+        """Фильтр измерения не влияет на его собственные счетчики"""
+        facets = self._facets(city='moscow')
+        self.assertEqual(facets['city'], {'moscow': 2, 'tula': 1})
+        self.assertEqual(facets['specialization'], {'narcology': 2, 'psychiatry': 1})
+        self.assertEqual(facets['home_visits'], {'True': 1, 'False': 1})
+
+        facets = self._facets(city='moscow', specialization='psychiatry')
+        self.assertEqual(facets['city'], {'moscow': 1, 'tula': 1})
+        self.assertEqual(facets['home_visits'], {'True': 1})
+
+    def test_options(self):
+        """Выбранное значение отмечено, ссылка снимает фильтр и сбрасывает страницу"""
+        response = self.client.get(reverse('facilities:private_doctors_list'), {
+            'city': 'moscow', 'page': 2, 'home_visits': 'True'})
+        options = {option['value']: option for option in response.context['facets']['city']}
+        self.assertTrue(options['moscow']['selected'])
+        self.assertEqual(options['moscow']['label'], 'Москва')
+        self.assertEqual(options['moscow']['query'], 'home_visits=True')
+        self.assertEqual(options['tula']['query'], 'city=tula&home_visits=True')
+        self.assertContains(response, 'Выезд на дом (1)')
+
+    def _facet_queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('facilities:private_doctors_list'), params)
+        return [query['sql'] for query in context.captured_queries if 'GROUP BY' in query['sql']]
+
+    def test_one_query_per_facet_and_cache(self):
+        """Один групповой запрос на измерение, повторы берутся из кэша"""
+        self.assertEqual(len(self._facet_queries(city='moscow')), 3)
+        self.assertEqual(self._facet_queries(city='moscow'), [])
+
+        # Счетчики городов не зависят от выбранного города
+        queries = self._facet_queries(city='tula')
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('"core_city"."name"' in sql.split('FROM')[0] for sql in queries))
+
+    def test_invalidated_on_doctor_change(self):
+        """Изменение врача сбрасывает счетчики"""
+        self.assertEqual(self._facets()['city'], {'moscow': 2, 'tula': 1})
+        self.first.city = self.tula
+        self.first.save()
+        self.assertEqual(self._facets()['city'], {'moscow': 1, 'tula': 2})
+
+        self.first.specializations.remove(self.narcology)
+        self.assertEqual(self._facets()['specialization'], {'narcology': 1, 'psychiatry': 2})
+
+    def test_signature_normalized(self):
+        """Равнозначные параметры дают одну сигнатуру"""
+        self.assertEqual(
+            facet_signature([('search', ' Нарколог  Москва'), ('city', '')], {'search'}),
+            facet_signature([('search', 'нарколог москва')], {'search'})
+        )
+        self.assertNotEqual(
+            facet_signature([('search', 'нарколог')], {'search'}), facet_signature([('city', 'нарколог')], {'search'})
+        )
+
+    def test_signature_keeps_filter_values(self):
+        """Значения точных фильтров не нормализуются"""
+        self.assertNotEqual(
+            facet_signature([('city', 'Moskva')], {'search'}), facet_signature([('city', 'moskva')], {'search'})
+        )
+        self.assertNotEqual(
+            facet_signature([('city', 'sankt-peterburg ')], {'search'}),
+            facet_signature([('city', 'sankt-peterburg')], {'search'})
+        )
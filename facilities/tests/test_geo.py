@@ -0,0 +1,74 @@
+"""
+Тесты фильтра «рядом» для учреждений.
+"""
+
+from django.test import TestCase
+from django.urls import reverse
+from facilities.models import Clinic, OrganizationType
+from core.geo import invalidate_city_grid
+from core.models import Region, City, CityCoordinates
+
+
+class NearFilterTest(TestCase):
+    def setUp(self):
+        invalidate_city_grid()
+        region = Region.objects.create(name='Московская область', slug='near-region')
+        self.moscow = City.objects.create(name='Москва', slug='near-moscow', region=region)
+        self.mytishchi = City.objects.create(name='Мытищи', slug='near-mytishchi', region=region)
+        self.spb = City.objects.create(name='Санкт-Петербург', slug='near-spb', region=region)
+        self.nowhere = City.objects.create(name='Без координат', slug='near-nowhere', region=region)
+        CityCoordinates.objects.create(city=self.moscow, latitude='55.755800', longitude='37.617300')
+        CityCoordinates.objects.create(city=self.mytishchi, latitude='55.911600', longitude='37.730800')
+        CityCoordinates.objects.create(city=self.spb, latitude='59.934300', longitude='30.335100')
+
+        organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic-near', description='Клиника')
+        self.clinics = {}
+        for city in (self.spb, self.mytishchi, self.moscow, self.nowhere):
+            self.clinics[city.slug] = Clinic.objects.create(
+                name=f'Клиника {city.name}', slug=f'clinic-{city.slug}', city=city,
+                organization_type=organization_type)
+
+    def test_near_coordinates(self):
+        """Учреждения в радиусе по возрастанию расстояния"""
+        clinics = list(Clinic.objects.near('55.75,37.62', 50))
+        self.assertEqual(clinics, [self.clinics['near-moscow'], self.clinics['near-mytishchi']])
+        self.assertLess(clinics[0].distance_km, 1)
+        self.assertAlmostEqual(clinics[1].distance_km, 19.3, delta=0.5)
+
+    def test_near_city_slug(self):
+        """Город как точка отсчета"""
+        clinics = list(Clinic.objects.near('near-spb', 700))
+        self.assertEqual(clinics[0], self.clinics['near-spb'])
+        self.assertEqual(len(clinics), 3)
+
+    def test_invalid_origin(self):
+        """Неизвестный город и неверный радиус"""
+        with self.assertRaises(ValueError):
+            Clinic.objects.near('unknown-city')
+        with self.assertRaises(ValueError):
+            Clinic.objects.near('55.75,37.62', 100000)
+
+    def test_coordinates_change_reloads_grid(self):
+        """Изменение координат учитывается без перезапуска"""
+        self.assertNotIn(self.clinics['near-nowhere'], Clinic.objects.near('55.75,37.62', 5))
+        CityCoordinates.objects.create(city=self.nowhere, latitude='55.760000', longitude='37.620000')
+        clinics = list(Clinic.objects.near('55.75,37.62', 5))
+        self.assertIn(self.clinics['near-nowhere'], clinics)
+
+    def test_list_view_near(self):
+        """Параметр near в списке клиник"""
+        response = self.client.get(reverse('facilities:clinic_list'), {
+            'near': 'near-moscow', 'radius': '50'
+        })
+        self.assertEqual(
+            list(response.context['clinics']),
+            [self.clinics['near-moscow'], self.clinics['near-mytishchi']]
+        )
+        self.assertEqual(response.context['near'], 'near-moscow')
+
+    def test_list_view_ignores_invalid_near(self):
+        """Некорректный near не ломает список"""
+        response = self.client.get(reverse('facilities:clinic_list'), {'near': '999,999'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['clinics']), 4)
@@ -0,0 +1,216 @@
+"""
+Тесты массового импорта учреждений.
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models.signals import post_save
+from django.test import TestCase
+from facilities.importing import FacilityImporter, iter_csv_rows, iter_json_rows
+from facilities.models import Clinic, RehabCenter, PrivateDoctor, OrganizationType
+from facilities.search import get_search_backend, doctor_name_search
+from staff.models import Specialization
+from core.home import home_snapshot_cache
+from core.models import Region, City
+from core.page_cache import get_tag_versions
+
+
+CSV_HEADER = 'type,name,slug,city,organization_type,phone,is_featured,description\n'
+
+
+class ImportFacilitiesTest(TestCase):
+    def setUp(self):
+        doctor_name_search.reset()
+        self.region = Region.objects.create(name='Московская область', slug='import-region')
+        self.city = City.objects.create(name='Москва', slug='moskva', region=self.region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic', description='Медицинская клиника')
+        self.specialization = Specialization.objects.create(name='Психиатрия', slug='psychiatry')
+
+    def _write(self, content, suffix):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def _call(self, *args, **options):
+        out = StringIO()
+        call_command('import_facilities', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_csv_import(self):
+        """Строки CSV создаются пакетами, города и типы ищутся по slug и названию"""
+        path = self._write(
+            CSV_HEADER +
+            'clinic,Клиника Здоровье,,moskva,clinic,+7 495 000-00-00,да,Лечение алкоголизма\n'
+            'clinic,Клиника Здоровье,,Москва,Клиника,,0,\n'
+            'rehab,Центр Возрождение,vozrozhdenie,москва,clinic,,,\n',
+            '.csv'
+        )
+        output = self._call(path, batch_size=2)
+
+        self.assertIn('создано 3', output)
+        clinics = Clinic.objects.order_by('pk')
+        self.assertEqual([c.slug for c in clinics], ['klinika-zdorove', 'klinika-zdorove-1'])
+        self.assertTrue(clinics[0].is_featured)
+        self.assertFalse(clinics[1].is_featured)
+        self.assertEqual(clinics[0].city, self.city)
+        self.assertEqual(RehabCenter.objects.get().slug, 'vozrozhdenie')
+        self.assertEqual(get_search_backend().search_ids(Clinic, 'алкоголизм'), [clinics[0].pk])
+
+    def test_row_errors_do_not_abort_import(self):
+        """Ошибочные строки попадают в отчет, остальные импортируются"""
+        path = self._write(
+            CSV_HEADER +
+            'clinic,Первая,,moskva,clinic,,,\n'
+            'clinic,Без города,,tver,clinic,,,\n'
+            'hospital,Неизвестный тип,,moskva,clinic,,,\n'
+            'clinic,Без типа,,moskva,,,,\n'
+            'clinic,Флаг,,moskva,clinic,,может быть,\n'
+            'clinic,Вторая,,moskva,clinic,,,\n',
+            '.csv'
+        )
+        output = self._call(path)
+
+        self.assertEqual(set(Clinic.objects.values_list('name', flat=True)), {'Первая', 'Вторая'})
+        self.assertIn('Строка 2: Неизвестный или неоднозначный город: tver', output)
+        self.assertIn('Строка 3: Неизвестный тип учреждения: hospital', output)
+        self.assertIn('Строка 4: organization_type', output)
+        self.assertIn('Строка 5: is_featured', output)
+        self.assertIn('ошибок 4', output)
+
+    def test_json_lines_doctors_with_specializations(self):
+        """Врачи из JSON Lines получают имя, slug и специализации"""
+        rows = [
+            {'first_name': 'Иван', 'last_name': 'Сидоров', 'experience_years': 10,
+             'city': 'moskva', 'organization_type': 'clinic',
+             'specializations': 'psychiatry; Психиатрия', 'home_visits': True,
+             'schedule': 'Пн-Пт 9:00-18:00'},
+            {'first_name': 'Петр', 'last_name': 'Иванов', 'experience_years': 'много',
+             'organization_type': 'clinic', 'schedule': 'Пн-Пт'},
+        ]
+        path = self._write('\n'.join(json.dumps(row, ensure_ascii=False) for row in rows), '.jsonl')
+        output = self._call(path, type='private_doctor')
+
+        doctor = PrivateDoctor.objects.get()
+        self.assertEqual(doctor.name, 'Сидоров Иван')
+        self.assertEqual(doctor.slug, 'sidorov-ivan')
+        self.assertTrue(doctor.home_visits)
+        self.assertEqual(list(doctor.specializations.all()), [self.specialization])
+        self.assertIn('Строка 2: experience_years', output)
+        self.assertEqual(
+            [pk for pk, _ in doctor_name_search.search_index('Сидоров')], [doctor.pk]
+        )
+
+    def test_update_existing(self):
+        """С --update существующие учреждения обновляются только по переданным полям"""
+        clinic = Clinic.objects.create(
+            name='Старое название', slug='existing', city=self.city, phone='123',
+            organization_type=self.organization_type)
+        path = self._write(
+            json.dumps([{'type': 'clinic', 'slug': 'existing', 'name': 'Новое название'}],
+                       ensure_ascii=False),
+            '.json'
+        )
+
+        output = self._call(path)
+        self.assertIn('уже существует', output)
+        clinic.refresh_from_db()
+        self.assertEqual(clinic.name, 'Старое название')
+
+        output = self._call(path, update=True)
+        self.assertIn('обновлено 1', output)
+        clinic.refresh_from_db()
+        self.assertEqual(clinic.name, 'Новое название')
+        self.assertEqual(clinic.phone, '123')
+        self.assertEqual(clinic.city, self.city)
+
+    def test_duplicate_slug_in_file(self):
+        """Повтор slug в файле — ошибка строки"""
+        rows = [{'name': 'А', 'slug': 'same', 'organization_type': 'clinic'}] * 2
+        result = FacilityImporter('clinic', batch_size=1).run(rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(2, 'Slug повторяется в файле: same')])
+
+    def test_dry_run(self):
+        """При --dry-run изменения не сохраняются"""
+        path = self._write(CSV_HEADER + 'clinic,Клиника,,moskva,clinic,,,\n', '.csv')
+        output = self._call(path, dry_run=True)
+        self.assertIn('создано 1', output)
+        self.assertFalse(Clinic.objects.exists())
+
+    def test_no_post_save_signals(self):
+        """Импорт не вызывает post_save для каждой строки"""
+        calls = []
+        receiver = lambda sender, **kwargs: calls.append(sender)
+        post_save.connect(receiver, sender=Clinic, weak=False)
+        self.addCleanup(post_save.disconnect, receiver, sender=Clinic)
+
+        rows = [{'name': f'Клиника {i}', 'organization_type': 'clinic'} for i in range(5)]
+        # Справочники, слаги, вставка, индекс и пересчет похожих объектов
+        with self.assertNumQueries(15):
+            result = FacilityImporter('clinic', batch_size=5).run(rows)
+        self.assertEqual(result.created, 5)
+        self.assertEqual(calls, [])
+
+    def test_caches_invalidated(self):
+        """Импорт сбрасывает кэш страниц и снимок главной без сигналов"""
+        tags = get_tag_versions(['facilities.Clinic', 'facilities.RehabCenter'])
+        snapshot = home_snapshot_cache.get_version()
+        FacilityImporter('clinic').run([{'name': 'Клиника', 'organization_type': 'clinic'}])
+        clinic_tag, rehab_tag = get_tag_versions(['facilities.Clinic', 'facilities.RehabCenter'])
+        self.assertGreater(clinic_tag, tags[0])
+        self.assertEqual(rehab_tag, tags[1])
+        self.assertGreater(home_snapshot_cache.get_version(), snapshot)
+
+    def test_rows_retried_as_new_after_rollback(self):
+        """После отката пакета строки повторно вставляются, а не обновляются"""
+        rows = [{'name': f'Клиника {i}', 'organization_type': 'clinic'} for i in range(3)]
+        # Вставка пакета прошла и выдала id, индексирование откатило транзакцию
+        with mock.patch('facilities.importing.index_facilities',
+                        side_effect=[DatabaseError('locked'), None, DatabaseError('locked'), None]):
+            result = FacilityImporter('clinic', batch_size=3).run(rows)
+        self.assertEqual((result.created, result.updated), (2, 0))
+        self.assertEqual([number for number, _ in result.errors], [2])
+        self.assertEqual(
+            sorted(Clinic.objects.values_list('name', flat=True)), ['Клиника 0', 'Клиника 2'])
+
+    def test_unknown_columns_reported(self):
+        """Неизвестные столбцы пропускаются и перечисляются в отчете"""
+        result = FacilityImporter('clinic').run([
+            {'name': 'Клиника', 'organization_type': 'clinic', 'rating': 5, 'color': 'red'}
+        ])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.ignored_columns, {'rating', 'color'})
+
+
+class ImportReadersTest(TestCase):
+    def test_json_array_streamed_in_small_chunks(self):
+        """JSON-массив читается по частям"""
+        rows = [{'name': f'Клиника {i}', 'tags': '[,]'} for i in range(20)]
+        stream = StringIO(json.dumps(rows, ensure_ascii=False, indent=2))
+        self.assertEqual(list(iter_json_rows(stream, read_size=7)), rows)
+
+    def test_json_lines(self):
+        """JSON Lines и пустые строки"""
+        stream = StringIO('{"a": 1}\n\n{"a": 2}\n')
+        self.assertEqual(list(iter_json_rows(stream)), [{'a': 1}, {'a': 2}])
+
+    def test_invalid_json(self):
+        """Некорректный JSON приводит к ValueError"""
+        with self.assertRaises(ValueError):
+            list(iter_json_rows(StringIO('[{"a": 1}, {"a": ')))
+        with self.assertRaises(ValueError):
+            list(iter_json_rows(StringIO('[{"a": 1}')))
+
+    def test_csv_rows(self):
+        """CSV с другим разделителем"""
+        stream = StringIO('name;phone\nКлиника;123\n')
+        self.assertEqual(list(iter_csv_rows(stream, delimiter=';')), [{'name': 'Клиника', 'phone': '123'}])
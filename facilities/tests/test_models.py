@@ -424,4 +424,32 @@ class MainImageTest(TestCase):
         inactive_main.save()
         
         # Проверяем, что main_image возвращает активное главное изображение
-        self.assertEqual(self.clinic.main_image, inactive_main) 
\ No newline at end of file
+        self.assertEqual(self.clinic.main_image, inactive_main) 
+
+    def test_main_image_prefetched_in_one_query(self):
+        """Тест пакетной загрузки главных изображений через with_main_image()"""
+        clinic_ct = ContentType.objects.get_for_model(Clinic)
+        second_clinic = Clinic.objects.create(
+            name='Вторая клиника',
+            slug='second-clinic',
+            organization_type=self.org_type,
+            city=self.city
+        )
+        FacilityImage.objects.create(
+            content_type=clinic_ct, object_id=self.clinic.id,
+            image='regular.jpg', title='Обычное'
+        )
+        main = FacilityImage.objects.create(
+            content_type=clinic_ct, object_id=self.clinic.id,
+            image='main.jpg', title='Главное', is_main=True
+        )
+        FacilityImage.objects.create(
+            content_type=clinic_ct, object_id=second_clinic.id,
+            image='hidden.jpg', title='Скрытое', is_active=False
+        )
+        
+        # Один запрос на учреждения и один на изображения
+        with self.assertNumQueries(2):
+            clinics = {c.pk: c for c in Clinic.objects.with_main_image()}
+            self.assertEqual(clinics[self.clinic.pk].main_image, main)
+            self.assertIsNone(clinics[second_clinic.pk].main_image)
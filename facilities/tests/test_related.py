@@ -0,0 +1,171 @@
+"""
+Тесты предрассчитанных похожих учреждений и врачей.
+"""
+
+from io import StringIO
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.models import Region, City
+from facilities.models import Clinic, PrivateDoctor, OrganizationType, RelatedFacility
+from facilities.related import (
+    enqueue_related_refresh, get_related, rebuild_related, refresh_related, wait_for_related_refresh,
+)
+from medical_services.models import FacilityService, Service
+from staff.models import Specialization
+
+
+@override_settings(RELATED_FACILITIES={'ASYNC': False})
+class RelatedFacilitiesTest(TestCase):
+    def setUp(self):
+        region = Region.objects.create(name='Московская область', slug='related-region')
+        self.moscow = City.objects.create(name='Москва', slug='related-moscow', region=region)
+        self.podolsk = City.objects.create(name='Подольск', slug='related-podolsk', region=region)
+        other_region = Region.objects.create(name='Тульская область', slug='related-tula-region')
+        self.tula = City.objects.create(name='Тула', slug='related-tula', region=other_region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Частный врач', slug='related-doctor', description='Врач')
+        self.narcology = Specialization.objects.create(name='Наркология', slug='related-narcology')
+        self.psychiatry = Specialization.objects.create(name='Психиатрия', slug='related-psychiatry')
+
+        self.source = self._doctor('source', self.moscow, [self.narcology, self.psychiatry])
+        self.same_all = self._doctor('same-all', self.moscow, [self.narcology, self.psychiatry])
+        self.same_city = self._doctor('same-city', self.moscow, [])
+        self.same_region = self._doctor('same-region', self.podolsk, [self.narcology])
+        self.unrelated = self._doctor('unrelated', self.tula, [])
+
+    def _doctor(self, slug, city, specializations, **kwargs):
+        doctor = PrivateDoctor.objects.create(
+            slug=slug, first_name='Иван', last_name=slug, experience_years=5, city=city,
+            organization_type=self.organization_type, **kwargs)
+        doctor.specializations.set(specializations)
+        return doctor
+
+    def _stored(self, model=PrivateDoctor):
+        content_type = ContentType.objects.get_for_model(model)
+        result = {}
+        for link in RelatedFacility.objects.filter(content_type=content_type):
+            result.setdefault(link.source_id, []).append((link.target_id, link.score))
+        return result
+
+    def test_rebuild_orders_by_similarity(self):
+        """Похожесть учитывает город, регион и специализации"""
+        rebuild_related(PrivateDoctor)
+        related = list(get_related(self.source))
+        self.assertEqual(related, [self.same_all, self.same_city, self.same_region])
+        self.assertEqual(list(get_related(self.unrelated)), [])
+        self.assertEqual(list(get_related(self.source, limit=1)), [self.same_all])
+
+    def test_single_query(self):
+        """Похожие объекты читаются одним запросом"""
+        rebuild_related(PrivateDoctor)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(get_related(self.source))), 3)
+
+    def test_inactive_not_related(self):
+        """Неактивные объекты не попадают в списки"""
+        self.same_all.is_active = False
+        self.same_all.save()
+        rebuild_related(PrivateDoctor)
+        self.assertNotIn(self.same_all, get_related(self.source))
+        self.assertEqual(list(get_related(self.same_all)), [])
+
+    def test_services_and_rating(self):
+        """Общие услуги и рейтинг повышают оценку"""
+        organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='related-clinic', description='Клиника')
+        clinics = [
+            Clinic.objects.create(name=name, slug=name, city=self.moscow, organization_type=organization_type)
+            for name in ('base', 'rated', 'with-service', 'plain')
+        ]
+        Clinic.objects.filter(pk=clinics[1].pk).update(rating_avg=5, rating_count=1)
+        service = Service.objects.create(name='Детокс', slug='related-detox', description='')
+        content_type = ContentType.objects.get_for_model(Clinic)
+        for clinic in (clinics[0], clinics[2]):
+            FacilityService.objects.create(content_type=content_type, object_id=clinic.pk, service=service)
+
+        rebuild_related(Clinic)
+        self.assertEqual(list(get_related(clinics[0])), [clinics[2], clinics[1], clinics[3]])
+
+    def test_incremental_refresh_matches_rebuild(self):
+        """Инкрементальный пересчет дает тот же результат, что и полный"""
+        rebuild_related(PrivateDoctor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.same_city.city = self.tula
+            self.same_city.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unrelated.specializations.add(self.narcology)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._doctor('new', self.moscow, [self.psychiatry])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.same_all.delete()
+
+        incremental = self._stored()
+        rebuild_related(PrivateDoctor)
+        self.assertEqual(incremental, self._stored())
+
+    def test_full_list_refilled(self):
+        """Выбывший из полного списка сосед заменяется следующим кандидатом"""
+        with self.settings(RELATED_FACILITIES={'TOP_K': 2, 'ASYNC': False}):
+            rebuild_related(PrivateDoctor)
+            self.assertEqual(list(get_related(self.source)), [self.same_all, self.same_city])
+
+            PrivateDoctor.objects.filter(pk=self.same_all.pk).update(is_active=False)
+            refresh_related(PrivateDoctor, [self.same_all.pk])
+            self.assertEqual(list(get_related(self.source)), [self.same_city, self.same_region])
+
+    def test_service_change_triggers_refresh(self):
+        """Изменение услуг учреждения пересчитывает похожие объекты"""
+        rebuild_related(PrivateDoctor)
+        service = Service.objects.create(name='Консультация', slug='related-consult', description='')
+        content_type = ContentType.objects.get_for_model(PrivateDoctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            for doctor in (self.source, self.unrelated):
+                FacilityService.objects.create(content_type=content_type, object_id=doctor.pk, service=service)
+        self.assertIn(self.unrelated, get_related(self.source))
+
+    def test_command_and_detail_view(self):
+        """Команда пересчета и страница врача"""
+        out = StringIO()
+        call_command('rebuild_related_facilities', type='private_doctor', stdout=out)
+        self.assertIn('Похожие объекты пересчитаны', out.getvalue())
+
+        response = self.client.get(
+            reverse('facilities:private_doctor_detail', kwargs={'slug': self.source.slug}))
+        self.assertEqual(list(response.context['related_doctors']), [
+            self.same_all, self.same_city, self.same_region])
+
+    def test_background_refresh(self):
+        """Изменения из запросов пересчитываются в фоне одним пакетом"""
+        with self.settings(RELATED_FACILITIES={'ASYNC': True}):
+            with mock.patch('facilities.related.refresh_related') as refresh:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.source.save()
+                    self.same_all.specializations.remove(self.psychiatry)
+                wait_for_related_refresh()
+                enqueue_related_refresh({PrivateDoctor: {self.unrelated.pk}})
+                wait_for_related_refresh()
+        # Ожидающие изменения других тестов (on_commit в TestCase не выполняется) не проверяются
+        calls = [call.args[1] for call in refresh.call_args_list if call.args[0] is PrivateDoctor]
+        self.assertEqual(len(calls), 2)
+        self.assertLessEqual({self.source.pk, self.same_all.pk}, calls[0])
+        self.assertEqual(calls[1], {self.unrelated.pk})
+
+    def test_background_refresh_survives_errors(self):
+        """Ошибка пересчета или постановки в очередь не останавливает фоновую обработку"""
+        with self.settings(RELATED_FACILITIES={'ASYNC': True}):
+            with mock.patch('facilities.related.refresh_related', side_effect=[ValueError, None]) as refresh:
+                with self.assertLogs('facilities.related', level='ERROR'):
+                    enqueue_related_refresh({PrivateDoctor: {self.source.pk}})
+                    wait_for_related_refresh()
+                with mock.patch('facilities.related._get_executor', side_effect=RuntimeError):
+                    with self.assertRaises(RuntimeError):
+                        enqueue_related_refresh({PrivateDoctor: {self.same_city.pk}})
+                enqueue_related_refresh({PrivateDoctor: {self.unrelated.pk}})
+                wait_for_related_refresh()
+        self.assertEqual(refresh.call_count, 2)
+        self.assertEqual(refresh.call_args.args[1], {self.same_city.pk, self.unrelated.pk})
@@ -0,0 +1,189 @@
+"""
+Тесты полнотекстового поиска учреждений.
+"""
+
+from io import StringIO
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from facilities.models import Clinic, RehabCenter, PrivateDoctor, OrganizationType
+from facilities.search import get_search_backend, SQLiteFTSBackend, doctor_name_search, rebuild_search_index
+from staff.models import Specialization
+from core.models import Region, City
+from core.trigram import NameSearch
+
+
+class FacilitySearchTest(TestCase):
+    def setUp(self):
+        self.region = Region.objects.create(name='Московская область', slug='search-region')
+        self.city = City.objects.create(name='Москва', slug='search-city', region=self.region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic-search', description='Медицинская клиника')
+        self.narcology = Clinic.objects.create(
+            name='Наркологическая клиника', slug='narcology-search', city=self.city,
+            organization_type=self.organization_type,
+            description='Лечение алкоголизма и наркомании', address='ул. Лесная, 5')
+        self.other = Clinic.objects.create(
+            name='Клиника здоровья', slug='health-search', city=self.city,
+            organization_type=self.organization_type,
+            description='Помощь при лечении алкоголизма', address='ул. Садовая, 1')
+        self.rehab = RehabCenter.objects.create(
+            name='Центр наркологии', slug='rehab-search', city=self.city,
+            organization_type=self.organization_type)
+
+    def _ids(self, model, query, limit=None):
+        return get_search_backend().search_ids(model, query, limit)
+
+    def test_default_backend_for_sqlite(self):
+        """Для SQLite используется FTS5"""
+        if connection.vendor == 'sqlite':
+            self.assertIsInstance(get_search_backend(), SQLiteFTSBackend)
+
+    def test_inflected_query_matches(self):
+        """Поиск находит другие словоформы"""
+        self.assertEqual(self._ids(Clinic, 'алкоголизмом'), [self.narcology.id, self.other.id])
+        self.assertEqual(self._ids(RehabCenter, 'наркология'), [self.rehab.id])
+        self.assertEqual(self._ids(Clinic, 'клиники москвы'), [self.narcology.id, self.other.id])
+
+    def test_title_ranked_first(self):
+        """Совпадение в названии выше совпадения в описании"""
+        self.assertEqual(self._ids(Clinic, 'здоровье')[0], self.other.id)
+        self.assertEqual(self._ids(Clinic, 'лечения')[0], self.narcology.id)
+
+    def test_index_updated_on_save_and_delete(self):
+        """Индекс обновляется при сохранении и удалении"""
+        self.other.name = 'Клиника реабилитации'
+        self.other.save()
+        self.assertEqual(self._ids(Clinic, 'реабилитация'), [self.other.id])
+        self.assertEqual(self._ids(Clinic, 'здоровья'), [])
+
+        other_id = self.other.id
+        self.other.delete()
+        self.assertNotIn(other_id, self._ids(Clinic, 'клиника'))
+
+    def test_doctor_specializations_indexed(self):
+        """Специализации врача попадают в индекс"""
+        doctor = PrivateDoctor.objects.create(
+            slug='search-doctor', first_name='Иван', last_name='Сидоров', experience_years=5,
+            city=self.city, organization_type=self.organization_type)
+        specialization = Specialization.objects.create(name='Психиатрия', slug='psychiatry-search')
+        doctor.specializations.add(specialization)
+        self.assertEqual(self._ids(PrivateDoctor, 'психиатр'), [doctor.id])
+        self.assertEqual(self._ids(PrivateDoctor, 'Сидорову'), [doctor.id])
+
+        specialization.name = 'Психотерапия'
+        specialization.save()
+        self.assertEqual(self._ids(PrivateDoctor, 'психотерапии'), [doctor.id])
+
+        doctor.specializations.clear()
+        self.assertEqual(self._ids(PrivateDoctor, 'психотерапия'), [])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс"""
+        get_search_backend().clear()
+        self.assertEqual(self._ids(Clinic, 'клиника'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self._ids(Clinic, 'клиника')), 2)
+
+    def test_rebuild_with_historical_models(self):
+        """Миграция индексирует учреждения историческими моделями"""
+        apps = MigrationExecutor(connection).loader.project_state(('facilities', '0004_search_index')).apps
+        get_search_backend().clear()
+        counts = rebuild_search_index(apps=apps)
+        self.assertEqual(sorted(counts.values()), [0, 1, 2])
+        self.assertEqual(self._ids(Clinic, 'алкоголизмом'), [self.narcology.id, self.other.id])
+        self.assertEqual(self._ids(RehabCenter, 'москва'), [self.rehab.id])
+
+    def test_filter_in_database(self):
+        """Фильтрация и ранжирование в БД: срез и счетчик без ограничения"""
+        for number in range(3):
+            Clinic.objects.create(
+                name=f'Клиника {number}', slug=f'extra-search-{number}', city=self.city,
+                organization_type=self.organization_type, description='Лечение алкоголизма')
+        results = get_search_backend().filter(Clinic.objects.all(), 'алкоголизм')
+        self.assertEqual(results.count(), 5)
+        self.assertEqual(list(results[:2].values_list('pk', flat=True)), self._ids(Clinic, 'алкоголизм', limit=2))
+        ranks = list(results.values_list('search_rank', flat=True))
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertFalse(get_search_backend().filter(Clinic.objects.all(), '!!!').exists())
+
+    def test_list_view_uses_search_backend(self):
+        """Список клиник ищет с учетом морфологии и релевантности"""
+        response = self.client.get(reverse('facilities:clinic_list'), {'search': 'наркологических'})
+        self.assertEqual(list(response.context['clinics']), [self.narcology])
+
+    @override_settings(FACILITY_SEARCH={'BACKEND': 'facilities.search.ContainsSearchBackend'})
+    def test_contains_backend(self):
+        """Резервный бэкенд ищет по подстроке"""
+        self.assertEqual(list(Clinic.objects.search('здоров')), [self.other])
+
+
+class DoctorNameSearchTest(TestCase):
+    def setUp(self):
+        doctor_name_search.reset()
+        self.city = City.objects.create(
+            name='Казань', slug='name-city',
+            region=Region.objects.create(name='Татарстан', slug='name-region'))
+        self.organization_type = OrganizationType.objects.create(
+            name='Частный врач', slug='doctor-name-search', description='Врач')
+        self.ivanov = PrivateDoctor.objects.create(
+            slug='ivanov-name', first_name='Иван', last_name='Иванов', middle_name='Петрович',
+            experience_years=5, city=self.city, organization_type=self.organization_type)
+        self.kuznetsova = PrivateDoctor.objects.create(
+            slug='kuznetsova-name', first_name='Анна', last_name='Кузнецова',
+            experience_years=3, city=self.city, organization_type=self.organization_type)
+
+    def test_search_by_name_with_typo(self):
+        """Поиск по ФИО с опечаткой"""
+        self.assertEqual(list(PrivateDoctor.objects.search_by_name('Кузнецвоа')), [self.kuznetsova])
+        self.assertEqual(PrivateDoctor.objects.search_by_name('Иванво Иван').first(), self.ivanov)
+
+    def test_index_follows_changes(self):
+        """Индекс ФИО обновляется при сохранении и удалении"""
+        self.assertTrue(PrivateDoctor.objects.search_by_name('Кузнецова').exists())
+        self.kuznetsova.last_name = 'Смирнова'
+        self.kuznetsova.save()
+        self.assertFalse(PrivateDoctor.objects.search_by_name('Кузнецова').exists())
+        self.assertEqual(list(PrivateDoctor.objects.search_by_name('Смирнва')), [self.kuznetsova])
+        self.kuznetsova.delete()
+        self.assertFalse(PrivateDoctor.objects.search_by_name('Смирнова').exists())
+
+    def test_index_refreshes_changed_rows(self):
+        """Отставший процесс перечитывает только измененные строки"""
+        other = NameSearch('facilities.PrivateDoctor')
+        other.search_index('Кузнецова')
+        self.kuznetsova.last_name = 'Смирнова'
+        self.kuznetsova.save()
+        with mock.patch.object(other, '_reload', side_effect=AssertionError('full reload')):
+            self.assertEqual([pk for pk, _ in other.search_index('Смирнова')], [self.kuznetsova.pk])
+            self.assertEqual(other.search_index('Кузнецова'), [])
+        # После invalidate() журнал изменений не покрывает разрыв
+        doctor_name_search.invalidate()
+        with mock.patch.object(other, '_reload', wraps=other._reload) as reload:
+            other.search_index('Смирнова')
+        reload.assert_called_once()
+
+    def test_name_hits_merged_with_full_text_hits(self):
+        """Похожие ФИО выдаются вместе с полнотекстовыми совпадениями, после них"""
+        student = PrivateDoctor.objects.create(
+            slug='student-name', first_name='Олег', last_name='Орлов',
+            description='Ученик профессора Смирнова',
+            experience_years=2, city=self.city, organization_type=self.organization_type)
+        misspelled = PrivateDoctor.objects.create(
+            slug='shmirnov-name', first_name='Олег', last_name='Шмирнов',
+            experience_years=2, city=self.city, organization_type=self.organization_type)
+        backend = get_search_backend()
+        self.assertEqual(list(backend.filter(PrivateDoctor.objects.all(), 'Смирнов')), [student])
+        self.assertEqual(
+            list(backend.filter(PrivateDoctor.objects.all(), 'Смирнов', name_search=doctor_name_search)),
+            [student, misspelled]
+        )
+
+    def test_list_view_finds_misspelled_name(self):
+        """Список врачей находит фамилию с опечаткой"""
+        response = self.client.get(reverse('facilities:private_doctors_list'), {'search': 'Кузнецвоа'})
+        self.assertEqual(list(response.context['doctors']), [self.kuznetsova])
@@ -155,6 +155,49 @@ class AjaxViewsTest(TestCase):
         self.assertIn('error', data)
 
 
+    def test_load_more_clinics_cursor_walk(self):
+        """Тест последовательной загрузки клиник по курсору без пропусков и дублей"""
+        response = self.client.get(reverse('facilities:load_more_clinics'), {'offset': 0})
+        data = json.loads(response.content)
+        self.assertTrue(data['has_more'])
+        self.assertTrue(data['next_cursor'])
+        first_page = data['cards']
+        
+        response = self.client.get(reverse('facilities:load_more_clinics'), {
+            'cursor': data['next_cursor']
+        })
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(data['has_more'])
+        self.assertIsNone(data['next_cursor'])
+        
+        # 15 клиник: 12 на первой странице и 3 на второй
+        self.assertEqual(first_page.count('class="card"'), 12)
+        self.assertEqual(data['cards'].count('class="card"'), 3)
+        for i in range(15):
+            self.assertEqual((first_page + data['cards']).count(f'clinic-{i}-ajax/'), 1)
+    
+    def test_load_more_rehabs_respects_search(self):
+        """Тест применения поиска списка к подгрузке центров"""
+        response = self.client.get(reverse('facilities:load_more_rehabs'), {
+            'offset': 0,
+            'search': 'Центр 1'
+        })
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(data['has_more'])
+        # Центр 1, Центр 10..14
+        self.assertEqual(data['cards'].count('class="card"'), 6)
+    
+    def test_load_more_invalid_cursor(self):
+        """Тест обработки некорректного курсора"""
+        response = self.client.get(reverse('facilities:load_more_clinics'), {
+            'cursor': '!!!'
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', json.loads(response.content))
+
+
 class PrivateDoctorViewsTest(TestCase):
     """Тесты для PrivateDoctorListView и PrivateDoctorDetailView"""
     
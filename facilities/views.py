@@ -2,38 +2,65 @@ from django.shortcuts import render
 from django.views.generic import ListView, DetailView
 from django.db.models import Q, Exists, OuterRef
 from .models import Clinic, RehabCenter, PrivateDoctor
+from .catalog import catalog_queryset, hydrate_catalog_rows, DEFAULT_CATALOG_ORDERING
 from medical_services.models import FacilityService, Service
 from django.contrib.contenttypes.models import ContentType
 from django.http import JsonResponse
-from django.template.loader import render_to_string
 from django.db import models
-from core.mixins import SearchMixin, FilterMixin, PaginationMixin, CacheMixin, GeoDataMixin
+from core.mixins import SearchMixin, FilterMixin, PaginationMixin, CacheMixin, GeoDataMixin, RatingMixin, NearMixin, FacetMixin
+from core.pagination import keyset_paginate, get_keyset_ordering, cursor_for
+from .card_cache import CardFragmentMixin, render_cards
+from .related import get_related
+from .search import FullTextSearchMixin, doctor_name_search
 
 # Create your views here.
 
-class FacilityListView(ListView):
+class FacilityListView(CacheMixin, CardFragmentMixin, ListView):
     """
     General list of all facilities.
     
-    TODO: Refactor to use custom managers.
+    Uses the unified catalog: filtering, ordering and pagination are done
+    in the database, only the current page is loaded into memory.
     """
     template_name = 'facilities/facility_list.html'
     context_object_name = 'facilities'
+    cache_tags = (
+        'facilities.Clinic', 'facilities.RehabCenter', 'facilities.PrivateDoctor',
+        'facilities.FacilityImage', 'reviews.Review', 'core.City',
+    )
     paginate_by = 12
 
     def get_queryset(self):
         """
-        Get combined queryset of clinics and rehabilitation centers.
+        Get catalog queryset of clinics, rehabilitation centers and doctors.
         
         Returns:
-            list: Combined list of clinics and rehabilitation centers
+            QuerySet: UNION queryset of catalog rows
+        """
+        facility_type = self.request.GET.get('type')
+        return catalog_queryset(
+            facility_types=[facility_type] if facility_type else None,
+            city=self.request.GET.get('city', '').strip() or None,
+            search=self.request.GET.get('search', '').strip() or None,
+            ordering=self.request.GET.get('sort') or DEFAULT_CATALOG_ORDERING,
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginate catalog rows and load facilities for the current page.
+        
+        Args:
+            queryset: Catalog queryset
+            page_size: Number of items per page
+            
+        Returns:
+            tuple: (paginator, page_obj, object_list, is_paginated)
         """
-        # Объединяем клиники и реабилитационные центры
-        clinics = Clinic.objects.all()
-        rehab_centers = RehabCenter.objects.all()
-        return list(clinics) + list(rehab_centers)
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        page.object_list = hydrate_catalog_rows(object_list)
+        return paginator, page, page.object_list, is_paginated
 
-class ClinicListView(SearchMixin, PaginationMixin, ListView):
+class ClinicListView(CacheMixin, CardFragmentMixin, NearMixin, FullTextSearchMixin, RatingMixin, PaginationMixin, ListView):
     """
     List of clinics with search and pagination.
     
@@ -42,10 +69,10 @@ class ClinicListView(SearchMixin, PaginationMixin, ListView):
     model = Clinic
     template_name = 'facilities/clinic_list.html'
     context_object_name = 'clinics'
+    cache_tags = ('facilities.Clinic', 'facilities.FacilityImage', 'reviews.Review', 'core.City')
     paginate_by = 12
     
     # Настройки поиска
-    search_fields = ['name', 'description', 'address']
     search_param = 'search'
 
     def get_queryset(self):
@@ -55,7 +82,7 @@ class ClinicListView(SearchMixin, PaginationMixin, ListView):
         Returns:
             QuerySet: Optimized queryset with related data
         """
-        queryset = Clinic.objects.with_related_data()
+        self.queryset = Clinic.objects.with_related_data()
         
         # Применяем поиск из миксина
         return super().get_queryset()
@@ -78,7 +105,7 @@ class ClinicListView(SearchMixin, PaginationMixin, ListView):
         
         return context
 
-class RehabilitationCenterListView(SearchMixin, PaginationMixin, ListView):
+class RehabilitationCenterListView(CacheMixin, CardFragmentMixin, NearMixin, FullTextSearchMixin, RatingMixin, PaginationMixin, ListView):
     """
     List of rehabilitation centers with search and pagination.
     
@@ -87,10 +114,10 @@ class RehabilitationCenterListView(SearchMixin, PaginationMixin, ListView):
     model = RehabCenter
     template_name = 'facilities/rehabilitation_list.html'
     context_object_name = 'rehabilitation_centers'
+    cache_tags = ('facilities.RehabCenter', 'facilities.FacilityImage', 'reviews.Review', 'core.City')
     paginate_by = 12
     
     # Настройки поиска
-    search_fields = ['name', 'description', 'address']
     search_param = 'search'
 
     def get_queryset(self):
@@ -112,7 +139,9 @@ class RehabilitationCenterListView(SearchMixin, PaginationMixin, ListView):
             queryset = queryset.annotate(
                 has_program=Exists(program_services)
             ).order_by('-has_program', 'name')
-        return super().get_queryset() if not sort else queryset
+            return queryset
+        self.queryset = queryset
+        return super().get_queryset()
 
     def get_context_data(self, **kwargs):
         """
@@ -132,13 +161,18 @@ class RehabilitationCenterListView(SearchMixin, PaginationMixin, ListView):
         
         return context
 
-class FacilityDetailView(GeoDataMixin, DetailView):
+class FacilityDetailView(CacheMixin, GeoDataMixin, DetailView):
     """
     Detailed view of a facility.
     
     Supports different facility types (clinics, rehabilitation centers).
     """
     context_object_name = 'facility'
+    cache_tags = (
+        'facilities.Clinic', 'facilities.RehabCenter', 'facilities.FacilityImage',
+        'facilities.FacilityDocument', 'medical_services.FacilityService', 'reviews.Review',
+        'staff.FacilitySpecialist',
+    )
 
     def get_model(self):
         """
@@ -233,18 +267,16 @@ class FacilityDetailView(GeoDataMixin, DetailView):
 
     def _get_related_facilities(self, model):
         """
-        Get related facilities of the same type.
+        Get precomputed related facilities of the same type.
         
         Args:
             model: Model class (Clinic or RehabCenter)
             
         Returns:
-            QuerySet: Related facilities
+            QuerySet: Related facilities, most similar first
         """
-        if model == Clinic:
-            return Clinic.objects.filter(city=self.object.city).exclude(pk=self.object.pk)[:3]
-        elif model == RehabCenter:
-            return RehabCenter.objects.filter(city=self.object.city).exclude(pk=self.object.pk)[:3]
+        if model in (Clinic, RehabCenter):
+            return get_related(self.object, limit=3, queryset=model.objects.with_related_data())
         return model.objects.none()
 
     def _get_facility_services(self):
@@ -261,90 +293,25 @@ class FacilityDetailView(GeoDataMixin, DetailView):
             is_active=True
         ).select_related('service')
 
-def load_more_rehabs(request):
-    """
-    AJAX loading of additional rehabilitation centers.
-    
-    TODO: Refactor to use custom manager.
-    
-    Args:
-        request: HTTP request object
-        
-    Returns:
-        JsonResponse: JSON response with cards HTML and has_more flag
-    """
-    try:
-        offset = int(request.GET.get('offset', 0))
-        limit = 12
-        
-        rehabs = RehabCenter.objects.all().order_by('id')[offset:offset + limit + 1]
-        has_more = len(rehabs) > limit
-        rehabs = rehabs[:limit]
-        
-        cards_html = ''
-        for center in rehabs:
-            cards_html += render_to_string(
-                'includes/cards/rehab_card.html',
-                {'facility': center},
-                request=request
-            )
-        
-        return JsonResponse({
-            'cards': cards_html,
-            'has_more': has_more
-        })
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
-
-def load_more_clinics(request):
-    """
-    AJAX loading of additional clinics.
-    
-    TODO: Refactor to use custom manager.
-    
-    Args:
-        request: HTTP request object
-        
-    Returns:
-        JsonResponse: JSON response with cards HTML and has_more flag
-    """
-    try:
-        offset = int(request.GET.get('offset', 0))
-        limit = 12
-        
-        clinics = Clinic.objects.all().order_by('id')[offset:offset + limit + 1]
-        has_more = len(clinics) > limit
-        clinics = clinics[:limit]
-        
-        cards_html = ''
-        for clinic in clinics:
-            cards_html += render_to_string(
-                'includes/cards/clinic_card.html',
-                {'clinic': clinic},
-                request=request
-            )
-        
-        return JsonResponse({
-            'cards': cards_html,
-            'has_more': has_more
-        })
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
-
-class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView):
+class PrivateDoctorListView(CacheMixin, CardFragmentMixin, FacetMixin, NearMixin, FullTextSearchMixin, FilterMixin, RatingMixin, PaginationMixin, ListView):
     """
     List of private doctors with search, filtering and pagination.
     
-    Uses custom PrivateDoctorManager for query optimization.
+    Uses custom PrivateDoctorManager for query optimization. Filter values
+    are shown with counts under the current search and other filters.
     """
     model = PrivateDoctor
     template_name = 'facilities/private_doctors_list.html'
     context_object_name = 'doctors'
+    cache_tags = (
+        'facilities.PrivateDoctor', 'facilities.FacilityImage', 'reviews.Review',
+        'staff.Specialization', 'core.City',
+    )
     paginate_by = 12
     
     # Настройки поиска
-    search_fields = ['first_name', 'last_name', 'middle_name', 'specializations__name', 'city__name']
     search_param = 'search'
+    name_search = doctor_name_search
     
     # Настройки фильтрации
     filter_fields = {
@@ -352,6 +319,16 @@ class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView)
         'specialization': 'specializations__slug',
         'home_visits': 'home_visits'
     }
+    
+    # Счетчики значений фильтров
+    facet_fields = {
+        'city': 'city__name',
+        'specialization': 'specializations__name',
+        'home_visits': None,
+    }
+    facet_labels = {
+        'home_visits': {'True': 'Выезд на дом', 'False': 'Без выезда на дом'},
+    }
 
     def get_queryset(self):
         """
@@ -360,7 +337,7 @@ class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView)
         Returns:
             QuerySet: Optimized queryset with related data
         """
-        queryset = PrivateDoctor.objects.with_related_data()
+        self.queryset = PrivateDoctor.objects.with_related_data()
         
         # Применяем фильтры из миксинов
         return super().get_queryset()
@@ -373,7 +350,7 @@ class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView)
             **kwargs: Additional context data
             
         Returns:
-            dict: Context with filters, specializations and SEO metadata
+            dict: Context with filters, facet groups and SEO metadata
         """
         context = super().get_context_data(**kwargs)
         
@@ -383,9 +360,13 @@ class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView)
         context['specialization_filter'] = self.request.GET.get('specialization', '')
         context['home_visits_filter'] = self.request.GET.get('home_visits', '')
         
-        # Добавляем список всех специализаций для фильтра
-        from staff.models import Specialization
-        context['specializations'] = Specialization.objects.all().order_by('name')
+        # Группы фильтров со счетчиками
+        facets = context['facets']
+        context['facet_groups'] = [
+            ('Город', facets['city']),
+            ('Специализация', facets['specialization']),
+            ('Выезд на дом', facets['home_visits']),
+        ]
         
         # SEO контекст
         context['meta_title'] = 'Частные врачи - Центр помощи зависимым'
@@ -393,7 +374,7 @@ class PrivateDoctorListView(SearchMixin, FilterMixin, PaginationMixin, ListView)
         
         return context
 
-class PrivateDoctorDetailView(GeoDataMixin, DetailView):
+class PrivateDoctorDetailView(CacheMixin, GeoDataMixin, DetailView):
     """
     Detailed view of a private doctor.
     
@@ -402,6 +383,10 @@ class PrivateDoctorDetailView(GeoDataMixin, DetailView):
     model = PrivateDoctor
     template_name = 'facilities/private_doctor_detail.html'
     context_object_name = 'doctor'
+    cache_tags = (
+        'facilities.PrivateDoctor', 'facilities.FacilityImage', 'facilities.FacilityDocument',
+        'medical_services.FacilityService', 'reviews.Review', 'staff.Specialization',
+    )
 
     def get_queryset(self):
         """
@@ -446,24 +431,12 @@ class PrivateDoctorDetailView(GeoDataMixin, DetailView):
     
     def _get_related_doctors(self):
         """
-        Get related doctors with similar specializations or location.
+        Get precomputed related doctors (shared specializations, city, services).
         
         Returns:
-            QuerySet: Related doctors
+            QuerySet: Related doctors, most similar first
         """
-        related_doctors = PrivateDoctor.objects.filter(is_active=True)
-        
-        # Фильтруем по специализации
-        if self.object.specializations.exists():
-            related_doctors = related_doctors.filter(
-                specializations__in=self.object.specializations.all()
-            )
-        
-        # Фильтруем по городу
-        if self.object.city:
-            related_doctors = related_doctors.filter(city=self.object.city)
-        
-        return related_doctors.exclude(pk=self.object.pk)[:4]
+        return get_related(self.object, limit=4, queryset=PrivateDoctor.objects.with_related_data())
     
     def _get_doctor_services(self):
         """
@@ -494,37 +467,96 @@ class PrivateDoctorDetailView(GeoDataMixin, DetailView):
             is_published=True
         ).order_by('-created_at')
 
-def load_more_doctors(request):
+
+LOAD_MORE_LIMIT = 12
+
+
+def _load_more(request, view_class):
     """
-    AJAX loading of additional doctors.
+    Render the next page of cards for a list view.
     
-    TODO: Refactor to use custom manager.
+    The list view builds the queryset, so search, filters and sorting of
+    the page being extended are applied. Pages are selected by an opaque
+    keyset cursor (sort key + id). The legacy ``offset`` parameter is still
+    accepted for the first request and also returns ``next_cursor``. An
+    ordering that keyset pagination cannot follow (expressions, nullable
+    keys) returns no cursor, and the client keeps paging by ``offset``.
+    Cards are taken from the fragment cache, only missing ones are rendered.
     
     Args:
         request: HTTP request object
+        view_class: List view class providing get_queryset()
         
     Returns:
-        JsonResponse: JSON response with cards HTML and has_more flag
+        JsonResponse: JSON response with cards HTML, has_more flag and next_cursor
     """
     try:
-        offset = int(request.GET.get('offset', 0))
-        limit = 12
-        
-        doctors = PrivateDoctor.objects.filter(is_active=True).order_by('last_name', 'first_name')[offset:offset + limit + 1]
-        has_more = len(doctors) > limit
-        doctors = doctors[:limit]
-        
-        cards_html = ''
-        for doctor in doctors:
-            cards_html += render_to_string(
-                'includes/cards/private_doctor_card.html',
-                {'doctor': doctor},
-                request=request
-            )
+        view = view_class()
+        view.setup(request)
+        queryset = view.get_queryset()
+        ordering = get_keyset_ordering(queryset)
+        
+        cursor = request.GET.get('cursor')
+        if cursor:
+            items, next_cursor = keyset_paginate(queryset, cursor, LOAD_MORE_LIMIT, ordering)
+            has_more = next_cursor is not None
+        else:
+            offset = int(request.GET.get('offset', 0))
+            if offset < 0:
+                raise ValueError('offset must be non-negative')
+            if ordering is not None:
+                queryset = queryset.order_by(*ordering)
+            items = list(queryset[offset:offset + LOAD_MORE_LIMIT + 1])
+            has_more = len(items) > LOAD_MORE_LIMIT
+            items = items[:LOAD_MORE_LIMIT]
+            # Без курсора клиент запрашивает следующую страницу по offset
+            next_cursor = cursor_for(items[-1], ordering) if has_more and ordering is not None else None
+        
+        cards_html = ''.join(render_cards(items))
         
         return JsonResponse({
             'cards': cards_html,
-            'has_more': has_more
+            'has_more': has_more,
+            'next_cursor': next_cursor,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
+
+
+def load_more_rehabs(request):
+    """
+    AJAX loading of additional rehabilitation centers.
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        JsonResponse: JSON response with cards HTML, has_more flag and next_cursor
+    """
+    return _load_more(request, RehabilitationCenterListView)
+
+
+def load_more_clinics(request):
+    """
+    AJAX loading of additional clinics.
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        JsonResponse: JSON response with cards HTML, has_more flag and next_cursor
+    """
+    return _load_more(request, ClinicListView)
+
+
+def load_more_doctors(request):
+    """
+    AJAX loading of additional doctors.
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        JsonResponse: JSON response with cards HTML, has_more flag and next_cursor
+    """
+    return _load_more(request, PrivateDoctorListView)
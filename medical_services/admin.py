@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django.contrib.contenttypes.models import ContentType
+from core.admin import GenericPrefetchAdminMixin
 from facilities.utils import CustomJSONEncoder
 from .models import (
     ServiceCategory,
@@ -76,7 +77,7 @@ class ServiceAdmin(admin.ModelAdmin):
         return CustomJSONEncoder
 
 @admin.register(FacilityService)
-class FacilityServiceAdmin(admin.ModelAdmin):
+class FacilityServiceAdmin(GenericPrefetchAdminMixin, admin.ModelAdmin):
     list_display = ['get_facility_name', 'service', 'price', 'is_active']
     list_filter = ['content_type', 'service', 'is_active']
     search_fields = ['service__name']
@@ -6,3 +6,7 @@ class MedicalServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'medical_services'
     verbose_name = _('Медицинские услуги')
+
+    def ready(self):
+        """Подключение сигналов сброса кэша контекст-процессоров."""
+        import medical_services.signals
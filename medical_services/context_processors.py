@@ -1,107 +1,87 @@
-from .models import ServiceCategory, Service
+import logging
+
+from django.db.models import Prefetch
+from django.utils.functional import SimpleLazyObject
+from core.caching import VersionedCache
+from .models import ServiceCategory, Service, ACTIVE_SERVICES_ATTR
+
+logger = logging.getLogger(__name__)
+
+# Кэш меню и футера; сбрасывается сигналами ServiceCategory и Service
+service_menu_cache = VersionedCache('service_menu')
+
+# Основные категории в порядке вывода, остальные идут за ними по алфавиту
+MAIN_CATEGORY_SLUGS = ['lechenie-narkomanii', 'lechenie-alkogolizma', 'drugie-uslugi']
+
+# Ключи футера для основных категорий
+FOOTER_KEYS = {
+    'lechenie-alkogolizma': 'alcoholism',
+    'lechenie-narkomanii': 'drug_addiction',
+    'drugie-uslugi': 'other',
+}
+
+# Максимум услуг категории в футере
+FOOTER_SERVICES_LIMIT = 10
 
 
 def service_categories(request):
     """
-    Контекстный процессор для передачи категорий услуг во все шаблоны
+    Контекстный процессор для передачи категорий услуг во все шаблоны.
+
+    Список берется из кэша только при обращении к нему в шаблоне.
     """
-    try:
-        # Получаем активные категории услуг в фиксированном порядке
-        categories = []
-        
-        # 1. Лечение наркомании
-        drug_addiction_category = ServiceCategory.objects.filter(
-            slug='lechenie-narkomanii',
-            is_active=True
-        ).first()
-        if drug_addiction_category:
-            categories.append(drug_addiction_category)
-        
-        # 2. Лечение алкоголизма
-        alcoholism_category = ServiceCategory.objects.filter(
-            slug='lechenie-alkogolizma',
-            is_active=True
-        ).first()
-        if alcoholism_category:
-            categories.append(alcoholism_category)
-        
-        # 3. Другие услуги
-        other_category = ServiceCategory.objects.filter(
-            slug='drugie-uslugi',
-            is_active=True
-        ).first()
-        if other_category:
-            categories.append(other_category)
-        
-        # 4. Остальные категории (если есть) - по алфавиту
-        other_categories = ServiceCategory.objects.filter(
-            is_active=True
-        ).exclude(
-            slug__in=['lechenie-alkogolizma', 'lechenie-narkomanii', 'drugie-uslugi']
-        ).order_by('name')
-        
-        categories.extend(other_categories)
-        
-        return {'service_categories': categories}
-        
-    except Exception:
-        # В случае ошибки возвращаем пустой QuerySet
-        return {'service_categories': ServiceCategory.objects.none()}
+    return {'service_categories': SimpleLazyObject(lambda: _get_cached('categories', _build_service_categories, []))}
 
 
 def footer_services(request):
     """
-    Контекстный процессор для передачи данных услуг в футер
+    Контекстный процессор для передачи данных услуг в футер.
+
+    Данные берутся из кэша только при обращении к ним в шаблоне.
+    """
+    return {'footer_services': SimpleLazyObject(lambda: _get_cached('footer', _build_footer_services, {}))}
+
+
+def _get_cached(key, build, default):
+    """
+    Значение из кэша меню.
+
+    При ошибке (база или кэш недоступны) возвращается пустое значение; оно
+    не кэшируется, следующий запрос собирает данные заново.
     """
     try:
-        # Получаем основные категории услуг для футера
-        alcoholism_category = ServiceCategory.objects.filter(
-            slug='lechenie-alkogolizma',
-            is_active=True
-        ).first()
-        
-        drug_addiction_category = ServiceCategory.objects.filter(
-            slug='lechenie-narkomanii',
-            is_active=True
-        ).first()
-        
-        other_category = ServiceCategory.objects.filter(
-            slug='drugie-uslugi',
-            is_active=True
-        ).first()
-        
-        # Получаем услуги для каждой категории (максимум 8-10 для футера)
-        footer_services = {}
-        
-        if alcoholism_category:
-            footer_services['alcoholism'] = {
-                'category': alcoholism_category,
-                'services': Service.objects.filter(
-                    categories=alcoholism_category,
-                    is_active=True
-                ).order_by('display_order', 'name')[:10]
-            }
-        
-        if drug_addiction_category:
-            footer_services['drug_addiction'] = {
-                'category': drug_addiction_category,
-                'services': Service.objects.filter(
-                    categories=drug_addiction_category,
-                    is_active=True
-                ).order_by('display_order', 'name')[:10]
-            }
-        
-        if other_category:
-            footer_services['other'] = {
-                'category': other_category,
-                'services': Service.objects.filter(
-                    categories=other_category,
-                    is_active=True
-                ).order_by('display_order', 'name')[:10]
-            }
-        
-        return {'footer_services': footer_services}
-        
+        return service_menu_cache.get(key, build)
     except Exception:
-        # В случае ошибки возвращаем пустой словарь
-        return {'footer_services': {}} 
\ No newline at end of file
+        logger.exception('Failed to build service menu %s', key)
+        return default
+
+
+def _build_service_categories():
+    """Активные категории в фиксированном порядке с активными услугами (2 запроса)"""
+    categories = list(
+        ServiceCategory.objects.filter(is_active=True).order_by('name').prefetch_related(
+            Prefetch(
+                'services',
+                queryset=Service.objects.filter(is_active=True).order_by('display_order', 'name'),
+                to_attr=ACTIVE_SERVICES_ATTR
+            )
+        )
+    )
+
+    # Сортировка устойчивая: остальные категории сохраняют алфавитный порядок
+    position = {slug: index for index, slug in enumerate(MAIN_CATEGORY_SLUGS)}
+    categories.sort(key=lambda category: position.get(category.slug, len(position)))
+    return categories
+
+
+def _build_footer_services():
+    """Основные категории футера с первыми услугами"""
+    footer_services = {}
+    for category in service_menu_cache.get('categories', _build_service_categories):
+        key = FOOTER_KEYS.get(category.slug)
+        if key:
+            footer_services[key] = {
+                'category': category,
+                'services': category.active_services()[:FOOTER_SERVICES_LIMIT]
+            }
+    return footer_services
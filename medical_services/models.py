@@ -12,6 +12,10 @@ from facilities.models import RehabCenter
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+# Атрибут с предзагруженными активными услугами категории (Prefetch to_attr)
+ACTIVE_SERVICES_ATTR = 'prefetched_active_services'
+
+
 class ServiceCategory(TimeStampedModel):
     """
     Категории медицинских услуг
@@ -75,8 +79,11 @@ class ServiceCategory(TimeStampedModel):
         Получить только активные услуги категории.
         
         Returns:
-            QuerySet: Активные услуги категории
+            QuerySet: Активные услуги категории (список, если они
+            предзагружены в ACTIVE_SERVICES_ATTR)
         """
+        if hasattr(self, ACTIVE_SERVICES_ATTR):
+            return getattr(self, ACTIVE_SERVICES_ATTR)
         return self.services.filter(is_active=True).order_by('display_order', 'name')
 
 class TherapyMethod(TimeStampedModel):
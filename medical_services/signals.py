@@ -0,0 +1,23 @@
+"""
+Сигналы приложения medical_services.
+
+Меню категорий и футер с услугами (context_processors.service_menu_cache)
+кэшируются на всех страницах; изменения категорий, услуг и их связей
+сбрасывают кэш во всех процессах.
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .context_processors import service_menu_cache
+from .models import ServiceCategory, Service
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(m2m_changed, sender=Service.categories.through)
+def invalidate_service_menu(sender, **kwargs):
+    """Сбрасывает кэш меню и футера с услугами."""
+    service_menu_cache.invalidate_on_change()
@@ -0,0 +1,96 @@
+"""
+Тесты кэшируемых контекст-процессоров меню, футера и контента сайта.
+"""
+
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from content.context_processors import site_content
+from content.models import Banner
+from medical_services.context_processors import (
+    service_categories, footer_services, service_menu_cache,
+)
+from medical_services.models import ServiceCategory, Service
+
+
+class CachedContextProcessorsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        service_menu_cache.invalidate()
+        self.request = RequestFactory().get('/')
+        self.other = ServiceCategory.objects.create(name='Другие услуги', slug='drugie-uslugi')
+        self.alcoholism = ServiceCategory.objects.create(name='Лечение алкоголизма', slug='lechenie-alkogolizma')
+        self.extra = ServiceCategory.objects.create(name='Анонимная помощь', slug='anonimnaya-pomosch')
+        self.service = Service.objects.create(name='Детокс', description='', display_order=1)
+        self.service.categories.add(self.alcoholism)
+        Service.objects.create(name='Скрытая', description='', is_active=False).categories.add(self.alcoholism)
+
+    def test_order_and_services(self):
+        """Порядок категорий сохранен, активные услуги предзагружены"""
+        categories = list(service_categories(self.request)['service_categories'])
+        self.assertEqual(categories, [self.alcoholism, self.other, self.extra])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(categories[0].active_services()), [self.service])
+
+        footer = footer_services(self.request)['footer_services']
+        self.assertEqual(set(footer), {'alcoholism', 'other'})
+        self.assertEqual(list(footer['alcoholism']['services']), [self.service])
+
+    def test_cached_and_lazy(self):
+        """Повторные запросы не обращаются к базе, неиспользуемые данные не читаются"""
+        list(service_categories(self.request)['service_categories'])
+        with self.assertNumQueries(0):
+            list(service_categories(self.request)['service_categories'])
+            dict(footer_services(self.request)['footer_services'])
+            service_categories(RequestFactory().get('/other/'))
+
+    def test_failure_not_cached(self):
+        """Ошибка базы дает пустое меню только для текущего запроса"""
+        with mock.patch.object(ServiceCategory.objects, 'filter', side_effect=DatabaseError):
+            with self.assertLogs('medical_services.context_processors', level='ERROR'):
+                self.assertEqual(list(service_categories(self.request)['service_categories']), [])
+                self.assertEqual(dict(footer_services(self.request)['footer_services']), {})
+        self.assertEqual(
+            list(service_categories(self.request)['service_categories']), [self.alcoholism, self.other, self.extra])
+        self.assertEqual(set(footer_services(self.request)['footer_services']), {'alcoholism', 'other'})
+
+    def test_invalidated_by_signals(self):
+        """Изменение категорий и услуг сбрасывает кэш"""
+        list(service_categories(self.request)['service_categories'])
+        self.extra.is_active = False
+        self.extra.save()
+        self.assertNotIn(self.extra, service_categories(self.request)['service_categories'])
+
+        service = Service.objects.create(name='Консультация', description='', display_order=2)
+        service.categories.add(self.alcoholism)
+        footer = footer_services(self.request)['footer_services']
+        self.assertEqual(list(footer['alcoholism']['services']), [self.service, service])
+
+    def test_site_content(self):
+        """Баннеры кэшируются и сбрасываются при изменении"""
+        self.assertEqual(list(site_content(self.request)['banners']), [])
+        banner = Banner.objects.create(
+            title='Баннер', description='', image='banners/a.jpg',
+            start_date=date.today(), end_date=date.today())
+        self.assertEqual(list(site_content(self.request)['banners']), [banner])
+        self.assertFalse(site_content(self.request)['site_settings'])
+        with self.assertNumQueries(0):
+            list(site_content(self.request)['banners'])
+            self.assertFalse(site_content(self.request)['site_settings'])
+
+    @override_settings(PAGE_CACHE={'ENABLED': False})
+    def test_page_queries(self):
+        """Контекст-процессоры не добавляют запросов к закэшированной странице"""
+        url = reverse('medical_services:service_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('FROM "medical_services_servicecategory" WHERE', sql)
+        self.assertNotIn('content_banner', sql)
+        self.assertNotIn('content_sitesettings', sql)
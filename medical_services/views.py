@@ -1,16 +1,18 @@
 from django.views.generic import ListView, DetailView
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from core.mixins import CacheMixin
 from .models import ServiceCategory, Service, FacilityService
 from facilities.models import Clinic, RehabCenter, PrivateDoctor
 
 
-class ServiceCategoryListView(ListView):
+class ServiceCategoryListView(CacheMixin, ListView):
     """Список всех категорий услуг"""
     model = ServiceCategory
     template_name = 'medical_services/category_list.html'
     context_object_name = 'categories'
+    cache_tags = ('medical_services.ServiceCategory', 'medical_services.Service')
     
     def get_queryset(self):
         return ServiceCategory.objects.filter(
@@ -28,11 +30,12 @@ class ServiceCategoryListView(ListView):
         return context
 
 
-class ServiceCategoryDetailView(DetailView):
+class ServiceCategoryDetailView(CacheMixin, DetailView):
     """Детальная страница категории с услугами"""
     model = ServiceCategory
     template_name = 'medical_services/category_detail.html'
     context_object_name = 'category'
+    cache_tags = ('medical_services.ServiceCategory', 'medical_services.Service')
     
     def get_queryset(self):
         return ServiceCategory.objects.filter(is_active=True).prefetch_related('services')
@@ -51,11 +54,16 @@ class ServiceCategoryDetailView(DetailView):
         return context
 
 
-class ServiceDetailView(DetailView):
+class ServiceDetailView(CacheMixin, DetailView):
     """Детальная страница услуги с учреждениями"""
     model = Service
     template_name = 'medical_services/service_detail.html'
     context_object_name = 'service'
+    cache_tags = (
+        'medical_services.Service', 'medical_services.FacilityService',
+        'facilities.Clinic', 'facilities.RehabCenter', 'facilities.PrivateDoctor',
+        'facilities.FacilityImage', 'staff.FacilitySpecialist',
+    )
     
     def get_queryset(self):
         return Service.objects.filter(is_active=True).prefetch_related('categories')
@@ -70,54 +78,28 @@ class ServiceDetailView(DetailView):
         ).select_related(
             'service'
         ).prefetch_related(
-            'specialists'
+            'specialists',
+            # Учреждения всех типов загружаются пачкой: один запрос на модель;
+            # неактивные учреждения на странице услуги не показываются
+            GenericPrefetch('facility', [
+                Clinic.objects.with_related_data().filter(is_active=True),
+                RehabCenter.objects.with_related_data().filter(is_active=True),
+                PrivateDoctor.objects.with_related_data(),
+            ]),
         ).order_by('content_type__model')
         
         # Группируем по типам учреждений
-        clinics = []
-        rehab_centers = []
-        private_doctors = []
-        
-        # Получаем ContentType для каждого типа учреждения
-        try:
-            clinic_ct = ContentType.objects.get(app_label='facilities', model='clinic')
-            rehab_ct = ContentType.objects.get(app_label='facilities', model='rehabcenter')
-            doctor_ct = ContentType.objects.get(app_label='facilities', model='privatedoctor')
-            
-            for fs in facility_services:
-                if fs.content_type == clinic_ct:
-                    # Получаем клинику
-                    try:
-                        clinic = Clinic.objects.get(id=fs.object_id)
-                        clinics.append({
-                            'facility_service': fs,
-                            'facility': clinic
-                        })
-                    except Clinic.DoesNotExist:
-                        continue
-                elif fs.content_type == rehab_ct:
-                    # Получаем реабилитационный центр
-                    try:
-                        rehab = RehabCenter.objects.get(id=fs.object_id)
-                        rehab_centers.append({
-                            'facility_service': fs,
-                            'facility': rehab
-                        })
-                    except RehabCenter.DoesNotExist:
-                        continue
-                elif fs.content_type == doctor_ct:
-                    # Получаем частного врача
-                    try:
-                        doctor = PrivateDoctor.objects.get(id=fs.object_id)
-                        private_doctors.append({
-                            'facility_service': fs,
-                            'facility': doctor
-                        })
-                    except PrivateDoctor.DoesNotExist:
-                        continue
-        except ContentType.DoesNotExist:
-            # Если ContentType не найдены, оставляем списки пустыми
-            pass
+        groups = {Clinic: [], RehabCenter: [], PrivateDoctor: []}
+        for fs in facility_services:
+            facility = fs.facility
+            if facility is not None and type(facility) in groups:
+                groups[type(facility)].append({
+                    'facility_service': fs,
+                    'facility': facility
+                })
+        clinics = groups[Clinic]
+        rehab_centers = groups[RehabCenter]
+        private_doctors = groups[PrivateDoctor]
         
         # SEO
         context['meta_title'] = self.object.meta_title or self.object.name
@@ -127,17 +109,18 @@ class ServiceDetailView(DetailView):
             'clinics': clinics,
             'rehab_centers': rehab_centers,
             'private_doctors': private_doctors,
-            'total_facilities': len(facility_services)
+            'total_facilities': len(clinics) + len(rehab_centers) + len(private_doctors)
         })
         
         return context
 
 
-class ServiceListView(ListView):
+class ServiceListView(CacheMixin, ListView):
     """Список всех услуг"""
     model = Service
     template_name = 'medical_services/service_list.html'
     context_object_name = 'services'
+    cache_tags = ('medical_services.Service', 'medical_services.ServiceCategory')
     paginate_by = 12
     
     def get_queryset(self):
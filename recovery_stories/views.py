@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView
 from django.db.models import Q
+from core.generic import prefetch_generic
 from .models import RecoveryStory, RecoveryCategory, RecoveryTag
 
 # Create your views here.
@@ -62,9 +63,15 @@ class StoryDetailView(DetailView):
     def get_queryset(self):
         return RecoveryStory.objects.filter(is_published=True).select_related('category', 'content_type')
 
+    def get_object(self, queryset=None):
+        story = super().get_object(queryset)
+        # Учреждение истории загружается вместе с городом и фотографиями
+        prefetch_generic([story], 'facility')
+        return story
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        story = self.get_object()
+        story = self.object
         # SEO
         context['meta_title'] = story.meta_title or story.title
         context['meta_description'] = story.meta_description or (story.excerpt[:160] if story.excerpt else '')
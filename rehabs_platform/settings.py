@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from  rehabs_platform.secret import MY_SECRET_KEY
 
@@ -66,6 +67,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
     # Кастомные middleware для логирования
+    'core.middleware.QueryInspectorMiddleware',
     'core.middleware.RequestLoggingMiddleware',
     'core.middleware.SecurityMiddleware',
     'core.middleware.DatabaseLoggingMiddleware',
@@ -106,6 +108,45 @@ DATABASES = {
     }
 }
 
+# Cache
+# Кэш страниц, контекста и карточек, счетчики лимитов заявок и метрики
+# должны быть общими для всех процессов: в продакшене задайте REDIS_URL
+# (или настройте Memcached). LocMemCache у каждого процесса свой и годится
+# только для разработки; manage.py check --deploy предупреждает об этом.
+# Номера версий кэшей хранятся отдельно в 'versions': их вытеснение вернуло
+# бы устаревшие данные. Ключи версий бессрочные, поэтому Redis нужна
+# политика вытеснения volatile-* (ключи без срока не вытесняются).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'rehabs',
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'rehabs-versions',
+            'TIMEOUT': None,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'default',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'versions',
+            'TIMEOUT': None,
+            # Ключей версий единицы на модель: до вытеснения не доходит
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -162,7 +203,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 # Создание папки logs если её нет
-import os
 logs_dir = BASE_DIR / 'logs'
 if not logs_dir.exists():
     logs_dir.mkdir(exist_ok=True)
@@ -222,7 +262,52 @@ SITE_URL = 'http://localhost:8000'  # Изменить на реальный URL
 # EMAIL_HOST_USER = 'your-email@yandex.ru'
 # EMAIL_HOST_PASSWORD = 'your-app-password'
 
+# Подсчет SQL-запросов на запрос, обнаружение N+1 и журнал медленных
+# запросов (core.query_inspector); порог в секундах
+QUERY_INSPECTOR = {
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_THRESHOLD': 0.5,
+    'EXPLAIN_SLOW_QUERIES': False,
+}
+
+# Паттерны подозрительных запросов по типам активности (core.security_scan);
+# проверяются путь и значения GET-параметров без учета регистра
+SECURITY_SCAN = {
+    'RULES': {
+        'sql_injection_attempt': ['union select', 'drop table', 'delete from', 'insert into', 'update set'],
+        'xss_attempt': ['<script', 'script>', 'javascript:'],
+    },
+}
+
+# Ограничение частоты заявок (core.rate_limit): (заявок, окно в секундах)
+# на IP и на номер телефона для каждой формы; None отключает ключ.
+# TRUSTED_PROXY_COUNT - число своих прокси перед сайтом (nginx и т.п.),
+# дописывающих X-Forwarded-For; при 0 используется REMOTE_ADDR
+RATE_LIMITS = {
+    'TRUSTED_PROXY_COUNT': 0,
+    'DEFAULT': {
+        'ip': (10, 600),
+        'phone': (3, 3600),
+    },
+    'ENDPOINTS': {
+        'consultation': {'ip': (10, 600), 'phone': (3, 3600)},
+        'dependent': {'ip': (10, 600), 'phone': (3, 3600)},
+        'partner': {'ip': (5, 3600), 'phone': (2, 3600)},
+    },
+}
+
 # Настройки логирования
+# Обработчики подключаются через очередь: запись на диск идет в фоновом
+# потоке (core.logging.configure_logging), запрос не ждет диска
+LOGGING_CONFIG = 'core.logging.configure_logging'
+
+# Очередь логов: размер, пакет записи и интервал сброса на диск (секунды)
+LOG_QUEUE = {
+    'MAXSIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 0.2,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -257,7 +342,7 @@ LOGGING = {
         },
         'file_general': {
             'level': 'INFO',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'general.log',
             'when': 'midnight',
             'interval': 1,
@@ -266,7 +351,7 @@ LOGGING = {
         },
         'file_errors': {
             'level': 'ERROR',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'errors.log',
             'when': 'midnight',
             'interval': 1,
@@ -275,7 +360,7 @@ LOGGING = {
         },
         'file_security': {
             'level': 'WARNING',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'security.log',
             'when': 'midnight',
             'interval': 1,
@@ -284,7 +369,7 @@ LOGGING = {
         },
         'file_business': {
             'level': 'INFO',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'business.log',
             'when': 'midnight',
             'interval': 1,
@@ -293,7 +378,7 @@ LOGGING = {
         },
         'file_performance': {
             'level': 'INFO',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'performance.log',
             'when': 'midnight',
             'interval': 1,
@@ -302,7 +387,7 @@ LOGGING = {
         },
         'file_database': {
             'level': 'INFO',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'database.log',
             'when': 'midnight',
             'interval': 1,
@@ -311,7 +396,7 @@ LOGGING = {
         },
         'file_requests': {
             'level': 'INFO',
-            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'class': 'core.logging.BatchedTimedRotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'requests.log',
             'when': 'midnight',
             'interval': 1,
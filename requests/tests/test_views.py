@@ -1,4 +1,5 @@
-from django.test import TestCase, Client, RequestFactory
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.messages.storage.fallback import FallbackStorage
@@ -234,4 +235,79 @@ class PrintReportViewTest(TestCase):
         url = reverse('requests:print_report', args=[99999])
         response = self.client.get(url)
         
-        self.assertEqual(response.status_code, 302)  # Редирект на страницу ошибки 
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)  # Редирект на страницу ошибки
+
+
+@override_settings(RATE_LIMITS={'ENDPOINTS': {
+    'consultation': {'ip': (3, 600), 'phone': (2, 3600)},
+    'partner': {'ip': (1, 600), 'phone': None},
+}})
+class RateLimitTest(TestCase):
+    """Тесты ограничения частоты заявок"""
+    
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('requests:consultation_request')
+    
+    def test_phone_limit_ajax(self):
+        """Повторные заявки с одного телефона получают JSON 429"""
+        for _ in range(2):
+            response = self.client.post(self.url, {'phone': '+7 (999) 555-11-22'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(response.status_code, 200)
+        
+        # Тот же номер в другом формате
+        response = self.client.post(self.url, {'phone': '89995551122'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(AnonymousRequest.objects.count(), 2)
+    
+    def test_ip_limit(self):
+        """Лимит по IP действует для разных телефонов"""
+        for index in range(3):
+            self.client.post(self.url, {'phone': f'7999000000{index}'})
+        response = self.client.post(self.url, {'phone': '79990000009'})
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, 'Слишком много заявок', status_code=429)
+        
+        # Другой клиент не ограничен
+        response = self.client.post(self.url, {'phone': '79990000008'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+    
+    def test_spoofed_forwarded_for(self):
+        """Подмена X-Forwarded-For не сбрасывает счетчик IP"""
+        for index in range(3):
+            self.client.post(self.url, {'phone': f'7999000000{index}'}, HTTP_X_FORWARDED_FOR=f'10.1.1.{index}')
+        response = self.client.post(self.url, {'phone': '79990000009'}, HTTP_X_FORWARDED_FOR='10.1.1.9')
+        self.assertEqual(response.status_code, 429)
+    
+    def test_trusted_proxy(self):
+        """За доверенным прокси берется адрес, добавленный самим прокси"""
+        limits = {'TRUSTED_PROXY_COUNT': 1, 'ENDPOINTS': {'consultation': {'ip': (1, 600), 'phone': None}}}
+        with override_settings(RATE_LIMITS=limits):
+            self.client.post(self.url, {'phone': '79990000001'}, HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.5')
+            response = self.client.post(self.url, {'phone': '79990000002'}, HTTP_X_FORWARDED_FOR='2.2.2.2, 203.0.113.5')
+            self.assertEqual(response.status_code, 429)
+            # Другой клиент за тем же прокси
+            response = self.client.post(self.url, {'phone': '79990000003'}, HTTP_X_FORWARDED_FOR='203.0.113.6')
+            self.assertEqual(response.status_code, 302)
+    
+    def test_limits_per_endpoint(self):
+        """Лимиты форм независимы, GET не учитывается"""
+        partner_url = reverse('requests:partner_request')
+        data = {'name': 'Партнер', 'phone': '79990000001', 'email': 'p@example.com', 'message': 'Сотрудничество'}
+        self.assertEqual(self.client.post(partner_url, data).status_code, 302)
+        response = self.client.post(partner_url, dict(data, phone='79990000002'))
+        self.assertEqual(response.status_code, 429)
+        
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.post(self.url, {'phone': '79990000003'})
+        self.assertEqual(response.status_code, 302)
+    
+    def test_disabled(self):
+        with override_settings(RATE_LIMITS={'ENABLED': False}):
+            for index in range(5):
+                response = self.client.post(self.url, {'phone': f'7999111111{index}'})
+                self.assertEqual(response.status_code, 302)
+
@@ -8,15 +8,18 @@ from .models import AnonymousRequest, DependentRequest
 from django.utils import timezone
 from facilities.models import Clinic, RehabCenter, PrivateDoctor, OrganizationType
 from services.request_service import RequestService
+from core.mixins import RateLimitMixin
 
 # Create your views here.
 
-class ConsultationRequestView(CreateView):
+class ConsultationRequestView(RateLimitMixin, CreateView):
     """
     View for creating consultation requests.
     
-    Uses RequestService for business logic processing.
+    Uses RequestService for business logic processing; submissions are
+    rate limited per IP and phone number.
     """
+    rate_limit_scope = 'consultation'
     model = AnonymousRequest
     fields = ['phone']  # Только телефон, остальное заполним в form_valid
     template_name = 'facilities/includes/consultation.html'
@@ -112,12 +115,14 @@ class ConsultationRequestView(CreateView):
         return redirect('requests:error', error_message=error_text)
 
 
-class PartnerRequestView(CreateView):
+class PartnerRequestView(RateLimitMixin, CreateView):
     """
     View for creating partnership requests.
     
-    Uses RequestService for business logic processing.
+    Uses RequestService for business logic processing; submissions are
+    rate limited per IP and phone number.
     """
+    rate_limit_scope = 'partner'
     model = AnonymousRequest
     fields = ['name', 'phone', 'email', 'message']  # Используем существующие поля
     template_name = 'index.html'
@@ -213,12 +218,14 @@ class PartnerRequestView(CreateView):
         return redirect('requests:error', error_message=error_text)
 
 
-class DependentRequestView(CreateView):
+class DependentRequestView(RateLimitMixin, CreateView):
     """
     View for creating dependent treatment requests.
     
-    Uses RequestService for business logic processing.
+    Uses RequestService for business logic processing; submissions are
+    rate limited per IP and phone number.
     """
+    rate_limit_scope = 'dependent'
     model = DependentRequest
     template_name = 'facilities/includes/consultation.html'
     fields = ['phone', 'addiction_type']  # Используем существующие поля
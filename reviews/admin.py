@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.contenttypes.models import ContentType
+from core.admin import GenericPrefetchAdminMixin
 from django import forms
 from facilities.models import Clinic, RehabCenter
 from .models import Review
@@ -26,7 +27,7 @@ class ReviewAdminForm(forms.ModelForm):
         exclude = ['created_by']  # Исключаем поле created_by, т.к. оно будет заполняться автоматически
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(GenericPrefetchAdminMixin, admin.ModelAdmin):
     form = ReviewAdminForm
     list_display = ('id', 'get_facility_name', 'author_display', 'get_rating_stars', 'short_content', 'created_at', 'is_published')
     list_filter = ('rating', 'is_published', 'created_at', 'content_type')
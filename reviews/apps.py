@@ -6,3 +6,7 @@ class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
     verbose_name = _('Отзывы')
+
+    def ready(self):
+        """Подключение сигналов при запуске приложения."""
+        import reviews.signals
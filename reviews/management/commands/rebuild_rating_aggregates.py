@@ -0,0 +1,35 @@
+"""
+Django management command для пересчета статистики отзывов.
+
+Использование:
+    python manage.py rebuild_rating_aggregates
+    python manage.py rebuild_rating_aggregates --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from reviews.utils import get_rated_models, refresh_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные рейтинги и количество отзывов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество объектов, обрабатываемых за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        self.stdout.write('Пересчет рейтингов...')
+        
+        for model in get_rated_models():
+            refreshed = refresh_rating_aggregates(model, batch_size=batch_size)
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {model._meta.verbose_name_plural}: {refreshed}')
+            )
+        
+        self.stdout.write(self.style.SUCCESS('\n✓ Пересчет рейтингов завершен'))
@@ -5,6 +5,48 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import gettext_lazy as _
 
+
+def empty_rating_histogram():
+    """Пустая гистограмма оценок: количество отзывов с оценкой 1..5"""
+    return [0, 0, 0, 0, 0]
+
+
+class RatingAggregateModel(models.Model):
+    """
+    Абстрактная модель с денормализованной статистикой опубликованных отзывов.
+
+    Поля пересчитываются сигналами модели Review и командой
+    rebuild_rating_aggregates, поэтому сортировка и фильтрация по рейтингу
+    выполняются без JOIN с таблицей отзывов.
+    """
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Количество отзывов')
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Сумма оценок')
+    )
+    rating_avg = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name=_('Средняя оценка')
+    )
+    rating_histogram = models.JSONField(
+        default=empty_rating_histogram,
+        editable=False,
+        verbose_name=_('Распределение оценок')
+    )
+
+    class Meta:
+        abstract = True
+
+
 class Review(models.Model):
     """Модель отзыва"""
     content_type = models.ForeignKey(
@@ -0,0 +1,42 @@
+"""
+Сигналы приложения reviews.
+
+Поддерживают актуальность денормализованной статистики отзывов
+(RatingAggregateModel) при создании, изменении и удалении отзывов.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Review
+from .utils import refresh_rating_for_target
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_target(sender, instance, **kwargs):
+    """Запоминает прежний объект отзыва, если отзыв переносят на другой объект."""
+    instance._previous_target = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list(
+            'content_type_id', 'object_id'
+        ).first()
+        if previous and previous != (instance.content_type_id, instance.object_id):
+            instance._previous_target = previous
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, **kwargs):
+    """Пересчитывает рейтинг объекта после сохранения отзыва."""
+    refresh_rating_for_target(instance.content_type, instance.object_id)
+
+    previous = getattr(instance, '_previous_target', None)
+    if previous:
+        content_type_id, object_id = previous
+        refresh_rating_for_target(ContentType.objects.get_for_id(content_type_id), object_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Пересчитывает рейтинг объекта после удаления отзыва."""
+    refresh_rating_for_target(instance.content_type, instance.object_id)
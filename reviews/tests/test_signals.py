@@ -0,0 +1,137 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth import get_user_model
+from facilities.models import Clinic, RehabCenter, OrganizationType
+from staff.models import FacilitySpecialist
+from core.models import City, Region
+from reviews.models import Review
+from reviews.utils import refresh_rating_aggregates
+
+User = get_user_model()
+
+
+class RatingAggregateSignalsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ratinguser',
+            email='rating@example.com',
+            password='testpass123'
+        )
+        self.region = Region.objects.create(name='Регион рейтинга', slug='rating-region')
+        self.city = City.objects.create(name='Город рейтинга', slug='rating-city', region=self.region)
+        self.organization_type = OrganizationType.objects.create(
+            name='Клиника', slug='clinic-rating', description='Медицинская клиника')
+        self.clinic = Clinic.objects.create(
+            name='Клиника рейтинга', city=self.city, organization_type=self.organization_type)
+        self.rehab = RehabCenter.objects.create(
+            name='Центр рейтинга', city=self.city, organization_type=self.organization_type)
+        self.clinic_ct = ContentType.objects.get_for_model(Clinic)
+        self.rehab_ct = ContentType.objects.get_for_model(RehabCenter)
+
+    def _create_review(self, rating, content_type=None, object_id=None, is_published=True):
+        return Review.objects.create(
+            content_type=content_type or self.clinic_ct,
+            object_id=object_id or self.clinic.id,
+            created_by=self.user,
+            author_name='Автор',
+            rating=rating,
+            content='Текст отзыва',
+            is_published=is_published
+        )
+
+    def test_aggregate_updated_on_create(self):
+        self._create_review(5)
+        self._create_review(4)
+        self._create_review(1, is_published=False)
+        self.clinic.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 2)
+        self.assertEqual(self.clinic.rating_sum, 9)
+        self.assertEqual(self.clinic.rating_avg, Decimal('4.50'))
+        self.assertEqual(self.clinic.rating_histogram, [0, 0, 0, 1, 1])
+
+    def test_aggregate_updated_on_unpublish_and_delete(self):
+        review = self._create_review(5)
+        self._create_review(3)
+        review.is_published = False
+        review.save()
+        self.clinic.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 1)
+        self.assertEqual(self.clinic.rating_avg, Decimal('3.00'))
+
+        Review.objects.filter(rating=3).delete()
+        self.clinic.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 0)
+        self.assertEqual(self.clinic.rating_avg, Decimal('0'))
+        self.assertEqual(self.clinic.rating_histogram, [0, 0, 0, 0, 0])
+
+    def test_aggregate_updated_when_review_moved(self):
+        review = self._create_review(2)
+        review.content_type = self.rehab_ct
+        review.object_id = self.rehab.id
+        review.save()
+        self.clinic.refresh_from_db()
+        self.rehab.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 0)
+        self.assertEqual(self.rehab.rating_count, 1)
+        self.assertEqual(self.rehab.rating_histogram, [0, 1, 0, 0, 0])
+
+    def test_specialist_aggregate(self):
+        specialist = FacilitySpecialist.objects.create(
+            first_name='Иван', last_name='Рейтингов', experience_years=5,
+            content_type=self.clinic_ct, object_id=self.clinic.id)
+        self._create_review(
+            4, content_type=ContentType.objects.get_for_model(FacilitySpecialist),
+            object_id=specialist.id)
+        specialist.refresh_from_db()
+        self.assertEqual(specialist.rating_count, 1)
+        self.assertEqual(specialist.rating_avg, Decimal('4.00'))
+
+    def test_rebuild_command(self):
+        self._create_review(5)
+        self._create_review(3)
+        Clinic.objects.filter(pk=self.clinic.pk).update(
+            rating_count=0, rating_sum=0, rating_avg=0, rating_histogram=[0, 0, 0, 0, 0])
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.clinic.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 2)
+        self.assertEqual(self.clinic.rating_avg, Decimal('4.00'))
+        self.assertEqual(self.clinic.rating_histogram, [0, 0, 1, 0, 1])
+
+    def test_refresh_with_historical_models(self):
+        """Миграции пересчитывают статистику историческими моделями"""
+        specialist = FacilitySpecialist.objects.create(
+            first_name='Иван', last_name='Рейтингов', experience_years=5,
+            content_type=self.clinic_ct, object_id=self.clinic.id)
+        self._create_review(5)
+        self._create_review(
+            2, content_type=ContentType.objects.get_for_model(FacilitySpecialist),
+            object_id=specialist.id)
+        Clinic.objects.update(rating_count=0, rating_sum=0, rating_avg=0)
+        FacilitySpecialist.objects.update(rating_count=0, rating_sum=0, rating_avg=0)
+
+        apps = MigrationExecutor(connection).loader.project_state([
+            ('facilities', '0003_rating_aggregates'),
+            ('staff', '0002_rating_aggregates'),
+        ]).apps
+        refresh_rating_aggregates(apps.get_model('facilities', 'Clinic'), apps=apps)
+        refresh_rating_aggregates(apps.get_model('staff', 'MedicalSpecialist'), apps=apps)
+        self.clinic.refresh_from_db()
+        specialist.refresh_from_db()
+        self.assertEqual(self.clinic.rating_count, 1)
+        self.assertEqual(self.clinic.rating_avg, Decimal('5.00'))
+        self.assertEqual(specialist.rating_count, 1)
+        self.assertEqual(specialist.rating_histogram, [0, 1, 0, 0, 0])
+
+    def test_manager_rating_queries(self):
+        self._create_review(5)
+        self._create_review(
+            2, content_type=self.rehab_ct, object_id=self.rehab.id)
+        self.assertEqual(list(Clinic.objects.with_min_rating(4)), [self.clinic])
+        self.assertFalse(RehabCenter.objects.with_min_rating(4).exists())
+        self.assertEqual(RehabCenter.objects.top_rated().first(), self.rehab)
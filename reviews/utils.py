@@ -0,0 +1,170 @@
+"""
+Утилиты для денормализованной статистики отзывов.
+
+Пересчитывают поля RatingAggregateModel (количество, сумма, средняя оценка
+и гистограмма) одним сгруппированным запросом на пачку объектов.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.apps import apps as global_apps
+from django.db.models import Count
+
+from .models import RatingAggregateModel, empty_rating_histogram
+
+
+def get_rating_root_model(model):
+    """
+    Get the model whose table stores the rating aggregate fields.
+
+    For multi-table inheritance (FacilitySpecialist -> MedicalSpecialist)
+    the fields live in the parent table, so the parent is returned.
+
+    Args:
+        model: Model class derived from RatingAggregateModel
+
+    Returns:
+        Model: Concrete model owning the rating fields
+    """
+    return model._meta.get_field('rating_count').model
+
+
+def get_rated_models():
+    """
+    Get all concrete models that store rating aggregates.
+
+    Returns:
+        list: Root models (one per table) derived from RatingAggregateModel
+    """
+    roots = []
+    for model in global_apps.get_models():
+        if issubclass(model, RatingAggregateModel):
+            root = get_rating_root_model(model)
+            if root not in roots:
+                roots.append(root)
+    return roots
+
+
+def _get_family_content_types(root, apps=None):
+    """
+    Get content types of the root model and its multi-table children.
+
+    Reviews may reference both the parent and the child content type,
+    while both share the same primary key.
+    """
+    apps = apps or global_apps
+    family = [root] + [
+        model for model in apps.get_models()
+        if model is not root and issubclass(model, root)
+    ]
+    content_types = apps.get_model('contenttypes', 'ContentType').objects.get_for_models(*family)
+    return list(content_types.values())
+
+
+def compute_rating_stats(model, object_ids, apps=None):
+    """
+    Compute rating statistics for the given objects.
+
+    Args:
+        model: Model class derived from RatingAggregateModel
+        object_ids: Iterable of object primary keys
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        dict: Mapping of object id to dict with rating field values
+    """
+    root = get_rating_root_model(model)
+    object_ids = list(object_ids)
+    stats = {
+        object_id: {
+            'rating_count': 0,
+            'rating_sum': 0,
+            'rating_avg': Decimal('0'),
+            'rating_histogram': empty_rating_histogram(),
+        }
+        for object_id in object_ids
+    }
+    if not object_ids:
+        return stats
+
+    review_model = (apps or global_apps).get_model('reviews', 'Review')
+    rows = review_model.objects.filter(
+        content_type__in=_get_family_content_types(root, apps),
+        object_id__in=object_ids,
+        is_published=True
+    ).values_list('object_id', 'rating').annotate(total=Count('id')).order_by()
+
+    for object_id, rating, total in rows:
+        item = stats.get(object_id)
+        if item is None or not 1 <= rating <= 5:
+            continue
+        item['rating_count'] += total
+        item['rating_sum'] += rating * total
+        item['rating_histogram'][rating - 1] += total
+
+    for item in stats.values():
+        if item['rating_count']:
+            item['rating_avg'] = (
+                Decimal(item['rating_sum']) / Decimal(item['rating_count'])
+            ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return stats
+
+
+def refresh_rating_aggregates(model, object_ids=None, batch_size=500, apps=None):
+    """
+    Recalculate rating fields for the given objects.
+
+    Args:
+        model: Model class derived from RatingAggregateModel (or its
+            historical model in migrations)
+        object_ids: Primary keys to refresh (all objects if None)
+        batch_size: Number of objects processed per query
+        apps: App registry (historical models in migrations)
+
+    Returns:
+        int: Number of refreshed objects
+    """
+    root = get_rating_root_model(model)
+    if object_ids is None:
+        object_ids = root._default_manager.order_by('pk').values_list('pk', flat=True).iterator(
+            chunk_size=batch_size
+        )
+
+    fields = ['rating_count', 'rating_sum', 'rating_avg', 'rating_histogram']
+    refreshed = 0
+    batch = []
+
+    def flush(ids):
+        stats = compute_rating_stats(root, ids, apps)
+        objects = [root(pk=object_id, **values) for object_id, values in stats.items()]
+        root._default_manager.bulk_update(objects, fields, batch_size=batch_size)
+        return len(objects)
+
+    for object_id in object_ids:
+        batch.append(object_id)
+        if len(batch) >= batch_size:
+            refreshed += flush(batch)
+            batch = []
+    if batch:
+        refreshed += flush(batch)
+    return refreshed
+
+
+def refresh_rating_for_target(content_type, object_id):
+    """
+    Recalculate rating fields for the object a review points to.
+
+    Args:
+        content_type: ContentType of the reviewed object
+        object_id: Primary key of the reviewed object
+
+    Returns:
+        bool: True if the target stores rating aggregates
+    """
+    if content_type is None or object_id is None:
+        return False
+    model = content_type.model_class()
+    if model is None or not issubclass(model, RatingAggregateModel):
+        return False
+    refresh_rating_aggregates(model, [object_id])
+    return True
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django.contrib.contenttypes.models import ContentType
+from core.admin import GenericPrefetchAdminMixin
 from .models import (
     FacilitySpecialist,
     Specialization,
@@ -85,7 +86,7 @@ class SpecializationAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
 
 @admin.register(FacilitySpecialist)
-class FacilitySpecialistAdmin(admin.ModelAdmin):
+class FacilitySpecialistAdmin(GenericPrefetchAdminMixin, admin.ModelAdmin):
     form = FacilitySpecialistForm
     list_display = [
         'get_full_name_with_id',
@@ -6,3 +6,8 @@ class StaffConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'staff'
     verbose_name = _('Персонал')
+
+    def ready(self):
+        """Подключение индекса поиска по ФИО специалистов."""
+        from staff.search import specialist_name_search
+        specialist_name_search.connect_signals()
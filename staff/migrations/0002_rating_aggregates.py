@@ -0,0 +1,44 @@
+# Generated by Django 5.1.11 on 2026-10-16 23:13
+
+import reviews.models
+from django.db import migrations, models
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    """Рассчитывает статистику отзывов для существующих специалистов."""
+    from reviews.utils import refresh_rating_aggregates
+
+    # Поля в родительской таблице: FacilitySpecialist пересчитывается вместе с ней
+    refresh_rating_aggregates(apps.get_model('staff', 'MedicalSpecialist'), apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0001_initial'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalspecialist',
+            name='rating_avg',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=3, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='medicalspecialist',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='medicalspecialist',
+            name='rating_histogram',
+            field=models.JSONField(default=reviews.models.empty_rating_histogram, editable=False, verbose_name='Распределение оценок'),
+        ),
+        migrations.AddField(
+            model_name='medicalspecialist',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+POSTGRES_CREATE = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS staff_medicalspecialist_name_trgm "
+    "ON staff_medicalspecialist USING GIN (("
+    "COALESCE(last_name, '') || ' ' || COALESCE(first_name, '') || ' ' || COALESCE(middle_name, '')"
+    ") gin_trgm_ops)",
+)
+POSTGRES_DROP = "DROP INDEX IF EXISTS staff_medicalspecialist_name_trgm"
+
+
+def create_name_index(apps, schema_editor):
+    """Создает триграммный индекс ФИО специалистов (только PostgreSQL)."""
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_name_index(apps, schema_editor):
+    """Удаляет триграммный индекс ФИО специалистов."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0002_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
@@ -3,11 +3,10 @@ from django.utils.translation import gettext_lazy as _
 from core.models import TimeStampedModel
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.utils.text import slugify
-from django.db.models import Q
 from django.urls import reverse
-from reviews.models import Review
+from reviews.models import Review, RatingAggregateModel
 from core.utils import transliterate, generate_slug
+from core.slugs import make_base_slug, save_with_unique_slug
 
 class Specialization(TimeStampedModel):
     """
@@ -39,7 +38,7 @@ class Specialization(TimeStampedModel):
             self.slug = generate_slug(self.name, Specialization, self)
         super().save(*args, **kwargs)
 
-class MedicalSpecialist(TimeStampedModel):
+class MedicalSpecialist(RatingAggregateModel, TimeStampedModel):
     """
     Базовая модель для всех медицинских специалистов
     """
@@ -119,18 +118,10 @@ class MedicalSpecialist(TimeStampedModel):
     def save(self, *args, **kwargs):
         if not self.slug or self.slug.startswith('-'):
             # Формируем базовый слаг из фамилии и имени
-            base_slug = slugify(f"{self.last_name}-{self.first_name}")
-            if not base_slug:  # Если после slugify получили пустую строку
-                base_slug = f"specialist-{self.id}" if self.id else "specialist"
-            slug = base_slug
-            
-            # Проверяем, существует ли уже такой слаг
-            counter = 1
-            while MedicalSpecialist.objects.filter(Q(slug=slug) & ~Q(pk=self.pk)).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-                
-            self.slug = slug
+            base_slug = make_base_slug(f"{self.last_name}-{self.first_name}", fallback='specialist')
+            return save_with_unique_slug(
+                self, base_slug, lambda: super(MedicalSpecialist, self).save(*args, **kwargs)
+            )
             
         super().save(*args, **kwargs)
 
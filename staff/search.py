@@ -0,0 +1,10 @@
+"""
+Typo-tolerant name search over medical specialists.
+
+See core.trigram for the pg_trgm and in-process implementations.
+"""
+
+from core.trigram import NameSearch
+
+
+specialist_name_search = NameSearch('staff.MedicalSpecialist')
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from staff.models import MedicalSpecialist, FacilitySpecialist, Specialization
 from facilities.models import Clinic, OrganizationType
 from core.models import City, Region
+from staff.search import specialist_name_search
 
 User = get_user_model()
 
@@ -161,4 +162,15 @@ class StaffViewsTest(TestCase):
         # При поиске несуществующего специалиста список должен быть пустым
         self.assertIn('specialists', response.context)
         specialists = response.context['specialists']
-        self.assertEqual(len(specialists), 0) 
\ No newline at end of file
+        self.assertEqual(len(specialists), 0) 
+
+    def test_specialists_list_view_search_with_typo(self):
+        """Тест поиска по фамилии с опечаткой"""
+        specialist_name_search.reset()
+        response = self.client.get(reverse('staff:specialists_list'), {
+            'search': 'Петрв'
+        })
+        self.assertEqual(response.status_code, 200)
+        specialists = response.context['specialists']
+        self.assertIn(self.facility_specialist, specialists)
+        self.assertNotIn(self.facility_specialist2, specialists)
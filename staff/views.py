@@ -1,24 +1,31 @@
 from django.shortcuts import render
 from django.views.generic import DetailView, ListView
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from .models import FacilitySpecialist
-from core.mixins import GeoDataMixin
+from core.generic import prefetch_generic
+from core.mixins import CacheMixin, GeoDataMixin
+from .search import specialist_name_search
 
 # Create your views here.
 
-class SpecialistsListView(ListView):
+class SpecialistsListView(CacheMixin, ListView):
     """
     List view for facility specialists with search functionality.
     """
     model = FacilitySpecialist
     template_name = 'staff/specialists_list.html'
     context_object_name = 'specialists'
+    cache_tags = ('staff.FacilitySpecialist', 'staff.Specialization')
     paginate_by = 12
     
     def get_queryset(self):
         """
         Get filtered queryset with search functionality.
         
+        Names similar to the query (typos) are found too; the best name
+        matches go first.
+        
         Returns:
             QuerySet: Filtered specialists queryset
         """
@@ -27,11 +34,18 @@ class SpecialistsListView(ListView):
         # Поиск по имени или должности
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
+            condition = (
                 Q(first_name__icontains=search_query) |
                 Q(last_name__icontains=search_query) |
                 Q(position__icontains=search_query)
             )
+            # Похожие ФИО (опечатки) ищутся вместе с точными совпадениями
+            names = specialist_name_search.match(search_query)
+            if names is not None:
+                return queryset.filter(condition | names[0]).annotate(
+                    name_similarity=Coalesce(names[1], Value(0.0))
+                ).order_by('-name_similarity', 'last_name', 'first_name')
+            queryset = queryset.filter(condition)
         
         return queryset.order_by('last_name', 'first_name')
     
@@ -49,13 +63,30 @@ class SpecialistsListView(ListView):
         context['search_query'] = self.request.GET.get('search', '')
         return context
 
-class SpecialistDetailView(GeoDataMixin, DetailView):
+class SpecialistDetailView(CacheMixin, GeoDataMixin, DetailView):
     """
     Detail view for facility specialist with geographical data.
     """
     model = FacilitySpecialist
     template_name = 'staff/specialist_detail.html'
     context_object_name = 'specialist'
+    cache_tags = (
+        'staff.FacilitySpecialist', 'staff.Specialization', 'staff.SpecialistDocument',
+        'facilities.Clinic', 'facilities.RehabCenter', 'facilities.PrivateDoctor',
+        'reviews.Review',
+    )
+
+    def get_object(self, queryset=None):
+        """
+        Get the specialist with the facility resolved in batch.
+        
+        Returns:
+            FacilitySpecialist: Specialist with facility, its city, images
+            and reviews loaded
+        """
+        specialist = super().get_object(queryset)
+        prefetch_generic([specialist], 'facility', prefetch_related=('images', 'reviews'))
+        return specialist
 
     def get_context_data(self, **kwargs):
         """
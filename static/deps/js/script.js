@@ -291,9 +291,16 @@ document.addEventListener("DOMContentLoaded", () => {
         if (button) {
             button.addEventListener('click', function() {
                 button.disabled = true;
-                const currentCards = document.querySelectorAll('.rehabs__cards .card').length;
+                // Передаем текущие поиск и фильтры списка, далее - курсор следующей страницы
+                const params = new URLSearchParams(window.location.search);
+                params.delete('page');
+                if (button.dataset.cursor) {
+                    params.set('cursor', button.dataset.cursor);
+                } else {
+                    params.set('offset', document.querySelectorAll('.rehabs__cards .card').length);
+                }
                 
-                fetch(url + '?offset=' + currentCards, {
+                fetch(url + '?' + params.toString(), {
                     method: 'GET',
                     headers: {
                         'X-Requested-With': 'XMLHttpRequest'
@@ -304,6 +311,7 @@ document.addEventListener("DOMContentLoaded", () => {
                     if (data.cards) {
                         const cardsContainer = document.querySelector('.rehabs__cards');
                         cardsContainer.insertAdjacentHTML('beforeend', data.cards);
+                        button.dataset.cursor = data.next_cursor || '';
                         if (!data.has_more) {
                             button.style.display = 'none';
                         }